@@ -0,0 +1,150 @@
+"""
+IVF 인덱스의 n_probe별 recall@k와 QPS를 정확 탐색(AdvertiserMatcher)과 비교합니다.
+인덱스 파일에 함께 저장한 광고주 정보의 id 조회 시간(첫 조회 포함)도 측정합니다.
+광고주 임베딩은 클러스터 구조를 가진 합성 데이터를 사용합니다.
+
+사용법:
+    python benchmarks/bench_ann_index.py [--advertisers 100000] [--dim 768]
+        [--k 10]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+)
+
+from ann_index import IVFIndex, build_ivf_index  # noqa: E402
+from matcher import AdvertiserMatcher  # noqa: E402
+
+
+def make_clustered_vectors(count, dim, n_topics, rng, noise=0.6):
+    topics = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    labels = rng.integers(0, n_topics, count)
+    return topics[labels] + noise * rng.standard_normal((count, dim)).astype(
+        np.float32
+    )
+
+
+def measure(search, queries):
+    start = time.perf_counter()
+    results = [search(q) for q in queries]
+    elapsed = time.perf_counter() - start
+    return results, len(queries) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--advertisers', type=int, default=100000)
+    parser.add_argument('--dim', type=int, default=768)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--n-lists', type=int, default=None)
+    parser.add_argument(
+        '--n-probes', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64]
+    )
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    n_topics = max(10, args.advertisers // 500)
+    vectors = make_clustered_vectors(args.advertisers, args.dim, n_topics, rng)
+    queries = make_clustered_vectors(args.queries, args.dim, n_topics, rng)
+    ids = np.arange(1, args.advertisers + 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'advertisers.ivf')
+        start = time.perf_counter()
+        metadata = [
+            {
+                'name': f"광고주 {i}",
+                'description': f"광고주 {i}의 클라우드 서비스 소개 " * 4,
+                'ad_template': f"광고주 {i} 맞춤 광고 템플릿",
+            }
+            for i in ids
+        ]
+        build_ivf_index(
+            ids, vectors, path, n_lists=args.n_lists, metadata=metadata
+        )
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = IVFIndex(path)
+        open_time = time.perf_counter() - start
+
+        lookup_ids = rng.choice(ids, 1000)
+        start = time.perf_counter()
+        first = index.get(int(lookup_ids[0]))
+        first_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for advertiser_id in lookup_ids:
+            advertiser = index.get(int(advertiser_id))
+            assert advertiser['name'] == f"광고주 {advertiser_id}"
+        get_us = (time.perf_counter() - start) / len(lookup_ids) * 1e6
+        assert first['id'] == int(lookup_ids[0])
+        assert index.get(args.advertisers + 1) is None
+        # 비교: 광고주 정보 전체를 JSON 하나로 저장하면 첫 조회 때 전부 파싱해야 합니다.
+        blob = json.dumps(
+            {str(int(i)): m for i, m in zip(ids, metadata)},
+            ensure_ascii=False,
+        ).encode('utf-8')
+        start = time.perf_counter()
+        json.loads(blob)
+        whole_ms = (time.perf_counter() - start) * 1000
+
+        advertisers = [
+            {'id': int(i), 'embedding': v} for i, v in zip(ids, vectors)
+        ]
+        matcher = AdvertiserMatcher(advertisers)
+        exact, exact_qps = measure(
+            lambda q: [a['id'] for a, _ in matcher.top_k(q, args.k)], queries
+        )
+
+        print(
+            f"advertisers={args.advertisers} dim={args.dim}"
+            f" n_lists={index.n_lists} k={args.k}"
+        )
+        print(
+            f"build {build_time:.1f}s, open {open_time * 1000:.2f}ms, "
+            f"file {os.path.getsize(path) / 2**20:.1f}MiB"
+        )
+        print(
+            f"metadata get: first {first_ms:.3f}ms, then {get_us:.1f}us"
+            f" (whole-blob JSON parse {whole_ms:.0f}ms,"
+            f" {len(blob) / 2**20:.1f}MiB)"
+        )
+        print(
+            f"{'n_probe':>8} {f'recall@{args.k}':>10} {'QPS':>10}"
+            f" {'vs exact':>9}"
+        )
+        print(f"{'exact':>8} {1.0:>10.3f} {exact_qps:>10.0f} {1.0:>8.1f}x")
+
+        for n_probe in args.n_probes:
+            if n_probe > index.n_lists:
+                break
+            approx, qps = measure(
+                lambda q: [i for i, _ in index.search(q, args.k, n_probe)],
+                queries,
+            )
+            recall = np.mean([
+                len(set(a) & set(e)) / max(len(e), 1)
+                for a, e in zip(approx, exact)
+            ])
+            print(
+                f"{n_probe:>8} {recall:>10.3f} {qps:>10.0f}"
+                f" {qps / exact_qps:>8.1f}x"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+묶음 광고 매칭({"queries": [...]})과 질문별 단일 요청을 비교합니다.
+
+1. 매칭: 질문 N개를 top_k를 N번 호출할 때와 top_k_batch(행렬-행렬 곱 한 번)로 처리할 때의 시간
+2. 핸들러: 질문 N개를 단일 요청 N번으로 보낼 때와 묶음 요청 한 번(생성 없음/전체 생성)으로 보낼 때의
+   종단 시간, 임베딩 API 호출 수, 광고 생성(LLM) 호출 수
+
+임베딩 API와 광고 생성은 고정 지연 스텁입니다. (임베딩은 요청 하나당 지연, 묶음 크기와 무관)
+
+사용법:
+    python benchmarks/bench_batch_matching.py [--advertisers 10000] [--queries
+        10] [--embed-ms 60] [--generation-ms 150]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, '..', 'src'))
+# Lambda 레이어로 배포되는 공용 모듈 (services/shared/python)
+sys.path.insert(0, os.path.join(BASE_DIR, '..', '..', 'shared', 'python'))
+os.environ.setdefault('GEMINI_API_KEY', 'local-benchmark')
+os.environ.pop('EMBEDDING_CACHE_PATH', None)
+os.environ.pop('AD_INDEX_PATH', None)
+
+import ad_generator  # noqa: E402
+import embedding_cache  # noqa: E402
+from matcher import AdvertiserMatcher  # noqa: E402
+
+
+def make_advertisers(count, dim, rng):
+    embeddings = rng.normal(0, 1, (count, dim)).astype(np.float32)
+    return [
+        {
+            'id': i,
+            'name': f'advertiser-{i}',
+            'description': f'advertiser {i}',
+            'ad_template': f'advertiser {i} 특별 혜택',
+            'embedding': embeddings[i],
+        }
+        for i in range(count)
+    ]
+
+
+def bench_matching(advertisers, dim, counts, k, rng):
+    matcher = AdvertiserMatcher(advertisers)
+    print(f"matching against {len(advertisers)} advertisers, top_k={k}")
+    print(f"{'queries':>8} {'loop ms':>9} {'batch ms':>9} {'speedup':>8}")
+    for count in counts:
+        queries = list(rng.normal(0, 1, (count, dim)).astype(np.float32))
+        runs = 5
+        started = time.perf_counter()
+        for _ in range(runs):
+            loop = [matcher.top_k(query, k=k) for query in queries]
+        loop_ms = (time.perf_counter() - started) / runs * 1000
+        started = time.perf_counter()
+        for _ in range(runs):
+            batch = matcher.top_k_batch(queries, k=k)
+        batch_ms = (time.perf_counter() - started) / runs * 1000
+        assert [[a['id'] for a, _ in r] for r in loop] == [
+            [a['id'] for a, _ in r] for r in batch
+        ]
+        print(
+            f"{count:>8} {loop_ms:>9.2f} {batch_ms:>9.2f}"
+            f" {loop_ms / batch_ms:>7.1f}x"
+        )
+
+
+def install_stubs(args, advertisers, dim, counters):
+    vectors = {}
+
+    def embed(texts, task_type, model):
+        counters['embed_calls'] += 1
+        time.sleep(args.embed_ms / 1000.0)
+        for text in texts:
+            if text not in vectors:
+                vectors[text] = np.random.default_rng(
+                    abs(hash(text)) % (2**32)
+                ).normal(0, 1, dim)
+        return [vectors[text] for text in texts]
+
+    def generate(advertiser, user_query):
+        counters['generations'] += 1
+        time.sleep(args.generation_ms / 1000.0)
+        return f"[{advertiser['name']}] {user_query} 맞춤 광고"
+
+    embedding_cache.embed_content = embed
+    ad_generator.generate_personalized_ad = generate
+    ad_generator.load_advertisers = lambda: advertisers
+    ad_generator._advertiser_matcher = None
+    ad_generator._advertisers_by_id = None
+    # 같은 질문 재사용으로 인한 차이가 없도록 의미 캐시는 끕니다.
+    ad_generator.SEMANTIC_CACHE_THRESHOLD = 2.0
+    ad_generator.AD_DEADLINE_MS = 0
+
+
+def run_mode(mode, args, round_number, counters):
+    embedding_cache._default_cache = None
+    counters.update(embed_calls=0, generations=0)
+    queries = [
+        f"{mode} 대화 {round_number} 턴 {i}" for i in range(args.queries)
+    ]
+    started = time.perf_counter()
+    if mode == 'single requests':
+        for query in queries:
+            response = ad_generator.handler(
+                {'body': json.dumps({'query': query})}, None
+            )
+            assert response['statusCode'] == 200, response
+    else:
+        body = {
+            'queries': queries,
+            'top_k': args.top_k,
+            'unique_advertisers': True,
+            'generate': mode == 'batch (generate all)',
+        }
+        response = ad_generator.handler({'body': json.dumps(body)}, None)
+        assert response['statusCode'] == 200, response
+        results = json.loads(response['body'])['results']
+        assert len(results) == args.queries and all(
+            len(r['matches']) == args.top_k for r in results
+        )
+        ids = [m['advertiser']['id'] for r in results for m in r['matches']]
+        assert len(ids) == len(
+            set(ids)
+        ), "unique_advertisers must not repeat advertisers"
+    return (time.perf_counter() - started) * 1000, dict(counters)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--advertisers', type=int, default=10000)
+    parser.add_argument('--dim', type=int, default=768)
+    parser.add_argument('--queries', type=int, default=10)
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument(
+        '--embed-ms',
+        type=float,
+        default=60.0,
+        help='임베딩 API 요청 하나의 지연',
+    )
+    parser.add_argument(
+        '--generation-ms', type=float, default=150.0, help='광고 생성 지연'
+    )
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    advertisers = make_advertisers(args.advertisers, args.dim, rng)
+    bench_matching(advertisers, args.dim, [1, 10, 50], args.top_k, rng)
+
+    counters = {'embed_calls': 0, 'generations': 0}
+    install_stubs(args, advertisers, args.dim, counters)
+    print(
+        f"\nhandler, {args.queries} queries per conversation, embed"
+        f" {args.embed_ms:.0f}ms/request, generation"
+        f" {args.generation_ms:.0f}ms (median of {args.rounds} rounds)"
+    )
+    print(
+        f"{'mode':<24} {'total ms':>9} {'embed calls':>12} {'LLM calls':>10}"
+    )
+    real_stdout = sys.stdout
+    for mode in (
+        'single requests',
+        'batch (match only)',
+        'batch (generate all)',
+    ):
+        runs = []
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            for round_number in range(args.rounds):
+                runs.append(run_mode(mode, args, round_number, counters))
+        finally:
+            sys.stdout.close()
+            sys.stdout = real_stdout
+        elapsed, counts = sorted(runs, key=lambda run: run[0])[len(runs) // 2]
+        print(
+            f"{mode:<24} {elapsed:>9.1f} {counts['embed_calls']:>12}"
+            f" {counts['generations']:>10}"
+        )
+    ad_generator.get_generation_executor().shutdown(wait=True)
+
+
+if __name__ == '__main__':
+    main()
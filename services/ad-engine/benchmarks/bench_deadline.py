@@ -0,0 +1,153 @@
+"""
+마감 시간 기반 광고 응답을 측정합니다.
+느린 꼬리 지연(로그 정규 분포)을 가진 광고 생성 스텁으로 ad_generator.handler를 호출해
+마감 시간이 없을 때와 있을 때의 종단 지연 p50/p95/p99, 응답 출처(generated/cache/template) 비율,
+단계별 지연 백분위수를 비교합니다. 백그라운드 생성이 캐시를 채워 다음 요청이 캐시에서 처리되는지도 확인합니다.
+
+사용법:
+    python benchmarks/bench_deadline.py [--requests 400] [--queries 80]
+        [--deadline-ms 300] [--median-ms 150]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, '..', 'src'))
+# Lambda 레이어로 배포되는 공용 모듈 (services/shared/python)
+sys.path.insert(0, os.path.join(BASE_DIR, '..', '..', 'shared', 'python'))
+os.environ.setdefault('GEMINI_API_KEY', 'local-benchmark')
+
+import ad_generator  # noqa: E402
+from latency import LatencyTracker  # noqa: E402
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[
+        min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))
+    ]
+
+
+def install_stubs(args, seed):
+    rng = random.Random(seed)
+    embeddings = {}
+
+    def embed(text):
+        time.sleep(args.embed_ms / 1000.0)
+        if text not in embeddings:
+            vector_rng = np.random.default_rng(abs(hash(text)) % (2**32))
+            # 광고주 Mock 임베딩과 같은 방향 + 질문별 성분 (서로 다른 질문은 의미 캐시에서 구분됨)
+            embeddings[text] = np.full(768, 0.2) + vector_rng.normal(
+                0, 0.05, 768
+            )
+        return embeddings[text]
+
+    def generate(advertiser, user_query):
+        # 로그 정규 분포: 중앙값 median_ms, 꼬리가 긴 LLM 지연
+        delay = args.median_ms * math.exp(rng.gauss(0, args.sigma)) / 1000.0
+        time.sleep(delay)
+        return f"[{advertiser['name']}] {user_query} 맞춤 광고"
+
+    ad_generator.get_text_embedding = embed
+    ad_generator.generate_personalized_ad = generate
+
+
+def run(args, deadline_ms):
+    # 모듈 상태(의미 캐시, 지연 집계, 진행 중 작업)를 초기화합니다.
+    ad_generator._semantic_ad_cache = None
+    ad_generator.stage_latency = LatencyTracker()
+    ad_generator.AD_DEADLINE_MS = deadline_ms
+    install_stubs(args, seed=1)
+
+    rng = random.Random(0)
+    weights = [1.0 / (rank + 1) for rank in range(args.queries)]
+    queries = [
+        f"클라우드 질문 {i}"
+        for i in rng.choices(range(args.queries), weights, k=args.requests)
+    ]
+
+    latencies, sources = [], Counter()
+    for query in queries:
+        start = time.perf_counter()
+        response = ad_generator.handler(
+            {'body': json.dumps({'query': query})}, None
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        sources[json.loads(response['body'])['ad_source']] += 1
+        time.sleep(args.gap_ms / 1000.0)
+    # 남은 백그라운드 생성이 끝날 때까지 기다립니다.
+    ad_generator.get_generation_executor().shutdown(wait=True)
+    ad_generator._generation_executor = None
+    return latencies, sources, ad_generator.stage_latency.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--queries', type=int, default=80)
+    parser.add_argument('--deadline-ms', type=int, default=300)
+    parser.add_argument(
+        '--median-ms', type=float, default=150.0, help='광고 생성 지연 중앙값'
+    )
+    parser.add_argument(
+        '--sigma',
+        type=float,
+        default=0.8,
+        help='로그 정규 분포 sigma (클수록 꼬리가 김)',
+    )
+    parser.add_argument('--embed-ms', type=float, default=5.0)
+    parser.add_argument(
+        '--gap-ms', type=float, default=2.0, help='요청 사이 간격'
+    )
+    args = parser.parse_args()
+
+    # print 로그가 결과를 가리지 않도록 핸들러 출력은 버립니다.
+    real_stdout = sys.stdout
+    results = {}
+    for label, deadline_ms in (
+        ('no deadline', 0),
+        (f'deadline {args.deadline_ms}ms', args.deadline_ms),
+    ):
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            results[label] = run(args, deadline_ms)
+        finally:
+            sys.stdout.close()
+            sys.stdout = real_stdout
+
+    print(
+        f"{args.requests} requests, {args.queries} distinct queries (Zipf), "
+        f"generation median {args.median_ms:.0f}ms sigma {args.sigma}"
+    )
+    print(
+        f"{'mode':<16} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+        "  sources"
+    )
+    for label, (latencies, sources, _) in results.items():
+        print(
+            f"{label:<16} {percentile(latencies, 50):>8.1f}"
+            f" {percentile(latencies, 95):>8.1f}"
+            f" {percentile(latencies, 99):>8.1f} {max(latencies):>8.1f} "
+            f" {dict(sources)}"
+        )
+
+    print("\nstage percentiles with deadline (ms)")
+    _, _, summary = results[f'deadline {args.deadline_ms}ms']
+    for stage, values in summary.items():
+        print(
+            f"  {stage:<14} n={values['count']:<5} p50={values['p50']:.1f}"
+            f" p95={values['p95']:.1f} p99={values['p99']:.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
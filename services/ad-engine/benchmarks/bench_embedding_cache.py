@@ -0,0 +1,201 @@
+"""
+임베딩 캐시의 효과를 측정합니다.
+1. 압축 방식(float32/float16/int8)별 벡터당 바이트 수와 코사인 유사도 오차
+2. Zipf 분포의 반복 질문에 대한 ad_generator.get_text_embedding 지연 시간 (캐시 없음 vs 캐시)
+3. 파일 계층: 새 프로세스(새 캐시 인스턴스)가 같은 파일로 시작했을 때의 적중률
+
+지연 시간을 주입하는 임베딩 스텁을 사용하므로 네트워크/API 키가 필요 없습니다.
+
+사용법:
+    python benchmarks/bench_embedding_cache.py [--requests 2000] [--distinct
+        1000] [--latency 0.03]
+"""
+
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, '..', 'src'))
+# Lambda 레이어로 배포되는 공용 모듈 (services/shared/python)
+sys.path.insert(0, os.path.join(BASE_DIR, '..', '..', 'shared', 'python'))
+os.environ.setdefault('GEMINI_API_KEY', 'local-benchmark')
+
+import ad_generator  # noqa: E402
+import embedding_cache  # noqa: E402
+from embedding_cache import (  # noqa: E402
+    CODECS,
+    EmbeddingCache,
+    decode_vector,
+    encode_vector,
+)
+
+
+class EmbedStub:
+    def __init__(self, dim=768, latency=0.08):
+        self.dim = dim
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, texts, task_type, model):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [
+            [random.Random(text).gauss(0, 0.05) for _ in range(self.dim)]
+            for text in texts
+        ]
+
+
+def cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    return dot / (
+        math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    )
+
+
+def report_codecs(dim, samples=200):
+    rng = random.Random(0)
+    vectors = [
+        [rng.gauss(0, 0.05) for _ in range(dim)] for _ in range(samples)
+    ]
+    print(
+        f"{'dtype':<8} {'bytes/vector':>12} {'max |cos err|':>14}"
+        f" {'encode us':>10} {'decode us':>10}"
+    )
+    for dtype in CODECS:
+        errors, encode_time, decode_time = [], 0.0, 0.0
+        for vector in vectors:
+            start = time.perf_counter()
+            entry = encode_vector(vector, dtype)
+            encode_time += time.perf_counter() - start
+            start = time.perf_counter()
+            decoded = decode_vector(*entry)
+            decode_time += time.perf_counter() - start
+            # 질의 벡터와의 유사도가 얼마나 바뀌는지로 오차를 잽니다.
+            query = vectors[(vectors.index(vector) + 1) % samples]
+            errors.append(abs(cosine(query, vector) - cosine(query, decoded)))
+        print(
+            f"{dtype:<8} {len(entry[3]):>12} {max(errors):>14.5f}"
+            f" {encode_time / samples * 1e6:>10.1f}"
+            f" {decode_time / samples * 1e6:>10.1f}"
+        )
+
+
+def zipf_queries(requests, distinct, seed=0):
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(distinct)]
+    return [
+        f"질문 {i}: 클라우드 서비스 추천해주세요"
+        for i in rng.choices(range(distinct), weights, k=requests)
+    ]
+
+
+def run_requests(queries, stub, cache):
+    embedding_cache._default_cache = cache
+    embedding_cache.embed_content = stub
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        ad_generator.get_text_embedding(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        'p50': statistics.median(latencies),
+        'p99': latencies[int(len(latencies) * 0.99) - 1],
+        'mean': statistics.fmean(latencies),
+        'calls': stub.calls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--distinct', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.03)
+    parser.add_argument('--dim', type=int, default=768)
+    parser.add_argument('--dtype', default='float16', choices=list(CODECS))
+    args = parser.parse_args()
+
+    print("== codecs")
+    report_codecs(args.dim)
+
+    queries = zipf_queries(args.requests, args.distinct)
+    print(
+        f"\n== {args.requests} ad requests, {len(set(queries))} distinct"
+        f" queries (Zipf), {args.latency * 1000:.0f}ms embed latency"
+    )
+    print(
+        f"{'mode':<26} {'API calls':>9} {'p50 ms':>8} {'p99 ms':>8}"
+        f" {'mean ms':>8}"
+    )
+
+    # 캐시 없음: 크기 0인 캐시는 아무것도 보관하지 않습니다.
+    uncached = run_requests(
+        queries, EmbedStub(args.dim, args.latency), EmbeddingCache(maxsize=0)
+    )
+    print(
+        f"{'no cache':<26} {uncached['calls']:>9} {uncached['p50']:>8.2f}"
+        f" {uncached['p99']:>8.2f} {uncached['mean']:>8.2f}"
+    )
+
+    path = os.path.join(
+        tempfile.mkdtemp(prefix='bench-embedding-cache-'), 'embeddings.bin'
+    )
+    cache = EmbeddingCache(maxsize=args.distinct, dtype=args.dtype, path=path)
+    cached = run_requests(queries, EmbedStub(args.dim, args.latency), cache)
+    stats = cache.stats()
+    print(
+        f"{'LRU + file (' + args.dtype + ')':<26} {cached['calls']:>9}"
+        f" {cached['p50']:>8.2f} {cached['p99']:>8.2f} {cached['mean']:>8.2f}"
+    )
+    print(
+        f"    hit rate {stats['hits'] / args.requests:.1%}, memory"
+        f" {stats['memory_bytes'] / 1024:.0f} KiB, file"
+        f" {stats['file_bytes'] / 1024:.0f} KiB"
+    )
+    cache.close()
+
+    # 새 컨테이너: 인메모리 계층은 비어 있고 파일 계층만 남아 있는 상태
+    restarted = EmbeddingCache(
+        maxsize=args.distinct, dtype=args.dtype, path=path
+    )
+    reloaded = run_requests(
+        queries, EmbedStub(args.dim, args.latency), restarted
+    )
+    stats = restarted.stats()
+    print(
+        f"{'restart (file only)':<26} {reloaded['calls']:>9}"
+        f" {reloaded['p50']:>8.2f} {reloaded['p99']:>8.2f}"
+        f" {reloaded['mean']:>8.2f}"
+    )
+    print(
+        f"    file hits {stats['file_hits']}, memory hits"
+        f" {stats['memory_hits']}, misses {stats['misses']}"
+    )
+
+    # 작은 파일 한도에서 압축(compaction) 동작 확인
+    small = EmbeddingCache(
+        maxsize=100,
+        dtype=args.dtype,
+        path=path + '.small',
+        file_max_bytes=200 * (args.dim * 2 + 41),
+    )
+    for query in queries[:2000]:
+        key = embedding_cache.embedding_key('m', 't', query)
+        if small.get(key) is None:
+            small.put(key, [0.01] * args.dim)
+    stats = small.stats()
+    print(
+        f"\ncompaction: {stats['compactions']} runs, {stats['file_entries']}"
+        f" entries kept, {stats['file_bytes'] / 1024:.0f} KiB <="
+        f" {small.file_max_bytes / 1024:.0f} KiB limit"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+"""
+광고주 인덱스 변경 로그(index_deltas)의 반영 지연, 조회 지연 시간, 반영 비용을 측정합니다.
+
+1. 신선도: 기준 스냅샷(광고주 행렬 / IVF 파일) 위에 광고주 변경·추가·삭제를 시뮬레이션 시계로 흘려보내며
+   요청마다 refresh()를 호출하고, 커밋 후 refresh_interval이 지난 첫 요청부터 변경이 보이는지 확인합니다.
+   (변경: 새 임베딩으로 찾으면 1위, 추가: 1위, 삭제: 결과와 get()에서 사라짐)
+   마지막에는 같은 광고주 목록으로 새로 만든 행렬과 결과가 같은지, 압축 후에도 같은지 확인합니다.
+2. 조회 지연: 변경이 없는 스냅샷과 반영한 변경이 N개 쌓인 인덱스의 요청당 조회 시간(p50/p99)을 비교합니다.
+3. 반영 비용: 광고주 전체를 다시 불러와 행렬을 만드는 비용과 refresh 한 번(변경 읽기 + 반영)의 비용을 비교합니다.
+
+사용법:
+    python benchmarks/bench_index_deltas.py [--advertisers 20000] [--dim 256]
+        [--deltas 1500] [--refresh-ms 1000]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, '..', 'src'))
+
+from ann_index import IVFIndex, build_ivf_index  # noqa: E402
+from index_deltas import (  # noqa: E402
+    DELTA_DELETE,
+    DELTA_UPSERT,
+    LiveAdvertiserIndex,
+    MatcherSnapshot,  # noqa: E402
+    SQLiteDeltaLog,
+)
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_advertisers(count, dim, rng, start=0):
+    embeddings = rng.normal(0, 1, (count, dim)).astype(np.float32)
+    return [
+        {
+            'id': start + i,
+            'name': f'advertiser-{start + i}',
+            'description': f'advertiser {start + i}',
+            'ad_template': f'ad {start + i}',
+            'embedding': embeddings[i],
+        }
+        for i in range(count)
+    ]
+
+
+def make_changes(advertisers, count, dim, rng, seed):
+    """
+    기존 광고주 변경(새 임베딩), 새 광고주 추가, 기존 광고주 삭제를 섞은 변경 목록입니다. 광고주마다 한 번만 바뀝니다.
+    """
+    shuffle = random.Random(seed)
+    existing = [advertiser['id'] for advertiser in advertisers]
+    shuffle.shuffle(existing)
+    next_id = len(advertisers)
+    changes = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            changes.append((
+                'update',
+                DELTA_UPSERT,
+                existing.pop(),
+                rng.normal(0, 1, dim).astype(np.float32),
+            ))
+        elif kind == 1:
+            changes.append((
+                'insert',
+                DELTA_UPSERT,
+                next_id,
+                rng.normal(0, 1, dim).astype(np.float32),
+            ))
+            next_id += 1
+        else:
+            changes.append(('delete', DELTA_DELETE, existing.pop(), None))
+    return changes
+
+
+def delta_payload(change):
+    """
+    새 광고주는 광고주 정보를 모두 싣고, 기존 광고주 변경은 임베딩만 실어 이전 정보를 이어받게 합니다.
+    """
+    kind, op, advertiser_id, embedding = change
+    if op != DELTA_UPSERT:
+        return None
+    if kind == 'insert':
+        return {
+            'name': f'advertiser-{advertiser_id}',
+            'description': f'advertiser {advertiser_id}',
+            'ad_template': f'ad {advertiser_id}',
+            'embedding': embedding,
+        }
+    return {'embedding': embedding}
+
+
+def visible(index, change, original):
+    kind, op, advertiser_id, embedding = change
+    if op == DELTA_UPSERT:
+        return index.search(embedding, k=1)[0][0] == advertiser_id
+    ranked = index.search(original[advertiser_id], k=5)
+    return (
+        advertiser_id not in [match[0] for match in ranked]
+        and index.get(advertiser_id) is None
+    )
+
+
+def bench_freshness(label, snapshot, advertisers, changes, args):
+    """
+    변경 커밋과 요청을 시뮬레이션 시계로 섞어 흘려보내고 각 변경이 처음 보인 요청까지의 지연을 잽니다.
+    """
+    clock = SimulatedClock()
+    delta_log = SQLiteDeltaLog(clock=clock)
+    refresh_interval = args.refresh_ms / 1000.0
+    by_id = {advertiser['id']: advertiser for advertiser in advertisers}
+    index = LiveAdvertiserIndex(
+        snapshot,
+        delta_log,
+        refresh_interval=refresh_interval,
+        compact_threshold=args.compact_threshold,
+        background_compaction=False,
+        clock=clock,
+        lookup=by_id.get,
+    )
+    original = {
+        advertiser['id']: advertiser['embedding'] for advertiser in advertisers
+    }
+    request_gap = args.request_ms / 1000.0
+    commit_gap = args.commit_ms / 1000.0
+
+    pending = []  # (커밋 시각, 변경)
+    delays = []
+    next_commit = 0.0
+    for change in changes:
+        # 다음 커밋 전까지 요청을 처리합니다. 요청마다 refresh() 후 밀린 변경이 보이는지 확인합니다.
+        while clock.now < next_commit:
+            index.refresh()
+            still_pending = []
+            for committed, waiting in pending:
+                if visible(index, waiting, original):
+                    delays.append(clock.now - committed)
+                else:
+                    assert clock.now < committed + refresh_interval, (
+                        f"{label}: {waiting[0]} of advertiser {waiting[2]} not"
+                        f" visible {clock.now - committed:.3f}s after commit"
+                    )
+                    still_pending.append((committed, waiting))
+            pending = still_pending
+            clock.now += request_gap
+        _, op, advertiser_id, _ = change
+        delta_log.append([(op, advertiser_id, delta_payload(change))])
+        pending.append((clock.now, change))
+        next_commit = clock.now + commit_gap
+    deadline = clock.now + refresh_interval
+    while pending:
+        assert (
+            clock.now <= deadline + request_gap
+        ), f"{label}: {len(pending)} deltas still invisible"
+        index.refresh()
+        still_pending = []
+        for committed, waiting in pending:
+            if visible(index, waiting, original):
+                delays.append(clock.now - committed)
+            else:
+                still_pending.append((committed, waiting))
+        pending = still_pending
+        clock.now += request_gap
+
+    stats = index.stats()
+    delays.sort()
+    print(
+        f"{label:<10} {len(changes):>7} {stats['refreshes']:>9}"
+        f" {stats['compactions']:>11} {delays[len(delays) // 2] * 1000:>8.0f}"
+        f" {delays[-1] * 1000:>8.0f} {args.refresh_ms:>8}"
+    )
+    assert delays[-1] <= refresh_interval + request_gap
+    return index, delta_log
+
+
+def final_advertisers(advertisers, changes):
+    by_id = {advertiser['id']: advertiser for advertiser in advertisers}
+    for kind, op, advertiser_id, embedding in changes:
+        if op == DELTA_UPSERT:
+            by_id[advertiser_id] = {
+                'id': advertiser_id,
+                'embedding': embedding,
+            }
+        else:
+            by_id.pop(advertiser_id)
+    return list(by_id.values())
+
+
+def check_exact(index, advertisers, changes, dim, rng):
+    """
+    변경을 반영한 인덱스와 최종 광고주로 새로 만든 행렬의 결과가 같은지, 압축 후에도 같은지 확인합니다.
+    """
+    fresh = MatcherSnapshot(final_advertisers(advertisers, changes))
+    queries = list(rng.normal(0, 1, (200, dim)).astype(np.float32))
+    expected = [
+        [match[0] for match in ranked]
+        for ranked in fresh.search_batch(queries, k=10)
+    ]
+    assert [
+        [match[0] for match in ranked]
+        for ranked in index.search_batch(queries, k=10)
+    ] == expected
+    index.compact()
+    stats = index.stats()
+    assert stats['hidden'] == 0 and stats['pending_deltas'] == 0
+    assert [
+        [match[0] for match in ranked]
+        for ranked in index.search_batch(queries, k=10)
+    ] == expected
+    print(
+        "exact results match a fresh rebuild before and after compaction"
+        f" ({stats['compactions']} compactions, snapshot version"
+        f" {stats['snapshot_version']})"
+    )
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def time_lookups(index, queries, k):
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, k=k)
+        timings.append((time.perf_counter() - started) * 1000)
+    return percentile(timings, 0.5), percentile(timings, 0.99)
+
+
+def bench_latency(advertisers, dim, args, rng):
+    """
+    반영한 변경 수에 따라 조회 시간이 어떻게 바뀌는지 봅니다. 압축 임계값에 닿으면 overlay가 비워집니다.
+    """
+    queries = list(rng.normal(0, 1, (args.lookups, dim)).astype(np.float32))
+    static = MatcherSnapshot(advertisers)
+    base_p50, base_p99 = time_lookups(static, queries, args.k)
+    print(
+        f"\nlookup latency, top_k={args.k}, {len(advertisers)} advertisers,"
+        f" compact threshold {args.compact_threshold}"
+    )
+    print(
+        f"{'pending deltas':>15} {'overlay':>8} {'hidden':>7} {'p50 ms':>8}"
+        f" {'p99 ms':>8}"
+    )
+    print(f"{'static':>15} {0:>8} {0:>7} {base_p50:>8.3f} {base_p99:>8.3f}")
+
+    changes = make_changes(
+        advertisers, args.compact_threshold * 2, dim, rng, args.seed + 1
+    )
+    clock = SimulatedClock()
+    delta_log = SQLiteDeltaLog(clock=clock)
+    index = LiveAdvertiserIndex(
+        MatcherSnapshot(advertisers),
+        delta_log,
+        compact_threshold=args.compact_threshold,
+        background_compaction=False,
+        clock=clock,
+    )
+    applied = 0
+    worst = 0.0
+    for target in (
+        10,
+        100,
+        args.compact_threshold // 2,
+        args.compact_threshold - 1,
+        args.compact_threshold,
+        args.compact_threshold * 2 - 1,
+    ):
+        batch = changes[applied:target]
+        if batch:
+            delta_log.append([
+                (change[1], change[2], delta_payload(change))
+                for change in batch
+            ])
+            applied = target
+        clock.now += 10
+        index.refresh()
+        stats = index.stats()
+        p50, p99 = time_lookups(index, queries, args.k)
+        worst = max(worst, p50)
+        print(
+            f"{stats['pending_deltas']:>15} {stats['overlay_size']:>8}"
+            f" {stats['hidden']:>7} {p50:>8.3f} {p99:>8.3f}"
+        )
+    # 변경이 쌓여도 조회 시간이 스냅샷 크기에 비례하는 기본 비용에서 크게 벗어나지 않아야 합니다.
+    assert (
+        worst <= base_p50 * 2 + 0.5
+    ), f"lookup p50 {worst:.3f} ms vs static {base_p50:.3f} ms"
+    return changes
+
+
+def bench_reload_cost(advertisers, dim, args, rng):
+    """
+    전체 재로딩(광고주 목록 -> 행렬)과 refresh 한 번(새 변경 읽기 + 반영)의 비용을 비교합니다.
+    전체 재로딩에는 실제 환경의 DB 조회 시간이 더해지고, refresh에는 빈 범위 조회 한 번이 더해집니다.
+    """
+    runs = 3
+    started = time.perf_counter()
+    for _ in range(runs):
+        MatcherSnapshot(advertisers)
+    reload_ms = (time.perf_counter() - started) / runs * 1000
+
+    clock = SimulatedClock()
+    delta_log = SQLiteDeltaLog(clock=clock)
+    index = LiveAdvertiserIndex(
+        MatcherSnapshot(advertisers),
+        delta_log,
+        compact_threshold=10**9,
+        clock=clock,
+    )
+    changes = make_changes(advertisers, 300, dim, rng, args.seed + 2)
+    print(
+        f"\nfull reload of {len(advertisers)} advertisers: {reload_ms:.1f} ms"
+        " (without the DB query)"
+    )
+    print(f"{'deltas per refresh':>19} {'refresh ms':>11}")
+    clock.now += 10
+    started = time.perf_counter()
+    index.refresh()
+    print(f"{0:>19} {(time.perf_counter() - started) * 1000:>11.3f}")
+    applied = 0
+    for size in (1, 10, 100):
+        delta_log.append([
+            (change[1], change[2], delta_payload(change))
+            for change in changes[applied:applied + size]
+        ])
+        applied += size
+        clock.now += 10
+        started = time.perf_counter()
+        assert index.refresh() == size
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{size:>19} {elapsed:>11.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--advertisers', type=int, default=20000)
+    parser.add_argument('--dim', type=int, default=256)
+    parser.add_argument(
+        '--deltas',
+        type=int,
+        default=1500,
+        help='신선도 확인에 흘려보낼 변경 수',
+    )
+    parser.add_argument(
+        '--refresh-ms', type=int, default=1000, help='변경 로그 확인 주기'
+    )
+    parser.add_argument(
+        '--request-ms',
+        type=int,
+        default=50,
+        help='요청 간격 (시뮬레이션 시계)',
+    )
+    parser.add_argument(
+        '--commit-ms',
+        type=int,
+        default=120,
+        help='변경 커밋 간격 (시뮬레이션 시계)',
+    )
+    parser.add_argument('--compact-threshold', type=int, default=1000)
+    parser.add_argument('--lookups', type=int, default=300)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    advertisers = make_advertisers(args.advertisers, args.dim, rng)
+    changes = make_changes(advertisers, args.deltas, args.dim, rng, args.seed)
+
+    print(
+        f"freshness: {args.advertisers} advertisers, a delta every"
+        f" {args.commit_ms} ms, a request every {args.request_ms} ms"
+    )
+    print(
+        f"{'snapshot':<10} {'deltas':>7} {'refreshes':>9} {'compactions':>11} "
+        f"{'p50 ms':>8} {'max ms':>8} {'bound':>8}"
+    )
+    index, _ = bench_freshness(
+        'matrix', MatcherSnapshot(advertisers), advertisers, changes, args
+    )
+    check_exact(index, advertisers, changes, args.dim, rng)
+
+    workdir = tempfile.mkdtemp(prefix='bench-index-deltas-')
+    try:
+        path = os.path.join(workdir, 'advertisers.ivf')
+        build_ivf_index(
+            [advertiser['id'] for advertiser in advertisers],
+            np.stack([advertiser['embedding'] for advertiser in advertisers]),
+            path,
+        )
+        bench_freshness('ivf', IVFIndex(path), advertisers, changes, args)
+    finally:
+        shutil.rmtree(workdir)
+
+    bench_latency(advertisers, args.dim, args, rng)
+    bench_reload_cost(advertisers, args.dim, args, rng)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+기존 cosine_similarity 루프와 AdvertiserMatcher의 광고주 매칭 속도를 비교합니다.
+
+사용법:
+    python benchmarks/bench_matcher.py [--sizes 1000 10000 100000] [--dim 768]
+        [--queries 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+)
+# Lambda 레이어로 배포되는 공용 모듈 (services/shared/python)
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        '..',
+        '..',
+        'shared',
+        'python',
+    ),
+)
+
+from ad_generator import cosine_similarity  # noqa: E402
+from matcher import AdvertiserMatcher  # noqa: E402
+
+
+def legacy_best_match(advertisers, query_vector):
+    """
+    변경 전 find_best_matching_advertiser의 선형 탐색 루프입니다.
+    """
+    best_match = None
+    best_similarity = 0.0
+    for advertiser in advertisers:
+        similarity = cosine_similarity(query_vector, advertiser['embedding'])
+        if similarity > best_similarity:
+            best_similarity = similarity
+            best_match = advertiser
+    return best_match, best_similarity
+
+
+def make_advertisers(count, dim, rng):
+    return [
+        {
+            'id': i,
+            'name': f'advertiser-{i}',
+            'embedding': [rng.uniform(-1, 1) for _ in range(dim)],
+        }
+        for i in range(count)
+    ]
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[1000, 10000, 100000]
+    )
+    parser.add_argument('--dim', type=int, default=768)
+    parser.add_argument('--queries', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(
+        f"{'advertisers':>12} {'legacy (ms)':>12} {'build (ms)':>11}"
+        f" {'matcher (ms)':>13} {'speedup':>9}"
+    )
+
+    for size in args.sizes:
+        advertisers = make_advertisers(size, args.dim, rng)
+        queries = [
+            [rng.uniform(-1, 1) for _ in range(args.dim)]
+            for _ in range(args.queries)
+        ]
+
+        build_start = time.perf_counter()
+        matcher = AdvertiserMatcher(advertisers)
+        build_time = time.perf_counter() - build_start
+
+        legacy_time, legacy_results = timed(
+            lambda q: legacy_best_match(advertisers, q), queries
+        )
+        matcher_time, matcher_results = timed(matcher.best_match, queries)
+
+        # float32 반올림 차이로 동점에 가까운 광고주의 순위가 바뀔 수 있으므로 유사도만 비교합니다.
+        for (_, legacy_score), (_, score) in zip(
+            legacy_results, matcher_results
+        ):
+            assert abs(legacy_score - score) < 1e-4, (legacy_score, score)
+
+        print(
+            f"{size:>12} {legacy_time * 1000:>12.2f}"
+            f" {build_time * 1000:>11.2f} {matcher_time * 1000:>13.3f}"
+            f" {legacy_time / matcher_time:>8.0f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
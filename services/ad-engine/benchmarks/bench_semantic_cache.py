@@ -0,0 +1,211 @@
+"""
+맞춤형 광고 의미 캐시를 측정합니다.
+1. 광고주별 캐시 크기에 따른 조회 시간 (행렬-벡터 곱 한 번)
+2. 광고주 수와 광고주별 질문 수에 따른 캐시 메모리 (max_entries 상한 확인)
+3. 임계값별 적중률과 잘못된 적중(다른 주제의 질문에 재사용) 비율, 예상 평균 지연 시간
+4. ad_generator.handler를 통한 요청에서 응답의 cached 표시 확인
+
+질문 임베딩은 주제 벡터에 잡음을 더한 합성 데이터(같은 주제 바꿔 말하기)이고, Gemini 광고 생성은 스텁입니다.
+
+사용법:
+    python benchmarks/bench_semantic_cache.py [--requests 20000] [--topics 400]
+        [--generation-ms 800]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, '..', 'src'))
+# Lambda 레이어로 배포되는 공용 모듈 (services/shared/python)
+sys.path.insert(0, os.path.join(BASE_DIR, '..', '..', 'shared', 'python'))
+os.environ.setdefault('GEMINI_API_KEY', 'local-benchmark')
+
+import ad_generator  # noqa: E402
+from semantic_cache import SemanticAdCache  # noqa: E402
+
+
+def unit(vector):
+    return vector / np.linalg.norm(vector, axis=-1, keepdims=True)
+
+
+def paraphrase(rng, topic_vector, noise):
+    return unit(
+        topic_vector + rng.normal(0, noise, topic_vector.shape)
+    ).astype(np.float32)
+
+
+def bench_lookup(dim, capacities, lookups=2000):
+    rng = np.random.default_rng(0)
+    print(f"{'capacity':>8} {'lookup us':>10}")
+    for capacity in capacities:
+        cache = SemanticAdCache(
+            threshold=0.95, capacity_per_advertiser=capacity
+        )
+        for i in range(capacity):
+            cache.store(1, rng.normal(size=dim), f"ad {i}")
+        queries = rng.normal(size=(lookups, dim)).astype(np.float32)
+        start = time.perf_counter()
+        for query in queries:
+            cache.lookup(1, query)
+        print(
+            f"{capacity:>8}"
+            f" {(time.perf_counter() - start) / lookups * 1e6:>10.1f}"
+        )
+
+
+def bench_memory(dim, capacity, max_entries, advertisers=1000):
+    rng = np.random.default_rng(2)
+    fixed_mb = advertisers * capacity * dim * 4 / 1e6
+    print(
+        f"{'queries/adv':>11} {'advertisers':>11} {'allocated':>9}"
+        f" {'MB':>7} {'fixed MB':>8}"
+    )
+    for per_advertiser in (2, 16, capacity):
+        cache = SemanticAdCache(
+            capacity_per_advertiser=capacity,
+            max_advertisers=advertisers,
+            max_entries=max_entries,
+        )
+        for advertiser_id in range(advertisers):
+            for i in range(per_advertiser):
+                cache.store(advertiser_id, rng.normal(size=dim), f"ad {i}")
+        stats = cache.stats()
+        assert stats['allocated'] <= max_entries
+        print(
+            f"{per_advertiser:>11} {stats['advertisers']:>11}"
+            f" {stats['allocated']:>9}"
+            f" {stats['allocated'] * dim * 4 / 1e6:>7.1f} {fixed_mb:>8.1f}"
+        )
+
+
+def simulate(args, threshold):
+    rng = np.random.default_rng(1)
+    # 같은 광고주의 주제끼리는 광고주 공통 성분을 공유해 서로 비슷합니다. (유사도 약 topic_overlap)
+    advertiser_of_topic = rng.integers(0, args.advertisers, args.topics)
+    advertiser_vectors = unit(rng.normal(size=(args.advertisers, args.dim)))
+    topics = unit(
+        np.sqrt(args.topic_overlap) * advertiser_vectors[advertiser_of_topic]
+        + np.sqrt(1 - args.topic_overlap)
+        * unit(rng.normal(size=(args.topics, args.dim)))
+    )
+    weights = 1.0 / np.arange(1, args.topics + 1)
+    picks = rng.choice(
+        args.topics, size=args.requests, p=weights / weights.sum()
+    )
+
+    cache = SemanticAdCache(
+        threshold=threshold, capacity_per_advertiser=args.capacity
+    )
+    wrong = 0
+    lookup_seconds = 0.0
+    for topic in picks:
+        advertiser_id = int(advertiser_of_topic[topic])
+        query = paraphrase(rng, topics[topic], args.noise)
+        start = time.perf_counter()
+        ad, _ = cache.lookup(advertiser_id, query)
+        lookup_seconds += time.perf_counter() - start
+        if ad is None:
+            cache.store(advertiser_id, query, f"topic-{topic}")
+        elif ad != f"topic-{topic}":
+            wrong += 1
+    stats = cache.stats()
+    misses = stats['misses']
+    mean_ms = (
+        lookup_seconds * 1000 + misses * args.generation_ms
+    ) / args.requests
+    return stats, wrong, mean_ms
+
+
+def bench_handler():
+    calls = []
+
+    def generate(advertiser, user_query):
+        calls.append(user_query)
+        return f"[{advertiser['name']}] {user_query[:10]}... 맞춤 광고"
+
+    base = np.full(768, 0.2, dtype=np.float32)
+    embeddings = {
+        '클라우드 AI 서비스 추천해주세요': base,
+        '클라우드 AI 서비스 추천 부탁해요': base + np.float32(0.001),
+    }
+    ad_generator.get_text_embedding = lambda text: embeddings[text]
+    ad_generator.generate_personalized_ad = generate
+    for query in embeddings:
+        response = ad_generator.handler(
+            {'body': json.dumps({'query': query})}, None
+        )
+        body = json.loads(response['body'])
+        print(
+            f"  {query!r}: cached={body['cached']}"
+            f" cache_similarity={body.get('cache_similarity')}"
+        )
+    print(f"  Gemini calls: {len(calls)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--topics', type=int, default=400)
+    parser.add_argument('--advertisers', type=int, default=20)
+    parser.add_argument('--capacity', type=int, default=256)
+    parser.add_argument('--dim', type=int, default=768)
+    parser.add_argument('--max-entries', type=int, default=16384)
+    parser.add_argument(
+        '--noise',
+        type=float,
+        default=0.006,
+        help='바꿔 말하기 잡음 (같은 주제 질문 간 유사도 약 0.97)',
+    )
+    parser.add_argument(
+        '--topic-overlap',
+        type=float,
+        default=0.9,
+        help='같은 광고주의 서로 다른 주제 간 유사도',
+    )
+    parser.add_argument('--generation-ms', type=float, default=800.0)
+    parser.add_argument(
+        '--thresholds', type=float, nargs='+', default=[0.9, 0.95, 0.98]
+    )
+    args = parser.parse_args()
+
+    print("== lookup latency (768-dim)")
+    bench_lookup(args.dim, [64, 256, 1024])
+
+    print(
+        f"\n== cache memory (1000 advertisers, capacity {args.capacity},"
+        f" max entries {args.max_entries})"
+    )
+    bench_memory(args.dim, args.capacity, args.max_entries)
+
+    print(
+        f"\n== {args.requests} requests, {args.topics} topics (Zipf),"
+        f" {args.advertisers} advertisers, topic overlap {args.topic_overlap},"
+        f" {args.generation_ms:.0f}ms generation"
+    )
+    print(
+        f"{'threshold':>9} {'hit rate':>9} {'wrong hits':>10}"
+        f" {'Gemini calls':>12} {'mean ms':>8} {'evictions':>9}"
+    )
+    print(
+        f"{'no cache':>9} {0:>9.1%} {0:>10} {args.requests:>12}"
+        f" {args.generation_ms:>8.1f} {0:>9}"
+    )
+    for threshold in args.thresholds:
+        stats, wrong, mean_ms = simulate(args, threshold)
+        print(
+            f"{threshold:>9.2f} {stats['hit_rate']:>9.1%} {wrong:>10}"
+            f" {stats['misses']:>12} {mean_ms:>8.1f} {stats['evictions']:>9}"
+        )
+
+    print("\n== ad_generator.handler")
+    bench_handler()
+
+
+if __name__ == '__main__':
+    main()
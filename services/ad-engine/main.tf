@@ -104,6 +104,24 @@ resource "aws_iam_role_policy_attachment" "ad_engine_policy_attachment" {
   policy_arn = aws_iam_policy.ad_engine_lambda_policy.arn
 }
 
+# --- Shared Lambda Layer ---
+# 서비스 간 공용 Python 모듈(services/shared/python)을 Lambda 레이어로 배포합니다.
+# 레이어 zip에는 python/ 최상위 디렉터리가 있어야 하므로 ../shared를 묶되,
+# 벤치마크와 문서는 런타임에 필요 없으므로 제외합니다.
+data "archive_file" "shared_layer_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../shared"
+  excludes    = ["README.md", "benchmarks"]
+  output_path = "${path.module}/dist/shared_layer.zip"
+}
+
+resource "aws_lambda_layer_version" "shared_layer" {
+  layer_name          = "ad-scouter-shared-ad-engine"
+  filename            = data.archive_file.shared_layer_zip.output_path
+  source_code_hash    = data.archive_file.shared_layer_zip.output_base64sha256
+  compatible_runtimes = ["python3.11"]
+}
+
 # --- Lambda Function for Vectorization ---
 data "archive_file" "vectorizer_zip" {
   type        = "zip"
@@ -119,7 +137,8 @@ resource "aws_lambda_function" "vectorizer_lambda" {
   
   filename         = data.archive_file.vectorizer_zip.output_path
   source_code_hash = data.archive_file.vectorizer_zip.output_base64sha256
-  timeout          = 300 # 5분
+  timeout          = 900 # 15분 (일괄 재벡터화는 남은 시간이 부족하면 체크포인트까지 저장하고 멈춤)
+  layers           = [aws_lambda_layer_version.shared_layer.arn]
   
   environment {
     variables = {
@@ -128,6 +147,16 @@ resource "aws_lambda_function" "vectorizer_lambda" {
       DB_USER       = aws_db_instance.ad_db.username
       DB_PASSWORD   = var.db_password
       GEMINI_API_KEY = var.gemini_api_key
+      REVECTORIZE_PAGE_SIZE = var.revectorize_page_size
+      EMBED_BATCH_SIZE      = var.embed_batch_size
+      EMBED_CONCURRENCY     = var.embed_concurrency
+      EMBEDDING_CACHE_PATH  = "/tmp/embedding_cache.bin"
+      EMBEDDING_CACHE_DTYPE = var.embedding_cache_dtype
+      GEMINI_RATE_LIMIT_PER_SECOND = var.vectorizer_gemini_rate_limit_per_second
+      GEMINI_MAX_CONCURRENCY       = var.vectorizer_gemini_max_concurrency
+      METRICS_ENABLED              = var.metrics_enabled
+      DEBUG_LOG_SAMPLE_RATE        = var.debug_log_sample_rate
+      AD_INDEX_DELTA_TABLE         = var.ad_index_delta_table
     }
   }
 }
@@ -148,6 +177,8 @@ resource "aws_lambda_function" "ad_generator_lambda" {
   filename         = data.archive_file.ad_generator_zip.output_path
   source_code_hash = data.archive_file.ad_generator_zip.output_base64sha256
   timeout          = 300 # 5분
+  memory_size      = var.ad_generator_memory_size
+  layers           = [aws_lambda_layer_version.shared_layer.arn]
   
   environment {
     variables = {
@@ -156,6 +187,26 @@ resource "aws_lambda_function" "ad_generator_lambda" {
       DB_USER       = aws_db_instance.ad_db.username
       DB_PASSWORD   = var.db_password
       GEMINI_API_KEY = var.gemini_api_key
+      AD_INDEX_PATH   = var.ad_index_path
+      AD_INDEX_NPROBE = var.ad_index_nprobe
+      EMBEDDING_CACHE_PATH  = "/tmp/embedding_cache.bin"
+      EMBEDDING_CACHE_SIZE  = var.embedding_cache_size
+      EMBEDDING_CACHE_DTYPE = var.embedding_cache_dtype
+      SEMANTIC_CACHE_THRESHOLD   = var.semantic_cache_threshold
+      SEMANTIC_CACHE_TTL_SECONDS = var.semantic_cache_ttl_seconds
+      SEMANTIC_CACHE_CAPACITY    = var.semantic_cache_capacity
+      SEMANTIC_CACHE_MAX_ADVERTISERS = var.semantic_cache_max_advertisers
+      SEMANTIC_CACHE_MAX_ENTRIES     = var.semantic_cache_max_entries
+      AD_DEADLINE_MS             = var.ad_deadline_ms
+      AD_REFINE_MAX_WAIT_MS      = var.ad_refine_max_wait_ms
+      AD_BATCH_MAX_QUERIES       = var.ad_batch_max_queries
+      GEMINI_RATE_LIMIT_PER_SECOND = var.ad_generator_gemini_rate_limit_per_second
+      GEMINI_MAX_CONCURRENCY       = var.ad_generator_gemini_max_concurrency
+      METRICS_ENABLED              = var.metrics_enabled
+      DEBUG_LOG_SAMPLE_RATE        = var.debug_log_sample_rate
+      AD_INDEX_DELTA_TABLE         = var.ad_index_delta_table
+      AD_INDEX_REFRESH_MS          = var.ad_index_refresh_ms
+      AD_INDEX_COMPACT_THRESHOLD   = var.ad_index_compact_threshold
     }
   }
 }
@@ -168,7 +219,7 @@ resource "aws_apigatewayv2_api" "ad_engine_api" {
   cors_configuration {
     allow_origins = ["*"]
     allow_methods = ["POST", "OPTIONS"]
-    allow_headers = ["Content-Type"]
+    allow_headers = ["Content-Type", "X-Ad-Deadline-Ms"]
   }
 }
 
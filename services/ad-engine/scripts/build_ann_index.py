@@ -0,0 +1,173 @@
+"""
+vectorizer가 DB에 저장한 광고주 임베딩으로 IVF 인덱스 파일을 오프라인에서 만듭니다.
+
+사용법:
+    # DB(advertisers.embedding)에서 읽기.
+    # DB_HOST/DB_NAME/DB_USER/DB_PASSWORD 환경 변수 사용
+    python scripts/build_ann_index.py --output advertisers.ivf
+
+    # {"id": 1, "name": ..., "description": ..., "ad_template": ...,
+    # "embedding": [...]} 형식의 JSONL 파일에서 읽기
+    # (광고주 정보는 인덱스 파일에 함께 저장되어 ad_generator가 결과 id를 광고주로 바꿀 때 씁니다)
+    python scripts/build_ann_index.py --input advertisers.jsonl --output
+        advertisers.ivf
+
+    # 변경 로그 압축: 현재 로그 버전을 스냅샷에 기록하고, 스냅샷에 반영된 변경 중 1시간 지난 것을 지웁니다.
+    # (광고 서빙 컨테이너는 새 파일을 열고 그 버전 이후의 변경만 이어서 반영합니다)
+    python scripts/build_ann_index.py --output advertisers.ivf --delta-table
+        advertiser_index_deltas --prune-after 3600
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+)
+
+from ann_index import METADATA_FIELDS, build_ivf_index  # noqa: E402
+from index_deltas import PostgresDeltaLog  # noqa: E402
+
+
+def read_jsonl(path):
+    ids, embeddings, metadata = [], [], []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                ids.append(row['id'])
+                embeddings.append(row['embedding'])
+                metadata.append(
+                    {field: row.get(field) for field in METADATA_FIELDS}
+                )
+    return ids, embeddings, metadata
+
+
+def connect():
+    import psycopg2
+
+    return psycopg2.connect(
+        host=os.environ.get('DB_HOST'),
+        dbname=os.environ.get('DB_NAME'),
+        user=os.environ.get('DB_USER'),
+        password=os.environ.get('DB_PASSWORD'),
+    )
+
+
+class _SingleConnectionPool:
+    """
+    PostgresDeltaLog에 연결 하나를 빌려주는 최소한의 풀입니다.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def getconn(self):
+        return self.conn
+
+    def putconn(self, conn):
+        pass
+
+
+def read_database():
+    conn = connect()
+    ids, embeddings, metadata = [], [], []
+    try:
+        # 서버 측 커서로 광고주 전체를 메모리에 한 번에 올리지 않고 읽습니다.
+        with conn.cursor(name='ann_index_export') as cur:
+            cur.itersize = 10000
+            cur.execute(
+                "SELECT id, name, description, ad_template, embedding::text"
+                " FROM advertisers WHERE embedding IS NOT NULL ORDER BY id"
+            )
+            for (
+                advertiser_id,
+                name,
+                description,
+                ad_template,
+                embedding,
+            ) in cur:
+                ids.append(advertiser_id)
+                embeddings.append(json.loads(embedding))
+                metadata.append({
+                    'name': name,
+                    'description': description,
+                    'ad_template': ad_template,
+                })
+    finally:
+        conn.close()
+    return ids, embeddings, metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--input', help='JSONL 파일 경로. 지정하지 않으면 DB에서 읽습니다.'
+    )
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--n-lists', type=int, default=None)
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument(
+        '--version',
+        type=int,
+        default=0,
+        help='스냅샷에 반영된 변경 로그 버전 (--delta-table이 없을 때)',
+    )
+    parser.add_argument(
+        '--delta-table',
+        help='광고주 변경 로그 테이블. 읽기 전의 최신 버전을 스냅샷 버전으로 씁니다.',
+    )
+    parser.add_argument(
+        '--prune-after',
+        type=float,
+        default=None,
+        help='스냅샷에 반영된 변경 중 이 시간(초)보다 오래된 것을 로그에서 지웁니다.',
+    )
+    args = parser.parse_args()
+
+    delta_log = None
+    version = args.version
+    if args.delta_table:
+        conn = connect()
+        delta_log = PostgresDeltaLog(
+            _SingleConnectionPool(conn), table=args.delta_table
+        )
+        # 광고주를 읽기 전에 버전을 정합니다. 읽는 동안 들어온 변경은 다시 반영되지만 결과는 같습니다.
+        version = delta_log.latest_version()
+
+    ids, embeddings, metadata = (
+        read_jsonl(args.input) if args.input else read_database()
+    )
+
+    start = time.perf_counter()
+    header = build_ivf_index(
+        ids,
+        embeddings,
+        args.output,
+        n_lists=args.n_lists,
+        iterations=args.iterations,
+        version=version,
+        metadata=metadata,
+    )
+    print(
+        f"Built IVF index with {header['count']} advertisers,"
+        f" {header['n_lists']} lists, dim {header['dim']}, delta version"
+        f" {version} in {time.perf_counter() - start:.1f}s -> {args.output}"
+    )
+
+    if delta_log is not None and args.prune_after is not None:
+        pruned = delta_log.prune(version, older_than_seconds=args.prune_after)
+        print(
+            f"Pruned {pruned} deltas up to version {version} from"
+            f" {args.delta_table}"
+        )
+
+
+if __name__ == '__main__':
+    main()
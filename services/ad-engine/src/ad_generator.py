@@ -1,13 +1,29 @@
 import json
 import os
 import math
-import google.generativeai as genai
+import threading
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    TimeoutError as FutureTimeoutError,
+    wait,
+)
+from embedding_cache import (
+    DEFAULT_EMBEDDING_MODEL,
+    get_embedding,
+    get_embedding_cache,
+    get_embeddings,
+)
+from latency import Deadline, LatencyTracker, StageTimings
+from gemini_client import get_gemini_client
+from lazy_clients import is_warmup_event, warm_up, warmup_response
+from metrics import InvocationMetrics
+from post_response import PostResponseExtension
+
 # import psycopg2
 
 # Gemini API 키 설정
+# google.generativeai와 numpy(매칭 행렬)는 콜드 스타트 시간을 줄이기 위해 처음 사용할 때 불러옵니다.
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
 
 # --- DB 연결 정보 ---
 DB_HOST = os.environ.get('DB_HOST')
@@ -15,6 +31,88 @@ DB_NAME = os.environ.get('DB_NAME')
 DB_USER = os.environ.get('DB_USER')
 DB_PASSWORD = os.environ.get('DB_PASSWORD')
 
+# --- 광고주 ANN 인덱스 설정 ---
+# AD_INDEX_PATH가 설정되면 오프라인에서 만든 IVF 인덱스 파일을 메모리 매핑해 근사 탐색합니다.
+# AD_INDEX_NPROBE는 재현율/지연 시간 조절값으로, 클수록 정확하지만 느려집니다.
+AD_INDEX_PATH = os.environ.get('AD_INDEX_PATH')
+AD_INDEX_NPROBE = int(os.environ.get('AD_INDEX_NPROBE', '8'))
+
+# --- 광고주 인덱스 변경 로그 설정 ---
+# 설정하면 광고주 행렬/IVF 인덱스를 기준 스냅샷으로 두고, vectorizer가 남긴 변경(추가/변경/삭제)을
+# AD_INDEX_REFRESH_MS마다 읽어 전체를 다시 불러오지 않고 반영합니다.
+AD_INDEX_DELTA_TABLE = os.environ.get('AD_INDEX_DELTA_TABLE')
+AD_INDEX_DELTA_SQLITE_PATH = os.environ.get('AD_INDEX_DELTA_SQLITE_PATH')
+AD_INDEX_REFRESH_MS = int(os.environ.get('AD_INDEX_REFRESH_MS', '1000'))
+# 반영한 변경이 이 수를 넘으면 광고주 행렬 스냅샷과 합칩니다. (IVF 파일은 오프라인 빌드로 새 스냅샷을 만듭니다)
+AD_INDEX_COMPACT_THRESHOLD = int(
+    os.environ.get('AD_INDEX_COMPACT_THRESHOLD', '1000')
+)
+
+# 질문 임베딩 모델 (광고주 임베딩과 같은 모델이어야 합니다)
+EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', DEFAULT_EMBEDDING_MODEL)
+
+# --- 맞춤형 광고 의미 캐시 설정 ---
+# 같은 광고주에 대해 질문 임베딩의 코사인 유사도가 임계값 이상이면 Gemini 호출 없이 캐시된 광고를 반환합니다.
+# 임계값을 1보다 크게 설정하면 캐시를 사용하지 않습니다.
+SEMANTIC_CACHE_THRESHOLD = float(
+    os.environ.get('SEMANTIC_CACHE_THRESHOLD', '0.95')
+)
+SEMANTIC_CACHE_TTL_SECONDS = int(
+    os.environ.get('SEMANTIC_CACHE_TTL_SECONDS', '3600')
+)
+SEMANTIC_CACHE_CAPACITY = int(os.environ.get('SEMANTIC_CACHE_CAPACITY', '256'))
+SEMANTIC_CACHE_MAX_ADVERTISERS = int(
+    os.environ.get('SEMANTIC_CACHE_MAX_ADVERTISERS', '1000')
+)
+# 모든 광고주의 캐시 항목 합계 상한입니다. 항목당 임베딩 차원 × 4바이트(768차원 3KB)를 차지하므로
+# Lambda 메모리(ad_generator_memory_size)에 맞춰 정합니다.
+SEMANTIC_CACHE_MAX_ENTRIES = int(
+    os.environ.get('SEMANTIC_CACHE_MAX_ENTRIES', '16384')
+)
+
+# --- 요청 마감 시간 설정 ---
+# 요청 헤더(X-Ad-Deadline-Ms) 또는 AD_DEADLINE_MS(ms) 안에 맞춤형 광고 생성이 끝나지 않으면
+# 광고주 기본 템플릿을 바로 반환합니다. 진행 중인 생성은 백그라운드에서 끝나 의미 캐시를 채웁니다. (0이면 마감 없음)
+AD_DEADLINE_MS = int(os.environ.get('AD_DEADLINE_MS', '1500'))
+DEADLINE_HEADER = 'x-ad-deadline-ms'
+# 마감 시간을 넘겨 템플릿으로 응답한 생성은 응답을 보낸 뒤 이 시간(ms)까지(호출 제한 시간 안에서) 기다려 마칩니다.
+# Lambda는 호출이 끝나면 실행 환경을 일시 정지하므로, 0이면 다음 호출 때 이어서 실행됩니다.
+AD_REFINE_MAX_WAIT_MS = int(os.environ.get('AD_REFINE_MAX_WAIT_MS', '10000'))
+# 동시에 진행할 수 있는 광고 생성 수
+AD_GENERATION_WORKERS = max(
+    1, int(os.environ.get('AD_GENERATION_WORKERS', '4'))
+)
+# 묶음 요청({"queries": [...]}) 한 번에 받을 수 있는 최대 질문 수와 질문당 최대 광고주 수(top_k)
+AD_BATCH_MAX_QUERIES = int(os.environ.get('AD_BATCH_MAX_QUERIES', '50'))
+AD_BATCH_MAX_TOP_K = int(os.environ.get('AD_BATCH_MAX_TOP_K', '10'))
+# 이 횟수마다 단계별 지연 시간 백분위수(p50/p95/p99)를 로그로 남깁니다.
+AD_TIMING_REPORT_EVERY = max(
+    1, int(os.environ.get('AD_TIMING_REPORT_EVERY', '100'))
+)
+
+# 단계별 지연 시간 집계 (컨테이너 단위)
+stage_latency = LatencyTracker()
+_generation_executor = None
+_in_flight_generations = {}
+_in_flight_lock = threading.Lock()
+_request_count = 0
+
+# 호출 단위 지표 (단계별 시간/카운터를 EMF 한 줄로 출력, 요청 단위 로그는 표본 추출)
+metrics = InvocationMetrics('ad-generator')
+
+
+def _pending_generations():
+    with _in_flight_lock:
+        return list(_in_flight_generations.values())
+
+
+# 응답 후 진행 중인 생성을 마치는 Lambda 내부 확장 (초기화 단계에서 등록해야 합니다)
+post_response = PostResponseExtension(
+    _pending_generations, AD_REFINE_MAX_WAIT_MS / 1000.0
+)
+post_response.start()
+
+
 def cosine_similarity(vec_a, vec_b):
     """
     두 벡터 간의 코사인 유사도를 계산합니다.
@@ -34,72 +132,575 @@ def cosine_similarity(vec_a, vec_b):
 def get_text_embedding(text):
     """
     Gemini Embedding API를 호출하여 텍스트를 벡터로 변환합니다.
+    반복되는 질문은 임베딩 캐시에서 바로 반환하므로 API 왕복이 없습니다.
     """
     if not GEMINI_API_KEY:
         raise ValueError("GEMINI_API_KEY is not configured for ad generator.")
 
     try:
-        result = genai.embed_content(
-            model="models/text-embedding-004",
-            content=text,
-            task_type="RETRIEVAL_QUERY" # 사용자 질문이므로 'RETRIEVAL_QUERY' 사용
-        )
-        return result['embedding']
+        # 사용자 질문이므로 'RETRIEVAL_QUERY' 사용
+        return get_embedding(text, "RETRIEVAL_QUERY", model=EMBEDDING_MODEL)
     except Exception as e:
         print(f"Error calling Gemini Embedding API: {e}")
         return None
 
-def find_best_matching_advertiser(user_query_vector):
+
+def get_text_embeddings(texts):
     """
-    사용자 질문 벡터와 가장 유사한 광고주를 찾습니다.
+    여러 질문을 벡터로 변환합니다. 캐시에 없는 질문만 한 번의 Gemini Embedding API 묶음 요청으로 보냅니다.
+    실패하면 None을 반환합니다.
+    """
+    try:
+        return get_embeddings(texts, "RETRIEVAL_QUERY", model=EMBEDDING_MODEL)
+    except Exception as e:
+        print(f"Error calling Gemini Embedding API: {e}")
+        return None
+
+
+def load_advertisers():
+    """
+    매칭 대상 광고주 목록을 불러옵니다.
     """
     # 실제 구현에서는 DB에서 모든 광고주의 벡터를 가져와 비교
     # 현재는 Mock 데이터로 테스트
-    
-    mock_advertisers = [
+    return [
         {
             'id': 1,
             'name': 'Microsoft',
-            'description': 'Microsoft AI and cloud services for enterprise solutions',
+            'description': (
+                'Microsoft AI and cloud services for enterprise solutions'
+            ),
             'embedding': [0.2] * 768,
-            'ad_template': 'Microsoft의 AI 솔루션으로 비즈니스를 혁신하세요! 무료 체험 신청'
+            'ad_template': (
+                'Microsoft의 AI 솔루션으로 비즈니스를 혁신하세요! 무료 체험 신청'
+            ),
         },
         {
             'id': 2,
             'name': 'Google',
-            'description': 'Google Cloud Platform and AI services for businesses',
+            'description': (
+                'Google Cloud Platform and AI services for businesses'
+            ),
             'embedding': [0.3] * 768,
-            'ad_template': 'Google Cloud로 스케일링하세요! 지금 시작하면 크레딧 제공'
+            'ad_template': (
+                'Google Cloud로 스케일링하세요! 지금 시작하면 크레딧 제공'
+            ),
         },
         {
             'id': 3,
             'name': 'Amazon',
             'description': 'Amazon Web Services cloud computing platform',
             'embedding': [0.15] * 768,
-            'ad_template': 'AWS로 클라우드 여정을 시작하세요! 신규 고객 특별 혜택'
-        }
+            'ad_template': (
+                'AWS로 클라우드 여정을 시작하세요! 신규 고객 특별 혜택'
+            ),
+        },
     ]
-    
-    best_match = None
-    best_similarity = 0.0
-    
-    for advertiser in mock_advertisers:
-        similarity = cosine_similarity(user_query_vector, advertiser['embedding'])
-        if similarity > best_similarity:
-            best_similarity = similarity
-            best_match = advertiser
-    
-    return best_match, best_similarity
+
+
+# 광고주 임베딩 행렬/인덱스는 컨테이너가 살아있는 동안 재사용합니다.
+_advertiser_matcher = None
+_advertiser_index = None
+_advertisers_by_id = None
+_queried_advertisers = {}
+_semantic_ad_cache = None
+_connection_pool = None
+_delta_log = None
+_live_advertiser_index = None
+
+
+def get_connection_pool():
+    """
+    psycopg2 커넥션 풀을 처음 사용할 때 만듭니다.
+    """
+    global _connection_pool
+    if _connection_pool is None:
+        from psycopg2.pool import ThreadedConnectionPool
+
+        _connection_pool = ThreadedConnectionPool(
+            1,
+            2,
+            host=DB_HOST,
+            dbname=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD,
+        )
+    return _connection_pool
+
+
+def get_delta_log():
+    """
+    광고주 인덱스 변경 로그를 반환합니다. 설정되지 않았으면 None입니다.
+    """
+    global _delta_log
+    if _delta_log is None:
+        if AD_INDEX_DELTA_TABLE:
+            from index_deltas import PostgresDeltaLog
+
+            _delta_log = PostgresDeltaLog(
+                get_connection_pool(), table=AD_INDEX_DELTA_TABLE
+            )
+        elif AD_INDEX_DELTA_SQLITE_PATH:
+            from index_deltas import SQLiteDeltaLog
+
+            _delta_log = SQLiteDeltaLog(AD_INDEX_DELTA_SQLITE_PATH)
+    return _delta_log
+
+
+def get_advertiser_matcher():
+    """
+    광고주 임베딩 행렬을 담은 AdvertiserMatcher를 반환합니다. 최초 호출 시 한 번만 생성합니다.
+    """
+    global _advertiser_matcher
+    if _advertiser_matcher is None:
+        from matcher import AdvertiserMatcher
+
+        _advertiser_matcher = AdvertiserMatcher(load_advertisers())
+    return _advertiser_matcher
+
+
+def get_advertiser_index():
+    """
+    AD_INDEX_PATH에 있는 IVF 인덱스를 메모리 매핑으로 열어 반환합니다. 설정되지 않았으면 None입니다.
+    """
+    global _advertiser_index
+    if _advertiser_index is None and AD_INDEX_PATH:
+        from ann_index import IVFIndex
+
+        _advertiser_index = IVFIndex(AD_INDEX_PATH)
+    return _advertiser_index
+
+
+def _ivf_snapshot_loader():
+    """
+    AD_INDEX_PATH 파일이 바뀌었을 때(오프라인 빌드로 교체) 새 IVF 인덱스를 여는 함수를 반환합니다.
+    """
+    from ann_index import IVFIndex
+
+    def file_id():
+        stat = os.stat(AD_INDEX_PATH)
+        return stat.st_ino, stat.st_mtime_ns
+
+    opened = [file_id()]
+
+    def load():
+        current = file_id()
+        if current == opened[0]:
+            return None
+        opened[0] = current
+        return IVFIndex(AD_INDEX_PATH)
+
+    return load
+
+
+def _forget_cached_ads(advertiser_ids):
+    """
+    바뀌거나 삭제된 광고주의 캐시된 광고를 버립니다.
+    """
+    if _semantic_ad_cache is not None:
+        for advertiser_id in advertiser_ids:
+            _semantic_ad_cache.forget(advertiser_id)
+
+
+def get_live_advertiser_index():
+    """
+    변경 로그가 설정되어 있으면 기준 스냅샷(IVF 인덱스 또는 광고주 행렬)에 변경을 점진적으로 반영하는 인덱스를 반환하고,
+    확인 주기가 지났으면 새 변경을 반영합니다. 요청마다 호출하며, 주기 전에는 시각 비교만 합니다.
+    변경 로그가 없거나 기준 스냅샷을 만들지 못하면 None을 반환해 기존 경로로 매칭합니다.
+    """
+    global _live_advertiser_index
+    if _live_advertiser_index is None:
+        try:
+            # 변경 로그 연결(커넥션 풀 생성)에 실패해도 기존 경로로 매칭합니다.
+            delta_log = get_delta_log()
+            if delta_log is None:
+                return None
+            from index_deltas import LiveAdvertiserIndex, MatcherSnapshot
+
+            index = get_advertiser_index()
+            if index is not None:
+                snapshot, loader = index, _ivf_snapshot_loader()
+            else:
+                # 광고주를 읽기 전에 버전을 정합니다. 그 사이에 들어온 변경은 다시 반영되지만 결과는 같습니다.
+                version = delta_log.latest_version()
+                snapshot, loader = (
+                    MatcherSnapshot(load_advertisers(), version),
+                    None,
+                )
+        except Exception as e:
+            print(f"Error loading advertiser index delta log or snapshot: {e}")
+            return None
+        _live_advertiser_index = LiveAdvertiserIndex(
+            snapshot,
+            delta_log,
+            refresh_interval=AD_INDEX_REFRESH_MS / 1000.0,
+            compact_threshold=AD_INDEX_COMPACT_THRESHOLD,
+            snapshot_loader=loader,
+            lookup=_load_advertiser_by_id,
+            on_change=_forget_cached_ads,
+        )
+    _live_advertiser_index.refresh()
+    return _live_advertiser_index
+
+
+def get_advertiser_by_id(advertiser_id):
+    """
+    광고주 id로 광고주 정보를 조회합니다. 변경 로그를 반영한 인덱스가 있으면 최신 정보를 반환합니다.
+    """
+    if _live_advertiser_index is not None:
+        return _live_advertiser_index.get(advertiser_id)
+    return _load_advertiser_by_id(advertiser_id)
+
+
+def _load_advertiser_by_id(advertiser_id):
+    """
+    IVF 인덱스를 쓰면 인덱스 파일에 저장된 광고주 정보로, 없으면 DB에서 id로 조회합니다.
+    인덱스가 없으면 매칭에 쓰는 광고주 목록에서 찾습니다.
+    """
+    global _advertisers_by_id
+    index = get_advertiser_index()
+    if index is not None:
+        advertiser = index.get(advertiser_id)
+        if advertiser is None:
+            advertiser = _query_advertiser(advertiser_id)
+        return advertiser
+    if _advertisers_by_id is None:
+        _advertisers_by_id = {
+            advertiser['id']: advertiser for advertiser in load_advertisers()
+        }
+    return _advertisers_by_id.get(advertiser_id)
+
+
+def _query_advertiser(advertiser_id):
+    """
+    광고주 정보가 없는 인덱스 파일(이전 빌드)을 위해 DB에서 광고주 하나를 조회하고 컨테이너에 보관합니다.
+    """
+    advertiser = _queried_advertisers.get(advertiser_id)
+    if advertiser is not None:
+        return advertiser
+    try:
+        pool = get_connection_pool()
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT id, name, description, ad_template "
+                    "FROM advertisers WHERE id = %s",
+                    (advertiser_id,),
+                )
+                row = cur.fetchone()
+        finally:
+            pool.putconn(conn)
+    except Exception as e:
+        print(f"Error loading advertiser {advertiser_id}: {e}")
+        return None
+    if row is None:
+        return None
+    advertiser = {
+        'id': row[0],
+        'name': row[1],
+        'description': row[2] or '',
+        'ad_template': row[3] or '',
+    }
+    _queried_advertisers[advertiser_id] = advertiser
+    return advertiser
+
+
+def find_best_matching_advertiser(user_query_vector, n_probe=None):
+    """
+    사용자 질문 벡터와 가장 유사한 광고주를 찾습니다.
+    ANN 인덱스가 설정되어 있으면 n_probe개 리스트만 탐색하고, 아니면 전체 광고주를 정확히 비교합니다.
+    변경 로그가 설정되어 있으면 반영된 최신 광고주로 탐색합니다.
+    """
+    index = get_live_advertiser_index() or get_advertiser_index()
+    if index is None:
+        return get_advertiser_matcher().best_match(user_query_vector)
+
+    results = index.search(
+        user_query_vector, k=1, n_probe=n_probe or AD_INDEX_NPROBE
+    )
+    if not results:
+        return None, 0.0
+    advertiser_id, similarity = results[0]
+    return get_advertiser_by_id(advertiser_id), similarity
+
+
+def find_top_advertisers_batch(query_vectors, k=1, unique=False, n_probe=None):
+    """
+    여러 질문 벡터의 상위 k개 (광고주, 유사도)를 질문 순서대로 반환합니다.
+    unique=True면 앞선 질문의 결과에 나온 광고주는 뒤 질문에서 제외합니다. (요청 순서대로 배정)
+    """
+    index = get_live_advertiser_index() or get_advertiser_index()
+    if index is None:
+        return get_advertiser_matcher().top_k_batch(
+            query_vectors, k=k, unique=unique
+        )
+
+    # 앞 질문들에 배정된 광고주가 빠져도 k개가 남도록 후보를 더 가져옵니다.
+    candidates = k * len(query_vectors) if unique else k
+    results, used = [], set()
+    for ranked in index.search_batch(
+        query_vectors, k=candidates, n_probe=n_probe or AD_INDEX_NPROBE
+    ):
+        matches = []
+        for advertiser_id, similarity in ranked:
+            advertiser = get_advertiser_by_id(advertiser_id)
+            if advertiser is None or advertiser_id in used:
+                continue
+            matches.append((advertiser, similarity))
+            if len(matches) == k:
+                break
+        if unique:
+            used.update(advertiser['id'] for advertiser, _ in matches)
+        results.append(matches)
+    return results
+
+
+def get_semantic_ad_cache():
+    """
+    맞춤형 광고 의미 캐시를 반환합니다. 최초 호출 시 한 번만 생성합니다.
+    """
+    global _semantic_ad_cache
+    if _semantic_ad_cache is None:
+        from semantic_cache import SemanticAdCache
+
+        _semantic_ad_cache = SemanticAdCache(
+            threshold=SEMANTIC_CACHE_THRESHOLD,
+            ttl_seconds=SEMANTIC_CACHE_TTL_SECONDS,
+            capacity_per_advertiser=SEMANTIC_CACHE_CAPACITY,
+            max_advertisers=SEMANTIC_CACHE_MAX_ADVERTISERS,
+            max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+        )
+    return _semantic_ad_cache
+
+
+def default_ad(advertiser):
+    """
+    Gemini를 사용할 수 없을 때의 기본 광고 문구입니다.
+    """
+    return (
+        f"{advertiser['name']}의 솔루션이 궁금하시군요!"
+        f" {advertiser['ad_template']}"
+    )
+
+
+def get_generation_executor():
+    """
+    백그라운드 광고 생성용 스레드 풀을 반환합니다. 최초 호출 시 한 번만 생성합니다.
+    """
+    global _generation_executor
+    if _generation_executor is None:
+        _generation_executor = ThreadPoolExecutor(
+            max_workers=AD_GENERATION_WORKERS
+        )
+    return _generation_executor
+
+
+def _generate_and_cache(advertiser, user_query, user_query_vector):
+    """
+    맞춤형 광고를 생성하고 생성 시간을 기록한 뒤, 의미 캐시에 저장합니다.
+    """
+    timings = StageTimings()
+    with timings.stage('generate'):
+        personalized_ad = generate_personalized_ad(advertiser, user_query)
+    stage_latency.record_all(timings.stages)
+    # 백그라운드 생성은 요청이 끝난 뒤 완료될 수 있어 다음 호출의 지표 줄에 포함될 수 있습니다.
+    metrics.observe('generate_latency', timings.stages['generate'])
+    # 기본 문구(오류/API 키 없음)는 캐시하지 않습니다.
+    if SEMANTIC_CACHE_THRESHOLD <= 1.0 and personalized_ad != default_ad(
+        advertiser
+    ):
+        get_semantic_ad_cache().store(
+            advertiser['id'], user_query_vector, personalized_ad, user_query
+        )
+    return personalized_ad
+
+
+def _submit_generation(advertiser, user_query, user_query_vector):
+    """
+    광고 생성을 백그라운드로 시작합니다. 같은 (광고주, 질문)의 생성이 이미 진행 중이면 그 작업을 공유합니다.
+    """
+    key = (advertiser['id'], user_query)
+    with _in_flight_lock:
+        future = _in_flight_generations.get(key)
+        if future is not None:
+            return future
+        future = get_generation_executor().submit(
+            _generate_and_cache, advertiser, user_query, user_query_vector
+        )
+        _in_flight_generations[key] = future
+    # 이미 끝난 작업이면 콜백이 바로 실행되므로 잠금을 푼 뒤에 등록합니다.
+    future.add_done_callback(lambda _: _forget_generation(key, future))
+    return future
+
+
+def _forget_generation(key, future):
+    with _in_flight_lock:
+        if _in_flight_generations.get(key) is future:
+            del _in_flight_generations[key]
+
+
+def get_personalized_ad(
+    advertiser, user_query, user_query_vector, deadline=None, timings=None
+):
+    """
+    의미 캐시에 비슷한 질문으로 만든 광고가 있으면 재사용하고, 없으면 Gemini로 생성해 캐시에 저장합니다.
+    마감 시간 안에 생성이 끝나지 않을 것 같으면 기본 템플릿을 반환하고, 생성은 백그라운드에서 계속합니다.
+    (광고, 정보 dict)를 반환합니다. 정보의 source는 'cache', 'generated', 'template' 중 하나입니다.
+    """
+    timings = timings or StageTimings()
+    if SEMANTIC_CACHE_THRESHOLD <= 1.0:
+        with timings.stage('cache'):
+            cached_ad, similarity = get_semantic_ad_cache().lookup(
+                advertiser['id'], user_query_vector
+            )
+        if cached_ad is not None:
+            return cached_ad, {
+                'hit': True,
+                'similarity': round(similarity, 4),
+                'source': 'cache',
+            }
+
+    remaining = deadline.remaining() if deadline is not None else None
+    if remaining is None:
+        with timings.stage('generate_wait'):
+            personalized_ad = _generate_and_cache(
+                advertiser, user_query, user_query_vector
+            )
+        return personalized_ad, {'hit': False, 'source': 'generated'}
+
+    future = _submit_generation(advertiser, user_query, user_query_vector)
+    # 최근 생성 시간의 중앙값도 남은 시간 안에 들어오지 않으면 기다리지 않습니다.
+    typical_ms = stage_latency.percentile('generate', 50, min_samples=20)
+    wait = (
+        0.0
+        if typical_ms is not None and typical_ms > remaining * 1000
+        else remaining
+    )
+    with timings.stage('generate_wait'):
+        try:
+            personalized_ad = future.result(timeout=wait)
+        except FutureTimeoutError:
+            personalized_ad = None
+    if personalized_ad is None:
+        return default_ad(advertiser), {
+            'hit': False,
+            'source': 'template',
+            'refining': True,
+        }
+    return personalized_ad, {'hit': False, 'source': 'generated'}
+
+
+def get_personalized_ads(requests, deadline=None, timings=None):
+    """
+    (광고주, 질문, 질문 벡터) 여러 개의 광고를 get_personalized_ad와 같은 규칙(의미 캐시, 마감 시간)으로 만듭니다.
+    캐시에 없는 광고는 백그라운드 생성을 한꺼번에 시작해 남은 시간 동안 함께 기다리고,
+    끝나지 않은 항목은 기본 템플릿을 반환합니다. 결과는 입력 순서의 (광고, 정보 dict) 리스트입니다.
+    """
+    timings = timings or StageTimings()
+    results = [None] * len(requests)
+    futures = {}
+    for index, (advertiser, user_query, user_query_vector) in enumerate(
+        requests
+    ):
+        if SEMANTIC_CACHE_THRESHOLD <= 1.0:
+            with timings.stage('cache'):
+                cached_ad, similarity = get_semantic_ad_cache().lookup(
+                    advertiser['id'], user_query_vector
+                )
+            if cached_ad is not None:
+                results[index] = (
+                    cached_ad,
+                    {
+                        'hit': True,
+                        'similarity': round(similarity, 4),
+                        'source': 'cache',
+                    },
+                )
+                continue
+        futures[index] = _submit_generation(
+            advertiser, user_query, user_query_vector
+        )
+
+    if futures:
+        remaining = deadline.remaining() if deadline is not None else None
+        typical_ms = stage_latency.percentile('generate', 50, min_samples=20)
+        if (
+            remaining is not None
+            and typical_ms is not None
+            and typical_ms > remaining * 1000
+        ):
+            remaining = 0.0
+        with timings.stage('generate_wait'):
+            wait(list(futures.values()), timeout=remaining)
+        for index, future in futures.items():
+            if future.done() and future.exception() is None:
+                results[index] = (
+                    future.result(),
+                    {'hit': False, 'source': 'generated'},
+                )
+            else:
+                results[index] = (
+                    default_ad(requests[index][0]),
+                    {'hit': False, 'source': 'template', 'refining': True},
+                )
+    return results
+
+
+def request_deadline(event):
+    """
+    요청 헤더의 X-Ad-Deadline-Ms 또는 AD_DEADLINE_MS로 요청 마감 시간을 만듭니다.
+    """
+    headers = {
+        str(name).lower(): value
+        for name, value in (event.get('headers') or {}).items()
+    }
+    budget_ms = AD_DEADLINE_MS
+    if headers.get(DEADLINE_HEADER):
+        try:
+            budget_ms = int(headers[DEADLINE_HEADER])
+        except ValueError:
+            print(
+                f"Ignoring invalid {DEADLINE_HEADER} header:"
+                f" {headers[DEADLINE_HEADER]}"
+            )
+    return Deadline(budget_ms)
+
+
+def report_timings(timings, sources, prefix=''):
+    """
+    요청의 단계별 시간과 응답 출처를 지표로 남기고 집계합니다. 일정 요청 수마다 백분위수 요약을 남깁니다.
+    묶음 요청은 단계 이름에 prefix('batch_')를 붙여 단일 요청의 백분위수와 섞이지 않게 합니다.
+    """
+    global _request_count
+    # 'generate'는 실제 생성 시간으로 _generate_and_cache에서 따로 기록합니다.
+    stages = {
+        f"{prefix}{name}": milliseconds
+        for name, milliseconds in timings.stages.items()
+    }
+    stage_latency.record_all(stages)
+    for name, milliseconds in stages.items():
+        # 전체 시간은 @metrics.instrument가 total로 기록합니다.
+        if name != f"{prefix}total":
+            metrics.timing(name, milliseconds)
+    for source in sources:
+        metrics.count(f"ad_source_{source}")
+    _request_count += 1
+    if _request_count % AD_TIMING_REPORT_EVERY == 0:
+        print(
+            "Ad stage latency percentiles:"
+            f" {json.dumps(stage_latency.summary())}"
+        )
+
 
 def generate_personalized_ad(advertiser, user_query):
     """
     Gemini API를 사용하여 사용자 질문에 맞춤화된 광고를 생성합니다.
     """
     if not GEMINI_API_KEY:
-        return f"{advertiser['name']}의 솔루션이 궁금하시군요! {advertiser['ad_template']}"
-    
+        return default_ad(advertiser)
+
     try:
-        model = genai.GenerativeModel('gemini-pro')
         prompt = f"""
         다음 정보를 바탕으로 사용자 질문에 맞는 맞춤형 광고를 생성해주세요:
         
@@ -114,18 +715,36 @@ def generate_personalized_ad(advertiser, user_query):
         - 한국어로 작성
         - 50자 이내로 간결하게
         """
-        response = model.generate_content(prompt)
+        response = get_gemini_client().generate_content(prompt, 'gemini-pro')
         return response.text.strip()
     except Exception as e:
         print(f"Error calling Gemini API for ad generation: {e}")
-        return f"{advertiser['name']}의 솔루션이 궁금하시군요! {advertiser['ad_template']}"
+        return default_ad(advertiser)
 
+
+@post_response.after_invocation
+@metrics.instrument
 def handler(event, context):
     """
     사용자 질문을 받아 가장 적합한 광고를 생성하고 반환합니다.
     """
-    print(f"Received ad generation request: {json.dumps(event)}")
-    
+    if is_warmup_event(event):
+        # 광고주 행렬/인덱스도 미리 만들어 첫 요청의 지연 시간을 줄입니다.
+        if get_live_advertiser_index() is None:
+            get_advertiser_matcher()
+            get_advertiser_index()
+        get_embedding_cache()
+        if SEMANTIC_CACHE_THRESHOLD <= 1.0:
+            get_semantic_ad_cache()
+        return warmup_response(
+            warm_up(generative_models=['gemini-pro'] if GEMINI_API_KEY else ())
+        )
+
+    if metrics.debug_enabled():
+        print(f"Received ad generation request: {json.dumps(event)}")
+    deadline = request_deadline(event)
+    timings = StageTimings()
+
     try:
         # CORS preflight 요청 처리
         if event.get('requestContext', {}).get('http', {}).get('method') == 'OPTIONS':
@@ -134,64 +753,101 @@ def handler(event, context):
                 'headers': {
                     'Access-Control-Allow-Origin': '*',
                     'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                    'Access-Control-Allow-Headers': 'Content-Type'
-                }
+                    'Access-Control-Allow-Headers': (
+                        'Content-Type, X-Ad-Deadline-Ms'
+                    ),
+                },
             }
-        
+
         # 요청 본문 파싱
         body = json.loads(event.get('body', '{}'))
+        if 'queries' in body:
+            return handle_batch_request(body, deadline, timings)
         user_query = body.get('query', '')
-        
+
         if not user_query:
             return {
                 'statusCode': 400,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
                 'body': json.dumps({'error': 'Query parameter is required'})
             }
-        
+
         # 1. 사용자 질문을 벡터로 변환
-        user_query_vector = get_text_embedding(user_query)
-        
+        with timings.stage('embed'):
+            user_query_vector = get_text_embedding(user_query)
+
         if user_query_vector is None:
             return {
                 'statusCode': 500,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
                 'body': json.dumps({'error': 'Failed to generate query embedding'})
             }
-        
+
         # 2. 가장 유사한 광고주 찾기
-        best_advertiser, similarity_score = find_best_matching_advertiser(user_query_vector)
-        
+        with timings.stage('match'):
+            best_advertiser, similarity_score = find_best_matching_advertiser(
+                user_query_vector
+            )
+
         if not best_advertiser:
             return {
                 'statusCode': 404,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
                 'body': json.dumps({'error': 'No matching advertiser found'})
             }
-        
-        # 3. 맞춤형 광고 생성
-        personalized_ad = generate_personalized_ad(best_advertiser, user_query)
-        
+
+        # 3. 맞춤형 광고 생성 (비슷한 질문으로 만든 광고가 의미 캐시에 있으면 재사용,
+        #    마감 시간 안에 생성되지 않으면 기본 템플릿 반환)
+        personalized_ad, ad_cache = get_personalized_ad(
+            best_advertiser,
+            user_query,
+            user_query_vector,
+            deadline=deadline,
+            timings=timings,
+        )
+        timings.record('total', deadline.elapsed_ms())
+
         # 4. 응답 구성
         response = {
             'advertiser': {
                 'id': best_advertiser['id'],
                 'name': best_advertiser['name'],
-                'description': best_advertiser['description']
+                'description': best_advertiser['description'],
             },
             'ad_content': personalized_ad,
             'similarity_score': similarity_score,
-            'user_query': user_query
+            'user_query': user_query,
+            'cached': ad_cache['hit'],
+            'ad_source': ad_cache['source'],
+            'timings_ms': timings.stages,
         }
-        
-        print(f"Generated ad for {best_advertiser['name']} with similarity {similarity_score:.3f}")
-        
+        if ad_cache['hit']:
+            response['cache_similarity'] = ad_cache['similarity']
+        if deadline.budget_ms is not None:
+            response['deadline_ms'] = deadline.budget_ms
+
+        metrics.debug(
+            "Served %s ad for %s with similarity %.3f",
+            ad_cache['source'],
+            best_advertiser['name'],
+            similarity_score,
+        )
+        report_timings(timings, [ad_cache['source']])
+        if SEMANTIC_CACHE_THRESHOLD <= 1.0:
+            metrics.set_property(
+                'semantic_cache', get_semantic_ad_cache().stats()
+            )
+        if _live_advertiser_index is not None:
+            metrics.set_property(
+                'advertiser_index', _live_advertiser_index.stats()
+            )
+
         return {
             'statusCode': 200,
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
             'body': json.dumps(response, ensure_ascii=False)
         }
-        
+
     except json.JSONDecodeError:
         return {
             'statusCode': 400,
@@ -205,3 +861,165 @@ def handler(event, context):
             'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
             'body': json.dumps({'error': 'Internal server error'})
         }
+
+
+def parse_batch_queries(body):
+    """
+    묶음 요청의 queries를 [(질문, 광고 생성 여부)]로 정규화합니다.
+    항목은 질문 문자열 또는 {"query": ..., "generate": ...}이며, generate가 없으면 본문의
+    generate(기본 false)를 따릅니다.
+    잘못된 항목이 있으면 ValueError를 발생시킵니다.
+    """
+    queries = body.get('queries')
+    if not isinstance(queries, list):
+        raise ValueError("'queries' must be an array")
+    default_generate = bool(body.get('generate', False))
+    items = []
+    for position, item in enumerate(queries):
+        query, generate = item, default_generate
+        if isinstance(item, dict):
+            query, generate = item.get('query'), bool(
+                item.get('generate', default_generate)
+            )
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError(f"queries[{position}] must be a non-empty query")
+        items.append((query, generate))
+    return items
+
+
+def handle_batch_request(body, deadline, timings):
+    """
+    여러 질문(대화 턴, 광고 지면)의 광고주를 한 번에 매칭합니다.
+    질문들은 한 번의 임베딩 묶음 요청으로 벡터화하고, 한 번의 행렬-행렬 곱으로 모든 광고주와 비교해
+    질문마다 상위 top_k 광고주와 유사도를 반환합니다.
+    unique_advertisers가 true면 지면 간 광고주가 겹치지 않게 배정합니다.
+    generate가 true인 항목만 1위 광고주로 맞춤형 광고를
+    만들고(의미 캐시/마감 시간 적용), 나머지는 LLM을 호출하지 않습니다.
+    """
+    headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+    }
+    try:
+        items = parse_batch_queries(body)
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'headers': headers,
+            'body': json.dumps({'error': str(e)}),
+        }
+    try:
+        top_k = int(body.get('top_k', 1))
+    except (TypeError, ValueError):
+        return {
+            'statusCode': 400,
+            'headers': headers,
+            'body': json.dumps({'error': "'top_k' must be an integer"}),
+        }
+    if not items:
+        return {
+            'statusCode': 400,
+            'headers': headers,
+            'body': json.dumps({'error': 'At least one query is required'}),
+        }
+    if len(items) > AD_BATCH_MAX_QUERIES:
+        return {
+            'statusCode': 413,
+            'headers': headers,
+            'body': json.dumps({
+                'error': f'At most {AD_BATCH_MAX_QUERIES} queries per request'
+            }),
+        }
+    top_k = max(1, min(top_k, AD_BATCH_MAX_TOP_K))
+    metrics.count('batch_queries', len(items))
+
+    # 1. 질문들을 한 번에 벡터로 변환 (캐시에 없는 질문만 묶음 요청)
+    with timings.stage('embed'):
+        query_vectors = get_text_embeddings([query for query, _ in items])
+    if query_vectors is None:
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': json.dumps(
+                {'error': 'Failed to generate query embeddings'}
+            ),
+        }
+
+    # 2. 모든 질문 × 모든 광고주 점수를 한 번에 계산해 질문별 상위 top_k 선택
+    with timings.stage('match'):
+        ranked_matches = find_top_advertisers_batch(
+            query_vectors,
+            k=top_k,
+            unique=bool(body.get('unique_advertisers', False)),
+        )
+
+    # 3. 요청한 항목만 1위 광고주로 맞춤형 광고 생성 (캐시에 없는 광고는 동시에 생성)
+    generation_items = [
+        index
+        for index, ((_, generate), ranked) in enumerate(
+            zip(items, ranked_matches)
+        )
+        if generate and ranked
+    ]
+    ads = (
+        dict(
+            zip(
+                generation_items,
+                get_personalized_ads(
+                    [
+                        (
+                            ranked_matches[index][0][0],
+                            items[index][0],
+                            query_vectors[index],
+                        )
+                        for index in generation_items
+                    ],
+                    deadline=deadline,
+                    timings=timings,
+                ),
+            )
+        )
+        if generation_items
+        else {}
+    )
+
+    results, sources = [], []
+    for index, ((query, _), ranked) in enumerate(zip(items, ranked_matches)):
+        result = {
+            'query': query,
+            'matches': [
+                {
+                    'advertiser': {
+                        'id': advertiser['id'],
+                        'name': advertiser['name'],
+                        'description': advertiser['description'],
+                    },
+                    'similarity_score': similarity,
+                }
+                for advertiser, similarity in ranked
+            ],
+        }
+        if index in ads:
+            personalized_ad, ad_cache = ads[index]
+            result.update({
+                'ad_content': personalized_ad,
+                'cached': ad_cache['hit'],
+                'ad_source': ad_cache['source'],
+            })
+            sources.append(ad_cache['source'])
+        results.append(result)
+    timings.record('total', deadline.elapsed_ms())
+
+    report_timings(timings, sources, prefix='batch_')
+    response = {
+        'results': results,
+        'top_k': top_k,
+        'timings_ms': timings.stages,
+    }
+    if deadline.budget_ms is not None:
+        response['deadline_ms'] = deadline.budget_ms
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': json.dumps(response, ensure_ascii=False),
+    }
@@ -0,0 +1,304 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+from matcher import TIE_TOLERANCE, _normalize_rows
+
+# --- 파일 포맷 ---
+# MAGIC(8바이트) | 헤더 길이(uint64, little endian) | JSON 헤더 | 64바이트 정렬된 배열들
+# 배열: centroids(n_lists x dim, float32), vectors(count x dim, float32),
+#       ids(count, int64), offsets(n_lists + 1, int64)
+# vectors/ids는 클러스터(리스트) 순서로 정렬되어 있어 리스트 하나가 연속된 구간이 됩니다.
+# 광고주 정보(선택): metadata_ids(count, int64, id 오름차순),
+#       metadata_offsets(count + 1, int64), metadata(uint8)
+# metadata[metadata_offsets[i]:metadata_offsets[i + 1]]가 metadata_ids[i] 광고주의
+# [name, description, ad_template] JSON이므로 조회한 행만 디코딩합니다.
+MAGIC = b'ADIVF001'
+ALIGNMENT = 64
+
+
+def _kmeans(vectors, n_lists, iterations, rng):
+    """
+    정규화된 벡터에 대해 구면(spherical) k-means를 수행하고 중심 벡터를 반환합니다.
+    """
+    centroids = vectors[
+        rng.choice(len(vectors), n_lists, replace=False)
+    ].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_lists)
+        # 비어 있는 클러스터는 임의의 벡터로 다시 시작합니다.
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            sums[empty] = vectors[
+                rng.choice(len(vectors), empty.size, replace=False)
+            ]
+        centroids = _normalize_rows(sums)
+    return centroids
+
+
+def _assign(vectors, centroids, chunk_size=65536):
+    """
+    각 벡터를 가장 가까운 중심에 배정합니다. 메모리 사용량을 제한하기 위해 나눠서 계산합니다.
+    """
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = vectors[start:start + chunk_size]
+        assignments[start:start + chunk_size] = np.argmax(
+            chunk @ centroids.T, axis=1
+        )
+    return assignments
+
+
+# 인덱스 파일에 함께 싣는 광고주 정보 필드
+METADATA_FIELDS = ('name', 'description', 'ad_template')
+
+
+def build_ivf_index(
+    ids,
+    embeddings,
+    path,
+    n_lists=None,
+    iterations=10,
+    training_sample=None,
+    seed=0,
+    version=0,
+    metadata=None,
+):
+    """
+    광고주 임베딩으로 IVF 인덱스를 만들어 메모리 매핑 가능한 단일 파일로 저장합니다.
+    n_lists를 지정하지 않으면 sqrt(광고주 수)를 사용합니다.
+    version은 스냅샷에 반영된 마지막 광고주 변경 로그 버전입니다. (index_deltas 참고)
+    metadata는 ids와 같은 순서의 광고주 정보 dict 목록으로, 주면 파일에 함께 저장해
+    IVFIndex.get으로 조회합니다.
+    """
+    vectors = _normalize_rows(np.array(embeddings, dtype=np.float32))
+    ids = np.asarray(ids, dtype=np.int64)
+    if vectors.ndim != 2 or len(vectors) != len(ids) or len(ids) == 0:
+        raise ValueError(
+            "ids and embeddings must be non-empty and of the same length."
+        )
+
+    count, dim = vectors.shape
+    n_lists = min(n_lists or max(1, int(np.sqrt(count))), count)
+    rng = np.random.default_rng(seed)
+
+    # 학습은 표본으로만 수행해 오프라인 빌드 시간을 제한합니다.
+    training_sample = training_sample or max(n_lists * 256, 10000)
+    if count > training_sample:
+        training = vectors[rng.choice(count, training_sample, replace=False)]
+    else:
+        training = vectors
+    centroids = _kmeans(training, n_lists, iterations, rng)
+
+    assignments = _assign(vectors, centroids)
+    order = np.argsort(assignments, kind='stable')
+    offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(assignments, minlength=n_lists))
+
+    arrays = {
+        'centroids': np.ascontiguousarray(centroids, dtype=np.float32),
+        'vectors': np.ascontiguousarray(vectors[order], dtype=np.float32),
+        'ids': np.ascontiguousarray(ids[order]),
+        'offsets': offsets,
+    }
+    if metadata is not None:
+        if len(metadata) != len(ids):
+            raise ValueError("metadata must have one entry per advertiser.")
+        by_id = np.argsort(ids, kind='stable')
+        rows = [
+            json.dumps(
+                [metadata[i].get(field) or '' for field in METADATA_FIELDS],
+                ensure_ascii=False,
+            ).encode('utf-8')
+            for i in by_id
+        ]
+        metadata_offsets = np.zeros(count + 1, dtype=np.int64)
+        metadata_offsets[1:] = np.cumsum([len(row) for row in rows])
+        arrays['metadata_ids'] = np.ascontiguousarray(ids[by_id])
+        arrays['metadata_offsets'] = metadata_offsets
+        arrays['metadata'] = np.frombuffer(b''.join(rows), dtype=np.uint8)
+
+    header = {
+        'dim': dim,
+        'count': count,
+        'n_lists': n_lists,
+        'version': version,
+        'arrays': {},
+    }
+    # 헤더 크기가 배열 오프셋에 영향을 주므로 오프셋은 헤더 영역을 넉넉히 잡은 뒤 계산합니다.
+    header_capacity = 4096
+    position = len(MAGIC) + 8 + header_capacity
+    for name, array in arrays.items():
+        position += -position % ALIGNMENT
+        header['arrays'][name] = {
+            'offset': position,
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+        }
+        position += array.nbytes
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    if len(header_bytes) > header_capacity:
+        raise ValueError("Index header is too large.")
+
+    # 컨테이너가 쓰는 도중의 파일을 열지 않도록 임시 파일에 쓴 뒤 교체합니다.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', header_capacity))
+        f.write(header_bytes.ljust(header_capacity, b' '))
+        for name, array in arrays.items():
+            f.seek(header['arrays'][name]['offset'])
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+    return header
+
+
+class IVFIndex:
+    """
+    build_ivf_index로 만든 파일을 메모리 매핑으로 여는 IVF 근사 최근접 이웃 인덱스입니다.
+    파일 전체를 읽지 않으므로 수 밀리초 안에 열리고, 같은 파일을 여는 프로세스끼리 페이지를 공유합니다.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an advertiser IVF index.")
+            (header_length,) = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(header_length))
+
+        self.path = path
+        self.dim = header['dim']
+        self.count = header['count']
+        self.n_lists = header['n_lists']
+        # 변경 로그 도입 전에 만든 파일은 버전 0으로 봅니다.
+        self.version = header.get('version', 0)
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            arrays[name] = np.memmap(
+                path,
+                dtype=np.dtype(spec['dtype']),
+                mode='r',
+                offset=spec['offset'],
+                shape=tuple(spec['shape']),
+            )
+        # 중심 벡터와 오프셋은 작고 매번 전부 읽으므로 메모리에 올려둡니다.
+        self.centroids = np.array(arrays['centroids'])
+        self.offsets = np.array(arrays['offsets'])
+        self.vectors = arrays['vectors']
+        self.ids = arrays['ids']
+        # 광고주 정보는 id 이진 탐색으로 찾은 행만 읽습니다.
+        # (광고주 정보 전체를 JSON 하나로 저장하던 이전 빌드 파일은 정보가 없는 것으로 봅니다)
+        self._metadata_ids = arrays.get('metadata_ids')
+        self._metadata_offsets = arrays.get('metadata_offsets')
+        self._metadata_bytes = arrays.get('metadata')
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def has_metadata(self):
+        return self._metadata_offsets is not None
+
+    def get(self, advertiser_id):
+        """
+        인덱스 파일에 저장된 광고주 정보를 반환합니다. 없으면 None입니다.
+        """
+        if self._metadata_offsets is None:
+            return None
+        position = int(np.searchsorted(self._metadata_ids, advertiser_id))
+        if (
+            position >= self.count
+            or self._metadata_ids[position] != advertiser_id
+        ):
+            return None
+        start, end = self._metadata_offsets[position:position + 2]
+        values = json.loads(self._metadata_bytes[start:end].tobytes())
+        return dict(zip(METADATA_FIELDS, values), id=advertiser_id)
+
+    def search(self, query_vector, k=1, n_probe=8, min_score=0.0):
+        """
+        질문 벡터와 가까운 n_probe개 리스트만 탐색해 상위 k개의 (광고주 id, 유사도)를 반환합니다.
+        n_probe를 키우면 재현율이 올라가고 지연 시간도 늘어납니다. n_probe >= n_lists이면 정확 탐색과 같습니다.
+        """
+        if k <= 0 or len(query_vector) != self.dim:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm == 0:
+            return []
+        query = query / norm
+        return self._search_normalized(
+            query, self.centroids @ query, k, n_probe, min_score
+        )
+
+    def search_batch(self, query_vectors, k=1, n_probe=8, min_score=0.0):
+        """
+        여러 질문 벡터를 search와 같이 탐색해 질문 순서대로 결과 리스트를 반환합니다.
+        중심점 점수는 질문 행렬과 중심점 행렬의 한 번의 행렬-행렬 곱으로 계산합니다.
+        """
+        results = [[] for _ in query_vectors]
+        valid = []
+        for index, query_vector in enumerate(query_vectors):
+            if k <= 0 or len(query_vector) != self.dim:
+                continue
+            query = np.asarray(query_vector, dtype=np.float32)
+            norm = float(np.linalg.norm(query))
+            if norm > 0:
+                valid.append((index, query / norm))
+        if not valid:
+            return results
+
+        queries = np.stack([query for _, query in valid])
+        for (index, query), centroid_scores in zip(
+            valid, queries @ self.centroids.T
+        ):
+            results[index] = self._search_normalized(
+                query, centroid_scores, k, n_probe, min_score
+            )
+        return results
+
+    def _search_normalized(
+        self, query, centroid_scores, k, n_probe, min_score
+    ):
+        n_probe = max(1, min(n_probe, self.n_lists))
+        if n_probe < self.n_lists:
+            probed = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+        else:
+            probed = np.arange(self.n_lists)
+
+        ranges = [
+            (self.offsets[i], self.offsets[i + 1]) for i in np.sort(probed)
+        ]
+        ranges = [(start, end) for start, end in ranges if end > start]
+        if not ranges:
+            return []
+        positions = np.concatenate(
+            [np.arange(start, end) for start, end in ranges]
+        )
+        similarities = np.concatenate(
+            [self.vectors[start:end] @ query for start, end in ranges]
+        )
+
+        if k < similarities.size:
+            candidates = np.argpartition(-similarities, k - 1)[:k]
+            threshold = similarities[candidates].min() - TIE_TOLERANCE
+            candidates = np.flatnonzero(similarities >= threshold)
+        else:
+            candidates = np.arange(similarities.size)
+        candidates = candidates[similarities[candidates] > min_score]
+
+        # 유사도가 같으면 id가 작은(먼저 등록된) 광고주를 우선합니다.
+        candidate_ids = np.asarray(self.ids[positions[candidates]])
+        rank_keys = np.round(similarities[candidates] / TIE_TOLERANCE)
+        order = np.lexsort((candidate_ids, -rank_keys))[:k]
+        return [
+            (int(candidate_ids[o]), float(similarities[candidates[o]]))
+            for o in order
+        ]
@@ -0,0 +1,382 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Gemini batchEmbedContents 한 번에 보낼 수 있는 최대 텍스트 수
+MAX_EMBED_BATCH_SIZE = 100
+
+CHECKPOINT_TABLE = 'revectorize_checkpoints'
+
+
+def _backoff_delay(attempt, base_delay, max_delay):
+    """
+    지수 백오프에 full jitter를 적용한 대기 시간을 반환합니다.
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2**attempt)))
+
+
+def _vector_literal(embedding):
+    # pgvector는 '[0.1,0.2,...]' 형식의 텍스트를 vector로 캐스팅할 수 있습니다.
+    return '[' + ','.join(repr(float(value)) for value in embedding) + ']'
+
+
+class PostgresAdvertiserStore:
+    """
+    RDS PostgreSQL(pgvector)의 advertisers 테이블을 페이지 단위로 읽고 임베딩을 일괄 저장합니다.
+    연결은 psycopg2 커넥션 풀에서 빌려 쓰므로 웜 컨테이너에서는 재연결하지 않습니다.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.round_trips = 0
+
+    def _run(self, work):
+        conn = self.pool.getconn()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    return work(cur)
+        finally:
+            self.pool.putconn(conn)
+
+    def ensure_checkpoint_table(self):
+        def work(cur):
+            cur.execute(
+                f"CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (job_id TEXT"
+                " PRIMARY KEY, last_id BIGINT NOT NULL, processed BIGINT NOT"
+                " NULL, done BOOLEAN NOT NULL DEFAULT FALSE, updated_at"
+                " TIMESTAMP DEFAULT NOW())"
+            )
+            # done 열이 없던 이전 체크포인트 테이블
+            cur.execute(
+                f"ALTER TABLE {CHECKPOINT_TABLE} ADD COLUMN IF NOT EXISTS"
+                " done BOOLEAN NOT NULL DEFAULT FALSE"
+            )
+
+        self._run(work)
+
+    def load_checkpoint(self, job_id):
+        """
+        (마지막 id, 처리 수)를 반환합니다. 체크포인트가 없거나 완료된 작업이면 (None, 0)입니다.
+        """
+
+        def work(cur):
+            cur.execute(
+                f"SELECT last_id, processed, done FROM {CHECKPOINT_TABLE}"
+                " WHERE job_id = %s",
+                (job_id,),
+            )
+            return cur.fetchone()
+
+        self.round_trips += 1
+        row = self._run(work)
+        return (row[0], row[1]) if row and not row[2] else (None, 0)
+
+    def fetch_page(self, after_id, limit, only_missing=False):
+        """
+        id 기준 키셋 페이지네이션으로 [(id, description)]을 최대 limit개 읽습니다.
+        """
+
+        def work(cur):
+            cur.execute(
+                "SELECT id, description FROM advertisers WHERE (%s IS NULL OR"
+                " id > %s) AND (NOT %s OR embedding IS NULL) ORDER BY id"
+                " LIMIT %s",
+                (after_id, after_id, only_missing, limit),
+            )
+            return cur.fetchall()
+
+        self.round_trips += 1
+        return self._run(work)
+
+    def write_page(self, rows, job_id, last_id, processed, done=False):
+        """
+        [(id, embedding)]을 다중 행 UPDATE 한 번으로 저장하고, 같은 트랜잭션에서 체크포인트를 갱신합니다.
+        마지막 페이지면 done=True로 체크포인트를 완료 처리합니다.
+        """
+        from psycopg2.extras import execute_values
+
+        def work(cur):
+            execute_values(
+                cur,
+                "UPDATE advertisers AS a SET embedding = v.embedding::vector,"
+                " updated_at = NOW() FROM (VALUES %s) AS v(id, embedding)"
+                " WHERE a.id = v.id",
+                [
+                    (advertiser_id, _vector_literal(embedding))
+                    for advertiser_id, embedding in rows
+                ],
+                page_size=len(rows) or 1,
+            )
+            cur.execute(
+                f"INSERT INTO {CHECKPOINT_TABLE} (job_id, last_id, processed,"
+                " done, updated_at) VALUES (%s, %s, %s, %s, NOW()) ON"
+                " CONFLICT (job_id) DO UPDATE SET last_id = EXCLUDED.last_id,"
+                " processed = EXCLUDED.processed, done = EXCLUDED.done,"
+                " updated_at = NOW()",
+                (job_id, last_id, processed, done),
+            )
+
+        self.round_trips += 1
+        self._run(work)
+
+    def complete_checkpoint(self, job_id):
+        """
+        남은 페이지 없이 끝난 작업의 체크포인트를 완료 처리합니다.
+        """
+        self.round_trips += 1
+        self._run(
+            lambda cur: cur.execute(
+                f"UPDATE {CHECKPOINT_TABLE} SET done = TRUE, updated_at ="
+                " NOW() WHERE job_id = %s",
+                (job_id,),
+            )
+        )
+
+
+class SQLiteAdvertiserStore:
+    """
+    PostgresAdvertiserStore의 로컬 대체 구현입니다. 임베딩은 JSON 텍스트로 저장합니다.
+    """
+
+    def __init__(self, path=':memory:'):
+        import sqlite3
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS advertisers (id INTEGER PRIMARY KEY,"
+            " description TEXT NOT NULL, embedding TEXT)"
+        )
+        self._conn.commit()
+        self.round_trips = 0
+
+    def ensure_checkpoint_table(self):
+        with self._lock:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (job_id TEXT"
+                " PRIMARY KEY, last_id INTEGER NOT NULL, processed INTEGER"
+                " NOT NULL, done INTEGER NOT NULL DEFAULT 0, updated_at REAL)"
+            )
+            self._conn.commit()
+
+    def load_checkpoint(self, job_id):
+        self.round_trips += 1
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT last_id, processed, done FROM {CHECKPOINT_TABLE}"
+                " WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        return (row[0], row[1]) if row and not row[2] else (None, 0)
+
+    def fetch_page(self, after_id, limit, only_missing=False):
+        self.round_trips += 1
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, description FROM advertisers WHERE (? IS NULL OR"
+                " id > ?) AND (NOT ? OR embedding IS NULL) ORDER BY id"
+                " LIMIT ?",
+                (after_id, after_id, only_missing, limit),
+            ).fetchall()
+
+    def write_page(self, rows, job_id, last_id, processed, done=False):
+        self.round_trips += 1
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE advertisers SET embedding = ? WHERE id = ?",
+                [
+                    (json.dumps(embedding), advertiser_id)
+                    for advertiser_id, embedding in rows
+                ],
+            )
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {CHECKPOINT_TABLE} (job_id, last_id,"
+                " processed, done, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, last_id, processed, int(done), time.time()),
+            )
+
+    def complete_checkpoint(self, job_id):
+        self.round_trips += 1
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE {CHECKPOINT_TABLE} SET done = 1, updated_at = ? WHERE"
+                " job_id = ?",
+                (time.time(), job_id),
+            )
+
+
+def plan_embed_batches(texts, batch_size=MAX_EMBED_BATCH_SIZE, max_chars=None):
+    """
+    텍스트 인덱스를 임베딩 요청 단위로 나눕니다. (요청당 최대 batch_size개, 선택적으로 총 max_chars자 이하)
+    """
+    batch_size = max(1, min(batch_size, MAX_EMBED_BATCH_SIZE))
+    batches, current, current_chars = [], [], 0
+    for index, text in enumerate(texts):
+        if current and (
+            len(current) >= batch_size
+            or (max_chars and current_chars + len(text) > max_chars)
+        ):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(index)
+        current_chars += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def embed_with_retry(
+    embed_batch,
+    texts,
+    max_attempts=5,
+    base_delay=0.5,
+    max_delay=8.0,
+    sleep=time.sleep,
+):
+    """
+    embed_batch(texts)를 호출하고 실패하면 지수 백오프 + jitter로 재시도합니다.
+    결과 개수가 입력과 다르면 실패로 봅니다. 끝내 실패하면 마지막 예외를 다시 발생시킵니다.
+    """
+    for attempt in range(max_attempts):
+        try:
+            embeddings = embed_batch(texts)
+            if embeddings is None or len(embeddings) != len(texts):
+                raise ValueError(
+                    f"Expected {len(texts)} embeddings, got"
+                    f" {len(embeddings or [])}."
+                )
+            return embeddings
+        except Exception as e:
+            if attempt + 1 >= max_attempts:
+                raise
+            print(
+                "Embedding batch failed (attempt"
+                f" {attempt + 1}/{max_attempts}): {e}"
+            )
+            sleep(_backoff_delay(attempt, base_delay, max_delay))
+
+
+def run_bulk_revectorize(
+    store,
+    embed_batch,
+    job_id='revectorize',
+    page_size=500,
+    batch_size=MAX_EMBED_BATCH_SIZE,
+    max_chars=None,
+    concurrency=4,
+    only_missing=False,
+    restart=False,
+    should_stop=None,
+    max_attempts=1,
+    on_page=None,
+):
+    """
+    광고주를 페이지 단위로 읽어 묶음 임베딩 요청으로 벡터화하고, 페이지마다 일괄 저장합니다.
+    페이지 저장과 체크포인트 갱신은 같은 트랜잭션이므로 중단된 작업은 마지막으로 저장한 페이지 다음부터 재개합니다.
+    should_stop()이 True를 반환하면(예: Lambda 남은 시간 부족) 현재 페이지까지 저장하고 멈춥니다.
+    마지막 페이지를 저장하는 트랜잭션에서 체크포인트를 완료 처리하므로, 끝난 작업을 같은 job_id로 다시 실행하면
+    처음부터 시작합니다.
+    on_page([(광고주 id, 설명, 임베딩)])는 페이지를 저장하기 직전에 호출합니다(예: 광고주 인덱스 변경 로그).
+    embed_batch는 보통 공용 Gemini 클라이언트처럼 스스로 재시도하므로 max_attempts는 1입니다.
+    재시도하지 않는 embed_batch에만 늘립니다. 예외가 나면 그 페이지는 저장하지 않으므로 재개할 때 다시 처리합니다.
+
+    처리 결과와 처리량 통계를 dict로 반환합니다.
+    """
+    store.ensure_checkpoint_table()
+    last_id, processed = (
+        (None, 0) if restart else store.load_checkpoint(job_id)
+    )
+    started = time.perf_counter()
+    stats = {
+        'job_id': job_id,
+        'resumed_from': last_id,
+        'processed': 0,
+        'pages': 0,
+        'embed_calls': 0,
+        'embed_seconds': 0.0,
+        'db_seconds': 0.0,
+        'done': False,
+    }
+    counter_lock = threading.Lock()
+
+    def embed(texts):
+        call_started = time.perf_counter()
+        embeddings = embed_with_retry(
+            embed_batch, texts, max_attempts=max_attempts
+        )
+        with counter_lock:
+            stats['embed_calls'] += 1
+        return embeddings, time.perf_counter() - call_started
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        while not (should_stop and should_stop()):
+            db_started = time.perf_counter()
+            rows = store.fetch_page(last_id, page_size, only_missing)
+            stats['db_seconds'] += time.perf_counter() - db_started
+            if not rows:
+                # 앞 페이지가 정확히 page_size개로 끝난 경우
+                store.complete_checkpoint(job_id)
+                stats['done'] = True
+                break
+
+            texts = [description or '' for _, description in rows]
+            batches = plan_embed_batches(texts, batch_size, max_chars)
+            results = list(
+                executor.map(
+                    lambda batch: embed([texts[i] for i in batch]), batches
+                )
+            )
+
+            embeddings = [None] * len(rows)
+            for batch, (batch_embeddings, seconds) in zip(batches, results):
+                stats['embed_seconds'] += seconds
+                for index, embedding in zip(batch, batch_embeddings):
+                    embeddings[index] = embedding
+
+            last_id = rows[-1][0]
+            processed += len(rows)
+            last_page = len(rows) < page_size
+            db_started = time.perf_counter()
+            if on_page is not None:
+                on_page([
+                    (advertiser_id, description, embedding)
+                    for (advertiser_id, description), embedding in zip(
+                        rows, embeddings
+                    )
+                ])
+            store.write_page(
+                [
+                    (advertiser_id, embedding)
+                    for (advertiser_id, _), embedding in zip(rows, embeddings)
+                ],
+                job_id,
+                last_id,
+                processed,
+                done=last_page,
+            )
+            stats['db_seconds'] += time.perf_counter() - db_started
+            stats['processed'] += len(rows)
+            stats['pages'] += 1
+            print(
+                f"Revectorized page {stats['pages']}: {len(rows)} advertisers"
+                f" up to id {last_id} ({processed} total for job '{job_id}')."
+            )
+            if last_page:
+                stats['done'] = True
+                break
+
+    elapsed = time.perf_counter() - started
+    stats.update({
+        'last_id': last_id,
+        'total_processed': processed,
+        'elapsed_seconds': round(elapsed, 3),
+        'advertisers_per_second': (
+            round(stats['processed'] / elapsed, 1) if elapsed > 0 else 0.0
+        ),
+        'embed_seconds': round(stats['embed_seconds'], 3),
+        'db_seconds': round(stats['db_seconds'], 3),
+    })
+    return stats
@@ -0,0 +1,389 @@
+import array
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+from gemini_client import get_gemini_client
+
+DEFAULT_EMBEDDING_MODEL = "models/text-embedding-004"
+
+# --- 임베딩 캐시 설정 ---
+# 키는 (모델, task_type, 텍스트 해시)이고 값은 float16 또는 int8(벡터별 scale) 로 압축해 보관합니다.
+# EMBEDDING_CACHE_PATH가 설정되면 추가 전용(append-only)
+# 파일에도 저장해 컨테이너/프로세스 재시작 후에도 재사용합니다.
+EMBEDDING_CACHE_SIZE = int(os.environ.get('EMBEDDING_CACHE_SIZE', '20000'))
+EMBEDDING_CACHE_MAX_BYTES = int(
+    os.environ.get('EMBEDDING_CACHE_MAX_BYTES', str(64 * 1024 * 1024))
+)
+EMBEDDING_CACHE_DTYPE = os.environ.get('EMBEDDING_CACHE_DTYPE', 'float16')
+EMBEDDING_CACHE_PATH = os.environ.get('EMBEDDING_CACHE_PATH')
+EMBEDDING_CACHE_FILE_MAX_BYTES = int(
+    os.environ.get('EMBEDDING_CACHE_FILE_MAX_BYTES', str(256 * 1024 * 1024))
+)
+
+# --- 파일 포맷 ---
+# MAGIC(8바이트) 다음에 레코드가 이어집니다.
+# 레코드: 키(SHA-256 32바이트) | 코덱(1바이트) | 차원(uint32) | scale(float32)
+#         | 값(차원 x 코덱 크기)
+FILE_MAGIC = b'ADEMB001'
+_RECORD_HEADER = struct.Struct('<32sBIf')
+
+CODECS = {'float32': 0, 'float16': 1, 'int8': 2}
+_ITEM_SIZES = {0: 4, 1: 2, 2: 1}
+
+
+def embedding_key(model, task_type, text):
+    """
+    (모델, task_type, 텍스트)의 SHA-256 다이제스트를 캐시 키로 반환합니다.
+    """
+    digest = hashlib.sha256()
+    for part in (model, task_type, text or ''):
+        encoded = part.encode('utf-8')
+        digest.update(struct.pack('<I', len(encoded)))
+        digest.update(encoded)
+    return digest.digest()
+
+
+def encode_vector(vector, dtype='float16'):
+    """
+    벡터를 (코덱, 차원, scale, 바이트)로 압축합니다. int8은 최대 절댓값 기준 대칭 양자화입니다.
+    """
+    codec = CODECS[dtype]
+    values = [float(value) for value in vector]
+    if codec == 0:
+        return (
+            codec,
+            len(values),
+            1.0,
+            struct.pack(f'<{len(values)}f', *values),
+        )
+    if codec == 1:
+        return (
+            codec,
+            len(values),
+            1.0,
+            struct.pack(f'<{len(values)}e', *values),
+        )
+    scale = max((abs(value) for value in values), default=0.0) / 127.0 or 1.0
+    return (
+        codec,
+        len(values),
+        scale,
+        array.array('b', [round(value / scale) for value in values]).tobytes(),
+    )
+
+
+def decode_vector(codec, dim, scale, payload):
+    """
+    encode_vector로 압축한 벡터를 float 리스트로 복원합니다.
+    """
+    if codec == 0:
+        return list(struct.unpack(f'<{dim}f', payload))
+    if codec == 1:
+        return list(struct.unpack(f'<{dim}e', payload))
+    return [value * scale for value in array.array('b', payload)]
+
+
+class EmbeddingCache:
+    """
+    압축된 임베딩을 보관하는 스레드 안전 캐시입니다.
+    인메모리 LRU(항목 수/바이트 제한)와 선택적인 추가 전용 메모리 매핑 파일 두 계층으로 구성됩니다.
+    파일이 file_max_bytes를 넘으면 최근에 사용한 항목만 남기도록 압축(compaction)합니다.
+    """
+
+    def __init__(
+        self,
+        maxsize=EMBEDDING_CACHE_SIZE,
+        max_bytes=EMBEDDING_CACHE_MAX_BYTES,
+        dtype=EMBEDDING_CACHE_DTYPE,
+        path=None,
+        file_max_bytes=EMBEDDING_CACHE_FILE_MAX_BYTES,
+    ):
+        if dtype not in CODECS:
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.dtype = dtype
+        self.path = path
+        self.file_max_bytes = file_max_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        # 파일 계층 인덱스: 키 -> 레코드 오프셋 (사용 순서 유지, 압축 시 최근 항목 우선)
+        self._file_index = OrderedDict()
+        self._file = None
+        self._map = None
+        self._file_size = 0
+        self._lock = threading.RLock()
+        self._counters = {
+            'memory_hits': 0,
+            'file_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'compactions': 0,
+        }
+        if path:
+            self._open_file()
+
+    # --- 파일 계층 ---
+
+    def _open_file(self):
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        self._file = open(self.path, 'r+b' if exists else 'w+b')
+        if not exists:
+            self._file.write(FILE_MAGIC)
+            self._file.flush()
+        self._file_size = os.path.getsize(self.path)
+        self._remap()
+        if self._map is None or self._map[: len(FILE_MAGIC)] != FILE_MAGIC:
+            raise ValueError(f"Not an embedding cache file: {self.path}")
+        self._scan()
+
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+        self._map = (
+            mmap.mmap(
+                self._file.fileno(), self._file_size, access=mmap.ACCESS_READ
+            )
+            if self._file_size
+            else None
+        )
+
+    def _scan(self):
+        """
+        파일의 레코드를 읽어 인덱스를 만듭니다. 마지막 레코드가 잘려 있으면(쓰기 중 종료) 그 앞까지 자릅니다.
+        """
+        position = len(FILE_MAGIC)
+        while position + _RECORD_HEADER.size <= self._file_size:
+            key, codec, dim, _ = _RECORD_HEADER.unpack_from(
+                self._map, position
+            )
+            end = (
+                position
+                + _RECORD_HEADER.size
+                + dim * _ITEM_SIZES.get(codec, 0)
+            )
+            if codec not in _ITEM_SIZES or end > self._file_size:
+                break
+            self._file_index[key] = position
+            self._file_index.move_to_end(key)
+            position = end
+        if position != self._file_size:
+            print(
+                "Truncating partial embedding cache record at offset"
+                f" {position} in {self.path}."
+            )
+            self._file.truncate(position)
+            self._file_size = position
+            self._remap()
+
+    def _read_record(self, position):
+        if self._map is None or position + _RECORD_HEADER.size > len(
+            self._map
+        ):
+            # 마지막 매핑 이후에 추가된 레코드는 파일을 다시 매핑해서 읽습니다.
+            self._remap()
+        key, codec, dim, scale = _RECORD_HEADER.unpack_from(
+            self._map, position
+        )
+        start = position + _RECORD_HEADER.size
+        return (
+            codec,
+            dim,
+            scale,
+            bytes(self._map[start:start + dim * _ITEM_SIZES[codec]]),
+        )
+
+    def _append_record(self, key, entry):
+        codec, dim, scale, payload = entry
+        record = _RECORD_HEADER.pack(key, codec, dim, scale) + payload
+        self._file.seek(self._file_size)
+        self._file.write(record)
+        self._file.flush()
+        self._file_index[key] = self._file_size
+        self._file_size += len(record)
+        if self._file_size > self.file_max_bytes:
+            self._compact()
+
+    def _compact(self):
+        """
+        최근에 사용한 항목부터 file_max_bytes의 절반까지만 남겨 파일을 다시 씁니다.
+        """
+        budget = self.file_max_bytes // 2
+        kept, size = [], len(FILE_MAGIC)
+        for key in reversed(self._file_index):
+            entry = self._read_record(self._file_index[key])
+            record_size = _RECORD_HEADER.size + len(entry[3])
+            if size + record_size > budget:
+                break
+            kept.append((key, entry))
+            size += record_size
+
+        temp_path = f"{self.path}.compact"
+        index = OrderedDict()
+        with open(temp_path, 'wb') as f:
+            f.write(FILE_MAGIC)
+            position = len(FILE_MAGIC)
+            for key, (codec, dim, scale, payload) in reversed(kept):
+                f.write(_RECORD_HEADER.pack(key, codec, dim, scale) + payload)
+                index[key] = position
+                position += _RECORD_HEADER.size + len(payload)
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+        os.replace(temp_path, self.path)
+        self._file = open(self.path, 'r+b')
+        self._file_size = os.path.getsize(self.path)
+        self._file_index = index
+        self._remap()
+        self._counters['compactions'] += 1
+
+    # --- 인메모리 계층 ---
+
+    def _remember(self, key, entry):
+        size = len(entry[3]) + 64  # 키/튜플 오버헤드 근사치
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous[1]
+        self._memory[key] = (entry, size)
+        self._memory_bytes += size
+        while self._memory and (
+            len(self._memory) > self.maxsize
+            or self._memory_bytes > self.max_bytes
+        ):
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+            self._counters['evictions'] += 1
+
+    # --- 공개 API ---
+
+    def get(self, key):
+        """
+        캐시된 벡터(float 리스트)를 반환합니다. 없으면 None입니다.
+        """
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+                self._counters['memory_hits'] += 1
+                entry = cached[0]
+            elif key in self._file_index:
+                self._file_index.move_to_end(key)
+                entry = self._read_record(self._file_index[key])
+                self._remember(key, entry)
+                self._counters['file_hits'] += 1
+            else:
+                self._counters['misses'] += 1
+                return None
+        return decode_vector(*entry)
+
+    def put(self, key, vector):
+        entry = encode_vector(vector, self.dtype)
+        with self._lock:
+            self._remember(key, entry)
+            self._counters['stores'] += 1
+            if self._file is not None and key not in self._file_index:
+                self._append_record(key, entry)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update({
+                'hits': stats['memory_hits'] + stats['file_hits'],
+                'size': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'file_entries': len(self._file_index),
+                'file_bytes': self._file_size,
+            })
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# 기본 캐시는 컨테이너가 살아있는 동안 재사용합니다.
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """
+    환경 변수 설정으로 만든 기본 임베딩 캐시를 반환합니다. 파일을 열 수 없으면 인메모리 계층만 사용합니다.
+    """
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                try:
+                    _default_cache = EmbeddingCache(path=EMBEDDING_CACHE_PATH)
+                except (OSError, ValueError) as e:
+                    print(
+                        f"Embedding cache file unavailable ({e}). Using"
+                        " in-memory cache only."
+                    )
+                    _default_cache = EmbeddingCache()
+    return _default_cache
+
+
+def embed_content(texts, task_type, model=DEFAULT_EMBEDDING_MODEL):
+    """
+    Gemini Embedding API로 텍스트 리스트를 벡터화합니다. (여러 개면 한 번의 묶음 요청)
+    공용 클라이언트가 속도 제한, 재시도, 회로 차단을 처리합니다.
+    """
+    client = get_gemini_client()
+    if len(texts) == 1:
+        return [
+            client.embed_content(
+                model=model, content=texts[0], task_type=task_type
+            )['embedding']
+        ]
+    return client.embed_content(
+        model=model, content=list(texts), task_type=task_type
+    )['embedding']
+
+
+def get_embeddings(
+    texts, task_type, model=DEFAULT_EMBEDDING_MODEL, cache=None, embed=None
+):
+    """
+    캐시에 있는 임베딩은 그대로 쓰고, 없는 텍스트만 (중복 제거 후) 한 번에 API로 요청해 캐시에 저장합니다.
+    결과 순서는 입력 순서와 같습니다. API 오류는 그대로 발생시킵니다.
+    """
+    cache = cache or get_embedding_cache()
+    embed = embed or embed_content
+    keys = [embedding_key(model, task_type, text) for text in texts]
+    results = [cache.get(key) for key in keys]
+
+    missing = OrderedDict()
+    for key, text, vector in zip(keys, texts, results):
+        if vector is None:
+            missing.setdefault(key, text)
+    if missing:
+        vectors = embed(list(missing.values()), task_type, model)
+        if len(vectors) != len(missing):
+            raise ValueError(
+                f"Expected {len(missing)} embeddings, got {len(vectors)}."
+            )
+        fetched = dict(zip(missing, vectors))
+        for key, vector in fetched.items():
+            cache.put(key, vector)
+        results = [
+            fetched[key] if vector is None else vector
+            for key, vector in zip(keys, results)
+        ]
+    return results
+
+
+def get_embedding(text, task_type, model=DEFAULT_EMBEDDING_MODEL, cache=None):
+    return get_embeddings([text], task_type, model=model, cache=cache)[0]
@@ -0,0 +1,680 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from matcher import TIE_TOLERANCE, AdvertiserMatcher
+
+# --- 광고주 인덱스 변경 로그 ---
+# vectorizer가 광고주 추가/변경(upsert)과 삭제(delete)를 버전 순서대로 추가하고,
+# 광고 서빙 컨테이너는 기준 스냅샷 이후의 변경만 읽어 메모리 인덱스에 반영합니다.
+# 각 항목은 광고주의 최종 상태이므로 같은 항목을 여러 번 반영해도 결과가 같습니다.
+DELTA_TABLE = 'advertiser_index_deltas'
+DELTA_UPSERT = 'upsert'
+DELTA_DELETE = 'delete'
+# 광고주 정보 중 변경 로그에 함께 싣는 필드 (임베딩은 float32 바이트로 따로 저장)
+DELTA_PAYLOAD_FIELDS = ('name', 'description', 'ad_template')
+
+
+def encode_embedding(embedding):
+    return np.asarray(embedding, dtype='<f4').tobytes()
+
+
+def decode_embedding(data):
+    return np.frombuffer(bytes(data), dtype='<f4')
+
+
+def _payload(advertiser):
+    if advertiser is None:
+        return None
+    return json.dumps(
+        {
+            field: advertiser[field]
+            for field in DELTA_PAYLOAD_FIELDS
+            if field in advertiser
+        },
+        ensure_ascii=False,
+    )
+
+
+def _delta_row(row):
+    """
+    (version, op, advertiser_id, payload, embedding) 행을 (버전, 작업, 광고주 id, 광고주
+    dict 또는 None)으로 바꿉니다.
+    """
+    version, op, advertiser_id, payload, embedding = row
+    if op != DELTA_UPSERT:
+        return version, op, advertiser_id, None
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    advertiser = dict(
+        payload or {}, id=advertiser_id, embedding=decode_embedding(embedding)
+    )
+    return version, op, advertiser_id, advertiser
+
+
+def _delta_error(op, advertiser, dim=None):
+    """
+    변경을 반영할 수 없는 이유를 반환합니다. 반영할 수 있으면 None입니다.
+    """
+    if op == DELTA_DELETE:
+        return None
+    if op != DELTA_UPSERT:
+        return f"unknown op {op!r}"
+    if not isinstance(advertiser, dict):
+        return "missing advertiser payload"
+    missing = [
+        field
+        for field in DELTA_PAYLOAD_FIELDS
+        if advertiser.get(field) is None
+    ]
+    if missing:
+        return f"missing fields {missing}"
+    embedding = advertiser.get('embedding')
+    if embedding is None:
+        return "missing embedding"
+    embedding = np.asarray(embedding, dtype=np.float32)
+    if (
+        embedding.ndim != 1
+        or embedding.size == 0
+        or not np.isfinite(embedding).all()
+    ):
+        return "invalid embedding"
+    if dim is not None and embedding.size != dim:
+        return f"embedding dimension {embedding.size} != index dimension {dim}"
+    return None
+
+
+class PostgresDeltaLog:
+    """
+    RDS PostgreSQL의 advertiser_index_deltas 테이블에 광고주 인덱스 변경을 기록하고 읽습니다.
+    연결은 psycopg2 커넥션 풀에서 빌려 쓰므로 웜 컨테이너에서는 재연결하지 않습니다.
+    """
+
+    def __init__(self, pool, table=DELTA_TABLE):
+        self.pool = pool
+        self.table = table
+        self.round_trips = 0
+
+    def _run(self, work):
+        conn = self.pool.getconn()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    return work(cur)
+        finally:
+            self.pool.putconn(conn)
+
+    def ensure_table(self):
+        self._run(
+            lambda cur: cur.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (version BIGSERIAL"
+                " PRIMARY KEY, advertiser_id BIGINT NOT NULL, op TEXT NOT"
+                " NULL, payload JSONB, embedding BYTEA, created_at"
+                " TIMESTAMPTZ DEFAULT NOW())"
+            )
+        )
+
+    def append(self, deltas):
+        """
+        [(작업, 광고주 id, 광고주 dict 또는 None)]을 한 트랜잭션으로 추가하고 마지막 버전을 반환합니다.
+        """
+
+        def work(cur):
+            # BIGSERIAL 값은 커밋 순서와 다를 수 있어, 읽는 쪽이 작은 버전을 건너뛰지 않도록 추가를 직렬화합니다.
+            cur.execute(
+                "SELECT pg_advisory_xact_lock(hashtext(%s))", (self.table,)
+            )
+            version = None
+            for op, advertiser_id, advertiser in deltas:
+                embedding = (
+                    encode_embedding(advertiser['embedding'])
+                    if op == DELTA_UPSERT
+                    else None
+                )
+                cur.execute(
+                    f"INSERT INTO {self.table} (advertiser_id, op, payload,"
+                    " embedding) VALUES (%s, %s, %s, %s) RETURNING version",
+                    (
+                        advertiser_id,
+                        op,
+                        _payload(advertiser) if op == DELTA_UPSERT else None,
+                        embedding,
+                    ),
+                )
+                version = cur.fetchone()[0]
+            return version
+
+        self.round_trips += 1
+        return self._run(work)
+
+    def latest_version(self):
+        def work(cur):
+            cur.execute(f"SELECT COALESCE(MAX(version), 0) FROM {self.table}")
+            return cur.fetchone()[0]
+
+        self.round_trips += 1
+        return self._run(work)
+
+    def read_since(self, version, limit=1000):
+        """
+        version 이후의 변경을 버전 순서대로 최대 limit개 읽습니다. 새 변경이 없으면 빈 리스트입니다.
+        """
+
+        def work(cur):
+            cur.execute(
+                "SELECT version, op, advertiser_id, payload, embedding FROM"
+                f" {self.table} WHERE version > %s ORDER BY version LIMIT %s",
+                (version, limit),
+            )
+            return cur.fetchall()
+
+        self.round_trips += 1
+        return [_delta_row(row) for row in self._run(work)]
+
+    def prune(self, through_version, older_than_seconds=0):
+        """
+        스냅샷에 반영된 through_version 이하의 변경 중
+        older_than_seconds보다 오래된 것을 지우고 지운 수를 반환합니다.
+        """
+
+        def work(cur):
+            cur.execute(
+                f"DELETE FROM {self.table} WHERE version <= %s "
+                "AND created_at < NOW() - make_interval(secs => %s)",
+                (through_version, older_than_seconds),
+            )
+            return cur.rowcount
+
+        self.round_trips += 1
+        return self._run(work)
+
+
+class SQLiteDeltaLog:
+    """
+    PostgresDeltaLog의 로컬 대체 구현입니다.
+    """
+
+    def __init__(self, path=':memory:', table=DELTA_TABLE, clock=time.time):
+        import sqlite3
+
+        self.table = table
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self.round_trips = 0
+        self.ensure_table()
+
+    def ensure_table(self):
+        with self._lock:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (version INTEGER"
+                " PRIMARY KEY AUTOINCREMENT, advertiser_id INTEGER NOT NULL,"
+                " op TEXT NOT NULL, payload TEXT, embedding BLOB, created_at"
+                " REAL)"
+            )
+            self._conn.commit()
+
+    def append(self, deltas):
+        self.round_trips += 1
+        with self._lock, self._conn:
+            version = None
+            for op, advertiser_id, advertiser in deltas:
+                embedding = (
+                    encode_embedding(advertiser['embedding'])
+                    if op == DELTA_UPSERT
+                    else None
+                )
+                cursor = self._conn.execute(
+                    f"INSERT INTO {self.table} (advertiser_id, op, payload,"
+                    " embedding, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        advertiser_id,
+                        op,
+                        _payload(advertiser) if op == DELTA_UPSERT else None,
+                        embedding,
+                        self.clock(),
+                    ),
+                )
+                version = cursor.lastrowid
+            return version
+
+    def latest_version(self):
+        self.round_trips += 1
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COALESCE(MAX(version), 0) FROM {self.table}"
+            ).fetchone()[0]
+
+    def read_since(self, version, limit=1000):
+        self.round_trips += 1
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT version, op, advertiser_id, payload, embedding FROM"
+                f" {self.table} WHERE version > ? ORDER BY version LIMIT ?",
+                (version, limit),
+            ).fetchall()
+        return [_delta_row(row) for row in rows]
+
+    def prune(self, through_version, older_than_seconds=0):
+        self.round_trips += 1
+        with self._lock, self._conn:
+            return self._conn.execute(
+                f"DELETE FROM {self.table} WHERE version <= ? AND"
+                " created_at < ?",
+                (through_version, self.clock() - older_than_seconds),
+            ).rowcount
+
+
+class MatcherSnapshot:
+    """
+    광고주 목록으로 만든 AdvertiserMatcher를 IVFIndex와 같은 id 기반 search/search_batch 형태로
+    감싼 기준 스냅샷입니다.
+    version은 스냅샷에 반영된 마지막 변경 로그 버전입니다.
+    """
+
+    def __init__(self, advertisers, version=0):
+        self.matcher = AdvertiserMatcher(advertisers)
+        self.version = version
+        self._by_id = {
+            advertiser['id']: advertiser
+            for advertiser in self.matcher.advertisers
+        }
+
+    def __len__(self):
+        return len(self.matcher)
+
+    def get(self, advertiser_id):
+        return self._by_id.get(advertiser_id)
+
+    def search(self, query_vector, k=1, n_probe=None, min_score=0.0):
+        return [
+            (advertiser['id'], similarity)
+            for advertiser, similarity in self.matcher.top_k(
+                query_vector, k=k, min_score=min_score
+            )
+        ]
+
+    def search_batch(self, query_vectors, k=1, n_probe=None, min_score=0.0):
+        return [
+            [
+                (advertiser['id'], similarity)
+                for advertiser, similarity in ranked
+            ]
+            for ranked in self.matcher.top_k_batch(
+                query_vectors, k=k, min_score=min_score
+            )
+        ]
+
+    def merged(self, upserts, hidden, version):
+        """
+        hidden 광고주를 빼고 upserts를 더한 새 스냅샷을 만듭니다. (변경 압축)
+        """
+        advertisers = [
+            advertiser
+            for advertiser in self.matcher.advertisers
+            if advertiser['id'] not in hidden
+        ]
+        advertisers.extend(upserts.values())
+        return MatcherSnapshot(advertisers, version)
+
+
+class _IndexState:
+    """
+    기준 스냅샷과 그 이후 반영한 변경입니다. 만든 뒤에는 바꾸지 않으므로 조회는 잠금 없이 읽습니다.
+    """
+
+    __slots__ = (
+        'snapshot',
+        'version',
+        'deltas',
+        'upserts',
+        'hidden',
+        'overlay',
+    )
+
+    def __init__(
+        self,
+        snapshot,
+        version=None,
+        deltas=(),
+        upserts=None,
+        hidden=frozenset(),
+    ):
+        self.snapshot = snapshot
+        self.version = snapshot.version if version is None else version
+        # 스냅샷 이후 반영한 변경 [(버전, 작업, 광고주 id, 광고주)]
+        self.deltas = tuple(deltas)
+        # 스냅샷 이후 추가/변경된 광고주 {id: 광고주}
+        self.upserts = upserts or {}
+        # 스냅샷에서 가려야 하는 광고주 id (삭제되었거나 upserts의 새 값으로 바뀐 광고주)
+        self.hidden = hidden
+        self.overlay = (
+            AdvertiserMatcher(list(self.upserts.values()))
+            if self.upserts
+            else None
+        )
+
+    def applied(self, deltas):
+        deltas = [delta for delta in deltas if delta[0] > self.version]
+        if not deltas:
+            return self
+        upserts = dict(self.upserts)
+        hidden = set(self.hidden)
+        for _, op, advertiser_id, advertiser in deltas:
+            if op == DELTA_UPSERT:
+                hidden.add(advertiser_id)
+                upserts[advertiser_id] = advertiser
+            elif op == DELTA_DELETE:
+                hidden.add(advertiser_id)
+                upserts.pop(advertiser_id, None)
+            # 그 외(검증에 실패해 버린 변경)는 버전만 넘깁니다.
+        return _IndexState(
+            self.snapshot,
+            deltas[-1][0],
+            self.deltas + tuple(deltas),
+            upserts,
+            frozenset(hidden),
+        )
+
+
+class LiveAdvertiserIndex:
+    """
+    기준 스냅샷(MatcherSnapshot 또는 IVFIndex)에 변경 로그를 점진적으로 반영하는 광고주 인덱스입니다.
+    IVFIndex와 같은 search/search_batch 형태로 (광고주 id, 유사도)를 반환합니다.
+
+    - refresh(): 요청마다 호출합니다.
+      마지막 확인 후 refresh_interval초가 지나지 않았으면 시각 비교만 하고 반환하고,
+      지났으면 현재 버전 이후의 변경을 읽어 반영합니다. 따라서 변경은 커밋 후 refresh_interval 안에 들어온
+      요청부터 보입니다. (새 변경이 없으면 빈 범위 조회 한 번)
+    - 조회는 스냅샷 결과에서 가려진 광고주를 빼고, 추가/변경된 광고주의 작은 행렬(overlay) 결과와 합칩니다.
+    - 반영한 변경이 compact_threshold개를 넘으면 스냅샷과 변경을 합친 새 스냅샷을 백그라운드 스레드에서 만들어
+      overlay를 비웁니다. (스냅샷이 merged를 제공하는 경우. IVF 파일은 오프라인 빌드로 새 스냅샷을 만듭니다)
+    - snapshot_loader가 새 스냅샷(더 높은 버전)을 반환하면 그 스냅샷으로 바꾸고 이후 변경만 다시 반영합니다.
+
+    상태는 바꾸지 않는 객체를 통째로 교체하므로 조회 중에 반영/압축이 일어나도 잠금을 기다리지 않습니다.
+    """
+
+    def __init__(
+        self,
+        snapshot,
+        delta_log=None,
+        refresh_interval=1.0,
+        max_deltas_per_refresh=1000,
+        compact_threshold=1000,
+        snapshot_loader=None,
+        lookup=None,
+        on_change=None,
+        background_compaction=True,
+        clock=time.monotonic,
+    ):
+        self.delta_log = delta_log
+        self.refresh_interval = refresh_interval
+        self.max_deltas_per_refresh = max_deltas_per_refresh
+        self.compact_threshold = compact_threshold
+        self.snapshot_loader = snapshot_loader
+        # 스냅샷이 광고주 정보를 갖고 있지 않을 때(IVFIndex) id로 광고주를 찾는 함수
+        self.lookup = lookup
+        # 반영한 변경의 광고주 id 집합을 받는 콜백 (예: 의미 캐시 무효화)
+        self.on_change = on_change
+        self.background_compaction = background_compaction
+        self.clock = clock
+        self._state = _IndexState(snapshot)
+        # _lock은 로그 확인을 한 스레드로 제한하고, _swap_lock은 상태 교체(반영/압축/스냅샷 교체)를 보호합니다.
+        self._lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self._next_check = 0.0
+        self._compacting = None
+        self._executor = None
+        self._counters = {
+            'refreshes': 0,
+            'deltas_applied': 0,
+            'compactions': 0,
+            'snapshot_reloads': 0,
+            'refresh_errors': 0,
+            'invalid_deltas': 0,
+        }
+
+    @property
+    def version(self):
+        return self._state.version
+
+    @property
+    def snapshot(self):
+        return self._state.snapshot
+
+    def refresh(self, force=False):
+        """
+        변경 로그를 확인해 반영하고 반영한 변경 수를 반환합니다. 확인 주기가 아니면 0을 바로 반환합니다.
+        """
+        if not force and self.clock() < self._next_check:
+            return 0
+        # 다른 스레드가 이미 확인 중이면 기다리지 않고 현재 상태로 조회합니다.
+        if not self._lock.acquire(blocking=force):
+            return 0
+        try:
+            if not force and self.clock() < self._next_check:
+                return 0
+            self._next_check = self.clock() + self.refresh_interval
+            self._counters['refreshes'] += 1
+            try:
+                self._maybe_reload_snapshot()
+                return self._pull()
+            except Exception as e:
+                # 변경 로그를 읽지 못하면 다음 주기에 다시 시도하고 그동안은 현재 상태로 조회합니다.
+                self._counters['refresh_errors'] += 1
+                print(f"Error refreshing advertiser index: {e}")
+                return 0
+        finally:
+            self._lock.release()
+
+    def _pull(self):
+        if self.delta_log is None:
+            return 0
+        applied = 0
+        while True:
+            deltas = self.delta_log.read_since(
+                self._state.version, self.max_deltas_per_refresh
+            )
+            if deltas:
+                self.apply(deltas)
+                applied += len(deltas)
+            if len(deltas) < self.max_deltas_per_refresh:
+                return applied
+
+    def _maybe_reload_snapshot(self):
+        if self.snapshot_loader is None:
+            return
+        snapshot = self.snapshot_loader()
+        if snapshot is None or snapshot.version < self._state.snapshot.version:
+            return
+        # 새 스냅샷 이후의 변경은 이미 반영한 것에서 다시 쓰고, 나머지는 이어서 로그에서 읽습니다.
+        with self._swap_lock:
+            self._state = _IndexState(snapshot).applied(self._state.deltas)
+        self._counters['snapshot_reloads'] += 1
+
+    def apply(self, deltas):
+        """
+        [(버전, 작업, 광고주 id, 광고주)] 변경을 반영합니다. 이미 반영한 버전은 건너뜁니다.
+        upsert에 없는 광고주 정보(이름, 광고 문구 등)는 이전 값을 이어받습니다.
+        이어받아도 광고주 정보가 모자라거나 임베딩이 잘못된 upsert는 반영하지 않고 버전만 넘깁니다.
+        """
+        deltas = self._validated(self._with_previous_fields(deltas))
+        with self._swap_lock:
+            state = self._state
+            new_state = state.applied(deltas)
+            if new_state is state:
+                return
+            self._state = new_state
+        self._counters['deltas_applied'] += len(new_state.deltas) - len(
+            state.deltas
+        )
+        if self.on_change is not None:
+            self.on_change({delta[2] for delta in deltas})
+        if len(new_state.hidden) >= self.compact_threshold and hasattr(
+            new_state.snapshot, 'merged'
+        ):
+            self.compact(background=self.background_compaction)
+
+    def _with_previous_fields(self, deltas):
+        latest = {}
+        completed = []
+        for version, op, advertiser_id, advertiser in deltas:
+            if op == DELTA_UPSERT and isinstance(advertiser, dict):
+                missing = [
+                    field
+                    for field in DELTA_PAYLOAD_FIELDS
+                    if field not in advertiser
+                ]
+                if missing:
+                    previous = (
+                        latest[advertiser_id]
+                        if advertiser_id in latest
+                        else self.get(advertiser_id)
+                    )
+                    if previous is not None:
+                        advertiser = dict(
+                            advertiser,
+                            **{
+                                field: previous[field]
+                                for field in missing
+                                if field in previous
+                            },
+                        )
+            latest[advertiser_id] = advertiser
+            completed.append((version, op, advertiser_id, advertiser))
+        return completed
+
+    def _validated(self, deltas):
+        """
+        서빙에 필요한 정보가 없는 upsert와 알 수 없는 작업을 (버전, None, 광고주 id, None)으로 바꿉니다.
+        버리지 않고 바꾸는 이유는 상태 버전이 그 변경을 지나가야 같은 변경을 반복해서 읽지 않기 때문입니다.
+        """
+        dim = getattr(self._state.snapshot, 'dim', None)
+        validated = []
+        for version, op, advertiser_id, advertiser in deltas:
+            error = _delta_error(op, advertiser, dim)
+            if error is not None:
+                self._counters['invalid_deltas'] += 1
+                print(
+                    f"Skipping invalid advertiser index delta {version} for"
+                    f" advertiser {advertiser_id}: {error}"
+                )
+                op, advertiser = None, None
+            validated.append((version, op, advertiser_id, advertiser))
+        return validated
+
+    def compact(self, background=False):
+        """
+        스냅샷과 반영한 변경을 합쳐 새 스냅샷을 만듭니다. 압축 중에 들어온 변경은 새 스냅샷 위에 다시 반영합니다.
+        """
+        if self._compacting is not None and not self._compacting.done():
+            return self._compacting
+        state = self._state
+        if not state.deltas or not hasattr(state.snapshot, 'merged'):
+            return None
+
+        def work():
+            snapshot = state.snapshot.merged(
+                state.upserts, state.hidden, state.version
+            )
+            with self._swap_lock:
+                current = self._state
+                if current.snapshot is not state.snapshot:
+                    return
+                self._state = _IndexState(snapshot).applied(current.deltas)
+                self._counters['compactions'] += 1
+
+        if not background:
+            work()
+            return None
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        self._compacting = self._executor.submit(work)
+        return self._compacting
+
+    def get(self, advertiser_id):
+        state = self._state
+        advertiser = state.upserts.get(advertiser_id)
+        if advertiser is not None or advertiser_id in state.hidden:
+            return advertiser
+        # 메타데이터가 없는 IVF 파일처럼 스냅샷이 광고주 정보를 갖고 있지 않으면 lookup으로 찾습니다.
+        # (정보를 가진 스냅샷에 없는 광고주는 압축으로 지워진 광고주이므로 lookup하지 않습니다)
+        getter = getattr(state.snapshot, 'get', None)
+        if getter is not None and getattr(
+            state.snapshot, 'has_metadata', True
+        ):
+            return getter(advertiser_id)
+        return self.lookup(advertiser_id) if self.lookup is not None else None
+
+    def search(self, query_vector, k=1, n_probe=8, min_score=0.0):
+        return self.search_batch(
+            [query_vector], k=k, n_probe=n_probe, min_score=min_score
+        )[0]
+
+    def search_batch(self, query_vectors, k=1, n_probe=8, min_score=0.0):
+        """
+        여러 질문 벡터의 상위 k개 (광고주 id, 유사도)를 질문 순서대로 반환합니다.
+        유사도가 같으면 id가 작은 광고주를 우선합니다.
+        """
+        state = self._state
+        if k <= 0:
+            return [[] for _ in query_vectors]
+        if not state.hidden:
+            return state.snapshot.search_batch(
+                query_vectors, k=k, n_probe=n_probe, min_score=min_score
+            )
+
+        # 가려진 광고주가 상위에 있어도 k개가 남도록 조금 더 가져오고, 부족하면 가려진 수만큼 더 가져옵니다.
+        fetch = k + min(len(state.hidden), k)
+        base = state.snapshot.search_batch(
+            query_vectors, k=fetch, n_probe=n_probe, min_score=min_score
+        )
+        overlay = (
+            state.overlay.top_k_batch(query_vectors, k=k, min_score=min_score)
+            if state.overlay is not None
+            else [[] for _ in query_vectors]
+        )
+
+        results = []
+        for query_vector, ranked, extra in zip(query_vectors, base, overlay):
+            visible = [
+                (advertiser_id, similarity)
+                for advertiser_id, similarity in ranked
+                if advertiser_id not in state.hidden
+            ]
+            if len(visible) < k and len(ranked) == fetch:
+                ranked = state.snapshot.search(
+                    query_vector,
+                    k=k + len(state.hidden),
+                    n_probe=n_probe,
+                    min_score=min_score,
+                )
+                visible = [
+                    (advertiser_id, similarity)
+                    for advertiser_id, similarity in ranked
+                    if advertiser_id not in state.hidden
+                ]
+            visible.extend(
+                (advertiser['id'], similarity)
+                for advertiser, similarity in extra
+            )
+            visible.sort(
+                key=lambda match: (-round(match[1] / TIE_TOLERANCE), match[0])
+            )
+            results.append(visible[:k])
+        return results
+
+    def stats(self):
+        state = self._state
+        stats = dict(self._counters)
+        stats.update(
+            version=state.version,
+            snapshot_version=state.snapshot.version,
+            pending_deltas=len(state.deltas),
+            overlay_size=len(state.upserts),
+            hidden=len(state.hidden),
+        )
+        return stats
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Deadline:
+    """
+    요청 단위 마감 시간입니다. budget_ms가 없거나 0 이하면 마감이 없습니다.
+    """
+
+    def __init__(self, budget_ms=None, clock=time.perf_counter):
+        self.clock = clock
+        self.budget_ms = budget_ms if budget_ms and budget_ms > 0 else None
+        self.started = clock()
+
+    def remaining(self):
+        """
+        남은 시간(초)을 반환합니다. 마감이 없으면 None입니다.
+        """
+        if self.budget_ms is None:
+            return None
+        return max(0.0, self.started + self.budget_ms / 1000.0 - self.clock())
+
+    def elapsed_ms(self):
+        return (self.clock() - self.started) * 1000.0
+
+
+class StageTimings:
+    """
+    요청 하나의 단계별 소요 시간(ms)을 기록합니다.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.record(name, (self.clock() - started) * 1000.0)
+
+    def record(self, name, milliseconds):
+        self.stages[name] = round(self.stages.get(name, 0.0) + milliseconds, 3)
+
+
+class LatencyTracker:
+    """
+    단계별 최근 소요 시간을 보관하고 백분위수(p50/p95/p99)를 계산하는 스레드 안전 집계기입니다.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, milliseconds):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(milliseconds)
+
+    def record_all(self, stages):
+        for name, milliseconds in stages.items():
+            self.record(name, milliseconds)
+
+    def percentile(self, name, q, min_samples=1):
+        """
+        name 단계의 q 백분위수(ms)를 반환합니다. 표본이 min_samples보다 적으면 None입니다.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(
+            len(samples) - 1, int(round(q / 100.0 * (len(samples) - 1)))
+        )
+        return samples[index]
+
+    def summary(self):
+        with self._lock:
+            names = list(self._samples)
+        return {
+            name: {
+                'count': len(self._samples[name]),
+                'p50': self.percentile(name, 50),
+                'p95': self.percentile(name, 95),
+                'p99': self.percentile(name, 99),
+            }
+            for name in names
+        }
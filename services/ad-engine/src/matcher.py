@@ -0,0 +1,161 @@
+import numpy as np
+
+# float32 누적 오차 수준의 유사도 차이는 동점으로 보고 먼저 등록된 광고주를 우선합니다.
+TIE_TOLERANCE = 1e-5
+
+
+def _normalize_rows(matrix):
+    """
+    각 행을 L2 정규화합니다. 크기가 0인 행은 0 벡터로 남겨 유사도가 0.0이 되도록 합니다.
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    matrix[(norms == 0).ravel()] = 0.0
+    return matrix
+
+
+class AdvertiserMatcher:
+    """
+    광고주 임베딩을 정규화된 연속 float32 행렬로 보관하고,
+    한 번의 행렬-벡터 곱으로 질문 벡터와의 코사인 유사도를 계산합니다.
+
+    기존 cosine_similarity와 동일하게 차원이 다른 벡터, 크기가 0인 벡터의 유사도는 0.0입니다.
+    광고주마다 임베딩 차원이 다를 수 있으므로 차원별로 행렬을 따로 둡니다.
+    """
+
+    def __init__(self, advertisers):
+        self.advertisers = list(advertisers)
+        rows_by_dim = {}
+        for position, advertiser in enumerate(self.advertisers):
+            rows_by_dim.setdefault(len(advertiser['embedding']), []).append(
+                position
+            )
+
+        # 차원 -> (정규화된 행렬, 광고주 위치 배열)
+        self._groups = {}
+        for dim, positions in rows_by_dim.items():
+            matrix = np.array(
+                [self.advertisers[p]['embedding'] for p in positions],
+                dtype=np.float32,
+            ).reshape(len(positions), dim)
+            self._groups[dim] = (
+                np.ascontiguousarray(_normalize_rows(matrix)),
+                np.asarray(positions, dtype=np.int64),
+            )
+
+    def __len__(self):
+        return len(self.advertisers)
+
+    def scores(self, query_vector):
+        """
+        질문 벡터와 같은 차원의 광고주들에 대한 (유사도 배열, 광고주 위치 배열)을 반환합니다.
+        """
+        group = self._groups.get(len(query_vector))
+        if group is None:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        matrix, positions = group
+        return matrix @ (query / norm), positions
+
+    def top_k(self, query_vector, k=1, min_score=0.0):
+        """
+        유사도가 min_score보다 큰 광고주 중 상위 k개를 (광고주, 유사도) 리스트로 반환합니다.
+        전체 정렬 대신 argpartition으로 후보 k개만 골라 정렬합니다.
+        유사도가 같으면(TIE_TOLERANCE 이내) 먼저 등록된 광고주가 앞에 옵니다.
+        """
+        if k <= 0:
+            return []
+
+        similarities, positions = self.scores(query_vector)
+        if similarities.size == 0:
+            return []
+        return [
+            (self.advertisers[position], similarity)
+            for position, similarity in self._select(
+                similarities, positions, k, min_score
+            )
+        ]
+
+    @staticmethod
+    def _select(similarities, positions, k, min_score):
+        """
+        상위 k개의 (광고주 위치, 유사도)를 유사도 내림차순(동점이면 위치 오름차순)으로 반환합니다.
+        """
+        if k < similarities.size:
+            candidates = np.argpartition(-similarities, k - 1)[:k]
+            # argpartition은 경계값이 같은 후보를 임의로 고를 수 있으므로 동점자를 모두 포함합니다.
+            threshold = similarities[candidates].min() - TIE_TOLERANCE
+            candidates = np.flatnonzero(similarities >= threshold)
+        else:
+            candidates = np.arange(similarities.size)
+
+        candidates = candidates[similarities[candidates] > min_score]
+        rank_keys = np.round(similarities[candidates] / TIE_TOLERANCE)
+        order = np.lexsort((positions[candidates], -rank_keys))[:k]
+
+        return [
+            (int(positions[c]), float(similarities[c]))
+            for c in candidates[order]
+        ]
+
+    def top_k_batch(self, query_vectors, k=1, min_score=0.0, unique=False):
+        """
+        여러 질문 벡터의 상위 k개 광고주를 질문 순서대로 반환합니다. (top_k 결과의 리스트)
+        같은 차원의 질문들은 정규화된 질문 행렬과 광고주 행렬의 한 번의 행렬-행렬 곱으로 점수를 계산합니다.
+        unique=True면 앞선 질문의 결과에 나온 광고주는 뒤 질문의 후보에서 뺍니다. (지면 간 광고주 중복 제거)
+        """
+        results = [[] for _ in query_vectors]
+        if k <= 0 or not results:
+            return results
+
+        # 차원 -> [(질문 위치, 정규화된 질문 벡터)]
+        queries_by_dim = {}
+        for index, query_vector in enumerate(query_vectors):
+            if len(query_vector) not in self._groups:
+                continue
+            query = np.asarray(query_vector, dtype=np.float32)
+            norm = float(np.linalg.norm(query))
+            if norm > 0:
+                queries_by_dim.setdefault(len(query_vector), []).append(
+                    (index, query / norm)
+                )
+
+        scored = {}
+        for dim, queries in queries_by_dim.items():
+            matrix, positions = self._groups[dim]
+            similarities = np.stack([query for _, query in queries]) @ matrix.T
+            for (index, _), row in zip(queries, similarities):
+                scored[index] = (row, positions)
+
+        excluded = []
+        for index in range(len(results)):
+            if index not in scored:
+                continue
+            similarities, positions = scored[index]
+            if excluded:
+                keep = ~np.isin(positions, excluded)
+                similarities, positions = similarities[keep], positions[keep]
+                if similarities.size == 0:
+                    continue
+            selected = self._select(similarities, positions, k, min_score)
+            results[index] = [
+                (self.advertisers[position], similarity)
+                for position, similarity in selected
+            ]
+            if unique:
+                excluded.extend(position for position, _ in selected)
+        return results
+
+    def best_match(self, query_vector):
+        """
+        가장 유사한 광고주와 유사도를 반환합니다. 유사도가 0보다 큰 광고주가 없으면 (None, 0.0)입니다.
+        """
+        results = self.top_k(query_vector, k=1)
+        if not results:
+            return None, 0.0
+        return results[0]
@@ -0,0 +1,148 @@
+import functools
+import json
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import wait
+
+# Lambda Extensions API의 내부 확장(같은 프로세스의 스레드)으로 등록해, 함수가 응답을 반환한 뒤에도
+# 실행 환경이 일시 정지되기 전에 진행 중인 백그라운드 작업을 마칠 수 있게 합니다.
+# 응답은 핸들러가 반환하는 즉시 호출자에게 전달되고, 확장이 다음 이벤트를 요청할 때까지만 환경이 유지됩니다.
+EXTENSIONS_API_VERSION = '2020-01-01'
+EXTENSION_NAME = 'post-response'
+# 호출 제한 시간 직전까지 기다리지 않도록 남겨 두는 여유 시간(초)
+SAFETY_MARGIN_SECONDS = 0.5
+
+
+class PostResponseExtension:
+    """
+    응답 후 pending()이 돌려주는 future들을 호출 제한 시간 안에서 최대 max_wait_seconds까지 기다립니다.
+    AWS_LAMBDA_RUNTIME_API가 없거나(로컬 실행) 등록에 실패하면 아무 일도 하지 않습니다.
+    """
+
+    def __init__(self, pending, max_wait_seconds, runtime_api=None):
+        self.pending = pending
+        self.max_wait_seconds = max_wait_seconds
+        self.runtime_api = runtime_api or os.environ.get(
+            'AWS_LAMBDA_RUNTIME_API'
+        )
+        self.extension_id = None
+        self.completed = 0
+        self.abandoned = 0
+        self._handler_done = threading.Event()
+
+    @property
+    def active(self):
+        return self.extension_id is not None
+
+    def start(self):
+        """
+        확장을 등록하고 이벤트 루프 스레드를 시작합니다. 내부 확장은 초기화 단계(모듈 import)에서만 등록할 수 있습니다.
+        """
+        if not self.runtime_api or self.max_wait_seconds <= 0:
+            return False
+        try:
+            request = urllib.request.Request(
+                self._url('register'),
+                data=json.dumps({'events': ['INVOKE']}).encode('utf-8'),
+                headers={'Lambda-Extension-Name': EXTENSION_NAME},
+                method='POST',
+            )
+            with urllib.request.urlopen(request) as response:
+                self.extension_id = response.headers[
+                    'Lambda-Extension-Identifier'
+                ]
+        except Exception as e:
+            print(
+                "Post-response extension not registered, background work will"
+                f" resume on the next invocation: {e}"
+            )
+            return False
+        threading.Thread(
+            target=self._run, name=EXTENSION_NAME, daemon=True
+        ).start()
+        return True
+
+    def after_invocation(self, handler):
+        """
+        핸들러가 끝나면(예외 포함) 확장 스레드가 남은 작업을 기다리기 시작하도록 알립니다.
+        """
+
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            try:
+                return handler(event, context)
+            finally:
+                self._handler_done.set()
+
+        return wrapper
+
+    def _url(self, path):
+        return (
+            f"http://{self.runtime_api}"
+            f"/{EXTENSIONS_API_VERSION}/extension/{path}"
+        )
+
+    def _next_event(self):
+        request = urllib.request.Request(
+            self._url('event/next'),
+            headers={'Lambda-Extension-Identifier': self.extension_id},
+        )
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def _run(self):
+        # 등록한 확장이 다음 이벤트를 요청하지 않으면 호출이 끝나지 않으므로, 오류가 나도 루프를 계속합니다.
+        while True:
+            try:
+                event = self._next_event()
+            except Exception as e:
+                print(
+                    "Post-response extension failed to get the next"
+                    f" event: {e}"
+                )
+                time.sleep(0.1)
+                continue
+            try:
+                self._drain(event.get('deadlineMs'))
+            except Exception as e:
+                print(
+                    "Post-response extension failed while waiting for"
+                    f" background work: {e}"
+                )
+
+    def _drain(self, deadline_ms):
+        """
+        핸들러가 응답을 반환할 때까지 기다린 뒤, 남은 작업을 호출 제한 시간 안에서 기다립니다.
+        """
+        remaining = (
+            (deadline_ms / 1000.0 - time.time())
+            if deadline_ms
+            else self.max_wait_seconds
+        )
+        self._handler_done.wait(
+            timeout=max(0.0, remaining - SAFETY_MARGIN_SECONDS)
+        )
+        self._handler_done.clear()
+
+        futures = list(self.pending())
+        if not futures:
+            return
+        remaining = (
+            (deadline_ms / 1000.0 - time.time())
+            if deadline_ms
+            else self.max_wait_seconds
+        )
+        timeout = max(
+            0.0, min(self.max_wait_seconds, remaining - SAFETY_MARGIN_SECONDS)
+        )
+        done, not_done = wait(futures, timeout=timeout)
+        self.completed += len(done)
+        if not_done:
+            # 끝나지 않은 작업은 같은 실행 환경의 다음 호출 동안 이어서 실행됩니다.
+            self.abandoned += len(not_done)
+            print(
+                f"Post-response wait timed out with {len(not_done)} background"
+                " task(s) still running."
+            )
@@ -0,0 +1,218 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class _AdvertiserEntries:
+    """
+    광고주 한 명의 캐시 항목입니다. 질문 임베딩을 정규화된 float32 행렬로 보관하고 슬롯 단위로 교체합니다.
+    행렬은 작게 시작해 슬롯이 모자랄 때마다 두 배로 늘립니다. (광고주별 capacity까지)
+    """
+
+    def __init__(self, rows, dim):
+        self.vectors = np.zeros((rows, dim), dtype=np.float32)
+        self.expires_at = np.zeros(rows, dtype=np.float64)  # 0이면 빈 슬롯
+        self.last_used = np.zeros(rows, dtype=np.float64)
+        self.ads = [None] * rows
+        self.queries = [None] * rows
+
+    @property
+    def rows(self):
+        return self.expires_at.shape[0]
+
+    def grow(self, rows):
+        extra = rows - self.rows
+        self.vectors = np.concatenate(
+            [
+                self.vectors,
+                np.zeros((extra, self.vectors.shape[1]), dtype=np.float32),
+            ]
+        )
+        self.expires_at = np.concatenate([self.expires_at, np.zeros(extra)])
+        self.last_used = np.concatenate([self.last_used, np.zeros(extra)])
+        self.ads.extend([None] * extra)
+        self.queries.extend([None] * extra)
+
+
+class SemanticAdCache:
+    """
+    광고주 id + 질문 임베딩을 키로 하는 맞춤형 광고 의미 캐시입니다.
+    같은 광고주에 대해 코사인 유사도가 threshold 이상인 질문이 캐시에 있으면 그 광고를 재사용합니다.
+
+    조회는 광고주별 행렬과 질문 벡터의 행렬-벡터 곱 한 번으로 끝납니다.
+    항목은 ttl_seconds 후 만료되고, 광고주별 capacity를 넘으면 가장 오래 사용하지 않은 항목을 교체합니다.
+    광고주 수는 max_advertisers로, 모든 광고주의 할당된 슬롯 합계는 max_entries로 제한하며
+    넘으면 가장 오래 사용하지 않은 광고주부터 비웁니다.
+    메모리 사용량은 대략 max_entries × 차원 × 4바이트입니다. (768차원, 16,384개 기준 약 50MB)
+    """
+
+    def __init__(
+        self,
+        threshold=0.95,
+        ttl_seconds=3600,
+        capacity_per_advertiser=256,
+        max_advertisers=1000,
+        max_entries=16384,
+        initial_capacity=8,
+        clock=time.time,
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.capacity = capacity_per_advertiser
+        self.max_advertisers = max_advertisers
+        self.max_entries = max(max_entries, 1)
+        self.initial_capacity = max(
+            1, min(initial_capacity, capacity_per_advertiser, self.max_entries)
+        )
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._allocated = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expired': 0,
+            'advertiser_evictions': 0,
+            'invalidations': 0,
+        }
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    def lookup(self, advertiser_id, query_vector):
+        """
+        (캐시된 광고, 유사도)를 반환합니다. 적중하지 않으면 (None, 가장 높은 유사도)입니다.
+        """
+        query = self._normalize(query_vector)
+        with self._lock:
+            entries = self._entries.get(advertiser_id)
+            if (
+                query is None
+                or entries is None
+                or entries.vectors.shape[1] != query.shape[0]
+            ):
+                self._counters['misses'] += 1
+                return None, 0.0
+
+            now = self.clock()
+            similarities = entries.vectors @ query
+            live = entries.expires_at > now
+            # 만료된 슬롯은 다음 저장 때 재사용되도록 비워 둡니다.
+            expired = (entries.expires_at > 0) & ~live
+            if expired.any():
+                self._counters['expired'] += int(expired.sum())
+                entries.expires_at[expired] = 0.0
+            similarities = np.where(live, similarities, -np.inf)
+
+            slot = int(np.argmax(similarities))
+            similarity = float(similarities[slot])
+            if similarity < self.threshold:
+                self._counters['misses'] += 1
+                return None, max(similarity, 0.0)
+
+            entries.last_used[slot] = now
+            self._entries.move_to_end(advertiser_id)
+            self._counters['hits'] += 1
+            return entries.ads[slot], similarity
+
+    def store(self, advertiser_id, query_vector, ad, query_text=None):
+        """
+        광고주의 질문 임베딩과 생성된 광고를 저장합니다.
+        """
+        query = self._normalize(query_vector)
+        if query is None or not ad:
+            return
+        with self._lock:
+            now = self.clock()
+            entries = self._entries.get(advertiser_id)
+            if entries is None or entries.vectors.shape[1] != query.shape[0]:
+                self._drop(advertiser_id)
+                self._make_room(self.initial_capacity, advertiser_id)
+                entries = _AdvertiserEntries(
+                    self.initial_capacity, query.shape[0]
+                )
+                self._entries[advertiser_id] = entries
+                self._allocated += entries.rows
+                while len(self._entries) > self.max_advertisers:
+                    self._evict_advertiser()
+            self._entries.move_to_end(advertiser_id)
+
+            free = np.flatnonzero(entries.expires_at <= now)
+            if not free.size and entries.rows < self.capacity:
+                rows = min(self.capacity, entries.rows * 2)
+                if self._make_room(rows - entries.rows, advertiser_id):
+                    slot = entries.rows
+                    entries.grow(rows)
+                    self._allocated += rows - slot
+                    free = np.array([slot])
+            if free.size:
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(entries.last_used))
+                self._counters['evictions'] += 1
+
+            entries.vectors[slot] = query
+            entries.expires_at[slot] = now + self.ttl_seconds
+            entries.last_used[slot] = now
+            entries.ads[slot] = ad
+            entries.queries[slot] = query_text
+            self._counters['stores'] += 1
+
+    def _drop(self, advertiser_id):
+        entries = self._entries.pop(advertiser_id, None)
+        if entries is not None:
+            self._allocated -= entries.rows
+        return entries
+
+    def _evict_advertiser(self):
+        advertiser_id = next(iter(self._entries))
+        self._drop(advertiser_id)
+        self._counters['advertiser_evictions'] += 1
+
+    def _make_room(self, rows, keep):
+        """
+        슬롯 rows개를 더 할당할 수 있을 때까지 keep이 아닌 광고주를 오래 사용하지 않은 순서로 비웁니다.
+        다른 광고주를 모두 비워도 자리가 없으면 False를 반환합니다.
+        """
+        while self._allocated + rows > self.max_entries:
+            if not self._entries or (
+                len(self._entries) == 1 and keep in self._entries
+            ):
+                return False
+            if next(iter(self._entries)) == keep:
+                self._entries.move_to_end(keep)
+            self._evict_advertiser()
+        return True
+
+    def forget(self, advertiser_id):
+        """
+        광고주의 캐시된 광고를 모두 버립니다. (광고주 정보가 바뀌거나 삭제된 경우)
+        """
+        with self._lock:
+            if self._drop(advertiser_id) is not None:
+                self._counters['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            now = self.clock()
+            stats['size'] = int(
+                sum(
+                    int((entries.expires_at > now).sum())
+                    for entries in self._entries.values()
+                )
+            )
+            stats['advertisers'] = len(self._entries)
+            stats['allocated'] = self._allocated
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = (
+            round(stats['hits'] / lookups, 4) if lookups else 0.0
+        )
+        return stats
@@ -1,12 +1,19 @@
 import json
 import os
-import google.generativeai as genai
+from embedding_cache import (
+    DEFAULT_EMBEDDING_MODEL,
+    get_embedding,
+    get_embedding_cache,
+    get_embeddings,
+)
+from lazy_clients import is_warmup_event, warm_up, warmup_response
+from metrics import InvocationMetrics
+
 # import psycopg2 # PostgreSQL 어댑터
 
 # Gemini API 키 설정
+# google.generativeai는 콜드 스타트 시간을 줄이기 위해 처음 임베딩할 때 불러옵니다.
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
 
 # --- DB 연결 정보 (환경 변수로 관리) ---
 DB_HOST = os.environ.get('DB_HOST')
@@ -14,54 +21,231 @@ DB_NAME = os.environ.get('DB_NAME')
 DB_USER = os.environ.get('DB_USER')
 DB_PASSWORD = os.environ.get('DB_PASSWORD')
 
+# --- 일괄 재벡터화 설정 ---
+# 한 페이지에 읽을 광고주 수, 임베딩 요청당 텍스트 수/총 글자 수, 동시 임베딩 요청 수
+REVECTORIZE_PAGE_SIZE = int(os.environ.get('REVECTORIZE_PAGE_SIZE', '500'))
+EMBED_BATCH_SIZE = int(os.environ.get('EMBED_BATCH_SIZE', '100'))
+EMBED_BATCH_MAX_CHARS = (
+    int(os.environ.get('EMBED_BATCH_MAX_CHARS', '0')) or None
+)
+EMBED_CONCURRENCY = max(1, int(os.environ.get('EMBED_CONCURRENCY', '4')))
+# Lambda 남은 실행 시간이 이보다 적으면 현재 페이지까지 저장하고 멈춥니다.
+REVECTORIZE_TIME_MARGIN_MS = int(
+    os.environ.get('REVECTORIZE_TIME_MARGIN_MS', '30000')
+)
+
+EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', DEFAULT_EMBEDDING_MODEL)
+
+# --- 광고주 인덱스 변경 로그 ---
+# 설정하면 광고주 벡터화/삭제를 변경 로그에 남겨 광고 서빙 컨테이너가 전체를 다시 불러오지 않고 반영하게 합니다.
+AD_INDEX_DELTA_TABLE = os.environ.get('AD_INDEX_DELTA_TABLE')
+AD_INDEX_DELTA_SQLITE_PATH = os.environ.get('AD_INDEX_DELTA_SQLITE_PATH')
+
+# DB 커넥션 풀은 컨테이너가 살아있는 동안 재사용합니다.
+_connection_pool = None
+_delta_log = None
+
+# 호출 단위 지표 (단계별 시간/카운터를 EMF 한 줄로 출력, 요청 단위 로그는 표본 추출)
+metrics = InvocationMetrics('vectorizer')
+
+
+def get_connection_pool():
+    """
+    psycopg2 커넥션 풀을 처음 사용할 때 만듭니다.
+    """
+    global _connection_pool
+    if _connection_pool is None:
+        from psycopg2.pool import ThreadedConnectionPool
+
+        _connection_pool = ThreadedConnectionPool(
+            1,
+            2,
+            host=DB_HOST,
+            dbname=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD,
+        )
+    return _connection_pool
+
+
+def get_delta_log():
+    """
+    광고주 인덱스 변경 로그를 반환합니다. 설정되지 않았으면 None입니다.
+    """
+    global _delta_log
+    if _delta_log is None:
+        if AD_INDEX_DELTA_TABLE:
+            from index_deltas import PostgresDeltaLog
+
+            delta_log = PostgresDeltaLog(
+                get_connection_pool(), table=AD_INDEX_DELTA_TABLE
+            )
+            # 테이블을 만들지 못했으면 다음 호출에서 다시 시도합니다.
+            delta_log.ensure_table()
+            _delta_log = delta_log
+        elif AD_INDEX_DELTA_SQLITE_PATH:
+            from index_deltas import SQLiteDeltaLog
+
+            _delta_log = SQLiteDeltaLog(AD_INDEX_DELTA_SQLITE_PATH)
+    return _delta_log
+
+
+def record_index_delta(op, advertiser_id, advertiser=None):
+    """
+    변경 로그가 설정되어 있으면 광고주 변경을 추가하고 버전을 반환합니다. 설정되지 않았으면 None입니다.
+    """
+    return record_index_deltas([(op, advertiser_id, advertiser)])
+
+
+def record_index_deltas(deltas):
+    """
+    [(작업, 광고주 id, 광고주 dict 또는 None)]을 한 번에 변경 로그에 추가하고 마지막 버전을 반환합니다.
+    변경 로그가 설정되지 않았으면 None입니다.
+    """
+    delta_log = get_delta_log()
+    if delta_log is None or not deltas:
+        return None
+    with metrics.stage('delta'):
+        version = delta_log.append(deltas)
+    for op, _, _ in deltas:
+        metrics.count(f"index_delta_{op}")
+    return version
+
+
+def record_revectorized_page(rows):
+    """
+    일괄 재벡터화한 페이지 [(광고주 id, 설명, 임베딩)]를 upsert 변경으로 남깁니다.
+    이름/광고 문구는 싣지 않으며, 광고 서빙 컨테이너가 이전 값을 이어받습니다.
+    """
+    from index_deltas import DELTA_UPSERT
+
+    record_index_deltas([
+        (
+            DELTA_UPSERT,
+            advertiser_id,
+            {'description': description, 'embedding': embedding},
+        )
+        for advertiser_id, description, embedding in rows
+    ])
+
+
 def get_text_embedding(text):
     """
     Gemini Embedding API를 호출하여 텍스트를 벡터로 변환합니다.
+    같은 (모델, task_type, 텍스트)는 임베딩 캐시에서 재사용합니다.
     """
     if not GEMINI_API_KEY:
         raise ValueError("GEMINI_API_KEY is not configured for vectorizer.")
 
     try:
         # 최신 임베딩 모델 사용
-        result = genai.embed_content(
-            model="models/text-embedding-004", # 또는 최신 모델
-            content=text,
-            task_type="RETRIEVAL_DOCUMENT"
-        )
-        return result['embedding']
+        return get_embedding(text, "RETRIEVAL_DOCUMENT", model=EMBEDDING_MODEL)
     except Exception as e:
         print(f"Error calling Gemini Embedding API: {e}")
         return None
 
+
+def get_text_embeddings(texts):
+    """
+    여러 텍스트를 벡터화합니다. 캐시에 없는 텍스트만 한 번의 Gemini Embedding API 요청으로 보냅니다.
+    실패하면 예외를 그대로 발생시킵니다.
+    """
+    if not GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY is not configured for vectorizer.")
+
+    return get_embeddings(texts, "RETRIEVAL_DOCUMENT", model=EMBEDDING_MODEL)
+
+
+def revectorize_all(event, context):
+    """
+    광고주 카탈로그 전체를 일괄 재벡터화합니다. (임베딩 모델 변경 등)
+    실행 시간이 부족하면 체크포인트까지 저장하고 done=False를 반환하므로, 같은 이벤트로 다시 호출하면 이어서 처리합니다.
+    """
+    from bulk_vectorizer import PostgresAdvertiserStore, run_bulk_revectorize
+
+    def should_stop():
+        if not hasattr(context, 'get_remaining_time_in_millis'):
+            return False
+        remaining = context.get_remaining_time_in_millis()
+        return remaining < REVECTORIZE_TIME_MARGIN_MS
+
+    stats = run_bulk_revectorize(
+        PostgresAdvertiserStore(get_connection_pool()),
+        get_text_embeddings,
+        job_id=event.get('job_id', 'revectorize'),
+        page_size=int(event.get('page_size', REVECTORIZE_PAGE_SIZE)),
+        batch_size=EMBED_BATCH_SIZE,
+        max_chars=EMBED_BATCH_MAX_CHARS,
+        concurrency=EMBED_CONCURRENCY,
+        only_missing=bool(event.get('only_missing', False)),
+        restart=bool(event.get('restart', False)),
+        should_stop=should_stop,
+        # 페이지를 저장하기 전에 변경 로그에 남겨, 체크포인트가 앞서가 변경이 빠지는 일이 없게 합니다.
+        on_page=(
+            record_revectorized_page if get_delta_log() is not None else None
+        ),
+    )
+    stats['embedding_cache'] = get_embedding_cache().stats()
+    metrics.count('revectorized', stats['processed'])
+    metrics.count('revectorize_pages', stats['pages'])
+    metrics.count('embed_calls', stats['embed_calls'])
+    metrics.timing('embed', stats['embed_seconds'] * 1000.0)
+    metrics.timing('persist', stats['db_seconds'] * 1000.0)
+    print(f"Bulk revectorization stats: {json.dumps(stats)}")
+    return {'statusCode': 200, 'body': json.dumps(stats)}
+
+
+@metrics.instrument
 def handler(event, context):
     """
     (가상) DB 트리거로부터 받은 광고주 정보를 벡터로 변환하고,
     다시 DB에 업데이트합니다.
     """
-    print(f"Processing vectorization request: {json.dumps(event)}")
-    
+    if is_warmup_event(event):
+        return warmup_response(
+            warm_up(modules=['google.generativeai'] if GEMINI_API_KEY else ())
+        )
+
+    if event.get('mode') == 'bulk':
+        try:
+            return revectorize_all(event, context)
+        except Exception as e:
+            print(f"Error during bulk revectorization: {e}")
+            return {
+                'statusCode': 500,
+                'body': json.dumps({'error': 'Bulk revectorization failed'}),
+            }
+
+    if metrics.debug_enabled():
+        print(f"Processing vectorization request: {json.dumps(event)}")
+
     # 실제 구현에서는 DB 트리거 이벤트를 받아 처리
     # 현재는 테스트용으로 직접 광고주 정보를 받아 처리
     advertiser_info = event.get('advertiser_info', {})
     advertiser_id = advertiser_info.get('id')
     description = advertiser_info.get('description', '')
-    
+
+    if event.get('action') == 'delete':
+        return delete_advertiser(advertiser_id)
+
     if not advertiser_id or not description:
         return {
             'statusCode': 400,
             'body': json.dumps({'error': 'Missing advertiser_id or description'})
         }
-    
+
     try:
         # 1. 광고주 정보 텍스트를 벡터로 변환
-        embedding_vector = get_text_embedding(description)
-        
+        with metrics.stage('embed'):
+            embedding_vector = get_text_embedding(description)
+
         if embedding_vector is None:
+            metrics.count('embedding_failures')
             return {
                 'statusCode': 500,
                 'body': json.dumps({'error': 'Failed to generate embedding'})
             }
-        
+
         # 2. DB에 연결하여 해당 광고주의 'embedding' 컬럼을 업데이트
         # conn = psycopg2.connect(host=DB_HOST, dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD)
         # cur = conn.cursor()
@@ -70,21 +254,66 @@ def handler(event, context):
         # conn.commit()
         # cur.close()
         # conn.close()
-        
-        print(f"Successfully vectorized and updated advertiser ID: {advertiser_id}")
-        
-        return {
-            'statusCode': 200,
-            'body': json.dumps({
-                'status': 'success',
-                'advertiser_id': advertiser_id,
-                'vector_dimension': len(embedding_vector)
-            })
+
+        # 3. 광고 서빙 컨테이너가 반영할 수 있도록 변경 로그에 추가
+        # (실패하면 500을 반환해 트리거가 다시 보내게 합니다. 같은 변경을 다시 추가해도 결과는 같습니다)
+        from index_deltas import DELTA_PAYLOAD_FIELDS, DELTA_UPSERT
+
+        advertiser = {
+            field: advertiser_info[field]
+            for field in DELTA_PAYLOAD_FIELDS
+            if field in advertiser_info
+        }
+        advertiser['embedding'] = embedding_vector
+        delta_version = record_index_delta(
+            DELTA_UPSERT, advertiser_id, advertiser
+        )
+
+        metrics.count('vectorized')
+        metrics.debug(
+            "Successfully vectorized and updated advertiser ID: %s",
+            advertiser_id,
+        )
+
+        response = {
+            'status': 'success',
+            'advertiser_id': advertiser_id,
+            'vector_dimension': len(embedding_vector),
         }
-        
+        if delta_version is not None:
+            response['index_version'] = delta_version
+        return {'statusCode': 200, 'body': json.dumps(response)}
+
     except Exception as e:
         print(f"Error processing vectorization: {e}")
         return {
             'statusCode': 500,
-            'body': json.dumps({'error': 'Vectorization failed'})
-        }
\ No newline at end of file
+            'body': json.dumps({'error': 'Vectorization failed'}),
+        }
+
+
+def delete_advertiser(advertiser_id):
+    """
+    삭제된 광고주를 변경 로그에 남겨 광고 서빙 컨테이너가 매칭 대상에서 빼게 합니다.
+    """
+    if not advertiser_id:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': 'Missing advertiser_id'}),
+        }
+    try:
+        from index_deltas import DELTA_DELETE
+
+        delta_version = record_index_delta(DELTA_DELETE, advertiser_id)
+    except Exception as e:
+        print(f"Error recording advertiser deletion: {e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps(
+                {'error': 'Failed to record advertiser deletion'}
+            ),
+        }
+    response = {'status': 'deleted', 'advertiser_id': advertiser_id}
+    if delta_version is not None:
+        response['index_version'] = delta_version
+    return {'statusCode': 200, 'body': json.dumps(response)}
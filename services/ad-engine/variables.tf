@@ -3,3 +3,153 @@ variable "gemini_api_key" {
   type        = string
   sensitive   = true
 }
+
+variable "ad_index_path" {
+  description = "Path to the memory-mapped advertiser IVF index file. Empty uses exact matching."
+  type        = string
+  default     = ""
+}
+
+variable "ad_index_nprobe" {
+  description = "Number of IVF lists probed per query (recall/latency trade-off)."
+  type        = string
+  default     = "8"
+}
+
+variable "ad_index_delta_table" {
+  description = "PostgreSQL table of the advertiser index change log. Empty disables incremental index updates."
+  type        = string
+  default     = ""
+}
+
+variable "ad_index_refresh_ms" {
+  description = "Minimum interval between advertiser change log checks in the ad generator (freshness bound)."
+  type        = string
+  default     = "1000"
+}
+
+variable "ad_index_compact_threshold" {
+  description = "Applied advertiser changes after which the in-memory matrix snapshot is compacted."
+  type        = string
+  default     = "1000"
+}
+
+variable "revectorize_page_size" {
+  description = "Advertisers read and written per page during bulk re-vectorization."
+  type        = string
+  default     = "500"
+}
+
+variable "embed_batch_size" {
+  description = "Texts per Gemini embedding request during bulk re-vectorization (max 100)."
+  type        = string
+  default     = "100"
+}
+
+variable "embed_concurrency" {
+  description = "Concurrent Gemini embedding requests during bulk re-vectorization."
+  type        = string
+  default     = "4"
+}
+
+variable "embedding_cache_size" {
+  description = "Maximum number of query embeddings kept in the in-process cache of the ad generator."
+  type        = string
+  default     = "20000"
+}
+
+variable "embedding_cache_dtype" {
+  description = "Storage format of cached embeddings: float32, float16 or int8."
+  type        = string
+  default     = "float16"
+}
+
+variable "semantic_cache_threshold" {
+  description = "Cosine similarity above which a cached personalized ad is reused (> 1 disables the cache)."
+  type        = string
+  default     = "0.95"
+}
+
+variable "semantic_cache_ttl_seconds" {
+  description = "Lifetime of a cached personalized ad in seconds."
+  type        = string
+  default     = "3600"
+}
+
+variable "semantic_cache_capacity" {
+  description = "Maximum cached personalized ads per advertiser."
+  type        = string
+  default     = "256"
+}
+
+variable "semantic_cache_max_advertisers" {
+  description = "Maximum number of advertisers kept in the personalized ad cache."
+  type        = string
+  default     = "1000"
+}
+
+variable "semantic_cache_max_entries" {
+  description = "Maximum cached personalized ads across all advertisers (about 3 KB each for 768-dim embeddings)."
+  type        = string
+  default     = "16384"
+}
+
+variable "ad_generator_memory_size" {
+  description = "Memory in MB of the ad generator Lambda. Must fit the advertiser matrix, the embedding cache and the semantic cache."
+  type        = string
+  default     = "1024"
+}
+
+variable "ad_deadline_ms" {
+  description = "Default per-request deadline for personalized ad generation in ms (0 disables). Overridable per request with the X-Ad-Deadline-Ms header."
+  type        = string
+  default     = "1500"
+}
+
+variable "ad_refine_max_wait_ms" {
+  description = "Maximum time in ms to keep the execution environment alive after responding so in-flight ad generations can finish (0 leaves them to resume on the next invocation)."
+  type        = string
+  default     = "10000"
+}
+
+variable "ad_batch_max_queries" {
+  description = "Maximum number of queries accepted by one batch ad-matching request."
+  type        = string
+  default     = "50"
+}
+
+variable "vectorizer_gemini_rate_limit_per_second" {
+  description = "Gemini embedding calls per second allowed per vectorizer container (token bucket)."
+  type        = string
+  default     = "10"
+}
+
+variable "vectorizer_gemini_max_concurrency" {
+  description = "Upper bound of the adaptive Gemini concurrency limit per vectorizer container."
+  type        = string
+  default     = "8"
+}
+
+variable "ad_generator_gemini_rate_limit_per_second" {
+  description = "Gemini calls per second allowed per ad generator container (token bucket)."
+  type        = string
+  default     = "20"
+}
+
+variable "ad_generator_gemini_max_concurrency" {
+  description = "Upper bound of the adaptive Gemini concurrency limit per ad generator container."
+  type        = string
+  default     = "16"
+}
+
+variable "metrics_enabled" {
+  description = "Emit one CloudWatch Embedded Metric Format line per invocation (\"false\" makes instrumentation a no-op)."
+  type        = string
+  default     = "true"
+}
+
+variable "debug_log_sample_rate" {
+  description = "Fraction of per-record debug log lines to print (0 disables them, 1 logs every record)."
+  type        = string
+  default     = "0.01"
+}
@@ -0,0 +1,202 @@
+"""
+기존 단일 이벤트 PutRecord 경로와 묶음/집계/압축 경로의 이벤트당 바이트 수와
+샤드당 처리 가능한 이벤트 수(events/sec/shard)를 비교합니다.
+
+Kinesis 샤드 쓰기 한도는 초당 레코드 1,000개, 초당 1MiB(데이터 + 파티션 키)입니다.
+샤드당 처리량 = min(1000 x 레코드당 이벤트 수, 1MiB / 이벤트당 바이트 수)
+
+사용법:
+    python benchmarks/bench_ingest_encoding.py [--events 5000] [--batch-size 100]
+        [--failure-rate 0.05]
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, '..', '..', 'shared', 'python'))
+sys.path.insert(0, os.path.join(BASE_DIR, '..', 'src'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-2')
+os.environ.setdefault('KINESIS_STREAM_NAME', 'ad-scouter-ingest-stream-local')
+
+import ingest  # noqa: E402
+from event_codec import decode_events  # noqa: E402
+
+SHARD_RECORDS_PER_SECOND = 1000
+SHARD_BYTES_PER_SECOND = 1024 * 1024
+
+QUESTIONS = [
+    '이 서비스의 기업용 요금제 가격이 얼마인가요?',
+    '슬랙 연동 기능을 지원하나요?',
+    '데이터를 엑셀로 내보내는 방법을 알려주세요',
+    '클라우드 비용을 줄이는 방법이 궁금합니다',
+    '안녕하세요 반갑습니다',
+]
+
+
+class InMemoryKinesis:
+    """
+    put_record/put_records를 기록하는 로컬 Kinesis 대체 구현입니다. 일정 비율의 항목을 실패로 돌려줍니다.
+    """
+
+    def __init__(self, failure_rate=0.0, seed=0):
+        self.failure_rate = failure_rate
+        self.records = []
+        self.requests = 0
+        self._rng = random.Random(seed)
+
+    def put_record(self, StreamName, Data, PartitionKey):
+        self.requests += 1
+        self.records.append((
+            PartitionKey,
+            Data if isinstance(Data, bytes) else Data.encode('utf-8'),
+        ))
+        return {
+            'ShardId': 'shardId-000000000000',
+            'SequenceNumber': str(len(self.records)),
+        }
+
+    def put_records(self, StreamName, Records):
+        self.requests += 1
+        results = []
+        for record in Records:
+            if self._rng.random() < self.failure_rate:
+                results.append(
+                    {'ErrorCode': 'ProvisionedThroughputExceededException'}
+                )
+            else:
+                self.records.append((record['PartitionKey'], record['Data']))
+                results.append({
+                    'ShardId': 'shardId-000000000000',
+                    'SequenceNumber': str(len(self.records)),
+                })
+        return {
+            'FailedRecordCount': sum('ErrorCode' in r for r in results),
+            'Records': results,
+        }
+
+
+def make_events(count, rng):
+    return [
+        {
+            'apiKey': f'customer-{rng.randrange(3)}',
+            'eventName': 'question_asked',
+            'properties': {
+                'question': rng.choice(QUESTIONS),
+                'page': '/pricing',
+                'sessionId': f's-{rng.randrange(10**6)}',
+            },
+            'timestamp': (
+                f'2025-08-25T00:{rng.randrange(60):02d}:'
+                f'{rng.randrange(60):02d}Z'
+            ),
+        }
+        for _ in range(count)
+    ]
+
+
+def legacy_put(events):
+    """
+    변경 전 ingest.handler와 같이 이벤트마다 전체 본문을 JSON으로 PutRecord합니다.
+    """
+    kinesis = InMemoryKinesis()
+    for body in events:
+        kinesis.put_record(
+            StreamName='stream',
+            Data=json.dumps(body),
+            PartitionKey=body['apiKey'],
+        )
+    return kinesis
+
+
+def batched_put(events, batch_size, compress, failure_rate):
+    kinesis = InMemoryKinesis(failure_rate=failure_rate)
+    ingest.kinesis_client = kinesis
+    ingest.INGEST_COMPRESS = compress
+    ingest.print = lambda *a, **k: None
+    for start in range(0, len(events), batch_size):
+        request = {
+            'body': json.dumps(
+                {'events': events[start:start + batch_size]},
+                ensure_ascii=False,
+            )
+        }
+        response = ingest.handler(request, None)
+        assert response['statusCode'] in (202, 207), response
+    return kinesis
+
+
+def report(name, events, kinesis, elapsed):
+    total_bytes = sum(
+        len(data) + len(key.encode('utf-8')) for key, data in kinesis.records
+    )
+    bytes_per_event = total_bytes / len(events)
+    events_per_record = len(events) / len(kinesis.records)
+    per_shard = min(
+        SHARD_RECORDS_PER_SECOND * events_per_record,
+        SHARD_BYTES_PER_SECOND / bytes_per_event,
+    )
+    print(
+        f"{name:<22} {len(kinesis.records):>8} {kinesis.requests:>9}"
+        f" {bytes_per_event:>11.1f} {events_per_record:>11.1f}"
+        f" {per_shard:>16,.0f} {len(events) / elapsed:>12,.0f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=100,
+        help='HTTP 요청 하나에 담는 이벤트 수',
+    )
+    parser.add_argument(
+        '--failure-rate',
+        type=float,
+        default=0.05,
+        help='PutRecords 항목 실패 비율',
+    )
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    events = make_events(args.events, random.Random(args.seed))
+    print(
+        f"{'path':<22} {'records':>8} {'requests':>9} {'bytes/event':>11}"
+        f" {'events/rec':>11} {'events/s/shard':>16} {'handler ev/s':>12}"
+    )
+
+    start = time.perf_counter()
+    kinesis = legacy_put(events)
+    report('legacy PutRecord', events, kinesis, time.perf_counter() - start)
+
+    for name, compress in (('batched', False), ('batched + zlib', True)):
+        start = time.perf_counter()
+        kinesis = batched_put(
+            events, args.batch_size, compress, args.failure_rate
+        )
+        elapsed = time.perf_counter() - start
+        decoded = [
+            e for _, data in kinesis.records for e in decode_events(data)
+        ]
+        assert sorted(map(json.dumps, decoded)) == sorted(
+            map(json.dumps, events)
+        ), "round trip mismatch"
+        report(name, events, kinesis, elapsed)
+
+    # processor가 기존 단일 JSON 레코드도 그대로 읽는지 확인합니다.
+    legacy_data = base64.b64encode(json.dumps(events[0]).encode('utf-8'))
+    assert decode_events(base64.b64decode(legacy_data)) == [events[0]]
+
+
+if __name__ == '__main__':
+    main()
@@ -43,6 +43,24 @@ data "archive_file" "lambda_zip" {
   output_path = "${path.module}/dist/ingest.zip"
 }
 
+# --- Shared Lambda Layer ---
+# 서비스 간 공용 Python 모듈(services/shared/python)을 Lambda 레이어로 배포합니다.
+# 레이어 zip에는 python/ 최상위 디렉터리가 있어야 하므로 ../shared를 묶되,
+# 벤치마크와 문서는 런타임에 필요 없으므로 제외합니다.
+data "archive_file" "shared_layer_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../shared"
+  excludes    = ["README.md", "benchmarks"]
+  output_path = "${path.module}/dist/shared_layer.zip"
+}
+
+resource "aws_lambda_layer_version" "shared_layer" {
+  layer_name          = "ad-scouter-shared-api-gateway"
+  filename            = data.archive_file.shared_layer_zip.output_path
+  source_code_hash    = data.archive_file.shared_layer_zip.output_base64sha256
+  compatible_runtimes = ["python3.11"]
+}
+
 # Lambda 함수 리소스를 정의합니다.
 resource "aws_lambda_function" "ingest_lambda" {
   function_name    = "ad-scouter-ingest-api"
@@ -52,6 +70,7 @@ resource "aws_lambda_function" "ingest_lambda" {
   
   filename         = data.archive_file.lambda_zip.output_path
   source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+  layers           = [aws_lambda_layer_version.shared_layer.arn]
 
   # 15분 타임아웃
   timeout = 900
@@ -60,6 +79,10 @@ resource "aws_lambda_function" "ingest_lambda" {
   environment {
     variables = {
       KINESIS_STREAM_NAME = aws_kinesis_stream.data_stream.name
+      INGEST_MAX_EVENTS   = var.ingest_max_events
+      INGEST_COMPRESS     = var.ingest_compress
+      METRICS_ENABLED       = var.metrics_enabled
+      DEBUG_LOG_SAMPLE_RATE = var.debug_log_sample_rate
     }
   }
 }
@@ -1,17 +1,199 @@
 import json
 import os
-import boto3 # AWS SDK for Python
+import random
+import time
+from event_codec import encode_event, pack_events
+from lazy_clients import (
+    get_boto3_client,
+    is_warmup_event,
+    warm_up,
+    warmup_response,
+)
+from metrics import InvocationMetrics
 
-# Kinesis 클라이언트 초기화
-kinesis_client = boto3.client('kinesis')
+# Kinesis 클라이언트는 콜드 스타트 시간을 줄이기 위해 처음 전송할 때 만듭니다.
+kinesis_client = None
 # 환경 변수에서 스트림 이름을 가져옵니다. Terraform에서 설정할 예정입니다.
 STREAM_NAME = os.environ.get('KINESIS_STREAM_NAME')
 
+# --- 묶음 수집 설정 ---
+# 요청 하나에 담을 수 있는 최대 이벤트 수와 이벤트 하나의 최대 크기
+INGEST_MAX_EVENTS = int(os.environ.get('INGEST_MAX_EVENTS', '500'))
+INGEST_MAX_EVENT_BYTES = int(
+    os.environ.get('INGEST_MAX_EVENT_BYTES', str(256 * 1024))
+)
+# 집계 레코드를 zlib으로 압축할지 여부
+INGEST_COMPRESS = os.environ.get('INGEST_COMPRESS', 'true').lower() == 'true'
+# PutRecords 실패 항목 재시도 횟수
+PUT_RECORDS_MAX_ATTEMPTS = int(os.environ.get('PUT_RECORDS_MAX_ATTEMPTS', '5'))
+
+# PutRecords 한 번의 요청 제한 (레코드 500개, 5MiB)
+PUT_RECORDS_MAX_ENTRIES = 500
+PUT_RECORDS_MAX_BYTES = 5 * 1024 * 1024
+
+CORS_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+}
+
+# 호출 단위 지표 (단계별 시간/카운터를 EMF 한 줄로 출력)
+metrics = InvocationMetrics('ingest')
+
+
+def get_kinesis_client():
+    """
+    Kinesis 클라이언트를 처음 사용할 때 만들어 재사용합니다.
+    """
+    global kinesis_client
+    if kinesis_client is None:
+        kinesis_client = get_boto3_client('kinesis')
+    return kinesis_client
+
+
+def validate_event(event, default_api_key=None):
+    """
+    이벤트 하나를 검증하고 (정규화된 이벤트, 오류 메시지) 를 반환합니다.
+    """
+    if not isinstance(event, dict):
+        return None, 'Bad Request: event must be a JSON object.'
+    if default_api_key and not event.get('apiKey'):
+        event = dict(event, apiKey=default_api_key)
+    if not event.get('apiKey'):
+        return None, 'Unauthorized: API Key is missing.'
+    if not event.get('eventName'):
+        return None, 'Bad Request: eventName is missing.'
+    if len(encode_event(event)) > INGEST_MAX_EVENT_BYTES:
+        return None, 'Bad Request: event is too large.'
+    return event, None
+
+
+def _put_records_requests(records):
+    """
+    PutRecords 요청 제한(개수/크기)에 맞게 레코드를 나눕니다.
+    """
+    chunk, chunk_bytes = [], 0
+    for record in records:
+        size = len(record['Data']) + len(
+            record['PartitionKey'].encode('utf-8')
+        )
+        if chunk and (
+            len(chunk) >= PUT_RECORDS_MAX_ENTRIES
+            or chunk_bytes + size > PUT_RECORDS_MAX_BYTES
+        ):
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append(record)
+        chunk_bytes += size
+    if chunk:
+        yield chunk
+
+
+def put_records_with_retry(
+    records,
+    max_attempts=None,
+    base_delay=0.05,
+    max_delay=1.0,
+    sleep=time.sleep,
+):
+    """
+    PutRecords로 레코드를 전송하고, 실패한 항목만 지수 백오프 + jitter로 재시도합니다.
+    끝내 실패한 [(레코드, 마지막 오류 코드)] 리스트를 반환합니다.
+    """
+    max_attempts = max_attempts or PUT_RECORDS_MAX_ATTEMPTS
+    client = get_kinesis_client()
+    failed = []
+    for chunk in _put_records_requests(records):
+        pending = [(record, None) for record in chunk]
+        for attempt in range(max_attempts):
+            try:
+                response = client.put_records(
+                    StreamName=STREAM_NAME,
+                    Records=[record for record, _ in pending],
+                )
+            except Exception as e:
+                print(f"Error calling Kinesis PutRecords: {e}")
+                pending = [(record, type(e).__name__) for record, _ in pending]
+            else:
+                if not response.get('FailedRecordCount'):
+                    pending = []
+                    break
+                # 응답 항목은 요청 순서와 같으며, 실패한 항목에만 ErrorCode가 있습니다.
+                pending = [
+                    (record, result['ErrorCode'])
+                    for (record, _), result in zip(
+                        pending, response['Records']
+                    )
+                    if result.get('ErrorCode')
+                ]
+            if attempt + 1 < max_attempts:
+                sleep(
+                    random.uniform(
+                        0, min(max_delay, base_delay * (2**attempt))
+                    )
+                )
+        failed.extend(pending)
+    return failed
+
+
+def pack_records(indexed_events):
+    """
+    [(요청 내 위치, 이벤트)]를 파티션 키(apiKey)별 집계 레코드로 묶어
+    (Kinesis 레코드 리스트, 레코드별 이벤트 위치 리스트)를 반환합니다.
+    """
+    groups = {}
+    for index, event in indexed_events:
+        groups.setdefault(event['apiKey'], []).append((index, event))
+
+    records, record_indexes = [], []
+    for partition_key, members in groups.items():
+        # 한 파티션 키의 이벤트는 순서대로 레코드에 나뉘어 담깁니다.
+        start = 0
+        packed = pack_events(
+            [event for _, event in members],
+            lambda e: partition_key,
+            compress=INGEST_COMPRESS,
+        )
+        for _, data, count in packed:
+            records.append({'Data': data, 'PartitionKey': partition_key})
+            record_indexes.append(
+                [index for index, _ in members[start:start + count]]
+            )
+            start += count
+    return records, record_indexes
+
+
+def rejection_code(message):
+    """
+    검증 오류 메시지를 클라이언트가 분기할 수 있는 오류 코드로 바꿉니다.
+    """
+    if message.startswith('Unauthorized'):
+        return 'Unauthorized'
+    if message.endswith('too large.'):
+        return 'EventTooLarge'
+    return 'InvalidEvent'
+
+
+def parse_events(body):
+    """
+    요청 본문에서 이벤트 목록을 꺼냅니다. (이벤트 배열, {"events": [...]}, 기존 단일 이벤트 형식 지원)
+    """
+    if isinstance(body, list):
+        return body, None, False
+    if isinstance(body, dict) and isinstance(body.get('events'), list):
+        return body['events'], body.get('apiKey'), False
+    return [body], None, True
+
+
+@metrics.instrument
 def handler(event, context):
     """
     API Gateway를 통해 SDK로부터 데이터 수집 요청을 처리하고,
     검증된 데이터를 Kinesis 데이터 스트림으로 전송합니다.
+    이벤트 배열을 받으면 파티션 키별로 압축된 집계 레코드로 묶어 PutRecords로 전송합니다.
     """
+    if is_warmup_event(event):
+        return warmup_response(warm_up(boto3_clients=['kinesis']))
+
     # CORS preflight 요청(OPTIONS) 처리 (기존과 동일)
     if event.get('requestContext', {}).get('http', {}).get('method') == 'OPTIONS':
         return {
@@ -22,42 +204,117 @@ def handler(event, context):
                 'Access-Control-Allow-Headers': 'Content-Type'
             }
         }
-    
+
     try:
-        body = json.loads(event.get('body', '{}'))
-        api_key = body.get('apiKey')
-        event_name = body.get('eventName')
-        
-        # 기본 유효성 검사
-        if not api_key:
-            return {'statusCode': 401, 'body': json.dumps({'message': 'Unauthorized: API Key is missing.'})}
-        
-        if not event_name:
-            return {'statusCode': 400, 'body': json.dumps({'message': 'Bad Request: eventName is missing.'})}
-        
+        with metrics.stage('decode'):
+            body = json.loads(event.get('body') or '{}')
+            events, default_api_key, single = parse_events(body)
+
+        if not events:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'message': 'Bad Request: no events.'}),
+            }
+        if len(events) > INGEST_MAX_EVENTS:
+            return {
+                'statusCode': 413,
+                'body': json.dumps({
+                    'message': (
+                        f'Payload Too Large: at most {INGEST_MAX_EVENTS}'
+                        ' events per request.'
+                    )
+                }),
+            }
+
+        # 기본 유효성 검사 (이벤트별)
+        accepted, rejected = [], []
+        with metrics.stage('validate'):
+            for index, item in enumerate(events):
+                valid_event, error = validate_event(item, default_api_key)
+                if error:
+                    rejected.append({
+                        'index': index,
+                        'code': rejection_code(error),
+                        'message': error,
+                    })
+                else:
+                    accepted.append((index, valid_event))
+        metrics.count('events', len(events))
+        metrics.count('rejected_events', len(rejected))
+
+        if single and rejected:
+            # 기존 단일 이벤트 요청은 이전과 같은 상태 코드로 응답합니다.
+            message = rejected[0]['message']
+            status_code = 401 if message.startswith('Unauthorized') else 400
+            return {
+                'statusCode': status_code,
+                'body': json.dumps({'message': message}),
+            }
+        if not accepted:
+            return {
+                'statusCode': 400,
+                'headers': CORS_HEADERS,
+                'body': json.dumps({
+                    'message': 'Bad Request: no valid events.',
+                    'rejected': rejected,
+                }),
+            }
+
         if not STREAM_NAME:
             raise ValueError("KINESIS_STREAM_NAME environment variable is not set.")
 
         # --- Kinesis로 데이터 전송 ---
-        # 데이터를 Kinesis 스트림으로 보냅니다.
         # PartitionKey는 데이터를 샤드에 분산시키는 역할을 합니다. apiKey를 사용해 동일 고객사의 데이터는 동일 샤드로 보내도록 합니다.
-        response = kinesis_client.put_record(
-            StreamName=STREAM_NAME,
-            Data=json.dumps(body), # 전체 요청 본문을 데이터로 사용
-            PartitionKey=api_key
+        with metrics.stage('encode'):
+            records, record_indexes = pack_records(accepted)
+            indexes_of = {
+                id(record): indexes
+                for record, indexes in zip(records, record_indexes)
+            }
+
+        with metrics.stage('put'):
+            failed_records = put_records_with_retry(records)
+        # 전송에 실패한 이벤트의 요청 내 위치와 오류 코드 (클라이언트는 이 이벤트만 다시 보냅니다)
+        failed = sorted(
+            (
+                {'index': index, 'code': code}
+                for record, code in failed_records
+                for index in indexes_of[id(record)]
+            ),
+            key=lambda entry: entry['index'],
         )
-        
-        print(f"Successfully put record to Kinesis. ShardId: {response['ShardId']}, SequenceNumber: {response['SequenceNumber']}")
 
-        # 성공 응답 반환 (기존과 동일)
+        metrics.count('put_events', len(accepted) - len(failed))
+        metrics.count('failed_events', len(failed))
+        metrics.count('kinesis_records', len(records) - len(failed_records))
+        metrics.count('failed_kinesis_records', len(failed_records))
+
+        if len(failed) == len(accepted):
+            error_body = {'message': 'Internal Server Error.'}
+            if not single:
+                error_body.update({'rejected': rejected, 'failed': failed})
+            return {'statusCode': 500, 'body': json.dumps(error_body)}
+
+        response_body = {'message': 'Event received successfully.'}
+        if not single:
+            response_body.update({
+                'accepted': len(accepted) - len(failed),
+                'rejected': rejected,
+                'failed': failed,
+            })
+
+        # 성공 응답 반환 (일부 이벤트가 거부/실패하면 207)
         return {
-            'statusCode': 202,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'message': 'Event received successfully.'})
+            'statusCode': 207 if rejected or failed else 202,
+            'headers': CORS_HEADERS,
+            'body': json.dumps(response_body, ensure_ascii=False),
         }
 
     except json.JSONDecodeError:
         return {'statusCode': 400, 'body': json.dumps({'message': 'Bad Request: Invalid JSON format.'})}
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        return {'statusCode': 500, 'body': json.dumps({'message': 'Internal Server Error.'})}
\ No newline at end of file
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'message': 'Internal Server Error.'}),
+        }
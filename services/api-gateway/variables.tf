@@ -3,3 +3,27 @@ variable "aws_region" {
   type        = string
   default     = "ap-northeast-2" # 서울 리전
 }
+
+variable "ingest_max_events" {
+  description = "Maximum number of events accepted in one ingest request."
+  type        = string
+  default     = "500"
+}
+
+variable "ingest_compress" {
+  description = "Whether aggregated Kinesis records are zlib-compressed."
+  type        = string
+  default     = "true"
+}
+
+variable "metrics_enabled" {
+  description = "Emit one CloudWatch Embedded Metric Format line per invocation (\"false\" makes instrumentation a no-op)."
+  type        = string
+  default     = "true"
+}
+
+variable "debug_log_sample_rate" {
+  description = "Fraction of per-record debug log lines to print (0 disables them, 1 logs every record)."
+  type        = string
+  default     = "0.01"
+}
@@ -0,0 +1,103 @@
+"""
+레코드별 put_item과 batch_write_items(25개 단위 BatchWriteItem)의 저장 지연 시간과 요청 수를 비교합니다.
+로컬 DynamoDB 대체 구현으로 호출당 지연 시간과 UnprocessedItems(스로틀링)를 주입합니다.
+
+사용법:
+    python benchmarks/bench_batch_writes.py [--items 100] [--latency 0.01]
+        [--unprocessed-rate 0.1]
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+)
+
+from batch_writer import batch_write_items  # noqa: E402
+from stubs import InMemoryDynamoDB  # noqa: E402
+
+TABLE_NAME = 'ad-scouter-stats-local'
+KEY_NAMES = ('customerId', 'eventId')
+
+
+def make_items(count, bad_indices):
+    return [
+        {
+            'customerId': None if i in bad_indices else f'customer-{i % 5}',
+            'eventId': str(uuid.uuid4()),
+            'eventName': 'question_asked',
+            'intent': '구매 고려',
+            'originalQuestion': f'질문 {i}',
+        }
+        for i in range(count)
+    ]
+
+
+def per_item(dynamodb, items):
+    table = dynamodb.Table(TABLE_NAME)
+    failures = []
+    for index, item in enumerate(items):
+        try:
+            table.put_item(Item=item)
+        except Exception as e:
+            failures.append((index, type(e).__name__))
+    return failures
+
+
+def batched(dynamodb, items):
+    return batch_write_items(
+        dynamodb, TABLE_NAME, items, key_names=KEY_NAMES, base_delay=0.005
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument(
+        '--latency',
+        type=float,
+        default=0.01,
+        help='DynamoDB 요청 1회 지연 시간(초)',
+    )
+    parser.add_argument('--unprocessed-rate', type=float, default=0.1)
+    parser.add_argument(
+        '--bad-items',
+        type=int,
+        nargs='*',
+        default=[7],
+        help='키가 없는 잘못된 항목 인덱스',
+    )
+    args = parser.parse_args()
+
+    items = make_items(args.items, set(args.bad_items))
+    print(
+        f"{'writer':<10} {'requests':>9} {'wall (ms)':>10} {'stored':>7}"
+        f" {'failed':>7}"
+    )
+    for name, write, unprocessed_rate in (
+        ('put_item', per_item, 0.0),
+        ('batch', batched, args.unprocessed_rate),
+    ):
+        dynamodb = InMemoryDynamoDB(
+            latency=args.latency, unprocessed_rate=unprocessed_rate
+        )
+        start = time.perf_counter()
+        failures = write(dynamodb, items)
+        wall = time.perf_counter() - start
+        stored = len(dynamodb.items(TABLE_NAME))
+        assert stored + len(failures) == len(items)
+        print(
+            f"{name:<10} {dynamodb.calls:>9} {wall * 1000:>10.1f} {stored:>7}"
+            f" {len(failures):>7}  {failures}"
+        )
+
+
+if __name__ == '__main__':
+    main()
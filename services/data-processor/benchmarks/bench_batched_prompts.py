@@ -0,0 +1,78 @@
+"""
+질문별 단독 프롬프트와 묶음 프롬프트의 호출 수, 프롬프트 토큰, 지연 시간을 비교합니다.
+스텁은 malformed_rate 비율의 항목을 빠뜨리거나 잘못된 레이블로 돌려줘 대체(단독) 호출 경로도 검증합니다.
+
+사용법:
+    python benchmarks/bench_batched_prompts.py [--questions 100] [--budgets 500
+        1000 2000 4000]
+"""
+
+import argparse
+import time
+
+from stubs import GeminiIntentStub, import_processor
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument(
+        '--budgets', type=int, nargs='+', default=[500, 1000, 2000, 4000]
+    )
+    parser.add_argument(
+        '--latency', type=float, default=0.05, help='호출당 고정 지연 시간(초)'
+    )
+    parser.add_argument(
+        '--per-item-latency',
+        type=float,
+        default=0.002,
+        help='묶음 항목당 추가 지연 시간(초)',
+    )
+    parser.add_argument('--malformed-rate', type=float, default=0.05)
+    args = parser.parse_args()
+
+    processor = import_processor()
+    processor.print = lambda *a, **k: None
+    questions = [
+        f'질문 {i}: 이 제품의 {i % 7}번 요금제는 기업용으로 얼마인가요?'
+        for i in range(args.questions)
+    ]
+
+    scenarios = [('per-question', 1, None)] + [
+        (f'budget {b}', processor.INTENT_BATCH_MAX_ITEMS, b)
+        for b in args.budgets
+    ]
+    print(
+        f"{'mode':<14} {'calls':>6} {'est. prompt tokens':>19} {'wall (s)':>9}"
+        f" {'correct':>8}"
+    )
+    for name, max_items, budget in scenarios:
+        stub = GeminiIntentStub(
+            latency=args.latency,
+            per_item_latency=args.per_item_latency,
+            malformed_rate=args.malformed_rate,
+        )
+        processor.generate_content = stub
+        processor.INTENT_BATCH_MAX_ITEMS = max_items
+
+        start = time.perf_counter()
+        intents = processor.classify_intents_batch(
+            questions, token_budget=budget
+        )
+        wall = time.perf_counter() - start
+
+        correct = sum(
+            intent == stub.label_for(q)
+            for intent, q in zip(intents, questions)
+        )
+        print(
+            f"{name:<14} {stub.calls:>6} {stub.prompt_chars // 2:>19}"
+            f" {wall:>9.2f} {correct:>5}/{len(questions)}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+배치 내 의도 분석 동시 실행 수에 따른 processor.handler 처리량을 측정합니다.
+지연 시간을 주입하는 로컬 Gemini 스텁을 사용하므로 네트워크/API 키가 필요 없습니다.
+
+사용법:
+    python benchmarks/bench_concurrency.py [--records 100] [--latency 0.2]
+        [--limits 1 2 4 8 16 32]
+"""
+
+import argparse
+import base64
+import json
+import time
+
+from stubs import GeminiIntentStub, InMemoryDynamoDB, import_processor
+
+
+def make_event(count):
+    records = []
+    for i in range(count):
+        body = {
+            'apiKey': f'customer-{i % 5}',
+            'eventName': 'question_asked',
+            'properties': {
+                'question': f'질문 {i}: 이 서비스 가격이 얼마인가요?'
+            },
+            'timestamp': '2025-08-25T00:00:00Z',
+        }
+        data = base64.b64encode(json.dumps(body).encode('utf-8')).decode(
+            'ascii'
+        )
+        records.append({'kinesis': {'data': data, 'sequenceNumber': str(i)}})
+    return {'Records': records}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--records', type=int, default=100)
+    parser.add_argument(
+        '--latency',
+        type=float,
+        default=0.2,
+        help='Gemini 호출 1회 지연 시간(초)',
+    )
+    parser.add_argument(
+        '--limits', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32]
+    )
+    args = parser.parse_args()
+
+    processor = import_processor()
+    event = make_event(args.records)
+    baseline = None
+
+    print(
+        f"{'limit':>6} {'wall (s)':>9} {'records/s':>10} {'speedup':>8}"
+        f" {'efficiency':>11} {'max in-flight':>14}"
+    )
+    for limit in args.limits:
+        stub = GeminiIntentStub(latency=args.latency)
+        dynamodb = InMemoryDynamoDB()
+        processor.generate_content = stub
+        processor.dynamodb = dynamodb
+        processor.intent_cache = processor.build_intent_cache()
+        processor.INTENT_CONCURRENCY = limit
+        # 빠른 사전 분류를 끄고 질문 하나당 호출 하나로 고정해 호출 단위 동시 실행 효과만 측정합니다.
+        processor.INTENT_BATCH_MAX_ITEMS = 1
+        processor.FAST_PATH_THRESHOLD = float('inf')
+        processor.print = lambda *a, **k: None
+
+        start = time.perf_counter()
+        processor.handler(event, None)
+        wall = time.perf_counter() - start
+
+        stored = dynamodb.items(processor.STATS_TABLE_NAME)
+        assert [item['originalQuestion'] for item in stored] == [
+            json.loads(base64.b64decode(r['kinesis']['data']))['properties'][
+                'question'
+            ]
+            for r in event['Records']
+        ], "output order must follow record order"
+
+        throughput = args.records / wall
+        baseline = baseline or throughput
+        speedup = throughput / baseline
+        print(
+            f"{limit:>6} {wall:>9.2f} {throughput:>10.1f} {speedup:>7.1f}x "
+            f"{speedup / limit:>10.0%} {stub.max_in_flight:>14}"
+        )
+
+
+if __name__ == '__main__':
+    main()
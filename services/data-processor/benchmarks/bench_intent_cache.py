@@ -0,0 +1,193 @@
+"""
+반복 트래픽에서 의도 분석 캐시가 줄이는 LLM 호출 수와 레코드당 지연 시간을 측정합니다.
+질문은 Zipf 분포로 뽑아 FAQ 클릭/반복 프롬프트처럼 일부 질문이 자주 반복되게 합니다.
+두 번째 실행은 새 컨테이너(빈 인메모리 계층)가 공유 SQLite 계층만으로 얼마나 적중하는지 보여줍니다.
+마지막으로 DynamoDB 공유 계층(스텁, 호출당 지연)에서 항목별 GetItem/PutItem과
+배치당 BatchGetItem/BatchWriteItem의 호출 수와 지연 시간을 비교합니다.
+
+사용법:
+    python benchmarks/bench_intent_cache.py [--batches 20] [--distinct 500]
+        [--latency 0.05] [--dynamodb-latency 0.005]
+"""
+
+import argparse
+import base64
+import json
+import random
+import time
+
+from stubs import GeminiIntentStub, InMemoryDynamoDB, import_processor
+
+
+def make_batch(rng, distinct, size, skew, first_sequence=0):
+    weights = [1 / (rank + 1) ** skew for rank in range(distinct)]
+    records = []
+    for i, question_id in enumerate(
+        rng.choices(range(distinct), weights=weights, k=size)
+    ):
+        # 같은 질문이라도 공백/문장부호가 조금씩 다르게 들어오는 경우를 흉내냅니다.
+        suffix = rng.choice(['', '?', ' ?', '!!', '  '])
+        body = {
+            'apiKey': 'customer-1',
+            'eventName': 'question_asked',
+            'properties': {
+                'question': (
+                    f'FAQ {question_id}번 요금제는 어떻게 되나요{suffix}'
+                )
+            },
+        }
+        data = base64.b64encode(
+            json.dumps(body, ensure_ascii=False).encode('utf-8')
+        ).decode('ascii')
+        records.append({
+            'kinesis': {
+                'data': data,
+                'sequenceNumber': str(first_sequence + i),
+            }
+        })
+    return {'Records': records}
+
+
+def run(processor, batches, latency, cache):
+    stub = GeminiIntentStub(latency=latency)
+    processor.generate_content = stub
+    processor.dynamodb = InMemoryDynamoDB()
+    processor.intent_cache = cache
+
+    records = 0
+    start = time.perf_counter()
+    for event in batches:
+        processor.handler(event, None)
+        records += len(event['Records'])
+    elapsed = time.perf_counter() - start
+    return stub.calls, records, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--batches', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--distinct', type=int, default=500)
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=3)
+    parser.add_argument('--dynamodb-latency', type=float, default=0.005)
+    args = parser.parse_args()
+
+    processor = import_processor()
+    processor.print = lambda *a, **k: None
+    processor.INTENT_CONCURRENCY = 1
+    # 빠른 사전 분류를 끄고 질문 하나당 호출 하나로 고정해 캐시 효과만 측정합니다.
+    processor.INTENT_BATCH_MAX_ITEMS = 1
+    processor.FAST_PATH_THRESHOLD = float('inf')
+    from intent_cache import (
+        DynamoDBIntentStore,
+        IntentCache,
+        LRUTTLCache,
+        SQLiteIntentStore,
+    )
+
+    rng = random.Random(args.seed)
+    batches = [
+        make_batch(
+            rng, args.distinct, args.batch_size, args.skew, b * args.batch_size
+        )
+        for b in range(args.batches)
+    ]
+
+    class NoCache(IntentCache):
+        def get(self, key):
+            return None
+
+        def put(self, key, intent):
+            pass
+
+        def get_many(self, keys):
+            return {}
+
+        def put_many(self, intents):
+            pass
+
+    shared = SQLiteIntentStore(':memory:')
+    scenarios = [
+        ('no cache (in-batch dedupe only)', NoCache()),
+        (
+            'warm container (LRU + shared)',
+            IntentCache(local=LRUTTLCache(maxsize=1000), shared=shared),
+        ),
+        (
+            'new container (shared only)',
+            IntentCache(local=LRUTTLCache(maxsize=1000), shared=shared),
+        ),
+    ]
+
+    print(
+        f"{'scenario':<32} {'records':>8} {'LLM calls':>10}"
+        f" {'calls/record':>13} {'ms/record':>10}"
+    )
+    for name, cache in scenarios:
+        calls, records, elapsed = run(processor, batches, args.latency, cache)
+        print(
+            f"{name:<32} {records:>8} {calls:>10} {calls / records:>13.3f}"
+            f" {elapsed / records * 1000:>10.2f}"
+        )
+        if not isinstance(cache, NoCache):
+            print(f"    stats: {cache.stats()}")
+
+    class PerItemStore(DynamoDBIntentStore):
+        # 묶음 조회/저장 도입 전처럼 키마다 GetItem/PutItem을 보냅니다.
+        def get_many(self, keys):
+            found = {key: self.get(key) for key in keys}
+            return {k: v for k, v in found.items() if v is not None}
+
+        def put_many(self, intents, ttl_seconds):
+            for key, intent in intents.items():
+                self.put(key, intent, ttl_seconds)
+
+    print(
+        f"\n== DynamoDB shared tier, {args.dynamodb_latency * 1000:.0f}ms"
+        " per call"
+    )
+    print(
+        f"{'scenario':<32} {'records':>8} {'LLM calls':>10}"
+        f" {'DDB calls':>10} {'ms/record':>10}"
+    )
+    hits = {}
+    for mode, store_class in (
+        ('per item', PerItemStore),
+        ('batched', DynamoDBIntentStore),
+    ):
+        dynamodb = InMemoryDynamoDB(
+            latency=args.dynamodb_latency,
+            table_keys={'intent-cache': ('questionHash',)},
+        )
+        for container in ('first', 'new'):
+            cache = IntentCache(
+                local=LRUTTLCache(maxsize=1000),
+                shared=store_class('intent-cache', dynamodb=dynamodb),
+            )
+            dynamodb.calls = 0
+            calls, records, elapsed = run(
+                processor, batches, args.latency, cache
+            )
+            print(
+                f"{f'{container} container ({mode})':<32} {records:>8}"
+                f" {calls:>10} {dynamodb.calls:>10}"
+                f" {elapsed / records * 1000:>10.2f}"
+            )
+            hits[mode, container] = cache.stats()
+    # 묶음 조회도 항목별 조회와 같은 결과(적중/미스)를 내야 합니다.
+    for container in ('first', 'new'):
+        for name in ('local_hits', 'shared_hits', 'misses', 'stores'):
+            assert (
+                hits['per item', container][name]
+                == hits['batched', container][name]
+            ), (container, name)
+    assert hits['batched', 'new']['shared_errors'] == 0
+
+
+if __name__ == '__main__':
+    main()
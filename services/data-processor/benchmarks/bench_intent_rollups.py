@@ -0,0 +1,324 @@
+"""
+의도 롤업(고객사 × 의도 × 시간/일 버킷 카운터)의 갱신 비용과 대시보드 조회 비용을 측정합니다.
+
+1. 실시간 갱신: processor.handler로 이벤트를 처리하며 배치당
+   롤업 update_item 수를 이벤트마다 갱신할 때와 비교합니다.
+   Gemini 오류를 주입해 실패 레코드부터 다시 전달하고, 배치 전체도 한 번 더 전달한 뒤
+   롤업 합계가 원시 이벤트 수와 같은지(재전달로 중복 집계되지 않는지) 확인합니다.
+2. 백필: 롤업 테이블을 비우고 원시 이벤트에서 다시 만든 결과가 실시간 갱신 결과와 같은지 확인합니다.
+3. 조회: 과거 원시 이벤트를 더 채우고 백필한 뒤, 기간별 의도 분포를 원시 이벤트 조회(고객사 파티션 전체 읽기 후 시간 필터)와
+   롤업 조회로 계산해 읽은 항목 수와 시간을 비교합니다. 두 결과는 같아야 합니다.
+
+사용법:
+    python benchmarks/bench_intent_rollups.py [--events 5000] [--customers 10]
+        [--days 3] [--history-events 200000]
+"""
+
+import argparse
+import base64
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from bench_replay import deliver_until_done
+from stubs import INTENTS, GeminiIntentStub, InMemoryDynamoDB, import_processor
+
+ROLLUP_TABLE_NAME = 'ad-scouter-intent-rollups-local'
+DATA_END = datetime(2025, 8, 25, tzinfo=timezone.utc)
+
+
+def isoformat(moment):
+    # SDK의 new Date().toISOString()과 같은 형식
+    return (
+        moment.strftime('%Y-%m-%dT%H:%M:%S.')
+        + f"{moment.microsecond // 1000:03d}Z"
+    )
+
+
+def random_moment(rng, start, end):
+    return start + timedelta(
+        seconds=rng.uniform(0, (end - start).total_seconds())
+    )
+
+
+def make_batches(args, rng):
+    start = DATA_END - timedelta(days=args.days)
+    batches = []
+    for batch in range(0, args.events, args.records):
+        records = []
+        for i in range(batch, min(batch + args.records, args.events)):
+            body = {
+                'apiKey': f'customer-{rng.randrange(args.customers)}',
+                'eventName': 'question_asked',
+                'properties': {
+                    'question': (
+                        f'질문 {i % 500}: 요금제와 기능을 비교하고 싶어요'
+                    )
+                },
+                # 스트림처럼 이벤트는 대략 발생 순서대로 들어옵니다. (최대 5분 늦게 도착)
+                'timestamp': isoformat(
+                    start
+                    + (DATA_END - start) * (i / args.events)
+                    - timedelta(seconds=rng.uniform(0, 300))
+                ),
+            }
+            data = base64.b64encode(
+                json.dumps(body, ensure_ascii=False).encode('utf-8')
+            ).decode('ascii')
+            records.append({
+                'kinesis': {
+                    'data': data,
+                    'sequenceNumber': str(49650000000000000000 + i),
+                }
+            })
+        batches.append({'Records': records})
+    return batches
+
+
+def raw_distribution(table, customer_id, start, end):
+    """
+    롤업 없이 원시 이벤트로 의도 분포를 계산합니다. (통계 테이블은 시간 정렬 키가 없어 고객사 파티션을 모두 읽습니다)
+    """
+    from intent_rollups import parse_timestamp
+
+    request = {
+        'KeyConditionExpression': '#pk = :pk',
+        'ExpressionAttributeNames': {'#pk': 'customerId'},
+        'ExpressionAttributeValues': {':pk': customer_id},
+    }
+    intents, total = {}, 0
+    while True:
+        response = table.query(**request)
+        for item in response['Items']:
+            if start <= parse_timestamp(item['timestamp']) < end:
+                intents[item['intent']] = intents.get(item['intent'], 0) + 1
+                total += 1
+        if not response.get('LastEvaluatedKey'):
+            return {'total': total, 'intents': intents}
+        request['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def rollup_snapshot(dynamodb):
+    return {
+        (item['rollupKey'], item['bucket']): {
+            k: v for k, v in item.items() if k.startswith(('intent#', 'total'))
+        }
+        for item in dynamodb.items(ROLLUP_TABLE_NAME)
+    }
+
+
+def bench_live(processor, dynamodb, batches, args):
+    import intent_rollups
+
+    stub = GeminiIntentStub(
+        latency=0.0, error_rate=args.error_rate, seed=args.seed
+    )
+    processor.generate_content = stub
+    updates_per_invocation = []
+    real_apply = processor.apply_rollup_updates
+
+    def counting_apply(table, updates, **kwargs):
+        updates_per_invocation.append(len(updates))
+        return real_apply(table, updates, **kwargs)
+
+    processor.apply_rollup_updates = counting_apply
+    deliveries = 0
+    started = time.perf_counter()
+    for batch in batches:
+        deliveries += deliver_until_done(processor, batch)
+    elapsed = time.perf_counter() - started
+    before_replay = rollup_snapshot(dynamodb)
+    # 타임아웃 후 재전달처럼 모든 배치를 통째로 한 번 더 전달합니다.
+    stub.error_rate = 0.0
+    for batch in batches:
+        processor.handler(batch, None)
+    processor.apply_rollup_updates = real_apply
+    assert (
+        rollup_snapshot(dynamodb) == before_replay
+    ), "redelivered batches must not change rollups"
+
+    stored = dynamodb.items(processor.STATS_TABLE_NAME)
+    update_calls = sum(updates_per_invocation)
+    print(
+        f"live: {len(stored)} events in {len(batches)} batches of"
+        f" {args.records} records, {deliveries} deliveries (Gemini error rate"
+        f" {args.error_rate:.0%}), {elapsed:.2f}s"
+    )
+    print(f"{'rollup writes':<28} {'update_item calls':>18} {'per batch':>10}")
+    print(
+        f"{'per event (hour + day)':<28} {2 * len(stored):>18}"
+        f" {2 * len(stored) / len(batches):>10.1f}"
+    )
+    print(
+        f"{'coalesced per invocation':<28} {update_calls:>18}"
+        f" {update_calls / len(batches):>10.1f}"
+    )
+
+    start = DATA_END - timedelta(days=args.days)
+    stats_table = dynamodb.Table(processor.STATS_TABLE_NAME)
+    rollup_table = dynamodb.Table(ROLLUP_TABLE_NAME)
+    for customer in range(args.customers):
+        customer_id = f'customer-{customer}'
+        expected = raw_distribution(stats_table, customer_id, start, DATA_END)
+        assert (
+            intent_rollups.query_intent_distribution(
+                rollup_table, customer_id, start, DATA_END
+            )
+            == expected
+        )
+
+
+def bench_backfill(processor, dynamodb, args):
+    import intent_rollups
+
+    live = rollup_snapshot(dynamodb)
+    dynamodb.tables[ROLLUP_TABLE_NAME] = {}
+    started = time.perf_counter()
+    scanned, buckets, failures = intent_rollups.backfill_rollups(
+        dynamodb,
+        processor.STATS_TABLE_NAME,
+        ROLLUP_TABLE_NAME,
+        before=DATA_END,
+        segments=args.segments,
+    )
+    elapsed = time.perf_counter() - started
+    assert (
+        not failures and rollup_snapshot(dynamodb) == live
+    ), "backfill must rebuild the live rollups"
+    print(
+        f"\nbackfill: {scanned} raw events -> {buckets} buckets in"
+        f" {elapsed:.2f}s (matches live rollups)"
+    )
+
+
+def seed_history(processor, dynamodb, args, rng):
+    """
+    과거 원시 이벤트를 통계 테이블에 바로 채웁니다. (조회 비용이 원시 이벤트 수에 따라 어떻게 늘어나는지 보기 위함)
+    """
+    start = DATA_END - timedelta(days=args.history_days)
+    table = dynamodb.tables.setdefault(processor.STATS_TABLE_NAME, {})
+    for i in range(args.history_events):
+        customer_id = f'customer-{rng.randrange(args.customers)}'
+        event_id = f'history-{i}'
+        table[(customer_id, event_id)] = {
+            'customerId': customer_id,
+            'eventId': event_id,
+            'eventName': 'question_asked',
+            'intent': rng.choice(INTENTS),
+            'originalQuestion': f'과거 질문 {i}',
+            'timestamp': isoformat(
+                random_moment(rng, start, DATA_END - timedelta(days=args.days))
+            ),
+        }
+
+
+def bench_queries(processor, dynamodb, args):
+    import intent_rollups
+
+    stats_table = dynamodb.Table(processor.STATS_TABLE_NAME)
+    rollup_table = dynamodb.Table(ROLLUP_TABLE_NAME)
+    raw_events = len(dynamodb.items(processor.STATS_TABLE_NAME))
+    # 시 단위 경계에 맞지 않는 시각으로 끝나는 구간 (대시보드의 "최근 N일")
+    end = DATA_END - timedelta(hours=5, minutes=30)
+    print(
+        f"\ndashboard query per customer ({raw_events} raw events,"
+        f" {args.customers} customers)"
+    )
+    print(
+        f"{'range':<8} {'raw items read':>15} {'raw ms':>8}"
+        f" {'rollup items read':>18} {'rollup ms':>10}"
+    )
+    for days in (1, 7, 30, 90):
+        start = end - timedelta(days=days)
+        results = {}
+        for mode, function, table in (
+            ('raw', raw_distribution, stats_table),
+            ('rollup', intent_rollups.query_intent_distribution, rollup_table),
+        ):
+            dynamodb.items_read = 0
+            started = time.perf_counter()
+            answers = [
+                function(table, f'customer-{c}', start, end)
+                for c in range(args.customers)
+            ]
+            elapsed = (time.perf_counter() - started) * 1000 / args.customers
+            results[mode] = (
+                answers,
+                dynamodb.items_read / args.customers,
+                elapsed,
+            )
+        # 롤업은 1시간 해상도이므로 시각을 시 단위로 맞춘 구간의 원시 집계와 비교합니다.
+        aligned = [
+            raw_distribution(
+                stats_table,
+                f'customer-{c}',
+                start.replace(minute=0),
+                end.replace(minute=0) + timedelta(hours=1),
+            )
+            for c in range(args.customers)
+        ]
+        assert (
+            results['rollup'][0] == aligned
+        ), "rollup distribution must equal the raw count"
+        print(
+            f"{days:>3} days {results['raw'][1]:>15.0f}"
+            f" {results['raw'][2]:>8.2f} {results['rollup'][1]:>18.0f}"
+            f" {results['rollup'][2]:>10.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument(
+        '--records', type=int, default=100, help='배치당 Kinesis 레코드 수'
+    )
+    parser.add_argument('--customers', type=int, default=10)
+    parser.add_argument(
+        '--days', type=int, default=3, help='실시간 처리 이벤트의 기간'
+    )
+    parser.add_argument(
+        '--error-rate', type=float, default=0.1, help='Gemini 호출 실패 비율'
+    )
+    parser.add_argument('--history-events', type=int, default=200000)
+    parser.add_argument('--history-days', type=int, default=120)
+    parser.add_argument(
+        '--segments', type=int, default=4, help='백필 병렬 스캔 세그먼트 수'
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    processor = import_processor()
+    processor.print = lambda *a, **k: None
+    processor.metrics.enabled = False
+    processor.metrics.sample_rate = 0.0
+    # 실제 Query/Scan 한 페이지(1MB)에 들어가는 정도의 항목 수로 나눠 읽습니다.
+    dynamodb = InMemoryDynamoDB(
+        table_keys={ROLLUP_TABLE_NAME: ('rollupKey', 'bucket')}, page_size=4000
+    )
+    processor.dynamodb = dynamodb
+    processor.INTENT_ROLLUP_TABLE_NAME = ROLLUP_TABLE_NAME
+    processor.FAST_PATH_THRESHOLD = float('inf')
+    rng = random.Random(args.seed)
+    from intent_rollups import backfill_rollups
+
+    bench_live(processor, dynamodb, make_batches(args, rng), args)
+    bench_backfill(processor, dynamodb, args)
+    seed_history(processor, dynamodb, args, rng)
+    # 과거 이벤트까지 포함해 롤업을 다시 만든 뒤 조회를 비교합니다.
+    backfill_rollups(
+        dynamodb,
+        processor.STATS_TABLE_NAME,
+        ROLLUP_TABLE_NAME,
+        before=DATA_END,
+        segments=args.segments,
+    )
+    bench_queries(processor, dynamodb, args)
+
+
+if __name__ == '__main__':
+    main()
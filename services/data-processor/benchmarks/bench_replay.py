@@ -0,0 +1,237 @@
+"""
+Kinesis 재전달(타임아웃/부분 실패 후 재시도) 시 processor.handler의 LLM 호출과 저장 항목 수를 측정합니다.
+
+1. 첫 전달에서 일부 Gemini 호출이 실패하면 그 레코드만 batchItemFailures로 보고됩니다.
+2. Kinesis처럼 가장 앞선 실패 레코드부터 다시 전달하고, 실패가 없어질 때까지 반복합니다.
+3. 같은 배치를 통째로 한 번 더 전달(타임아웃 후 재전달)해 이미 성공한 레코드에 LLM 호출이 0번인지 확인합니다.
+4. 재전달 때 사전 확인(BatchGetItem)이 실패하거나 키가 계속 UnprocessedKeys로 남는 경우,
+   조건부 쓰기로 항목과 의도 롤업이 중복되지 않는지 확인합니다.
+
+이전 방식(uuid eventId, 사전 확인 없음, 실패 보고 없음)과 비교합니다. 의도 분석 캐시는 꺼서 재전달 자체의 효과만 봅니다.
+
+사용법:
+    python benchmarks/bench_replay.py [--records 100] [--error-rate 0.2]
+        [--latency 0.02]
+"""
+
+import argparse
+import base64
+import json
+import uuid
+
+from stubs import GeminiIntentStub, InMemoryDynamoDB, import_processor
+
+ROLLUP_TABLE_NAME = 'ad-scouter-intent-rollups-local'
+
+
+def make_event(count):
+    records = []
+    for i in range(count):
+        body = {
+            'apiKey': f'customer-{i % 5}',
+            'eventName': 'question_asked',
+            'properties': {
+                'question': f'질문 {i}: 이 서비스 가격이 얼마인가요?'
+            },
+            'timestamp': '2025-08-25T00:00:00Z',
+        }
+        data = base64.b64encode(
+            json.dumps(body, ensure_ascii=False).encode('utf-8')
+        ).decode('ascii')
+        records.append({
+            'kinesis': {
+                'data': data,
+                'sequenceNumber': str(49650000000000000000 + i),
+            }
+        })
+    return {'Records': records}
+
+
+def question_of(record):
+    return json.loads(base64.b64decode(record['kinesis']['data']))[
+        'properties'
+    ]['question']
+
+
+class PromptLog:
+    """
+    Gemini 스텁을 감싸 호출된 프롬프트를 기록합니다.
+    """
+
+    def __init__(self, stub):
+        self.stub = stub
+        self.prompts = []
+
+    def __call__(self, prompt, json_output=False):
+        self.prompts.append(prompt)
+        return self.stub(prompt, json_output)
+
+
+def deliver_until_done(processor, event, max_deliveries=20):
+    """
+    Kinesis처럼 실패 보고가 없어질 때까지 가장 앞선 실패 레코드부터 다시 전달합니다.
+    """
+    records = event['Records']
+    deliveries = 0
+    while records and deliveries < max_deliveries:
+        deliveries += 1
+        response = processor.handler({'Records': records}, None)
+        failed = [
+            failure['itemIdentifier']
+            for failure in response.get('batchItemFailures', [])
+        ]
+        if not failed:
+            break
+        first = min(int(sequence) for sequence in failed)
+        records = [
+            record
+            for record in records
+            if int(record['kinesis']['sequenceNumber']) >= first
+        ]
+    return deliveries
+
+
+def run(processor, event, args, previous, check_failure=None):
+    from intent_cache import IntentCache
+
+    class NoCache(IntentCache):
+        def get(self, key):
+            return None
+
+        def put(self, key, intent):
+            pass
+
+        def get_many(self, keys):
+            return {}
+
+        def put_many(self, intents):
+            pass
+
+    stub = PromptLog(
+        GeminiIntentStub(
+            latency=args.latency, error_rate=args.error_rate, seed=args.seed
+        )
+    )
+    dynamodb = InMemoryDynamoDB(
+        table_keys={ROLLUP_TABLE_NAME: ('rollupKey', 'bucket')}
+    )
+    processor.generate_content = stub
+    processor.dynamodb = dynamodb
+    processor.intent_cache = NoCache()
+    real_event_id, real_find = (
+        processor.event_id,
+        processor.find_processed_keys,
+    )
+    if previous:
+        processor.event_id = lambda record, position: str(uuid.uuid4())
+        processor.find_processed_keys = lambda keys: set()
+    try:
+        if previous:
+            # 이전 handler는 실패를 보고하지 않고 항상 성공으로 응답했습니다.
+            processor.handler(event, None)
+            deliveries = 1
+        else:
+            deliveries = deliver_until_done(processor, event)
+        calls_until_done = len(stub.prompts)
+
+        # 타임아웃으로 응답을 못 한 경우처럼 배치 전체를 한 번 더 전달합니다.
+        stub.prompts.clear()
+        if check_failure == 'error':
+
+            def unavailable(RequestItems):
+                raise RuntimeError("Injected BatchGetItem failure")
+
+            dynamodb.batch_get_item = unavailable
+        elif check_failure == 'unprocessed':
+
+            def throttled(RequestItems):
+                return {'Responses': {}, 'UnprocessedKeys': RequestItems}
+
+            dynamodb.batch_get_item = throttled
+        processor.handler(event, None)
+        stored = dynamodb.items(processor.STATS_TABLE_NAME)
+        stored_questions = {item['originalQuestion'] for item in stored}
+        replay_calls_for_done = sum(
+            1
+            for prompt in stub.prompts
+            for question in stored_questions
+            if question in prompt
+        )
+        return {
+            'deliveries': deliveries,
+            'calls_until_done': calls_until_done,
+            'replay_calls': len(stub.prompts),
+            'replay_calls_for_done': replay_calls_for_done,
+            'stored_items': len(stored),
+            'distinct_events': len(stored_questions),
+            # 시간 버킷 롤업의 총합 (저장된 이벤트 수와 같아야 합니다)
+            'rollup_total': sum(
+                item['total']
+                for item in dynamodb.items(ROLLUP_TABLE_NAME)
+                if item['granularity'] == 'hour'
+            ),
+        }
+    finally:
+        processor.event_id, processor.find_processed_keys = (
+            real_event_id,
+            real_find,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--records', type=int, default=100)
+    parser.add_argument(
+        '--error-rate', type=float, default=0.2, help='Gemini 호출 실패 비율'
+    )
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    processor = import_processor()
+    processor.print = lambda *a, **k: None
+    # 질문 하나당 호출 하나로 고정해 레코드 단위 재시도 효과만 측정합니다.
+    processor.INTENT_BATCH_MAX_ITEMS = 1
+    processor.FAST_PATH_THRESHOLD = float('inf')
+    processor.INTENT_ROLLUP_TABLE_NAME = ROLLUP_TABLE_NAME
+    event = make_event(args.records)
+
+    print(f"{args.records} records, Gemini error rate {args.error_rate:.0%}")
+    print(
+        f"{'mode':<26} {'deliveries':>10} {'LLM calls':>10}"
+        f" {'full replay calls':>18} {'(for done)':>10} {'stored items':>12}"
+        f" {'events':>7} {'rollup':>7}"
+    )
+    modes = (
+        ('uuid, no pre-check (prev)', True, None),
+        ('deterministic + skip', False, None),
+        ('pre-check fails on replay', False, 'error'),
+        ('pre-check keys unprocessed', False, 'unprocessed'),
+    )
+    for name, previous, check_failure in modes:
+        result = run(processor, event, args, previous, check_failure)
+        print(
+            f"{name:<26} {result['deliveries']:>10}"
+            f" {result['calls_until_done']:>10} {result['replay_calls']:>18}"
+            f" {result['replay_calls_for_done']:>10}"
+            f" {result['stored_items']:>12} {result['distinct_events']:>7}"
+            f" {result['rollup_total']:>7}"
+        )
+        if not previous:
+            if check_failure is None:
+                assert (
+                    result['replay_calls_for_done'] == 0
+                ), "replay must not call Gemini for processed records"
+            assert (
+                result['stored_items'] == result['distinct_events']
+            ), "replay must not duplicate items"
+            assert (
+                result['rollup_total'] == result['stored_items']
+            ), "replay must not count rollups twice"
+
+
+if __name__ == '__main__':
+    main()
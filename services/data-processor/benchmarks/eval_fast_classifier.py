@@ -0,0 +1,188 @@
+"""
+빠른 의도 분류기를 LLM 레이블과 비교해 임계값별 일치율과 LLM 호출 회피 비율을 보고하고,
+목표 일치율을 만족하는 가장 낮은 임계값을 추천합니다.
+평가 질문은 모델 학습에 쓰지 않은 것이어야 합니다. 배포된 모델로 평가할 때 학습 데이터(--train-data)와
+겹치는 질문은 제외합니다.
+
+사용법:
+    # 배포된 모델로 학습에 쓰지 않은 질문 평가 ({"question": "...", "intent": "<LLM 레이블>"} 형식
+    # JSONL)
+    # (예: 사전 분류 도입 전 통계 테이블에서 내보낸 Gemini 분류 결과)
+    python benchmarks/eval_fast_classifier.py --input llm_labels.jsonl
+    python benchmarks/eval_fast_classifier.py --input data/intent_holdout.jsonl
+
+    # 입력 데이터로 k-fold 교차 검증 (각 폴드는 나머지 폴드로만 학습한 모델로 평가)
+    python benchmarks/eval_fast_classifier.py --input data/intent_seed.jsonl
+        --folds 5
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+)
+
+from fast_classifier import (  # noqa: E402
+    DEFAULT_MODEL_PATH,
+    FastIntentClassifier,
+    normalize,
+    train_ngram_model,
+)
+
+DEFAULT_TRAIN_DATA = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    '..',
+    'data',
+    'intent_seed.jsonl',
+)
+
+
+def load_examples(path):
+    with open(path, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [
+        (row['question'], row['intent'])
+        for row in rows
+        if row['intent'] != '분석 실패'
+    ]
+
+
+def predictions_for(examples, folds, model_path):
+    if folds <= 1:
+        classifier = FastIntentClassifier.load(model_path)
+        return [(classifier.predict(q), label) for q, label in examples]
+
+    results = []
+    for fold in range(folds):
+        train = [e for i, e in enumerate(examples) if i % folds != fold]
+        classifier = FastIntentClassifier(
+            train_ngram_model(train, min_count=1)
+        )
+        results.extend(
+            (classifier.predict(q), label)
+            for i, (q, label) in enumerate(examples)
+            if i % folds == fold
+        )
+    return results
+
+
+def exclude_training_questions(examples, train_path):
+    """
+    배포된 모델의 학습 데이터와 같은 질문을 제외합니다. (학습 데이터로 평가하면 일치율이 부풀려집니다)
+    """
+    if not train_path or not os.path.exists(train_path):
+        return examples
+    trained = {
+        normalize(question) for question, _ in load_examples(train_path)
+    }
+    held_out = [
+        (question, label)
+        for question, label in examples
+        if normalize(question) not in trained
+    ]
+    if len(held_out) < len(examples):
+        print(
+            f"excluded {len(examples) - len(held_out)} questions that are in"
+            f" the training data ({train_path})"
+        )
+    return held_out
+
+
+def recommend_threshold(results, thresholds, target_agreement):
+    """
+    회피한 호출의 일치율이 목표 이상인 가장 낮은 임계값을 반환합니다. 없으면 None입니다.
+    """
+    for threshold in sorted(thresholds):
+        avoided = [
+            (intent, label)
+            for (intent, confidence), label in results
+            if intent is not None and confidence >= threshold
+        ]
+        if (
+            avoided
+            and sum(intent == label for intent, label in avoided)
+            / len(avoided)
+            >= target_agreement
+        ):
+            return threshold
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--input', required=True)
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--folds', type=int, default=1)
+    parser.add_argument(
+        '--train-data',
+        default=DEFAULT_TRAIN_DATA,
+        help='배포된 모델의 학습 데이터 (평가 질문에서 제외, --folds 1일 때)',
+    )
+    parser.add_argument(
+        '--target-agreement',
+        type=float,
+        default=0.99,
+        help='임계값 추천에 쓰는 회피한 호출의 최소 LLM 레이블 일치율',
+    )
+    parser.add_argument(
+        '--thresholds',
+        type=float,
+        nargs='+',
+        default=[0.5, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99],
+    )
+    args = parser.parse_args()
+
+    examples = load_examples(args.input)
+    if args.folds <= 1:
+        examples = exclude_training_questions(examples, args.train_data)
+    if not examples:
+        parser.error(
+            "no held-out questions to evaluate (use --folds to cross-validate"
+            " the training data)"
+        )
+    results = predictions_for(examples, args.folds, args.model)
+    total = len(results)
+    overall = sum(intent == label for (intent, _), label in results) / total
+    print(f"examples={total} overall agreement (no threshold)={overall:.1%}")
+    print(
+        f"{'threshold':>9} {'LLM calls avoided':>18}"
+        f" {'agreement on avoided':>21}"
+    )
+    for threshold in args.thresholds:
+        avoided = [
+            (intent, label)
+            for (intent, confidence), label in results
+            if intent is not None and confidence >= threshold
+        ]
+        agreement = (
+            sum(intent == label for intent, label in avoided) / len(avoided)
+            if avoided
+            else 0.0
+        )
+        print(
+            f"{threshold:>9.2f} {len(avoided) / total:>18.1%}"
+            f" {agreement:>21.1%}"
+        )
+    recommended = recommend_threshold(
+        results, args.thresholds, args.target_agreement
+    )
+    if recommended is None:
+        print(
+            f"no threshold reaches {args.target_agreement:.0%} agreement; keep"
+            " the LLM for every question"
+        )
+    else:
+        print(
+            f"recommended FAST_PATH_THRESHOLD={recommended} (lowest with >="
+            f" {args.target_agreement:.0%} agreement)"
+        )
+
+
+if __name__ == '__main__':
+    main()
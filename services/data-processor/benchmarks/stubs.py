@@ -0,0 +1,410 @@
+"""
+벤치마크용 로컬 스텁입니다. 실제 Gemini/DynamoDB 대신 지연 시간과 오류를 주입합니다.
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+# Lambda 레이어로 배포되는 공용 모듈 (services/shared/python)
+SHARED_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', 'shared', 'python'
+)
+
+INTENTS = ['정보 탐색', '구매 고려', '기능 문의', '단순 대화', '기타']
+
+
+def import_processor():
+    """
+    AWS/Gemini 자격 증명 없이 processor 모듈을 불러옵니다.
+    """
+    os.environ.setdefault('GEMINI_API_KEY', 'local-benchmark')
+    os.environ.setdefault('STATS_TABLE_NAME', 'ad-scouter-stats-local')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-2')
+    for path in (SHARED_DIR, SRC_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    import processor
+
+    return processor
+
+
+class GeminiIntentStub:
+    """
+    processor.generate_content를 대신하는 지연 주입 스텁입니다.
+    단독/묶음 프롬프트를 모두 처리하며 호출 수, 분류한 질문 수, 최대 동시 호출 수를 기록합니다.
+    malformed_rate 비율의 묶음 항목은 응답에서 빼거나 허용되지 않은 레이블로 돌려줍니다.
+    """
+
+    def __init__(
+        self,
+        latency=0.05,
+        jitter=0.0,
+        error_rate=0.0,
+        malformed_rate=0.0,
+        per_item_latency=0.0,
+        seed=0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.per_item_latency = per_item_latency
+        self.calls = 0
+        self.items = 0
+        self.prompt_chars = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def label_for(text):
+        return INTENTS[sum(map(ord, text)) % len(INTENTS)]
+
+    def __call__(self, prompt, json_output=False):
+        batch_items = (
+            [json.loads(q) for q in _BATCH_ITEM.findall(prompt)]
+            if json_output
+            else []
+        )
+        count = len(batch_items) or 1
+        with self._lock:
+            self.calls += 1
+            self.items += count
+            self.prompt_chars += len(prompt)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            delay = (
+                self.latency
+                + self.per_item_latency * count
+                + self._rng.uniform(0, self.jitter)
+            )
+            failed = self._rng.random() < self.error_rate
+            malformed = [
+                self._rng.random() < self.malformed_rate for _ in batch_items
+            ]
+        try:
+            time.sleep(delay)
+            if failed:
+                raise RuntimeError("Injected Gemini failure")
+            if not json_output:
+                return self.label_for(_SINGLE_ITEM.search(prompt).group(1))
+            entries = []
+            for number, (question, broken) in enumerate(
+                zip(batch_items, malformed), 1
+            ):
+                if not broken:
+                    entries.append(
+                        {'id': number, 'intent': self.label_for(question)}
+                    )
+                elif number % 2:
+                    entries.append({'id': number, 'intent': '알 수 없음'})
+            return json.dumps(entries, ensure_ascii=False)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+_BATCH_ITEM = re.compile(r'^\d+\. (".*")$', re.MULTILINE)
+_SINGLE_ITEM = re.compile(r'텍스트: "(.*)"', re.DOTALL)
+
+
+class InMemoryDynamoDB:
+    """
+    put_item(기본 키 attribute_not_exists 조건 포함)/batch_write_item/batch_get_item과
+    테이블의 get_item/update_item(SET/ADD)/query/scan을 지원하는
+    로컬 DynamoDB 대체 구현입니다.
+    호출마다 지연 시간을 주고, 일정 비율의 항목을 UnprocessedItems로 돌려보내 스로틀링을 흉내냅니다.
+    table_keys로 테이블별 기본 키를 지정하며, 없는 테이블은 key_names를 씁니다.
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        unprocessed_rate=0.0,
+        key_names=('customerId', 'eventId'),
+        seed=0,
+        table_keys=None,
+        page_size=1000,
+    ):
+        self.latency = latency
+        self.unprocessed_rate = unprocessed_rate
+        self.key_names = key_names
+        self.table_keys = dict(table_keys or {})
+        self.page_size = page_size
+        self.tables = {}
+        self.calls = 0
+        # query/scan으로 읽은 항목 수 (읽기 용량 비교용)
+        self.items_read = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def keys_of(self, table_name):
+        return self.table_keys.get(table_name, self.key_names)
+
+    def Table(self, name):
+        return _InMemoryTable(self, name)
+
+    def items(self, table_name):
+        return list(self.tables.get(table_name, {}).values())
+
+    def _store(self, table_name, item):
+        key = tuple(item.get(name) for name in self.keys_of(table_name))
+        if any(value in (None, '') for value in key):
+            raise ValidationException(f"Missing key attribute in item: {key}")
+        self.tables.setdefault(table_name, {})[key] = dict(item)
+
+    def batch_write_item(self, RequestItems):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        unprocessed = {}
+        with self._lock:
+            for table_name, requests in RequestItems.items():
+                if len(requests) > 25:
+                    raise ValidationException(
+                        "Too many items requested for the BatchWriteItem call"
+                    )
+                # 실제 DynamoDB처럼 묶음 안에 잘못된 항목이 있으면 묶음 전체를 거부합니다.
+                for request in requests:
+                    key = tuple(
+                        request['PutRequest']['Item'].get(name)
+                        for name in self.keys_of(table_name)
+                    )
+                    if any(value in (None, '') for value in key):
+                        raise ValidationException(
+                            f"Missing key attribute in item: {key}"
+                        )
+                for request in requests:
+                    if self._rng.random() < self.unprocessed_rate:
+                        unprocessed.setdefault(table_name, []).append(request)
+                    else:
+                        self._store(table_name, request['PutRequest']['Item'])
+        return {'UnprocessedItems': unprocessed}
+
+    def batch_get_item(self, RequestItems):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        responses = {}
+        with self._lock:
+            for table_name, request in RequestItems.items():
+                if len(request['Keys']) > 100:
+                    raise ValidationException(
+                        "Too many items requested for the BatchGetItem call"
+                    )
+                table = self.tables.get(table_name, {})
+                key_names = self.keys_of(table_name)
+                # ProjectionExpression의 속성만 돌려줍니다. (없으면 키 속성만)
+                projected = list(
+                    request.get('ExpressionAttributeNames', {}).values()
+                ) or list(key_names)
+                for key in request['Keys']:
+                    item = table.get(
+                        tuple(key.get(name) for name in key_names)
+                    )
+                    if item is not None:
+                        responses.setdefault(table_name, []).append(
+                            {
+                                name: item[name]
+                                for name in projected
+                                if name in item
+                            }
+                        )
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+
+class _InMemoryTable:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+
+    def _call(self):
+        with self.db._lock:
+            self.db.calls += 1
+        time.sleep(self.db.latency)
+
+    def put_item(
+        self, Item, ConditionExpression=None, ExpressionAttributeNames=None
+    ):
+        """
+        조건은 'attribute_not_exists(#k0) AND ...'(기본 키 속성) 형태만 지원합니다.
+        """
+        self._call()
+        with self.db._lock:
+            if ConditionExpression:
+                key = tuple(
+                    Item.get(name) for name in self.db.keys_of(self.name)
+                )
+                if key in self.db.tables.get(self.name, {}):
+                    raise ConditionalCheckFailedException(
+                        "The conditional request failed"
+                    )
+            self.db._store(self.name, Item)
+        return {}
+
+    def get_item(self, Key):
+        self._call()
+        with self.db._lock:
+            item = self.db.tables.get(self.name, {}).get(
+                tuple(Key.get(name) for name in self.db.keys_of(self.name))
+            )
+        return {'Item': dict(item)} if item is not None else {}
+
+    def update_item(
+        self,
+        Key,
+        UpdateExpression,
+        ExpressionAttributeNames=None,
+        ExpressionAttributeValues=None,
+    ):
+        """
+        'SET #a = :v, ... ADD #b :n, ...' 형태의 식만 지원합니다. ADD는 없는 속성을 0에서 시작합니다.
+        """
+        self._call()
+        names = ExpressionAttributeNames or {}
+        values = ExpressionAttributeValues or {}
+        key_names = self.db.keys_of(self.name)
+        key = tuple(Key.get(name) for name in key_names)
+        with self.db._lock:
+            table = self.db.tables.setdefault(self.name, {})
+            item = table.get(key) or dict(Key)
+            for action, assignments in _UPDATE_CLAUSE.findall(
+                UpdateExpression
+            ):
+                for assignment in assignments.split(','):
+                    if action == 'SET':
+                        name, value = (
+                            part.strip() for part in assignment.split('=')
+                        )
+                        item[names.get(name, name)] = values[value]
+                    else:
+                        name, value = assignment.split()
+                        name = names.get(name, name)
+                        item[name] = item.get(name, 0) + values[value]
+            table[key] = item
+        return {}
+
+    def query(
+        self,
+        KeyConditionExpression,
+        ExpressionAttributeNames=None,
+        ExpressionAttributeValues=None,
+        ExclusiveStartKey=None,
+        Limit=None,
+    ):
+        """
+        '#pk = :pk' 또는 '#pk = :pk AND #sk BETWEEN :a AND :b' 형태의 키 조건만 지원합니다.
+        """
+        self._call()
+        values = ExpressionAttributeValues or {}
+        match = _KEY_CONDITION.fullmatch(KeyConditionExpression.strip())
+        partition_value = values[match.group(2)]
+        low, high = (
+            (values[match.group(4)], values[match.group(5)])
+            if match.group(3)
+            else (None, None)
+        )
+        partition_name, sort_name = self.db.keys_of(self.name)
+        with self.db._lock:
+            items = sorted(
+                (
+                    dict(item)
+                    for item in self.db.tables.get(self.name, {}).values()
+                    if item.get(partition_name) == partition_value
+                    and (low is None or low <= item.get(sort_name) <= high)
+                ),
+                key=lambda item: item[sort_name],
+            )
+        if ExclusiveStartKey:
+            items = [
+                item
+                for item in items
+                if item[sort_name] > ExclusiveStartKey[sort_name]
+            ]
+        return self._page(items, Limit)
+
+    def scan(
+        self,
+        ProjectionExpression=None,
+        ExpressionAttributeNames=None,
+        Segment=0,
+        TotalSegments=1,
+        ExclusiveStartKey=None,
+        Limit=None,
+    ):
+        self._call()
+        names = ExpressionAttributeNames or {}
+        key_names = self.db.keys_of(self.name)
+        with self.db._lock:
+            entries = sorted(
+                (key, item)
+                for key, item in self.db.tables.get(self.name, {}).items()
+                if hash(key) % TotalSegments == Segment
+            )
+        if ExclusiveStartKey:
+            start = tuple(ExclusiveStartKey[name] for name in key_names)
+            entries = [(key, item) for key, item in entries if key > start]
+        items = [item for _, item in entries]
+        if ProjectionExpression:
+            projected = [
+                names.get(name.strip(), name.strip())
+                for name in ProjectionExpression.split(',')
+            ]
+            keep = set(projected) | set(key_names)
+            items = [
+                {name: value for name, value in item.items() if name in keep}
+                for item in items
+            ]
+        return self._page(items, Limit)
+
+    def _page(self, items, limit):
+        limit = min(limit or self.db.page_size, self.db.page_size)
+        page = items[:limit]
+        with self.db._lock:
+            self.db.items_read += len(page)
+        response = {'Items': page, 'Count': len(page)}
+        if len(items) > limit:
+            response['LastEvaluatedKey'] = {
+                name: page[-1][name] for name in self.db.keys_of(self.name)
+            }
+        return response
+
+
+_UPDATE_CLAUSE = re.compile(r'(SET|ADD)\s+(.*?)(?=\s+(?:SET|ADD)\s|$)')
+_KEY_CONDITION = re.compile(
+    r'(\S+) = (:\w+)(?: AND (\S+) BETWEEN (:\w+) AND (:\w+))?'
+)
+
+
+class ValidationException(Exception):
+    """
+    botocore ClientError와 같은 모양의 오류 코드를 가진 검증 오류입니다.
+    """
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.response = {
+            'Error': {'Code': 'ValidationException', 'Message': message}
+        }
+
+
+class ConditionalCheckFailedException(Exception):
+    """
+    조건부 쓰기의 조건이 맞지 않을 때의 botocore ClientError 모양 오류입니다.
+    """
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.response = {
+            'Error': {
+                'Code': 'ConditionalCheckFailedException',
+                'Message': message,
+            }
+        }
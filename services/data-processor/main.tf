@@ -34,6 +34,52 @@ resource "aws_dynamodb_table" "stats_table" {
   stream_view_type = "NEW_AND_OLD_IMAGES" # 변경 전후 데이터를 모두 스트림으로 보냅니다.
 }
 
+# --- DynamoDB Table (Intent Cache) ---
+# 정규화된 질문 해시별 의도 분석 결과를 컨테이너 간에 공유하는 캐시 테이블입니다.
+resource "aws_dynamodb_table" "intent_cache_table" {
+  name         = "ad-scouter-intent-cache"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "questionHash"
+
+  attribute {
+    name = "questionHash"
+    type = "S"
+  }
+
+  # 만료된 캐시 항목은 DynamoDB TTL로 자동 삭제합니다.
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+}
+
+# --- DynamoDB Table (Intent Rollups) ---
+# 고객사별 의도 분포를 시간/일 버킷 카운터로 미리 집계한 테이블입니다. 대시보드는 원시 이벤트 대신 이 테이블을 조회합니다.
+resource "aws_dynamodb_table" "intent_rollup_table" {
+  name         = "ad-scouter-intent-rollups"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "rollupKey" # {customerId}#{hour|day}
+  range_key    = "bucket"    # 버킷 시작 시각 (UTC, 'YYYY-MM-DDTHH' 또는 'YYYY-MM-DD')
+
+  attribute {
+    name = "rollupKey"
+    type = "S"
+  }
+
+  attribute {
+    name = "bucket"
+    type = "S"
+  }
+}
+
+# --- SQS Queue (Kinesis On-Failure Destination) ---
+# 재시도 횟수나 최대 나이를 넘겨 버려지는 레코드의 위치(샤드, 시퀀스 번호 범위)를 남깁니다.
+# 스트림 보존 기간 안에 이 위치로 레코드를 다시 읽어 재처리할 수 있습니다.
+resource "aws_sqs_queue" "processor_failures" {
+  name                      = "ad-scouter-processor-failures"
+  message_retention_seconds = 1209600 # 14일
+}
+
 # --- IAM Role & Policy for Processor Lambda ---
 # 데이터 처리 Lambda가 필요한 AWS 서비스(Kinesis, DynamoDB, CloudWatch)에 접근할 수 있는 권한을 정의합니다.
 resource "aws_iam_role" "processor_lambda_role" {
@@ -71,10 +117,36 @@ resource "aws_iam_policy" "processor_lambda_policy" {
         Effect   = "Allow",
         Action   = [
           "dynamodb:PutItem",
-          "dynamodb:UpdateItem"
+          "dynamodb:UpdateItem",
+          "dynamodb:BatchWriteItem",
+          "dynamodb:BatchGetItem" # 재전달된 이벤트의 처리 여부 확인
         ],
         Resource = aws_dynamodb_table.stats_table.arn # 데이터 저장소
       },
+      {
+        Effect   = "Allow",
+        Action   = [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem",
+          "dynamodb:BatchGetItem",  # 배치의 캐시 조회를 한 번에
+          "dynamodb:BatchWriteItem" # 배치의 분석 결과를 한 번에 저장
+        ],
+        Resource = aws_dynamodb_table.intent_cache_table.arn # 의도 분석 캐시
+      },
+      {
+        Effect   = "Allow",
+        Action   = [
+          "dynamodb:UpdateItem" # 버킷별 카운터 원자적 증가
+        ],
+        Resource = aws_dynamodb_table.intent_rollup_table.arn # 의도 롤업
+      },
+      {
+        Effect   = "Allow",
+        Action   = [
+          "sqs:SendMessage" # 버려지는 레코드 위치 기록
+        ],
+        Resource = aws_sqs_queue.processor_failures.arn
+      },
       {
         Effect   = "Allow",
         Action   = [
@@ -95,6 +167,24 @@ resource "aws_iam_role_policy_attachment" "processor_policy_attachment" {
 }
 
 
+# --- Shared Lambda Layer ---
+# 서비스 간 공용 Python 모듈(services/shared/python)을 Lambda 레이어로 배포합니다.
+# 레이어 zip에는 python/ 최상위 디렉터리가 있어야 하므로 ../shared를 묶되,
+# 벤치마크와 문서는 런타임에 필요 없으므로 제외합니다.
+data "archive_file" "shared_layer_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../shared"
+  excludes    = ["README.md", "benchmarks"]
+  output_path = "${path.module}/dist/shared_layer.zip"
+}
+
+resource "aws_lambda_layer_version" "shared_layer" {
+  layer_name          = "ad-scouter-shared-data-processor"
+  filename            = data.archive_file.shared_layer_zip.output_path
+  source_code_hash    = data.archive_file.shared_layer_zip.output_base64sha256
+  compatible_runtimes = ["python3.11"]
+}
+
 # --- Lambda Function ---
 data "archive_file" "processor_zip" {
   type        = "zip"
@@ -110,13 +200,27 @@ resource "aws_lambda_function" "processor_lambda" {
   
   filename         = data.archive_file.processor_zip.output_path
   source_code_hash = data.archive_file.processor_zip.output_base64sha256
+  layers           = [aws_lambda_layer_version.shared_layer.arn]
 
   timeout = 300 # 5분 타임아웃
 
   environment {
     variables = {
-      STATS_TABLE_NAME = aws_dynamodb_table.stats_table.name
-      GEMINI_API_KEY   = var.gemini_api_key
+      STATS_TABLE_NAME   = aws_dynamodb_table.stats_table.name
+      GEMINI_API_KEY     = var.gemini_api_key
+      INTENT_CONCURRENCY = var.intent_concurrency
+      INTENT_CACHE_TABLE_NAME  = aws_dynamodb_table.intent_cache_table.name
+      INTENT_CACHE_SIZE        = var.intent_cache_size
+      INTENT_CACHE_TTL_SECONDS = var.intent_cache_ttl_seconds
+      INTENT_ROLLUP_TABLE_NAME  = aws_dynamodb_table.intent_rollup_table.name
+      INTENT_ROLLUP_CONCURRENCY = var.intent_rollup_concurrency
+      INTENT_BATCH_TOKEN_BUDGET = var.intent_batch_token_budget
+      FAST_PATH_THRESHOLD       = var.fast_path_threshold
+      FAST_PATH_SHADOW_RATE     = var.fast_path_shadow_rate
+      GEMINI_RATE_LIMIT_PER_SECOND = var.gemini_rate_limit_per_second
+      GEMINI_MAX_CONCURRENCY       = var.gemini_max_concurrency
+      METRICS_ENABLED              = var.metrics_enabled
+      DEBUG_LOG_SAMPLE_RATE        = var.debug_log_sample_rate
     }
   }
 }
@@ -129,12 +233,36 @@ resource "aws_lambda_event_source_mapping" "kinesis_mapping" {
   function_name     = aws_lambda_function.processor_lambda.arn
   starting_position = "LATEST"
   batch_size        = 100 # 한 번에 최대 100개의 레코드를 가져와 처리
+
+  # 실패한 레코드만 batchItemFailures로 보고해 그 레코드부터 다시 전달받습니다.
+  function_response_types = ["ReportBatchItemFailures"]
+  maximum_retry_attempts  = var.kinesis_max_retry_attempts
+  # 함수 오류(타임아웃 등)가 나면 배치를 반으로 나눠 문제 레코드만 재시도 횟수를 쓰게 합니다.
+  bisect_batch_on_function_error = true
+  # 오래된 레코드가 샤드를 계속 막지 않도록, 이 시간이 지나면 재시도를 멈추고 실패 목적지로 보냅니다.
+  maximum_record_age_in_seconds = var.kinesis_max_record_age_seconds
+
+  # 재시도 후에도 실패한 레코드는 버리기 전에 위치를 SQS에 남깁니다.
+  destination_config {
+    on_failure {
+      destination_arn = aws_sqs_queue.processor_failures.arn
+    }
+  }
 }
 
 output "dynamodb_table_name" {
   value = aws_dynamodb_table.stats_table.name
 }
 
+output "processor_failures_queue_url" {
+  description = "SQS queue that records Kinesis batches discarded after retries."
+  value       = aws_sqs_queue.processor_failures.id
+}
+
+output "intent_rollup_table_name" {
+  value = aws_dynamodb_table.intent_rollup_table.name
+}
+
 output "dynamodb_stream_arn" {
   description = "The ARN of the DynamoDB stream."
   value       = aws_dynamodb_table.stats_table.stream_arn
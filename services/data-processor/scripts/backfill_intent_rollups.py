@@ -0,0 +1,90 @@
+"""
+통계 테이블에 이미 저장된 원시 이벤트로 의도 롤업 테이블을 다시 만듭니다.
+
+처리기가 롤업을 갱신하기 전의 과거 이벤트를 채우거나, 갱신 실패(rollup_failures 지표)로 어긋난 카운트를 바로잡을 때 씁니다.
+--before 이전에 끝난 버킷만 절대값으로 덮어쓰므로 같은 값으로 여러 번 실행해도 결과가 같고,
+처리기가 아직 카운터를 더하고 있는 버킷(기본값: 오늘 UTC)은 건드리지 않습니다.
+
+사용법:
+    python scripts/backfill_intent_rollups.py --stats-table ad-scouter-stats
+        --rollup-table ad-scouter-intent-rollups
+    python scripts/backfill_intent_rollups.py --before 2025-08-25T00:00:00Z
+        --segments 8
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, '..', 'src'))
+# Lambda 레이어로 배포되는 공용 모듈 (services/shared/python)
+sys.path.insert(0, os.path.join(BASE_DIR, '..', '..', 'shared', 'python'))
+
+from intent_rollups import (  # noqa: E402
+    backfill_rollups,
+    floor_to,
+    parse_timestamp,
+)
+from lazy_clients import get_boto3_resource  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--stats-table',
+        default=os.environ.get('STATS_TABLE_NAME', 'ad-scouter-stats'),
+    )
+    parser.add_argument(
+        '--rollup-table',
+        default=os.environ.get(
+            'INTENT_ROLLUP_TABLE_NAME', 'ad-scouter-intent-rollups'
+        ),
+    )
+    parser.add_argument(
+        '--before',
+        help=(
+            '이 시각 이전에 끝난 버킷만 씁니다 (ISO 8601, 기본값: 오늘 0시 UTC)'
+        ),
+    )
+    parser.add_argument(
+        '--segments', type=int, default=4, help='병렬 스캔 세그먼트 수'
+    )
+    args = parser.parse_args()
+
+    before = floor_to(datetime.now(timezone.utc), 'day')
+    if args.before:
+        try:
+            datetime.fromisoformat(args.before.replace('Z', '+00:00'))
+        except ValueError:
+            parser.error(
+                f"--before must be an ISO 8601 timestamp: {args.before}"
+            )
+        before = parse_timestamp(args.before)
+
+    started = time.perf_counter()
+    scanned, buckets, failures = backfill_rollups(
+        get_boto3_resource('dynamodb'),
+        args.stats_table,
+        args.rollup_table,
+        before,
+        segments=args.segments,
+    )
+    print(
+        f"Scanned {scanned} events from {args.stats_table}, wrote"
+        f" {buckets - len(failures)}/{buckets} buckets before"
+        f" {before.isoformat()} to {args.rollup_table} in"
+        f" {time.perf_counter() - started:.1f}s"
+    )
+    for index, reason in failures:
+        print(f"Failed to write bucket #{index}: {reason}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
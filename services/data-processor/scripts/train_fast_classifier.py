@@ -0,0 +1,64 @@
+"""
+LLM이 분류한 질문으로 빠른 의도 분류기의 문자 n-gram 모델을 학습해 압축 파일로 저장합니다.
+
+사용법:
+    # {"question": "...", "intent": "구매 고려"} 형식의 JSONL (예: 통계 테이블의
+    # originalQuestion/intent 내보내기)
+    python scripts/train_fast_classifier.py --input data/intent_seed.jsonl
+        --output src/fast_intent_model.json.gz
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+)
+
+from fast_classifier import (  # noqa: E402
+    DEFAULT_MODEL_PATH,
+    save_model,
+    train_ngram_model,
+)
+
+# LLM 결과 중 학습에 쓰지 않는 레이블
+EXCLUDED_INTENTS = {'분석 실패'}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--input', required=True)
+    parser.add_argument('--output', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--min-count', type=int, default=1)
+    parser.add_argument(
+        '--max-features', type=int, default=2000, help='의도별 최대 n-gram 수'
+    )
+    args = parser.parse_args()
+
+    examples = []
+    with open(args.input, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                if row['intent'] not in EXCLUDED_INTENTS:
+                    examples.append((row['question'], row['intent']))
+
+    model = train_ngram_model(
+        examples,
+        min_count=args.min_count,
+        max_features_per_label=args.max_features,
+    )
+    save_model(model, args.output)
+    print(
+        f"Trained on {len(examples)} examples, {model['vocabulary_size']}"
+        f" n-grams -> {args.output} ({os.path.getsize(args.output)} bytes)"
+    )
+
+
+if __name__ == '__main__':
+    main()
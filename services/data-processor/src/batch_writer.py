@@ -0,0 +1,265 @@
+import random
+import time
+
+# DynamoDB BatchWriteItem 한 번에 쓸 수 있는 최대 항목 수
+MAX_BATCH_SIZE = 25
+
+# 재시도하면 성공할 수 있는 오류 코드 (그 외 오류는 항목 자체의 문제로 봅니다)
+RETRYABLE_ERROR_CODES = {
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'InternalServerError',
+    'ServiceUnavailable',
+}
+
+
+def _error_code(error):
+    return (
+        getattr(error, 'response', {})
+        .get('Error', {})
+        .get('Code', type(error).__name__)
+    )
+
+
+def _backoff_delay(attempt, base_delay, max_delay):
+    """
+    지수 백오프에 full jitter를 적용한 대기 시간을 반환합니다.
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2**attempt)))
+
+
+def batch_write_items(
+    dynamodb,
+    table_name,
+    items,
+    key_names,
+    max_attempts=6,
+    base_delay=0.05,
+    max_delay=2.0,
+    sleep=time.sleep,
+):
+    """
+    항목들을 25개씩 나눠 BatchWriteItem으로 저장합니다.
+    처리되지 않은 항목(UnprocessedItems)과 일시적 오류는 지수 백오프 + jitter로 재시도하고,
+    끝내 저장하지 못한 항목은 [(items 내 인덱스, 사유)] 리스트로 반환합니다.
+
+    dynamodb는 batch_write_item을 제공하는 boto3 DynamoDB 리소스(또는 로컬 대체 구현)입니다.
+    """
+    failures = []
+    for start in range(0, len(items), MAX_BATCH_SIZE):
+        chunk = list(enumerate(items[start:start + MAX_BATCH_SIZE], start))
+        failures.extend(
+            _write_chunk(
+                dynamodb,
+                table_name,
+                chunk,
+                key_names,
+                max_attempts,
+                base_delay,
+                max_delay,
+                sleep,
+            )
+        )
+    return sorted(failures)
+
+
+def _write_chunk(
+    dynamodb,
+    table_name,
+    chunk,
+    key_names,
+    max_attempts,
+    base_delay,
+    max_delay,
+    sleep,
+):
+    def key_of(item):
+        return tuple(item.get(name) for name in key_names)
+
+    pending = {key_of(item): index for index, item in chunk}
+    items_by_index = dict(chunk)
+    requests = [{'PutRequest': {'Item': item}} for _, item in chunk]
+
+    for attempt in range(max_attempts):
+        try:
+            response = dynamodb.batch_write_item(
+                RequestItems={table_name: requests}
+            )
+        except Exception as e:
+            code = _error_code(e)
+            if code not in RETRYABLE_ERROR_CODES:
+                if len(requests) == 1:
+                    return [(index, code) for index in pending.values()]
+                # 잘못된 항목 하나 때문에 묶음 전체가 거부되므로 항목별로 나눠 원인 항목만 실패 처리합니다.
+                failures = []
+                for index in pending.values():
+                    failures.extend(
+                        _write_chunk(
+                            dynamodb,
+                            table_name,
+                            [(index, items_by_index[index])],
+                            key_names,
+                            max_attempts,
+                            base_delay,
+                            max_delay,
+                            sleep,
+                        )
+                    )
+                return failures
+            sleep(_backoff_delay(attempt, base_delay, max_delay))
+            continue
+
+        requests = response.get('UnprocessedItems', {}).get(table_name, [])
+        if not requests:
+            return []
+        unprocessed_keys = {
+            key_of(request['PutRequest']['Item']) for request in requests
+        }
+        pending = {
+            key: index
+            for key, index in pending.items()
+            if key in unprocessed_keys
+        }
+        sleep(_backoff_delay(attempt, base_delay, max_delay))
+
+    return [(index, 'UnprocessedAfterRetries') for index in pending.values()]
+
+
+# DynamoDB BatchGetItem 한 번에 읽을 수 있는 최대 키 수
+MAX_BATCH_GET_SIZE = 100
+
+
+class UnconfirmedKeysError(Exception):
+    """
+    재시도 후에도 BatchGetItem으로 확인하지 못한 키가 남았을 때 발생합니다.
+    """
+
+    def __init__(self, table_name, count, reason):
+        super().__init__(
+            f"{count} key(s) in {table_name} unconfirmed after retries: "
+            f"{reason}"
+        )
+        self.count = count
+        self.reason = reason
+
+
+def batch_get_items(
+    dynamodb,
+    table_name,
+    keys,
+    key_names,
+    attribute_names=None,
+    max_attempts=6,
+    base_delay=0.05,
+    max_delay=2.0,
+    sleep=time.sleep,
+):
+    """
+    keys(key_names 순서의 튜플)에 해당하는 항목을 {키 튜플: 항목} dict로 반환합니다. 없는 키는 빠집니다.
+    100개씩 BatchGetItem으로 attribute_names 속성만(없으면 키 속성만) 읽고,
+    처리되지 않은 키(UnprocessedKeys)와 일시적 오류는 지수 백오프 + jitter로 재시도합니다.
+    재시도 후에도 확인하지 못한 키가 남으면 없는 것으로 보지 않고 UnconfirmedKeysError를 올립니다.
+    재시도할 수 없는 오류는 그대로 올립니다.
+    """
+    attribute_names = list(dict.fromkeys(attribute_names or key_names))
+    names = {f'#k{i}': name for i, name in enumerate(attribute_names)}
+    projection = ', '.join(names)
+    found = {}
+    keys = list(dict.fromkeys(keys))
+    for start in range(0, len(keys), MAX_BATCH_GET_SIZE):
+        request = {
+            'Keys': [
+                dict(zip(key_names, key))
+                for key in keys[start:start + MAX_BATCH_GET_SIZE]
+            ],
+            'ProjectionExpression': projection,
+            'ExpressionAttributeNames': names,
+        }
+        reason = None
+        for attempt in range(max_attempts):
+            try:
+                response = dynamodb.batch_get_item(
+                    RequestItems={table_name: request}
+                )
+            except Exception as e:
+                reason = _error_code(e)
+                if reason not in RETRYABLE_ERROR_CODES:
+                    raise
+                sleep(_backoff_delay(attempt, base_delay, max_delay))
+                continue
+            for item in response.get('Responses', {}).get(table_name, []):
+                found[tuple(item.get(name) for name in key_names)] = item
+            unprocessed = response.get('UnprocessedKeys', {}).get(table_name)
+            if not unprocessed or not unprocessed.get('Keys'):
+                break
+            request = dict(request, Keys=unprocessed['Keys'])
+            reason = 'UnprocessedKeys'
+            sleep(_backoff_delay(attempt, base_delay, max_delay))
+        else:
+            raise UnconfirmedKeysError(
+                table_name, len(request['Keys']), reason
+            )
+    return found
+
+
+def batch_get_existing_keys(dynamodb, table_name, keys, key_names, **kwargs):
+    """
+    keys(key_names 순서의 튜플) 중 테이블에 이미 있는 키의 집합을 반환합니다.
+    batch_get_items로 키 속성만 읽으며, 확인하지 못한 키가 남으면 UnconfirmedKeysError를 올립니다.
+    """
+    return set(
+        batch_get_items(dynamodb, table_name, keys, key_names, **kwargs)
+    )
+
+
+def put_new_items(
+    dynamodb,
+    table_name,
+    items,
+    key_names,
+    max_attempts=6,
+    base_delay=0.05,
+    max_delay=2.0,
+    sleep=time.sleep,
+):
+    """
+    항목마다 조건부 PutItem(attribute_not_exists)으로 저장해, 테이블에 없던 항목만 새로 씁니다.
+    BatchWriteItem은 조건을 지원하지 않으므로, 처리 여부를 미리 확인하지 못했을 때 씁니다.
+    반환값: (저장하지 못한 [(items 내 인덱스, 사유)], 이미 있던 항목의 인덱스 리스트)
+    """
+    table = dynamodb.Table(table_name)
+    names = {f'#k{i}': name for i, name in enumerate(key_names)}
+    condition = ' AND '.join(f'attribute_not_exists({name})' for name in names)
+    failures = []
+    existing = []
+    for index, item in enumerate(items):
+        for attempt in range(max_attempts):
+            try:
+                table.put_item(
+                    Item=item,
+                    ConditionExpression=condition,
+                    ExpressionAttributeNames=names,
+                )
+                break
+            except Exception as e:
+                code = _error_code(e)
+                if code == 'ConditionalCheckFailedException':
+                    existing.append(index)
+                    break
+                if code not in RETRYABLE_ERROR_CODES:
+                    failures.append((index, code))
+                    break
+                sleep(_backoff_delay(attempt, base_delay, max_delay))
+        else:
+            failures.append((index, 'UnprocessedAfterRetries'))
+    return failures, existing
+
+
+def is_retryable_failure(reason):
+    """
+    batch_write_items가 반환한 실패 사유가 다시 시도하면 성공할 수 있는 것인지 반환합니다.
+    """
+    return (
+        reason == 'UnprocessedAfterRetries' or reason in RETRYABLE_ERROR_CODES
+    )
@@ -0,0 +1,196 @@
+import gzip
+import json
+import math
+import os
+import re
+import unicodedata
+
+# 함께 배포되는 기본 n-gram 모델 파일
+DEFAULT_MODEL_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'fast_intent_model.json.gz'
+)
+
+# --- 한국어 키워드 규칙 ---
+# (의도, 패턴, 신뢰도). 한 의도의 규칙만 맞으면 해당 신뢰도로 판정합니다.
+# 키워드 하나로는 오분류가 잦으므로('얼마나 걸리나요', '고마워요 그런데 환불은?') 규칙 신뢰도는
+# 기본 임계값(0.9)보다 낮게 두고, 모델과 의도가 일치할 때만 임계값을 넘도록 합칩니다.
+KEYWORD_RULES = [
+    (
+        '구매 고려',
+        re.compile(
+            r'가격|얼마(?!나)|구매|결제|견적|할인|요금|구독|비용|살 수|사려고|사면'
+        ),
+        0.75,
+    ),
+    (
+        '단순 대화',
+        re.compile(
+            r'^(안녕|반가|고마|감사|수고|좋은 하루|잘 ?자|하이|ㅎㅎ|ㅋㅋ)'
+        ),
+        0.75,
+    ),
+    (
+        '기능 문의',
+        re.compile(
+            r'기능|지원(하나요|되나요|돼요|해요)|설정|연동'
+            r'|(?<!어떻게 )되나요\??$|가능한가요\??$'
+        ),
+        0.7,
+    ),
+]
+SMALL_TALK_MAX_LENGTH = 20
+# 인사로 시작해도 질문이 이어지면 '단순 대화' 규칙을 적용하지 않습니다.
+SMALL_TALK_EXCLUDE = re.compile(r'\?|그런데|근데|혹시|그리고|궁금|문의')
+
+# 나이브 베이즈는 n-gram 수가 많을수록 과신하므로, n-gram당 평균 로그 우도에 이 값을 곱해 신뢰도를 보정합니다.
+DEFAULT_SHARPNESS = 8.0
+
+
+def normalize(text):
+    """
+    n-gram 추출을 위해 텍스트를 정규화합니다.
+    """
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def char_ngrams(text, orders=(1, 2, 3)):
+    """
+    문장 경계 표시를 붙인 문자 n-gram 목록을 반환합니다.
+    """
+    padded = f"^{normalize(text)}$"
+    return [
+        padded[i:i + n] for n in orders for i in range(len(padded) - n + 1)
+    ]
+
+
+def train_ngram_model(
+    examples, orders=(1, 2, 3), min_count=2, max_features_per_label=2000
+):
+    """
+    (질문, 의도) 예시로 문자 n-gram 나이브 베이즈 모델을 학습해 직렬화 가능한 dict로 반환합니다.
+    빈도가 낮은 n-gram은 모델 파일을 작게 유지하기 위해 제외합니다.
+    """
+    counts = {}
+    documents = {}
+    for question, intent in examples:
+        documents[intent] = documents.get(intent, 0) + 1
+        label_counts = counts.setdefault(intent, {})
+        for gram in char_ngrams(question, orders):
+            label_counts[gram] = label_counts.get(gram, 0) + 1
+
+    model = {
+        'orders': list(orders),
+        'sharpness': DEFAULT_SHARPNESS,
+        'documents': documents,
+        'counts': {},
+        'totals': {},
+    }
+    vocabulary = set()
+    for intent, label_counts in counts.items():
+        kept = sorted(
+            (
+                (gram, count)
+                for gram, count in label_counts.items()
+                if count >= min_count
+            ),
+            key=lambda entry: (-entry[1], entry[0]),
+        )[:max_features_per_label]
+        model['counts'][intent] = dict(kept)
+        model['totals'][intent] = sum(label_counts.values())
+        vocabulary.update(gram for gram, _ in kept)
+    model['vocabulary_size'] = len(vocabulary)
+    return model
+
+
+def save_model(model, path):
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(model, f, ensure_ascii=False, separators=(',', ':'))
+
+
+class FastIntentClassifier:
+    """
+    LLM 호출 전에 사용하는 경량 의도 분류기입니다.
+    키워드 규칙과 문자 n-gram 나이브 베이즈 모델로 (의도, 신뢰도)를 반환합니다.
+    """
+
+    def __init__(self, model=None, rules=KEYWORD_RULES):
+        self.model = model
+        self.rules = rules
+
+    @classmethod
+    def load(cls, path=DEFAULT_MODEL_PATH):
+        """
+        압축된 모델 파일을 불러옵니다. 파일이 없으면 키워드 규칙만 사용합니다.
+        """
+        if not path or not os.path.exists(path):
+            print(
+                f"Fast intent model not found at {path}. Using keyword rules"
+                " only."
+            )
+            return cls()
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _rule_prediction(self, text):
+        normalized = normalize(text)
+        matches = {}
+        for intent, pattern, confidence in self.rules:
+            if intent == '단순 대화' and (
+                len(normalized) > SMALL_TALK_MAX_LENGTH
+                or SMALL_TALK_EXCLUDE.search(normalized)
+            ):
+                continue
+            if pattern.search(normalized):
+                matches[intent] = max(confidence, matches.get(intent, 0.0))
+        if len(matches) != 1:
+            # 규칙이 하나도 맞지 않거나 여러 의도가 겹치면 규칙으로 판정하지 않습니다.
+            return None, 0.0
+        return next(iter(matches.items()))
+
+    def _model_prediction(self, text):
+        if not self.model or not self.model['counts']:
+            return None, 0.0
+
+        grams = char_ngrams(text, self.model['orders'])
+        total_documents = sum(self.model['documents'].values())
+        vocabulary_size = self.model['vocabulary_size'] + 1
+        sharpness = self.model.get('sharpness', DEFAULT_SHARPNESS)
+        log_scores = {}
+        for intent, label_counts in self.model['counts'].items():
+            # 라플라스 스무딩을 적용한 다항 나이브 베이즈 로그 우도 (n-gram당 평균으로 보정)
+            denominator = math.log(
+                self.model['totals'][intent] + vocabulary_size
+            )
+            likelihood = sum(
+                math.log(label_counts.get(gram, 0) + 1) - denominator
+                for gram in grams
+            )
+            log_scores[intent] = math.log(
+                self.model['documents'][intent] / total_documents
+            ) + sharpness * likelihood / len(grams)
+
+        best = max(log_scores, key=log_scores.get)
+        normalizer = sum(
+            math.exp(score - log_scores[best]) for score in log_scores.values()
+        )
+        return best, 1.0 / normalizer
+
+    def predict(self, text):
+        """
+        (의도, 신뢰도)를 반환합니다. 판단할 근거가 없으면 (None, 0.0)입니다.
+        """
+        rule_intent, rule_confidence = self._rule_prediction(text)
+        model_intent, model_confidence = self._model_prediction(text)
+
+        if rule_intent and model_intent == rule_intent:
+            # 규칙과 모델이 일치하면 두 근거를 합칩니다. (둘 중 하나만으로는 틀릴 확률을 서로 줄임)
+            return rule_intent, 1.0 - (1.0 - rule_confidence) * (
+                1.0 - model_confidence
+            )
+        if rule_intent and model_intent:
+            # 서로 다르면 규칙을 따르되 신뢰도를 낮춰 LLM 분석으로 넘어가기 쉽게 합니다.
+            return rule_intent, rule_confidence * (1.0 - model_confidence / 2)
+        if rule_intent:
+            return rule_intent, rule_confidence
+        return model_intent, model_confidence
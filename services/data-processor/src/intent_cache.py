@@ -0,0 +1,331 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from batch_writer import batch_get_items, batch_write_items
+
+# 질문 정규화/해시 규칙은 scouter와 공유합니다. (shared 레이어, 기존 import 경로 유지)
+from question_keys import normalize_question, question_key  # noqa: F401
+
+# 분석 실패 결과는 일시적인 오류일 수 있으므로 절대 캐시하지 않습니다.
+FAILED_INTENT = "분석 실패"
+
+# SQLite 한 문장에 넣는 최대 바인딩 변수 수
+SQLITE_MAX_VARIABLES = 500
+
+
+class LRUTTLCache:
+    """
+    크기 제한(LRU)과 만료 시간(TTL)을 가진 스레드 안전 인메모리 캐시입니다.
+    """
+
+    def __init__(self, maxsize=10000, ttl_seconds=86400, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl_seconds=None):
+        expires_at = self.clock() + (ttl_seconds or self.ttl_seconds)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+
+class SQLiteIntentStore:
+    """
+    공유 캐시 계층의 로컬 대체 구현입니다. 테스트/로컬 개발에서 DynamoDB 대신 사용합니다.
+    """
+
+    def __init__(self, path=':memory:', clock=time.time):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS intent_cache (question_hash TEXT"
+            " PRIMARY KEY, intent TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT intent FROM intent_cache WHERE question_hash = ? AND"
+                " expires_at > ?",
+                (key, self.clock()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            now = self.clock()
+            for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                chunk = keys[start:start + SQLITE_MAX_VARIABLES]
+                found.update(
+                    self._conn.execute(
+                        "SELECT question_hash, intent FROM intent_cache WHERE"
+                        f" question_hash IN ({', '.join('?' * len(chunk))})"
+                        " AND expires_at > ?",
+                        (*chunk, now),
+                    ).fetchall()
+                )
+        return found
+
+    def put(self, key, intent, ttl_seconds):
+        self.put_many({key: intent}, ttl_seconds)
+
+    def put_many(self, intents, ttl_seconds):
+        with self._lock:
+            expires_at = self.clock() + ttl_seconds
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO intent_cache (question_hash, intent,"
+                " expires_at) VALUES (?, ?, ?)",
+                [(key, intent, expires_at) for key, intent in intents.items()],
+            )
+            self._conn.commit()
+
+
+class DynamoDBIntentStore:
+    """
+    여러 Lambda 컨테이너가 공유하는 DynamoDB 캐시 계층입니다.
+    만료된 항목은 테이블의 TTL(expiresAt)로 삭제되며, 삭제 전이라도 조회 시 만료 여부를 확인합니다.
+    get_many/put_many는 BatchGetItem(100개)/BatchWriteItem(25개) 단위로 묶어 읽고 씁니다.
+    """
+
+    KEY_NAMES = ('questionHash',)
+
+    def __init__(
+        self, table_name, dynamodb=None, dynamodb_factory=None, clock=time.time
+    ):
+        self.table_name = table_name
+        self.clock = clock
+        self._dynamodb = dynamodb
+        self._dynamodb_factory = dynamodb_factory
+        self._table = None
+
+    @property
+    def dynamodb(self):
+        # 리소스는 첫 조회/저장 시점에 만들어 콜드 스타트 비용을 줄입니다.
+        if self._dynamodb is None:
+            if self._dynamodb_factory is not None:
+                self._dynamodb = self._dynamodb_factory()
+            if self._dynamodb is None:
+                import boto3
+
+                self._dynamodb = boto3.resource('dynamodb')
+        return self._dynamodb
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = self.dynamodb.Table(self.table_name)
+        return self._table
+
+    def get(self, key):
+        item = self.table.get_item(Key={'questionHash': key}).get('Item')
+        if not item or int(item.get('expiresAt', 0)) <= self.clock():
+            return None
+        return item.get('intent')
+
+    def get_many(self, keys):
+        items = batch_get_items(
+            self.dynamodb,
+            self.table_name,
+            [(key,) for key in keys],
+            self.KEY_NAMES,
+            attribute_names=('questionHash', 'intent', 'expiresAt'),
+        )
+        now = self.clock()
+        return {
+            key: item.get('intent')
+            for (key,), item in items.items()
+            if int(item.get('expiresAt', 0)) > now
+        }
+
+    def put(self, key, intent, ttl_seconds):
+        self.table.put_item(
+            Item={
+                'questionHash': key,
+                'intent': intent,
+                'expiresAt': int(self.clock() + ttl_seconds),
+            }
+        )
+
+    def put_many(self, intents, ttl_seconds):
+        """
+        끝내 저장하지 못한 항목이 있으면 RuntimeError를 올립니다.
+        """
+        expires_at = int(self.clock() + ttl_seconds)
+        failures = batch_write_items(
+            self.dynamodb,
+            self.table_name,
+            [
+                {
+                    'questionHash': key,
+                    'intent': intent,
+                    'expiresAt': expires_at,
+                }
+                for key, intent in intents.items()
+            ],
+            self.KEY_NAMES,
+        )
+        if failures:
+            raise RuntimeError(
+                f"{len(failures)} intent(s) not written: {failures[0][1]}"
+            )
+
+
+class IntentCache:
+    """
+    인메모리 LRU+TTL 계층과 선택적인 공유 계층(DynamoDB/SQLite)으로 구성된 의도 분석 캐시입니다.
+    공유 계층 오류는 캐시 미스로 취급해 분석 자체는 계속 진행합니다.
+    """
+
+    def __init__(self, local=None, shared=None, ttl_seconds=86400):
+        self.local = local or LRUTTLCache(ttl_seconds=ttl_seconds)
+        self.shared = shared
+        self.ttl_seconds = ttl_seconds
+        self._counters = {
+            'local_hits': 0,
+            'shared_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'shared_errors': 0,
+        }
+        self._lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def get(self, key):
+        intent = self.local.get(key)
+        if intent is not None:
+            self._count('local_hits')
+            return intent
+
+        if self.shared is not None:
+            try:
+                intent = self.shared.get(key)
+            except Exception as e:
+                print(f"Error reading shared intent cache: {e}")
+                self._count('shared_errors')
+                intent = None
+            if intent is not None:
+                self._count('shared_hits')
+                self.local.set(key, intent)
+                return intent
+
+        self._count('misses')
+        return None
+
+    def put(self, key, intent):
+        if not intent or intent == FAILED_INTENT:
+            return
+        self.local.set(key, intent)
+        self._count('stores')
+        if self.shared is not None:
+            try:
+                self.shared.put(key, intent, self.ttl_seconds)
+            except Exception as e:
+                print(f"Error writing shared intent cache: {e}")
+                self._count('shared_errors')
+
+    def get_many(self, keys):
+        """
+        여러 키를 한 번에 조회해 {키: 의도} dict로 반환합니다. (캐시 미스인 키는 빠집니다)
+        인메모리 계층에 없는 키만 모아 공유 계층에서 한 번에 읽습니다.
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        remaining = []
+        for key in keys:
+            intent = self.local.get(key)
+            if intent is not None:
+                found[key] = intent
+            else:
+                remaining.append(key)
+        local_hits = len(found)
+        self._count('local_hits', local_hits)
+
+        if self.shared is not None and remaining:
+            try:
+                shared = self.shared.get_many(remaining)
+            except Exception as e:
+                print(f"Error reading shared intent cache: {e}")
+                self._count('shared_errors')
+                shared = {}
+            for key, intent in shared.items():
+                if intent is not None:
+                    self.local.set(key, intent)
+                    found[key] = intent
+            self._count('shared_hits', len(found) - local_hits)
+
+        self._count('misses', len(keys) - len(found))
+        return found
+
+    def put_many(self, intents):
+        """
+        {키: 의도}를 한 번에 저장합니다. 실패 결과는 저장하지 않습니다.
+        """
+        intents = {
+            key: intent
+            for key, intent in intents.items()
+            if intent and intent != FAILED_INTENT
+        }
+        if not intents:
+            return
+        for key, intent in intents.items():
+            self.local.set(key, intent)
+        self._count('stores', len(intents))
+        if self.shared is not None:
+            try:
+                self.shared.put_many(intents, self.ttl_seconds)
+            except Exception as e:
+                print(f"Error writing shared intent cache: {e}")
+                self._count('shared_errors')
+
+    def get_or_classify(self, question, classify):
+        """
+        캐시에 있으면 캐시된 의도를, 없으면 classify(question) 결과를 저장 후 반환합니다.
+        """
+        key = question_key(question)
+        intent = self.get(key)
+        if intent is None:
+            intent = classify(question)
+            self.put(key, intent)
+        return intent
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['hits'] = stats['local_hits'] + stats['shared_hits']
+        stats['evictions'] = self.local.evictions
+        stats['expirations'] = self.local.expirations
+        stats['size'] = len(self.local)
+        return stats
@@ -0,0 +1,377 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from batch_writer import (
+    RETRYABLE_ERROR_CODES,
+    _backoff_delay,
+    _error_code,
+    batch_write_items,
+)
+
+# 롤업 테이블의 기본 키 (파티션 키 '{customerId}#{단위}', 정렬 키 버킷 시작 시각)
+ROLLUP_TABLE_KEYS = ('rollupKey', 'bucket')
+# 시간(UTC) 단위 버킷과 일 단위 버킷의 정렬 키 형식 (문자열 순서가 시간 순서와 같습니다)
+GRANULARITY_FORMATS = {
+    'hour': '%Y-%m-%dT%H',
+    'day': '%Y-%m-%d',
+}
+GRANULARITY_STEPS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+# 의도별 카운터 속성 이름 앞에 붙는 접두사 (예: 'intent#구매 고려')
+INTENT_ATTRIBUTE_PREFIX = 'intent#'
+TOTAL_ATTRIBUTE = 'total'
+
+
+def parse_timestamp(value, default=None):
+    """
+    이벤트의 ISO 8601 timestamp를 UTC datetime으로 바꿉니다.
+    없거나 읽을 수 없으면 default(없으면 현재 시각)입니다.
+    """
+    if isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            parsed = None
+        if parsed is not None:
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.astimezone(timezone.utc)
+    return default or datetime.now(timezone.utc)
+
+
+def floor_to(moment, granularity):
+    if granularity == 'day':
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def bucket_name(moment, granularity):
+    return moment.strftime(GRANULARITY_FORMATS[granularity])
+
+
+def rollup_key(customer_id, granularity):
+    return f"{customer_id}#{granularity}"
+
+
+class RollupAccumulator:
+    """
+    배치 안의 이벤트를 (고객사, 단위, 버킷)별 의도 카운트로 메모리에서 합칩니다.
+    이벤트마다 테이블에 쓰지 않고, 배치가 끝나면 버킷 하나당 한 번만 갱신합니다.
+    """
+
+    def __init__(self, granularities=('hour', 'day')):
+        self.granularities = granularities
+        self._counts = {}
+
+    def add(self, customer_id, intent, timestamp=None, count=1):
+        moment = (
+            timestamp
+            if isinstance(timestamp, datetime)
+            else parse_timestamp(timestamp)
+        )
+        for granularity in self.granularities:
+            key = (customer_id, granularity, bucket_name(moment, granularity))
+            intents = self._counts.setdefault(key, {})
+            intents[intent] = intents.get(intent, 0) + count
+
+    def merge(self, other):
+        for key, intents in other._counts.items():
+            counts = self._counts.setdefault(key, {})
+            for intent, count in intents.items():
+                counts[intent] = counts.get(intent, 0) + count
+
+    def __len__(self):
+        return len(self._counts)
+
+    def updates(self):
+        """
+        [((고객사, 단위, 버킷), {의도: 카운트})] 리스트를 반환합니다.
+        """
+        return list(self._counts.items())
+
+    def items(self):
+        """
+        합친 카운트를 절대값 항목(PutRequest용)으로 반환합니다. 백필에서 사용합니다.
+        """
+        return [
+            _rollup_item(customer_id, granularity, bucket, intents)
+            for (
+                customer_id,
+                granularity,
+                bucket,
+            ), intents in self._counts.items()
+        ]
+
+
+def _rollup_item(customer_id, granularity, bucket, intents):
+    item = {
+        'rollupKey': rollup_key(customer_id, granularity),
+        'bucket': bucket,
+        'customerId': customer_id,
+        'granularity': granularity,
+        TOTAL_ATTRIBUTE: sum(intents.values()),
+    }
+    for intent, count in intents.items():
+        item[INTENT_ATTRIBUTE_PREFIX + intent] = count
+    return item
+
+
+def build_update(customer_id, granularity, bucket, intents):
+    """
+    버킷 하나의 카운터를 원자적으로 더하는 update_item 인자를 만듭니다.
+    항목이 없으면 DynamoDB가 ADD로 0에서 시작해 만듭니다.
+    """
+    names = {
+        '#customer': 'customerId',
+        '#granularity': 'granularity',
+        '#total': TOTAL_ATTRIBUTE,
+    }
+    values = {
+        ':customer': customer_id,
+        ':granularity': granularity,
+        ':total': sum(intents.values()),
+    }
+    additions = ['#total :total']
+    for index, (intent, count) in enumerate(sorted(intents.items())):
+        names[f'#i{index}'] = INTENT_ATTRIBUTE_PREFIX + intent
+        values[f':c{index}'] = count
+        additions.append(f'#i{index} :c{index}')
+    return {
+        'Key': {
+            'rollupKey': rollup_key(customer_id, granularity),
+            'bucket': bucket,
+        },
+        'UpdateExpression': (
+            'SET #customer = :customer, #granularity = :granularity ADD '
+            + ', '.join(additions)
+        ),
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values,
+    }
+
+
+def apply_rollup_updates(
+    table,
+    updates,
+    concurrency=1,
+    max_attempts=6,
+    base_delay=0.05,
+    max_delay=2.0,
+    sleep=time.sleep,
+):
+    """
+    RollupAccumulator.updates()의 버킷마다 update_item을 한 번 보냅니다.
+    일시적 오류는 지수 백오프 + jitter로 재시도하고, 끝내 갱신하지 못한 버킷은
+    [((고객사, 단위, 버킷), 사유)] 리스트로 반환합니다.
+
+    table은 update_item을 제공하는 boto3 DynamoDB Table(또는 로컬 대체 구현)입니다.
+    """
+
+    def apply(update):
+        key, intents = update
+        request = build_update(*key, intents)
+        for attempt in range(max_attempts):
+            try:
+                table.update_item(**request)
+                return None
+            except Exception as e:
+                code = _error_code(e)
+                if code not in RETRYABLE_ERROR_CODES:
+                    return key, code
+                sleep(_backoff_delay(attempt, base_delay, max_delay))
+        return key, 'UpdateFailedAfterRetries'
+
+    concurrency = min(concurrency, len(updates))
+    if concurrency <= 1:
+        results = [apply(update) for update in updates]
+    else:
+        # 버킷 갱신은 서로 독립적이고 네트워크 대기가 대부분이므로 스레드로 동시에 보냅니다.
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(apply, updates))
+    return [result for result in results if result is not None]
+
+
+def _query_buckets(table, customer_id, granularity, first, last):
+    """
+    한 고객사의 단위별 버킷 중 [first, last] 범위(양 끝 포함)의 항목을 모두 읽습니다.
+    """
+    request = {
+        'KeyConditionExpression': (
+            '#pk = :pk AND #bucket BETWEEN :first AND :last'
+        ),
+        'ExpressionAttributeNames': {'#pk': 'rollupKey', '#bucket': 'bucket'},
+        'ExpressionAttributeValues': {
+            ':pk': rollup_key(customer_id, granularity),
+            ':first': bucket_name(first, granularity),
+            ':last': bucket_name(last, granularity),
+        },
+    }
+    items = []
+    while True:
+        response = table.query(**request)
+        items.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return items
+        request['ExclusiveStartKey'] = last_key
+
+
+def _query_range(table, customer_id, granularity, start, end):
+    """
+    [start, end) 범위(단위 경계에 맞춘 값)의 버킷 항목을 읽습니다.
+    """
+    if start >= end:
+        return []
+    return _query_buckets(
+        table,
+        customer_id,
+        granularity,
+        start,
+        end - GRANULARITY_STEPS[granularity],
+    )
+
+
+def _ceil_to(moment, granularity):
+    floored = floor_to(moment, granularity)
+    return (
+        floored
+        if floored == moment
+        else floored + GRANULARITY_STEPS[granularity]
+    )
+
+
+def _sum_intents(items):
+    intents = {}
+    total = 0
+    for item in items:
+        total += int(item.get(TOTAL_ATTRIBUTE, 0))
+        for name, value in item.items():
+            if name.startswith(INTENT_ATTRIBUTE_PREFIX):
+                intent = name[len(INTENT_ATTRIBUTE_PREFIX):]
+                intents[intent] = intents.get(intent, 0) + int(value)
+    return {'total': total, 'intents': intents}
+
+
+def query_intent_distribution(table, customer_id, start, end):
+    """
+    [start, end) 동안 한 고객사의 의도별 이벤트 수를 롤업 항목만으로 계산합니다.
+    반환값: {'total': 전체 수, 'intents': {의도: 수}}
+
+    롤업의 해상도는 1시간이므로 start는 시 단위로 내리고 end는 시 단위로 올립니다.
+    하루 전체가 포함되는 구간은 일 버킷으로, 양 끝의 남는 시간만 시간 버킷으로 읽으므로
+    읽는 항목 수는 원시 이벤트 수와 상관없이 최대 (일 수 + 46)개입니다.
+    """
+    start = floor_to(start.astimezone(timezone.utc), 'hour')
+    end = _ceil_to(end.astimezone(timezone.utc), 'hour')
+    first_day = _ceil_to(start, 'day')
+    last_day = floor_to(end, 'day')
+    if first_day < last_day:
+        items = (
+            _query_range(table, customer_id, 'hour', start, first_day)
+            + _query_range(table, customer_id, 'day', first_day, last_day)
+            + _query_range(table, customer_id, 'hour', last_day, end)
+        )
+    else:
+        items = _query_range(table, customer_id, 'hour', start, end)
+    return _sum_intents(items)
+
+
+def query_intent_series(table, customer_id, start, end, granularity='day'):
+    """
+    [start, end) 동안 한 고객사의 버킷별 의도 분포를 시간 순서로 반환합니다. (대시보드 추이 그래프용)
+    반환값: [(버킷, {'total': 수, 'intents': {의도: 수}})], 이벤트가 없는 버킷은 빠집니다.
+    """
+    start = floor_to(start.astimezone(timezone.utc), granularity)
+    end = _ceil_to(end.astimezone(timezone.utc), granularity)
+    items = _query_range(table, customer_id, granularity, start, end)
+    return [
+        (item['bucket'], _sum_intents([item]))
+        for item in sorted(items, key=lambda item: item['bucket'])
+    ]
+
+
+def scan_raw_events(table, segment=0, total_segments=1, page_size=None):
+    """
+    통계 테이블의 원시 이벤트에서 롤업에 필요한 속성(customerId, intent, timestamp)만 읽어 돌려줍니다.
+    """
+    request = {
+        'ProjectionExpression': '#customer, #intent, #timestamp',
+        'ExpressionAttributeNames': {
+            '#customer': 'customerId',
+            '#intent': 'intent',
+            '#timestamp': 'timestamp',
+        },
+        'Segment': segment,
+        'TotalSegments': total_segments,
+    }
+    if page_size:
+        request['Limit'] = page_size
+    while True:
+        response = table.scan(**request)
+        yield from response.get('Items', [])
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return
+        request['ExclusiveStartKey'] = last_key
+
+
+def backfill_rollups(
+    dynamodb,
+    stats_table_name,
+    rollup_table_name,
+    before,
+    segments=4,
+    excluded_intents=('분석 실패',),
+    write=batch_write_items,
+):
+    """
+    통계 테이블의 원시 이벤트를 병렬 스캔해 롤업 항목을 절대값으로 다시 만듭니다.
+
+    before 이전에 끝난 버킷만 씁니다. (처리기가 아직 카운터를 더하고 있는 버킷을 덮어쓰지 않도록)
+    같은 before로 여러 번 실행해도 결과가 같으며, 실시간 갱신이 빠뜨리거나 중복한 카운트를 바로잡는 데도 씁니다.
+    반환값: (읽은 이벤트 수, 쓴 버킷 수, 쓰기 실패 [(인덱스, 사유)])
+    """
+    before = before.astimezone(timezone.utc)
+    stats_table = dynamodb.Table(stats_table_name)
+
+    def scan_segment(segment):
+        accumulator = RollupAccumulator()
+        scanned = 0
+        for item in scan_raw_events(stats_table, segment, segments):
+            scanned += 1
+            intent = item.get('intent')
+            customer_id = item.get('customerId')
+            if not customer_id or not intent or intent in excluded_intents:
+                continue
+            # timestamp가 없는 이벤트는 발생 시각을 알 수 없으므로 다시 집계하지 않습니다.
+            moment = parse_timestamp(item.get('timestamp'), default=before)
+            if moment < before:
+                accumulator.add(customer_id, intent, moment)
+        return scanned, accumulator
+
+    with ThreadPoolExecutor(max_workers=max(1, segments)) as executor:
+        results = list(executor.map(scan_segment, range(segments)))
+
+    merged = RollupAccumulator()
+    for _, accumulator in results:
+        merged.merge(accumulator)
+
+    items = [
+        item
+        for item in merged.items()
+        if _bucket_end(item['bucket'], item['granularity']) <= before
+    ]
+    failures = write(
+        dynamodb, rollup_table_name, items, key_names=ROLLUP_TABLE_KEYS
+    )
+    return sum(scanned for scanned, _ in results), len(items), failures
+
+
+def _bucket_end(bucket, granularity):
+    start = datetime.strptime(
+        bucket, GRANULARITY_FORMATS[granularity]
+    ).replace(tzinfo=timezone.utc)
+    return start + GRANULARITY_STEPS[granularity]
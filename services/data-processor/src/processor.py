@@ -1,89 +1,641 @@
 import base64
 import json
 import os
-import boto3
-import uuid
-import google.generativeai as genai
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from batch_writer import (
+    batch_get_existing_keys,
+    batch_write_items,
+    is_retryable_failure,
+    put_new_items,
+)
+from event_codec import decode_events
+from fast_classifier import DEFAULT_MODEL_PATH, FastIntentClassifier
+from gemini_client import get_gemini_client
+from intent_cache import (
+    DynamoDBIntentStore,
+    IntentCache,
+    LRUTTLCache,
+    SQLiteIntentStore,
+    question_key,
+)
+from intent_rollups import RollupAccumulator, apply_rollup_updates
+from lazy_clients import (
+    get_boto3_resource,
+    is_warmup_event,
+    warm_up,
+    warmup_response,
+)
+from metrics import InvocationMetrics
 
-# boto3 클라이언트 및 환경 변수 초기화
-dynamodb = boto3.resource('dynamodb')
+# 환경 변수 초기화
+# boto3 리소스와 Gemini 모델은 콜드 스타트 시간을 줄이기 위해 처음 사용할 때 만듭니다.
+# (GEMINI_API_KEY가 없으면 import 시점이 아니라 첫 Gemini 호출에서 오류가 납니다.)
+dynamodb = None
 STATS_TABLE_NAME = os.environ.get('STATS_TABLE_NAME')
-table = dynamodb.Table(STATS_TABLE_NAME)
+# 통계 테이블의 기본 키 (파티션 키, 정렬 키)
+STATS_TABLE_KEYS = ('customerId', 'eventId')
 
-# Gemini API 키 설정
-GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable is not set.")
-genai.configure(api_key=GEMINI_API_KEY)
+# 호출 단위 지표 (단계별 시간/카운터를 EMF 한 줄로 출력, 레코드 단위 로그는 표본 추출)
+metrics = InvocationMetrics('data-processor')
 
-def get_intent_from_gemini(text):
+
+def get_dynamodb():
     """
-    Gemini API를 호출하여 텍스트의 의도를 분석합니다.
+    DynamoDB 리소스를 처음 사용할 때 만들어 재사용합니다.
+    """
+    global dynamodb
+    if dynamodb is None:
+        dynamodb = get_boto3_resource('dynamodb')
+    return dynamodb
+
+
+# 배치 내 의도 분석 호출의 최대 동시 실행 수 (1이면 순차 처리)
+INTENT_CONCURRENCY = max(1, int(os.environ.get('INTENT_CONCURRENCY', '10')))
+
+# --- 의도 분석 캐시 설정 ---
+# 인메모리 계층은 웜 컨테이너 동안 유지되고, 공유 계층은 DynamoDB(또는 로컬 SQLite) 테이블을 사용합니다.
+INTENT_CACHE_SIZE = int(os.environ.get('INTENT_CACHE_SIZE', '10000'))
+INTENT_CACHE_TTL_SECONDS = int(
+    os.environ.get('INTENT_CACHE_TTL_SECONDS', '86400')
+)
+INTENT_CACHE_TABLE_NAME = os.environ.get('INTENT_CACHE_TABLE_NAME')
+INTENT_CACHE_SQLITE_PATH = os.environ.get('INTENT_CACHE_SQLITE_PATH')
+
+
+def build_intent_cache():
+    """
+    환경 변수 설정에 따라 의도 분석 캐시를 구성합니다.
+    """
+    shared = None
+    if INTENT_CACHE_TABLE_NAME:
+        shared = DynamoDBIntentStore(
+            INTENT_CACHE_TABLE_NAME, dynamodb_factory=get_dynamodb
+        )
+    elif INTENT_CACHE_SQLITE_PATH:
+        shared = SQLiteIntentStore(INTENT_CACHE_SQLITE_PATH)
+    return IntentCache(
+        local=LRUTTLCache(
+            maxsize=INTENT_CACHE_SIZE, ttl_seconds=INTENT_CACHE_TTL_SECONDS
+        ),
+        shared=shared,
+        ttl_seconds=INTENT_CACHE_TTL_SECONDS,
+    )
+
+
+intent_cache = build_intent_cache()
+
+# --- 의도 롤업 설정 ---
+# 설정하면 저장한 이벤트를 (고객사, 의도, 시간/일 버킷) 카운터로도 집계해 대시보드가 원시 이벤트를 스캔하지 않게 합니다.
+INTENT_ROLLUP_TABLE_NAME = os.environ.get('INTENT_ROLLUP_TABLE_NAME')
+# 배치가 끝날 때 버킷 갱신(update_item)의 최대 동시 실행 수
+INTENT_ROLLUP_CONCURRENCY = max(
+    1, int(os.environ.get('INTENT_ROLLUP_CONCURRENCY', '8'))
+)
+
+
+def update_intent_rollups(items):
+    """
+    새로 저장한 이벤트들을 버킷별로 합쳐 버킷 하나당 한 번씩 카운터를 더합니다.
+    반환값: (갱신을 시도한 버킷 수, 실패 [(버킷 키, 사유)])
+    """
+    accumulator = RollupAccumulator()
+    for item in items:
+        accumulator.add(
+            item['customerId'], item['intent'], item.get('timestamp')
+        )
+    table = get_dynamodb().Table(INTENT_ROLLUP_TABLE_NAME)
+    return len(accumulator), apply_rollup_updates(
+        table, accumulator.updates(), concurrency=INTENT_ROLLUP_CONCURRENCY
+    )
+
+
+# --- 빠른 사전 분류 설정 ---
+# 키워드 규칙 + 문자 n-gram 모델의 신뢰도가 임계값 이상이면 Gemini를 호출하지 않습니다.
+FAST_PATH_THRESHOLD = float(os.environ.get('FAST_PATH_THRESHOLD', '0.9'))
+FAST_PATH_MODEL_PATH = os.environ.get(
+    'FAST_PATH_MODEL_PATH', DEFAULT_MODEL_PATH
+)
+# 사전 분류로 처리할 질문 중 이 비율은 Gemini로도 분류해 일치율을 지표로 남깁니다. (저장은 Gemini 결과)
+# 학습에 쓰지 않은 질문의 LLM 레이블로 임계값을 계속 검증하기 위함입니다.
+FAST_PATH_SHADOW_RATE = float(os.environ.get('FAST_PATH_SHADOW_RATE', '0.02'))
+fast_classifier = None
+
+
+def get_fast_classifier():
+    """
+    빠른 사전 분류기 모델을 처음 사용할 때 불러옵니다.
+    """
+    global fast_classifier
+    if fast_classifier is None:
+        fast_classifier = FastIntentClassifier.load(FAST_PATH_MODEL_PATH)
+    return fast_classifier
+
+
+# 의도 분석 결과로 허용되는 레이블
+INTENT_LABELS = ('정보 탐색', '구매 고려', '기능 문의', '단순 대화', '기타')
+FAILED_INTENT = "분석 실패"
+
+# --- 묶음 프롬프트 설정 ---
+# 질문 여러 개를 번호를 붙여 하나의 프롬프트로 보내고, JSON 배열로 결과를 받습니다.
+# 한 묶음의 크기는 질문들의 추정 토큰 합이 INTENT_BATCH_TOKEN_BUDGET을 넘지 않도록 정합니다.
+INTENT_BATCH_TOKEN_BUDGET = int(
+    os.environ.get('INTENT_BATCH_TOKEN_BUDGET', '2000')
+)
+INTENT_BATCH_MAX_ITEMS = max(
+    1, int(os.environ.get('INTENT_BATCH_MAX_ITEMS', '50'))
+)
+# 번호, 따옴표, JSON 출력 한 줄 등 질문 하나당 추가로 드는 토큰 추정치
+INTENT_BATCH_ITEM_OVERHEAD_TOKENS = 20
+
+
+def generate_content(prompt, json_output=False):
+    """
+    Gemini 모델에 프롬프트를 보내고 응답 텍스트를 반환합니다.
+    공용 클라이언트가 속도 제한, 재시도, 회로 차단을 처리합니다.
+    """
+    generation_config = (
+        {'response_mime_type': 'application/json'} if json_output else None
+    )
+    started = time.perf_counter()
+    response = get_gemini_client().generate_content(
+        prompt, 'gemini-pro', generation_config=generation_config
+    )
+    metrics.observe('gemini_latency', (time.perf_counter() - started) * 1000.0)
+    # response.prompt_feedback는 부적절한 프롬프트가 있었는지 확인하는데 사용 가능
+    return response.text
+
+
+def estimate_tokens(text):
+    """
+    텍스트의 토큰 수를 대략 추정합니다. (한국어 기준 약 2자당 1토큰)
+    """
+    return len(text) // 2 + 1
+
+
+def chunk_by_token_budget(questions, token_budget=None, max_items=None):
+    """
+    질문들을 추정 토큰 합이 예산을 넘지 않는 묶음들로 나눠 인덱스 리스트로 반환합니다.
+    예산보다 큰 질문 하나는 단독 묶음이 됩니다.
+    """
+    token_budget = token_budget or INTENT_BATCH_TOKEN_BUDGET
+    max_items = max_items or INTENT_BATCH_MAX_ITEMS
+    chunks, current, current_tokens = [], [], 0
+    for index, question in enumerate(questions):
+        tokens = estimate_tokens(question) + INTENT_BATCH_ITEM_OVERHEAD_TOKENS
+        if current and (
+            current_tokens + tokens > token_budget or len(current) >= max_items
+        ):
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_batch_prompt(questions):
+    """
+    번호를 붙인 질문 목록과 엄격한 JSON 출력 형식을 담은 묶음 분류 프롬프트를 만듭니다.
+    """
+    # 질문은 JSON 문자열로 넣어 줄바꿈/번호가 섞인 질문이 다른 항목처럼 보이지 않게 합니다.
+    items = "\n".join(
+        f"{number}. {json.dumps(question, ensure_ascii=False)}"
+        for number, question in enumerate(questions, 1)
+    )
+    labels = ", ".join(f"'{label}'" for label in INTENT_LABELS)
+    return f"""
+        다음 {len(questions)}개의 텍스트를 각각 분석하여 사용자의 의도를 {labels} 중 하나로 정확하게 분류해줘.
+        반드시 아래 형식의 JSON 배열로만 답하고, 모든 번호에 대해 정확히 하나씩 결과를 포함해줘.
+        [{{"id": 1, "intent": "정보 탐색"}}, {{"id": 2, "intent": "기타"}}]
+
+        텍스트 목록:
+{items}
+        """
+
+
+def parse_batch_response(text, count):
+    """
+    묶음 분류 응답을 파싱해 {번호(0부터): 레이블}을 반환합니다.
+    허용된 레이블이 아니거나 형식이 잘못된 항목, 범위를 벗어난 번호는 제외합니다.
+    """
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.strip('`')
+        text = text[text.find('['):]
+    try:
+        entries = json.loads(text)
+    except (json.JSONDecodeError, ValueError):
+        return {}
+    if not isinstance(entries, list):
+        return {}
+
+    intents = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        number = entry.get('id')
+        intent = entry.get('intent')
+        if isinstance(intent, str):
+            intent = intent.strip()
+        if (
+            isinstance(number, int)
+            and 1 <= number <= count
+            and intent in INTENT_LABELS
+        ):
+            intents.setdefault(number - 1, intent)
+    return intents
+
+
+def parse_single_response(text):
+    """
+    단독 분류 응답을 허용된 레이블로 바꿉니다.
+    따옴표, 마침표, '분류:' 접두어는 무시하고, 허용된 레이블이 아니면 FAILED_INTENT를 반환합니다.
+    """
+    intent = text.strip()
+    if intent.startswith('분류:'):
+        intent = intent[len('분류:'):]
+    intent = intent.strip().strip('\'"`.').strip()
+    return intent if intent in INTENT_LABELS else FAILED_INTENT
+
+
+def _classify_single(text):
+    """
+    질문 하나를 단독 프롬프트로 분류합니다. 묶음 응답에서 빠지거나 잘못된 항목의 대체 경로입니다.
     """
     try:
-        model = genai.GenerativeModel('gemini-pro')
         prompt = f"""
         다음 텍스트를 분석하여 사용자의 의도를 '정보 탐색', '구매 고려', '기능 문의', '단순 대화', '기타' 중 하나로 정확하게 분류해줘. 다른 설명은 붙이지 말고 분류 결과만 말해줘.
         텍스트: "{text}"
         분류:
         """
-        response = model.generate_content(prompt)
-        # response.prompt_feedback는 부적절한 프롬프트가 있었는지 확인하는데 사용 가능
-        return response.text.strip()
+        intent = parse_single_response(generate_content(prompt))
     except Exception as e:
         print(f"Error calling Gemini API: {e}")
-        return "분석 실패" # 에러 발생 시 기본값 반환
+        return FAILED_INTENT  # 에러 발생 시 기본값 반환
+    if intent == FAILED_INTENT:
+        # 허용되지 않은 응답은 저장/캐시하지 않고 실패로 처리해 다시 전달될 때 분석합니다.
+        metrics.count('invalid_intent_responses')
+    return intent
 
+
+def classify_intents_batch(questions, token_budget=None):
+    """
+    여러 질문을 토큰 예산 단위로 묶어 한 번의 Gemini 호출로 분류합니다.
+    응답에서 빠졌거나 형식이 잘못된 항목만 질문별 단독 호출로 다시 분류합니다.
+    결과는 입력 순서와 같습니다.
+    """
+    intents = [None] * len(questions)
+    for chunk in chunk_by_token_budget(questions, token_budget):
+        chunk_questions = [questions[i] for i in chunk]
+        parsed = {}
+        if len(chunk) > 1:
+            try:
+                response_text = generate_content(
+                    build_batch_prompt(chunk_questions), json_output=True
+                )
+                parsed = parse_batch_response(response_text, len(chunk))
+            except Exception as e:
+                print(
+                    f"Error calling Gemini API for batch classification: {e}"
+                )
+        for position, index in enumerate(chunk):
+            intents[index] = parsed.get(position) or _classify_single(
+                questions[index]
+            )
+    return intents
+
+
+def get_intent_from_gemini(text):
+    """
+    Gemini API를 호출하여 텍스트의 의도를 분석합니다.
+    """
+    return classify_intents_batch([text])[0]
+
+
+def decode_record(record):
+    """
+    Kinesis 레코드를 디코딩하여 이벤트 데이터 리스트를 반환합니다.
+    ingest가 묶어 보낸 집계 레코드와 기존 단일 JSON 레코드를 모두 읽습니다.
+    """
+    # Kinesis 레코드는 base64로 인코딩되어 있으므로 디코딩합니다.
+    payload_decoded = base64.b64decode(record['kinesis']['data'])
+    return decode_events(payload_decoded)
+
+
+def _classify_isolated(questions):
+    """
+    예외가 다른 묶음으로 번지지 않도록 감싼 묶음 의도 분석 호출입니다.
+    """
+    try:
+        return classify_intents_batch(questions)
+    except Exception as e:
+        print(f"Error classifying intent: {e}")
+        return [FAILED_INTENT] * len(questions)
+
+
+def classify_intents(questions, concurrency=None):
+    """
+    여러 질문의 의도를 분석합니다. 결과는 입력 순서와 같습니다.
+    배치 안에서 같은 질문은 한 번만 처리하고, 빠른 사전 분류의 신뢰도가 충분하거나
+    캐시에 있는 질문은 호출 없이 처리합니다. 캐시는 배치의 나머지 질문을 모아 한 번에 조회/저장합니다.
+    나머지는 토큰 예산 단위 묶음으로 나눠 최대 concurrency개 묶음을 동시에 분석합니다.
+    """
+    keys = [question_key(question) for question in questions]
+    intent_by_key = {}
+    lookups = {}
+    shadowed = {}
+    fast_path_count = 0
+    for key, question in zip(keys, questions):
+        if key in intent_by_key or key in lookups:
+            continue
+        fast_intent, confidence = get_fast_classifier().predict(question)
+        if fast_intent is not None and confidence >= FAST_PATH_THRESHOLD:
+            if random.random() >= FAST_PATH_SHADOW_RATE:
+                intent_by_key[key] = fast_intent
+                fast_path_count += 1
+                continue
+            shadowed[key] = fast_intent
+        lookups[key] = question
+
+    cached = intent_cache.get_many(list(lookups)) if lookups else {}
+    misses = {}
+    for key, question in lookups.items():
+        # 검증 도입 전에 캐시된 자유 형식 응답은 캐시 미스로 취급합니다.
+        if cached.get(key) in INTENT_LABELS:
+            intent_by_key[key] = cached[key]
+        else:
+            misses[key] = question
+
+    metrics.count('fast_path_classified', fast_path_count)
+    metrics.count('intent_cache_misses', len(misses))
+
+    miss_keys = list(misses.keys())
+    miss_questions = list(misses.values())
+    chunks = [
+        [miss_questions[i] for i in chunk]
+        for chunk in chunk_by_token_budget(miss_questions)
+    ]
+
+    concurrency = min(concurrency or INTENT_CONCURRENCY, len(chunks))
+    metrics.count('intent_batches', len(chunks))
+    if concurrency <= 1:
+        chunk_intents = [_classify_isolated(chunk) for chunk in chunks]
+    else:
+        # LLM 호출은 네트워크 대기가 대부분이므로 스레드로 동시에 보냅니다.
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            chunk_intents = list(executor.map(_classify_isolated, chunks))
+
+    intents = [intent for chunk in chunk_intents for intent in chunk]
+    intent_by_key.update(zip(miss_keys, intents))
+    # 실패 결과는 캐시하지 않습니다.
+    intent_cache.put_many(dict(zip(miss_keys, intents)))
+
+    # 사전 분류 결과와 Gemini(또는 캐시된 Gemini) 결과를 비교합니다.
+    shadow_checks = shadow_disagreements = 0
+    for key, fast_intent in shadowed.items():
+        if intent_by_key[key] == FAILED_INTENT:
+            continue
+        shadow_checks += 1
+        if intent_by_key[key] != fast_intent:
+            shadow_disagreements += 1
+            metrics.debug(
+                "Fast path disagreement: fast=%s llm=%s",
+                fast_intent,
+                intent_by_key[key],
+            )
+    metrics.count('fast_path_shadow_checks', shadow_checks)
+    metrics.count('fast_path_shadow_disagreements', shadow_disagreements)
+    return [intent_by_key[key] for key in keys]
+
+
+def event_id(record, position):
+    """
+    Kinesis 시퀀스 번호와 레코드 안의 이벤트 위치로 결정적인 eventId를 만듭니다.
+    같은 레코드가 다시 전달되어도 같은 값이 나오므로 재전달된 이벤트를 알아볼 수 있습니다.
+    """
+    return f"{record['kinesis']['sequenceNumber']}-{position}"
+
+
+def find_processed_keys(keys):
+    """
+    통계 테이블에 이미 저장된(이전 전달에서 처리가 끝난) 키의 집합을 반환합니다.
+    확인에 실패하면 None(처리 여부를 모름)을 반환합니다. 이때 handler는 모두 분석하되 조건부 쓰기로 저장해
+    새로 저장된 이벤트만 롤업에 더합니다.
+    """
+    keys = [key for key in keys if all(key)]
+    if not keys:
+        return set()
+    try:
+        return batch_get_existing_keys(
+            get_dynamodb(), STATS_TABLE_NAME, keys, key_names=STATS_TABLE_KEYS
+        )
+    except Exception as e:
+        print(f"Error checking processed events: {e}")
+        metrics.count('dedupe_check_failures')
+        return None
+
+
+@metrics.instrument
 def handler(event, context):
     """
     Kinesis로부터 받은 레코드를 처리하여 의도를 분석하고 DynamoDB에 저장합니다.
+    이미 저장된 이벤트는 건너뛰고, 다시 시도하면 성공할 수 있는 실패(의도 분석 실패, 저장 스로틀링)만
+    batchItemFailures로 보고해 해당 레코드부터 다시 전달받습니다.
     """
-    print(f"Processing {len(event['Records'])} records from Kinesis.")
-    for record in event['Records']:
-        try:
-            # Kinesis 레코드는 base64로 인코딩되어 있으므로 디코딩합니다.
-            payload_decoded = base64.b64decode(record['kinesis']['data']).decode('utf-8')
-            data = json.loads(payload_decoded)
-            print(f"Decoded data: {data}")
+    if is_warmup_event(event):
+        get_fast_classifier()
+        return warmup_response(
+            warm_up(
+                boto3_resources=['dynamodb'], generative_models=['gemini-pro']
+            )
+        )
 
-            # SDK에서 보낸 'properties' 객체에서 질문을 추출합니다.
-            # 실제 데이터 구조에 따라 이 부분은 수정이 필요할 수 있습니다.
-            question_text = data.get('properties', {}).get('question', '')
+    metrics.count('records', len(event['Records']))
 
-            if not question_text:
-                print("No 'question' field in properties. Skipping record.")
+    # 1. 레코드 디코딩(집계 레코드는 이벤트 단위로 풀기) 및 질문 추출
+    pending = []
+    with metrics.stage('decode'):
+        for record in event['Records']:
+            try:
+                events = decode_record(record)
+            except Exception as e:
+                # 다시 전달받아도 디코딩할 수 없으므로 실패로 보고하지 않고 로깅만 하고 넘어갑니다.
+                metrics.count('undecodable_records')
+                print(f"Error processing record: {e}")
+                print(f"Problematic record data: {record['kinesis']['data']}")
                 continue
 
-            # 1. 비식별화 처리 (Placeholder)
-            # TODO: Microsoft Presidio 등 라이브러리를 사용하여 개인정보를 마스킹하는 로직 추가
-            anonymized_question = question_text # 현재는 원본 그대로 사용
-
-            # 2. Gemini API로 의도 분석
-            intent = get_intent_from_gemini(anonymized_question)
-            print(f"Detected intent for question '{anonymized_question[:30]}...': {intent}")
-
-            # 3. DynamoDB에 저장할 데이터 구성
-            item_to_store = {
-                'customerId': data.get('apiKey'), # apiKey를 고객사 ID로 사용
-                'eventId': str(uuid.uuid4()), # 각 이벤트를 고유하게 식별
-                'eventName': data.get('eventName'),
-                'intent': intent,
-                'originalQuestion': anonymized_question,
-                'timestamp': data.get('timestamp'),
-                # TODO: 잠재 광고주, 비용 통계 등 추가 필드 확장 예정
-            }
-
-            # 4. DynamoDB에 저장
-            table.put_item(Item=item_to_store)
-            print(f"Successfully stored stats for customer {item_to_store['customerId']}")
-
-        except Exception as e:
-            # 에러가 발생해도 다른 레코드 처리에 영향을 주지 않도록 로깅만 하고 넘어갑니다.
-            print(f"Error processing record: {e}")
-            print(f"Problematic record data: {record['kinesis']['data']}")
+            metrics.count('events', len(events))
+            for position, data in enumerate(events):
+                try:
+                    metrics.debug("Decoded data: %s", data)
+
+                    # SDK에서 보낸 'properties' 객체에서 질문을 추출합니다.
+                    # 실제 데이터 구조에 따라 이 부분은 수정이 필요할 수 있습니다.
+                    question_text = data.get('properties', {}).get(
+                        'question', ''
+                    )
+
+                    if not question_text:
+                        metrics.count('events_without_question')
+                        continue
+
+                    # 비식별화 처리 (Placeholder)
+                    # TODO: Microsoft Presidio 등 라이브러리를 사용하여 개인정보를 마스킹하는 로직 추가
+                    anonymized_question = question_text  # 현재는 원본 그대로 사용
+                    key = (data.get('apiKey'), event_id(record, position))
+                    pending.append((record, key, data, anonymized_question))
+
+                except Exception as e:
+                    print(f"Error processing event: {e}")
+                    print(
+                        f"Problematic record data: {record['kinesis']['data']}"
+                    )
+                    continue
+
+    # 2. 이전 전달에서 이미 저장된 이벤트는 의도 분석/저장 없이 건너뜁니다.
+    with metrics.stage('dedupe'):
+        processed_keys = (
+            find_processed_keys([key for _, key, _, _ in pending])
+            if pending
+            else set()
+        )
+    if processed_keys:
+        metrics.count('already_processed', len(processed_keys))
+        pending = [
+            entry for entry in pending if entry[1] not in processed_keys
+        ]
+
+    # 3. Gemini API로 의도 분석 (배치 내 동시 실행, 결과 순서는 레코드 순서와 동일)
+    with metrics.stage('classify'):
+        intents = classify_intents([question for _, _, _, question in pending])
+
+    failed_records = []
+    stored_records = []
+    items_to_store = []
+    for (
+        record,
+        (customer_id, item_event_id),
+        data,
+        anonymized_question,
+    ), intent in zip(pending, intents):
+        metrics.debug(
+            "Detected intent for question '%s...': %s",
+            anonymized_question[:30],
+            intent,
+        )
+        if intent == FAILED_INTENT:
+            # 저장하지 않고 실패로 보고해 다시 전달될 때 분석합니다.
+            metrics.count('failed_intents')
+            failed_records.append(record)
             continue
 
+        # 4. DynamoDB에 저장할 데이터 구성
+        item_to_store = {
+            'customerId': customer_id,  # apiKey를 고객사 ID로 사용
+            'eventId': item_event_id,  # Kinesis 시퀀스 번호 기반의 결정적인 이벤트 ID
+            'eventName': data.get('eventName'),
+            'intent': intent,
+            'originalQuestion': anonymized_question,
+            'timestamp': data.get('timestamp'),
+            # TODO: 잠재 광고주, 비용 통계 등 추가 필드 확장 예정
+        }
+        stored_records.append(record)
+        items_to_store.append(item_to_store)
+
+    # 5. DynamoDB에 25개 단위 BatchWriteItem으로 저장 (미처리 항목은 백오프 후 재시도)
+    # 사전 확인에 실패했으면 항목별 조건부 쓰기로 이미 저장된 이벤트를 덮어쓰지 않고 가려냅니다.
+    # (저장할 항목이 없으면 DynamoDB 리소스를 만들지 않습니다.)
+    failures = []
+    existing_indexes = []
+    if items_to_store:
+        with metrics.stage('persist'):
+            if processed_keys is None:
+                failures, existing_indexes = put_new_items(
+                    get_dynamodb(),
+                    STATS_TABLE_NAME,
+                    items_to_store,
+                    key_names=STATS_TABLE_KEYS,
+                )
+            else:
+                failures = batch_write_items(
+                    get_dynamodb(),
+                    STATS_TABLE_NAME,
+                    items_to_store,
+                    key_names=STATS_TABLE_KEYS,
+                )
+    if existing_indexes:
+        metrics.count('already_processed', len(existing_indexes))
+    for index, reason in failures:
+        print(f"Error storing record: {reason}")
+        print(
+            "Problematic record data:"
+            f" {stored_records[index]['kinesis']['data']}"
+        )
+        # 잘못된 항목(키 누락 등)은 다시 시도해도 실패하므로 보고하지 않습니다.
+        if is_retryable_failure(reason):
+            failed_records.append(stored_records[index])
+    metrics.count(
+        'stored_items',
+        len(items_to_store) - len(failures) - len(existing_indexes),
+    )
+    metrics.count('store_failures', len(failures))
+
+    # 6. 저장에 성공한 새 이벤트만 의도 롤업에 더합니다.
+    # 이미 저장된 이벤트는 2단계(또는 조건부 쓰기)에서 빠지므로 재전달된 배치가 카운트를 다시 더하지 않습니다.
+    # 롤업 갱신 실패는 원시 이벤트가 이미 저장되었으므로 재전달로 보고하지 않고, 백필 스크립트로 바로잡습니다.
+    if INTENT_ROLLUP_TABLE_NAME:
+        failed_indexes = {index for index, _ in failures} | set(
+            existing_indexes
+        )
+        stored_items = [
+            item
+            for index, item in enumerate(items_to_store)
+            if index not in failed_indexes
+        ]
+        if stored_items:
+            with metrics.stage('rollup'):
+                try:
+                    bucket_count, rollup_failures = update_intent_rollups(
+                        stored_items
+                    )
+                except Exception as e:
+                    print(f"Error updating intent rollups: {e}")
+                    bucket_count, rollup_failures = 0, [
+                        (None, type(e).__name__)
+                    ]
+            for bucket, reason in rollup_failures:
+                if bucket is not None:
+                    print(f"Error updating intent rollup {bucket}: {reason}")
+            metrics.count('rollup_buckets', bucket_count)
+            metrics.count('rollup_failures', len(rollup_failures))
+    metrics.set_property('intent_cache', intent_cache.stats())
+    metrics.set_property('gemini', get_gemini_client().stats())
+
+    batch_item_failures = report_batch_item_failures(failed_records)
+    metrics.count('batch_item_failures', len(batch_item_failures))
+
     return {
         'statusCode': 200,
-        'body': json.dumps(f"Successfully processed {len(event['Records'])} records.")
-    }
\ No newline at end of file
+        'body': json.dumps(
+            f"Successfully processed {len(event['Records'])} records."
+        ),
+        'batchItemFailures': batch_item_failures,
+    }
+
+
+def report_batch_item_failures(records):
+    """
+    실패한 레코드의 시퀀스 번호를 ReportBatchItemFailures 응답 형식으로 반환합니다.
+    (Kinesis는 가장 앞선 실패 레코드부터 다시 전달하며, 그 뒤의 성공한 이벤트는 다시 건너뜁니다.)
+    """
+    sequence_numbers = dict.fromkeys(
+        record['kinesis']['sequenceNumber'] for record in records
+    )
+    return [
+        {'itemIdentifier': sequence_number}
+        for sequence_number in sequence_numbers
+    ]
@@ -3,3 +3,81 @@ variable "gemini_api_key" {
   type        = string
   sensitive   = true
 }
+
+variable "intent_concurrency" {
+  description = "Maximum concurrent Gemini intent classification calls per Kinesis batch."
+  type        = string
+  default     = "10"
+}
+
+variable "intent_cache_size" {
+  description = "Maximum number of entries in the in-process intent cache."
+  type        = string
+  default     = "10000"
+}
+
+variable "intent_cache_ttl_seconds" {
+  description = "Time-to-live of cached intent classifications in seconds."
+  type        = string
+  default     = "86400"
+}
+
+variable "intent_rollup_concurrency" {
+  description = "Maximum concurrent intent rollup bucket updates at the end of each Kinesis batch."
+  type        = string
+  default     = "8"
+}
+
+variable "intent_batch_token_budget" {
+  description = "Estimated token budget for the questions packed into one batched intent prompt."
+  type        = string
+  default     = "2000"
+}
+
+variable "fast_path_threshold" {
+  description = "Minimum fast pre-classifier confidence to skip the Gemini intent call."
+  type        = string
+  default     = "0.9"
+}
+
+variable "fast_path_shadow_rate" {
+  description = "Fraction of fast-path questions also classified by Gemini to monitor agreement."
+  type        = string
+  default     = "0.02"
+}
+
+variable "kinesis_max_retry_attempts" {
+  description = "Maximum retries of records reported as failed before they are sent to the on-failure queue."
+  type        = number
+  default     = 5
+}
+
+variable "kinesis_max_record_age_seconds" {
+  description = "Maximum age of a Kinesis record before retries stop and it is sent to the on-failure queue."
+  type        = number
+  default     = 21600
+}
+
+variable "gemini_rate_limit_per_second" {
+  description = "Gemini calls per second allowed per processor container (token bucket)."
+  type        = string
+  default     = "20"
+}
+
+variable "gemini_max_concurrency" {
+  description = "Upper bound of the adaptive Gemini concurrency limit per processor container."
+  type        = string
+  default     = "32"
+}
+
+variable "metrics_enabled" {
+  description = "Emit one CloudWatch Embedded Metric Format line per invocation (\"false\" makes instrumentation a no-op)."
+  type        = string
+  default     = "true"
+}
+
+variable "debug_log_sample_rate" {
+  description = "Fraction of per-record debug log lines to print (0 disables them, 1 logs every record)."
+  type        = string
+  default     = "0.01"
+}
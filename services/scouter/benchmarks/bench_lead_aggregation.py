@@ -0,0 +1,215 @@
+"""
+잠재 광고주 집계 단계를 측정합니다.
+같은 질문이 반복되는(Zipf) '구매 고려' 스트림을 DynamoDB 스트림 배치로 scouter.handler에 흘려보내
+기존 방식(이벤트마다 순차 추출, 이벤트마다 결과 한 건)과 광고주 추출 호출 수, 처리 시간, 내보낸 레코드 수를 비교합니다.
+
+Gemini 추출은 지연을 주입하는 스텁이고, 이벤트 시각은 가상 시계로 진행하므로 네트워크/API 키가 필요 없습니다.
+
+사용법:
+    python benchmarks/bench_lead_aggregation.py [--batches 10] [--batch-size
+        100] [--questions 150] [--latency-ms 40]
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, '..', 'src'))
+# Lambda 레이어로 배포되는 공용 모듈 (services/shared/python)
+sys.path.insert(0, os.path.join(BASE_DIR, '..', '..', 'shared', 'python'))
+os.environ.setdefault('GEMINI_API_KEY', 'local-benchmark')
+
+import scouter  # noqa: E402
+from lead_aggregator import (  # noqa: E402
+    QuestionDeduplicator,
+    TumblingWindowAggregator,
+)
+
+COMPANIES = [
+    'Microsoft',
+    'Google',
+    'Apple',
+    'Amazon',
+    'Samsung',
+    'Naver',
+    'Kakao',
+]
+
+
+class ExtractStub:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, question):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return COMPANIES[int(question.split()[1]) % len(COMPANIES)]
+
+
+class SimulatedClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_batches(args):
+    rng = random.Random(0)
+    weights = [1.0 / (rank + 1) for rank in range(args.questions)]
+    start = 1_700_000_000
+    batches = []
+    for b in range(args.batches):
+        records = []
+        for i in range(args.batch_size):
+            event_time = start + (b * args.batch_size + i) * args.event_gap
+            q = rng.choices(range(args.questions), weights)[0]
+            # 같은 질문을 대소문자/공백/문장부호만 바꿔 보내는 경우도 섞습니다.
+            question = rng.choice([
+                f"질문 {q} 가격은 얼마인가요?",
+                f"질문 {q}  가격은 얼마인가요",
+                f"질문 {q} 가격은 얼마인가요 ?!",
+            ])
+            records.append({
+                'eventID': f"event-{b}-{i}",
+                'eventName': 'INSERT',
+                'dynamodb': {
+                    'SequenceNumber': str(b * args.batch_size + i),
+                    'ApproximateCreationDateTime': event_time,
+                    'NewImage': {
+                        'intent': {'S': '구매 고려'},
+                        'originalQuestion': {'S': question},
+                        'customerId': {
+                            'S': f"customer-{rng.randrange(args.customers)}"
+                        },
+                        'eventName': {'S': 'question_asked'},
+                    },
+                },
+            })
+        batches.append(records)
+    return batches
+
+
+def run_baseline(batches, stub):
+    # 기존 handler: '구매 고려' 이벤트마다 순차 추출, 이벤트마다 결과 한 건
+    emitted = 0
+    start = time.perf_counter()
+    for records in batches:
+        for record in records:
+            advertiser = stub(
+                record['dynamodb']['NewImage']['originalQuestion']['S']
+            )
+            if advertiser:
+                emitted += 1
+    return time.perf_counter() - start, emitted
+
+
+def run_aggregated(args, batches, stub):
+    clock = SimulatedClock(
+        batches[0][0]['dynamodb']['ApproximateCreationDateTime']
+    )
+    scouter.question_deduplicator = QuestionDeduplicator(
+        args.dedup_window, 50000, clock=clock
+    )
+    scouter.lead_windows = TumblingWindowAggregator(
+        args.window, args.grace, clock=clock
+    )
+    scouter._extract_advertiser = stub
+    emitted = []
+    real_emit = scouter.emit_scouting_results
+
+    def capture(results):
+        emitted.extend(results)
+        return len(results)
+
+    scouter.emit_scouting_results = capture
+    start = time.perf_counter()
+    try:
+        for records in batches:
+            clock.now = records[-1]['dynamodb']['ApproximateCreationDateTime']
+            scouter.handler({'Records': records}, None)
+        # 스트림이 끝난 뒤 남은 창을 닫습니다.
+        clock.now += args.window + args.grace
+        scouter.emit_scouting_results(scouter.lead_windows.flush())
+    finally:
+        scouter.emit_scouting_results = real_emit
+    elapsed = time.perf_counter() - start
+    leads = sum(result['lead_count'] for result in emitted)
+    return elapsed, emitted, leads
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batches', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--questions', type=int, default=150)
+    parser.add_argument('--customers', type=int, default=30)
+    parser.add_argument(
+        '--event-gap',
+        type=float,
+        default=0.5,
+        help='이벤트 사이 간격(초, 가상 시계)',
+    )
+    parser.add_argument('--latency-ms', type=float, default=40.0)
+    parser.add_argument('--window', type=int, default=300)
+    parser.add_argument('--grace', type=int, default=60)
+    parser.add_argument('--dedup-window', type=int, default=3600)
+    args = parser.parse_args()
+
+    batches = make_batches(args)
+    total = args.batches * args.batch_size
+    distinct = len({
+        scouter.question_key(
+            r['dynamodb']['NewImage']['originalQuestion']['S']
+        )
+        for records in batches
+        for r in records
+    })
+
+    baseline_stub = ExtractStub(args.latency_ms / 1000.0)
+    baseline_seconds, baseline_emitted = run_baseline(batches, baseline_stub)
+
+    stub = ExtractStub(args.latency_ms / 1000.0)
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        seconds, emitted, leads = run_aggregated(args, batches, stub)
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+
+    print(
+        f"{total} '구매 고려' events in {args.batches} batches, {distinct}"
+        f" distinct normalized questions, {args.customers} customers,"
+        f" {args.latency_ms:.0f}ms extraction, {args.window}s windows"
+    )
+    print(f"{'mode':<22} {'extractions':>11} {'seconds':>8} {'records':>8}")
+    print(
+        f"{'per event (baseline)':<22} {baseline_stub.calls:>11}"
+        f" {baseline_seconds:>8.2f} {baseline_emitted:>8}"
+    )
+    print(
+        f"{'dedup + windows':<22} {stub.calls:>11} {seconds:>8.2f}"
+        f" {len(emitted):>8}"
+    )
+    print(f"\nleads preserved in aggregated records: {leads}/{total}")
+    if emitted:
+        sample = max(emitted, key=lambda result: result['lead_count'])
+        print(
+            f"largest record: {sample['customer_id']} /"
+            f" {sample['potential_advertiser']}"
+            f" {sample['window_start']}..{sample['window_end']}"
+            f" lead_count={sample['lead_count']}"
+            f" distinct_questions={sample['distinct_questions']}"
+        )
+
+
+if __name__ == '__main__':
+    main()
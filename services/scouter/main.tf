@@ -11,6 +11,49 @@ provider "aws" {
   region = var.aws_region
 }
 
+# --- DynamoDB Table (Lead Windows) ---
+# (고객, 광고주, 창)별 잠재 고객과 열린 창을 저장합니다. 컨테이너가 바뀌거나 레코드가 재전달되어도 창 상태가 유지됩니다.
+resource "aws_dynamodb_table" "lead_windows_table" {
+  name         = "ad-scouter-lead-windows"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "windowKey" # {customerId}#{advertiser}#{창 시작 epoch 초}
+  range_key    = "itemKey"   # '#window' 또는 'lead#{스트림 eventID}'
+
+  attribute {
+    name = "windowKey"
+    type = "S"
+  }
+
+  attribute {
+    name = "itemKey"
+    type = "S"
+  }
+
+  attribute {
+    name = "openShard"
+    type = "S"
+  }
+
+  attribute {
+    name = "closeAt"
+    type = "N"
+  }
+
+  # 열린 창 항목만 openShard/closeAt을 가지므로, 닫힐 시각이 지난 창만 조회합니다.
+  global_secondary_index {
+    name            = "open-windows"
+    hash_key        = "openShard"
+    range_key       = "closeAt"
+    projection_type = "ALL"
+  }
+
+  # 내보낸 뒤 남은 창 항목과 오래된 잠재 고객 항목은 DynamoDB TTL로 삭제합니다.
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+}
+
 # --- IAM Role & Policy for Scouter Lambda ---
 resource "aws_iam_role" "scouter_lambda_role" {
   name = "ad-scouter-scouter-lambda-role"
@@ -24,7 +67,7 @@ resource "aws_iam_role" "scouter_lambda_role" {
   })
 }
 
-# DynamoDB Stream 읽기, CloudWatch 로그 쓰기 권한 정책
+# DynamoDB Stream 읽기, 창 테이블 읽기/쓰기, CloudWatch 로그 쓰기 권한 정책
 # TODO: 추후 S3 쓰기, SES 이메일 보내기, Gemini API 호출 권한 추가 필요
 resource "aws_iam_policy" "scouter_lambda_policy" {
   name = "ad-scouter-scouter-lambda-policy"
@@ -41,6 +84,18 @@ resource "aws_iam_policy" "scouter_lambda_policy" {
         ],
         Resource = var.dynamodb_stream_arn
       },
+      {
+        Effect   = "Allow",
+        Action   = [
+          "dynamodb:BatchWriteItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:Query"
+        ],
+        Resource = [
+          aws_dynamodb_table.lead_windows_table.arn,
+          "${aws_dynamodb_table.lead_windows_table.arn}/index/*"
+        ]
+      },
       {
         Effect   = "Allow",
         Action   = [
@@ -59,6 +114,24 @@ resource "aws_iam_role_policy_attachment" "scouter_policy_attachment" {
   policy_arn = aws_iam_policy.scouter_lambda_policy.arn
 }
 
+# --- Shared Lambda Layer ---
+# 서비스 간 공용 Python 모듈(services/shared/python)을 Lambda 레이어로 배포합니다.
+# 레이어 zip에는 python/ 최상위 디렉터리가 있어야 하므로 ../shared를 묶되,
+# 벤치마크와 문서는 런타임에 필요 없으므로 제외합니다.
+data "archive_file" "shared_layer_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../shared"
+  excludes    = ["README.md", "benchmarks"]
+  output_path = "${path.module}/dist/shared_layer.zip"
+}
+
+resource "aws_lambda_layer_version" "shared_layer" {
+  layer_name          = "ad-scouter-shared-scouter"
+  filename            = data.archive_file.shared_layer_zip.output_path
+  source_code_hash    = data.archive_file.shared_layer_zip.output_base64sha256
+  compatible_runtimes = ["python3.11"]
+}
+
 # --- Lambda Function ---
 data "archive_file" "scouter_zip" {
   type        = "zip"
@@ -75,10 +148,21 @@ resource "aws_lambda_function" "scouter_lambda" {
   filename         = data.archive_file.scouter_zip.output_path
   source_code_hash = data.archive_file.scouter_zip.output_base64sha256
   timeout          = 300 # 5분
+  layers           = [aws_lambda_layer_version.shared_layer.arn]
   
   environment {
     variables = {
-      GEMINI_API_KEY = var.gemini_api_key
+      GEMINI_API_KEY               = var.gemini_api_key
+      SCOUTER_WINDOW_SECONDS       = var.scouter_window_seconds
+      SCOUTER_WINDOW_GRACE_SECONDS = "60"
+      SCOUTER_WINDOW_TABLE         = aws_dynamodb_table.lead_windows_table.name
+      SCOUTER_DEDUP_WINDOW_SECONDS = var.scouter_dedup_window_seconds
+      SCOUTER_DEDUP_MAX_ENTRIES    = "50000"
+      SCOUTER_CONCURRENCY          = var.scouter_concurrency
+      GEMINI_RATE_LIMIT_PER_SECOND = var.gemini_rate_limit_per_second
+      GEMINI_MAX_CONCURRENCY       = var.gemini_max_concurrency
+      METRICS_ENABLED              = var.metrics_enabled
+      DEBUG_LOG_SAMPLE_RATE        = var.debug_log_sample_rate
     }
   }
 }
@@ -90,4 +174,29 @@ resource "aws_lambda_event_source_mapping" "dynamodb_mapping" {
   function_name     = aws_lambda_function.scouter_lambda.arn
   starting_position = "LATEST"
   batch_size        = 100
+
+  # 추출/저장에 실패한 레코드만 batchItemFailures로 보고해 그 레코드부터 다시 전달받습니다.
+  function_response_types = ["ReportBatchItemFailures"]
+  maximum_retry_attempts  = var.stream_max_retry_attempts
+}
+
+# --- Lead Window Flush Schedule ---
+# 트래픽이 끊겨도 닫힌 창이 내보내지도록 주기적으로 Scouter Lambda를 호출합니다.
+resource "aws_cloudwatch_event_rule" "lead_window_flush" {
+  name                = "ad-scouter-lead-window-flush"
+  schedule_expression = var.lead_window_flush_schedule
+}
+
+resource "aws_cloudwatch_event_target" "lead_window_flush" {
+  rule  = aws_cloudwatch_event_rule.lead_window_flush.name
+  arn   = aws_lambda_function.scouter_lambda.arn
+  input = jsonencode({ flushLeadWindows = true })
+}
+
+resource "aws_lambda_permission" "lead_window_flush" {
+  statement_id  = "AllowLeadWindowFlushSchedule"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.scouter_lambda.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.lead_window_flush.arn
 }
@@ -0,0 +1,491 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from question_keys import question_key
+
+# 추출 호출이 실패한 질문을 나타내는 표식입니다. (광고주 없음을 뜻하는 None과 구분)
+EXTRACTION_FAILED = object()
+
+
+class QuestionDeduplicator:
+    """
+    정규화된 질문 해시 → 추출된 광고주를 시간 창(window_seconds) 동안 기억하는 제한된 seen-set입니다.
+    같은 질문은 창 안에서 한 번만 추출하고, 이후에는 저장된 결과(광고주 또는 None)를 재사용합니다.
+    항목 수가 max_entries를 넘으면 가장 오래된 항목부터 버립니다.
+    """
+
+    def __init__(
+        self, window_seconds=3600, max_entries=50000, clock=time.time
+    ):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (첫 확인 시각, 광고주)
+        self._lock = threading.Lock()
+        self._counters = {
+            'lookups': 0,
+            'duplicates': 0,
+            'extracted': 0,
+            'evictions': 0,
+            'expired': 0,
+        }
+
+    def _expire(self, now):
+        while self._entries:
+            key, (seen_at, _) = next(iter(self._entries.items()))
+            if now - seen_at < self.window_seconds:
+                break
+            self._entries.popitem(last=False)
+            self._counters['expired'] += 1
+
+    def lookup(self, key):
+        """
+        (이미 본 질문인지, 저장된 광고주)를 반환합니다.
+        """
+        with self._lock:
+            self._counters['lookups'] += 1
+            self._expire(self.clock())
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            self._counters['duplicates'] += 1
+            return True, entry[1]
+
+    def remember(self, key, advertiser):
+        """
+        추출 결과를 기록합니다. 추출에 실패한 질문은 다음 배치에서 다시 시도하도록 기록하지 않습니다.
+        """
+        if advertiser is EXTRACTION_FAILED:
+            return
+        with self._lock:
+            now = self.clock()
+            self._entries[key] = (now, advertiser)
+            self._entries.move_to_end(key)
+            self._counters['extracted'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['size'] = len(self._entries)
+        return stats
+
+
+class TumblingWindowAggregator:
+    """
+    (고객, 광고주, 창 시작 시각)별 잠재 고객 신호를 고정 길이(window_seconds) 창으로 집계합니다.
+    워터마크(지금까지 본 가장 늦은 이벤트 시각)가 창 끝 + grace_seconds를 지나면 창을 닫고 내보냅니다.
+    """
+
+    def __init__(
+        self,
+        window_seconds=300,
+        grace_seconds=60,
+        max_samples=3,
+        clock=time.time,
+    ):
+        self.window_seconds = window_seconds
+        self.grace_seconds = grace_seconds
+        self.max_samples = max_samples
+        self.clock = clock
+        self.watermark = 0.0
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def window_start(self, event_time):
+        return int(event_time // self.window_seconds) * self.window_seconds
+
+    def add(
+        self, customer_id, advertiser, question, event_time, question_hash=None
+    ):
+        start = self.window_start(event_time)
+        key = (customer_id, advertiser, start)
+        question_hash = question_hash or question_key(question)
+        with self._lock:
+            self.watermark = max(self.watermark, event_time)
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = {
+                    'lead_count': 0,
+                    'question_hashes': set(),
+                    'sample_questions': [],
+                    'first_event_time': event_time,
+                    'last_event_time': event_time,
+                }
+            window['lead_count'] += 1
+            window['first_event_time'] = min(
+                window['first_event_time'], event_time
+            )
+            window['last_event_time'] = max(
+                window['last_event_time'], event_time
+            )
+            if question_hash not in window['question_hashes']:
+                window['question_hashes'].add(question_hash)
+                if len(window['sample_questions']) < self.max_samples:
+                    window['sample_questions'].append(question)
+
+    def flush(self, force=False, now=None):
+        """
+        닫힌 창의 집계 레코드를 반환하고 상태에서 지웁니다. force=True면 열린 창까지 모두 내보냅니다.
+        이벤트가 뜸해도 창이 닫히도록 워터마크는 현재 시각을 함께 고려합니다.
+        """
+        now = self.clock() if now is None else now
+        with self._lock:
+            watermark = max(self.watermark, now)
+            closed = [
+                key
+                for key in self._windows
+                if force
+                or key[2] + self.window_seconds + self.grace_seconds
+                <= watermark
+            ]
+            windows = [
+                (key, self._windows.pop(key))
+                for key in sorted(closed, key=lambda key: key[2])
+            ]
+
+        return [
+            {
+                'customer_id': customer_id,
+                'potential_advertiser': advertiser,
+                'window_start': _isoformat(start),
+                'window_end': _isoformat(start + self.window_seconds),
+                'lead_count': window['lead_count'],
+                'distinct_questions': len(window['question_hashes']),
+                'sample_questions': window['sample_questions'],
+                'first_event_time': _isoformat(window['first_event_time']),
+                'last_event_time': _isoformat(window['last_event_time']),
+                'status': 'identified',
+            }
+            for (customer_id, advertiser, start), window in windows
+        ]
+
+    def pending(self):
+        with self._lock:
+            return len(self._windows)
+
+    def add_leads(self, leads):
+        """
+        collect_leads 형식의 잠재 고객(광고주 포함)을 창에 더합니다.
+        메모리 집계는 실패하지 않으므로 빈 리스트를 반환합니다.
+        """
+        for lead in leads:
+            self.add(
+                lead['customer_id'],
+                lead['advertiser'],
+                lead['question'],
+                lead['event_time'],
+                lead['question_hash'],
+            )
+        return []
+
+    def emit_closed(self, emit, now=None):
+        """
+        닫힌 창을 emit(결과 리스트)으로 내보내고 내보낸 수를 반환합니다.
+        """
+        return emit(self.flush(now=now))
+
+
+class DynamoDBLeadWindowStore:
+    """
+    (고객, 광고주, 창 시작 시각)별 잠재 고객을 DynamoDB 테이블에 쌓고, 닫힌 창을 읽어 집계 레코드로 내보냅니다.
+    컨테이너가 바뀌거나 배치가 재전달되어도 창이 사라지거나 두 번 세어지지 않도록 상태를 테이블에 둡니다.
+
+    - 잠재 고객 항목: (windowKey, 'lead#{스트림 eventID}') — 같은 레코드가 재전달되면 같은 항목을 덮어씁니다.
+    - 창 항목: (windowKey, '#window') — 열린 창만 openShard/closeAt(GSI)를 가지며, 잠재 고객이
+      추가될 때마다 revision이 오릅니다.
+
+    emit_closed는 닫힌 창을 lease로 점유한 뒤 잠재 고객을 읽어 내보내고 지웁니다.
+    내보내는 동안 새 잠재 고객이 추가되면(revision 변경) 창을 열린 채로 두어 다음 flush에서 나머지를 내보냅니다.
+    """
+
+    LEAD_PREFIX = 'lead#'
+    WINDOW_ITEM = '#window'
+    OPEN_SHARD = 'open'
+    OPEN_WINDOWS_INDEX = 'open-windows'
+
+    def __init__(
+        self,
+        table_name,
+        window_seconds=300,
+        grace_seconds=60,
+        max_samples=3,
+        retention_seconds=86400,
+        lease_seconds=120,
+        dynamodb=None,
+        clock=time.time,
+    ):
+        self.table_name = table_name
+        self.window_seconds = window_seconds
+        self.grace_seconds = grace_seconds
+        self.max_samples = max_samples
+        self.retention_seconds = retention_seconds
+        self.lease_seconds = lease_seconds
+        self.clock = clock
+        self._dynamodb = dynamodb
+        self._table = None
+
+    @property
+    def table(self):
+        # 테이블 객체는 첫 사용 시점에 만들어 콜드 스타트 비용을 줄입니다.
+        if self._table is None:
+            dynamodb = self._dynamodb
+            if dynamodb is None:
+                from lazy_clients import get_boto3_resource
+
+                dynamodb = get_boto3_resource('dynamodb')
+            self._table = dynamodb.Table(self.table_name)
+        return self._table
+
+    def window_start(self, event_time):
+        return int(event_time // self.window_seconds) * self.window_seconds
+
+    def window_key(self, customer_id, advertiser, start):
+        return f"{customer_id}#{advertiser}#{start}"
+
+    def add_leads(self, leads):
+        """
+        잠재 고객 항목을 쓰고 창 항목을 열린 상태로 갱신합니다.
+        저장하지 못한 잠재 고객 리스트를 반환합니다. (호출한 쪽에서 해당 스트림 레코드를 재시도합니다)
+        """
+        windows = {}
+        for lead in leads:
+            start = self.window_start(lead['event_time'])
+            key = self.window_key(
+                lead['customer_id'], lead['advertiser'], start
+            )
+            windows.setdefault(
+                key, (lead['customer_id'], lead['advertiser'], start, [])
+            )[3].append(lead)
+
+        expires_at = int(self.clock() + self.retention_seconds)
+        failed = []
+        for key, (
+            customer_id,
+            advertiser,
+            start,
+            window_leads,
+        ) in windows.items():
+            try:
+                # 잠재 고객 항목을 먼저 쓰고 창 항목을 엽니다. 둘 다 다시 실행해도 결과가 같습니다.
+                with self.table.batch_writer(
+                    overwrite_by_pkeys=['windowKey', 'itemKey']
+                ) as batch:
+                    for lead in window_leads:
+                        batch.put_item(
+                            Item={
+                                'windowKey': key,
+                                'itemKey': self.LEAD_PREFIX + lead['event_id'],
+                                'question': lead['question'],
+                                'questionHash': lead['question_hash'],
+                                'eventTime': Decimal(
+                                    str(round(lead['event_time'], 3))
+                                ),
+                                'expiresAt': expires_at,
+                            }
+                        )
+                self.table.update_item(
+                    Key={'windowKey': key, 'itemKey': self.WINDOW_ITEM},
+                    UpdateExpression=(
+                        'SET customerId = :customer, advertiser = :advertiser,'
+                        ' windowStart = :start, openShard = :open, closeAt ='
+                        ' :close, expiresAt = :expires ADD revision :one'
+                    ),
+                    ExpressionAttributeValues={
+                        ':customer': customer_id,
+                        ':advertiser': advertiser,
+                        ':start': start,
+                        ':open': self.OPEN_SHARD,
+                        ':close': (
+                            start + self.window_seconds + self.grace_seconds
+                        ),
+                        ':expires': expires_at,
+                        ':one': 1,
+                    },
+                )
+            except Exception as e:
+                print(f"Error storing leads for window {key}: {e}")
+                failed.extend(window_leads)
+        return failed
+
+    def emit_closed(self, emit, now=None):
+        """
+        닫힌 창(창 끝 + grace_seconds가 지난 창)을 emit(결과 리스트)으로 내보내고 내보낸 수를 반환합니다.
+        """
+        now = self.clock() if now is None else now
+        emitted = 0
+        for window in self._closed_windows(now):
+            claimed = self._claim(window, now)
+            if claimed is None:
+                continue
+            try:
+                leads = self._read_leads(window['windowKey'])
+                if leads:
+                    emitted += emit(self._aggregate(claimed, leads))
+                    self._delete_leads(window['windowKey'], leads)
+            except Exception as e:
+                # lease가 끝나면 다음 flush에서 다시 시도합니다. (이미 내보낸 창이 한 번 더 나갈 수 있습니다)
+                print(f"Error emitting lead window {window['windowKey']}: {e}")
+                continue
+            self._close(claimed)
+        return emitted
+
+    def _closed_windows(self, now):
+        request = {
+            'IndexName': self.OPEN_WINDOWS_INDEX,
+            'KeyConditionExpression': 'openShard = :open AND closeAt <= :now',
+            'ExpressionAttributeValues': {
+                ':open': self.OPEN_SHARD,
+                ':now': int(now),
+            },
+        }
+        while True:
+            response = self.table.query(**request)
+            yield from response.get('Items', [])
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return
+            request['ExclusiveStartKey'] = last_key
+
+    def _claim(self, window, now):
+        """
+        다른 컨테이너가 같은 창을 동시에 내보내지 않도록 lease를 잡습니다. 잡으면 창 항목(claim 시점)을 반환합니다.
+        """
+        try:
+            response = self.table.update_item(
+                Key={
+                    'windowKey': window['windowKey'],
+                    'itemKey': self.WINDOW_ITEM,
+                },
+                UpdateExpression='SET leaseUntil = :until',
+                ConditionExpression=(
+                    'openShard = :open AND (attribute_not_exists(leaseUntil)'
+                    ' OR leaseUntil < :now)'
+                ),
+                ExpressionAttributeValues={
+                    ':open': self.OPEN_SHARD,
+                    ':now': int(now),
+                    ':until': int(now + self.lease_seconds),
+                },
+                ReturnValues='ALL_NEW',
+            )
+        except Exception as e:
+            if _error_code(e) != 'ConditionalCheckFailedException':
+                print(f"Error claiming lead window {window['windowKey']}: {e}")
+            return None
+        return response['Attributes']
+
+    def _read_leads(self, window_key):
+        request = {
+            'KeyConditionExpression': (
+                'windowKey = :key AND begins_with(itemKey, :prefix)'
+            ),
+            'ExpressionAttributeValues': {
+                ':key': window_key,
+                ':prefix': self.LEAD_PREFIX,
+            },
+            'ConsistentRead': True,
+        }
+        leads = []
+        while True:
+            response = self.table.query(**request)
+            leads.extend(response.get('Items', []))
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return leads
+            request['ExclusiveStartKey'] = last_key
+
+    def _aggregate(self, window, leads):
+        aggregator = TumblingWindowAggregator(
+            self.window_seconds, self.grace_seconds, self.max_samples
+        )
+        for lead in sorted(leads, key=lambda lead: lead['eventTime']):
+            aggregator.add(
+                window['customerId'],
+                window['advertiser'],
+                lead['question'],
+                float(lead['eventTime']),
+                lead['questionHash'],
+            )
+        return aggregator.flush(force=True)
+
+    def _delete_leads(self, window_key, leads):
+        with self.table.batch_writer() as batch:
+            for lead in leads:
+                batch.delete_item(
+                    Key={'windowKey': window_key, 'itemKey': lead['itemKey']}
+                )
+
+    def _close(self, window):
+        """
+        내보낸 뒤 새 잠재 고객이 없으면 창을 닫고(GSI에서 제외),
+        있으면 lease만 풀어 다음 flush에서 나머지를 내보냅니다.
+        """
+        key = {'windowKey': window['windowKey'], 'itemKey': self.WINDOW_ITEM}
+        try:
+            self.table.update_item(
+                Key=key,
+                UpdateExpression='REMOVE openShard, closeAt, leaseUntil',
+                ConditionExpression='revision = :revision',
+                ExpressionAttributeValues={':revision': window['revision']},
+            )
+        except Exception as e:
+            if _error_code(e) != 'ConditionalCheckFailedException':
+                print(f"Error closing lead window {window['windowKey']}: {e}")
+                return
+        else:
+            return
+        try:
+            self.table.update_item(
+                Key=key, UpdateExpression='REMOVE leaseUntil'
+            )
+        except Exception as e:
+            # lease가 끝나면 다음 flush에서 다시 점유할 수 있습니다.
+            print(f"Error releasing lead window {window['windowKey']}: {e}")
+
+
+def _error_code(error):
+    return (
+        getattr(error, 'response', {})
+        .get('Error', {})
+        .get('Code', type(error).__name__)
+    )
+
+
+def _isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(
+        '%Y-%m-%dT%H:%M:%SZ'
+    )
+
+
+def record_event_time(record, default=None):
+    """
+    DynamoDB 스트림 레코드의 이벤트 시각(epoch 초)입니다.
+    ApproximateCreationDateTime → NewImage.timestamp(ISO 8601)
+    → 현재 시각 순으로 사용합니다.
+    """
+    approximate = record.get('dynamodb', {}).get('ApproximateCreationDateTime')
+    if approximate is not None:
+        try:
+            return float(approximate)
+        except (TypeError, ValueError):
+            pass
+    timestamp = (
+        record.get('dynamodb', {})
+        .get('NewImage', {})
+        .get('timestamp', {})
+        .get('S')
+    )
+    if timestamp:
+        try:
+            return datetime.fromisoformat(
+                timestamp.replace('Z', '+00:00')
+            ).timestamp()
+        except ValueError:
+            pass
+    return time.time() if default is None else default
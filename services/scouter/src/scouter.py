@@ -1,91 +1,258 @@
 import json
 import os
-import google.generativeai as genai
+
+from gemini_client import get_gemini_client
+from lazy_clients import is_warmup_event, warm_up, warmup_response
+from metrics import InvocationMetrics
+from lead_aggregator import (
+    EXTRACTION_FAILED,
+    DynamoDBLeadWindowStore,
+    QuestionDeduplicator,
+    TumblingWindowAggregator,
+    question_key,
+    record_event_time,
+)
 
 # Gemini API 키 설정
+# google.generativeai는 콜드 스타트 시간을 줄이기 위해 처음 추출할 때 불러옵니다.
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
 
+# 잠재 광고주 집계 설정
+# 같은 질문(정규화 해시 기준)은 SCOUTER_DEDUP_WINDOW_SECONDS 동안 한 번만 추출합니다.
+SCOUTER_DEDUP_WINDOW_SECONDS = int(
+    os.environ.get('SCOUTER_DEDUP_WINDOW_SECONDS', '3600')
+)
+SCOUTER_DEDUP_MAX_ENTRIES = int(
+    os.environ.get('SCOUTER_DEDUP_MAX_ENTRIES', '50000')
+)
+# (고객, 광고주)별 신호를 SCOUTER_WINDOW_SECONDS 길이의 고정 창으로 묶어 한 건으로 내보냅니다.
+SCOUTER_WINDOW_SECONDS = int(os.environ.get('SCOUTER_WINDOW_SECONDS', '300'))
+SCOUTER_WINDOW_GRACE_SECONDS = int(
+    os.environ.get('SCOUTER_WINDOW_GRACE_SECONDS', '60')
+)
+# 설정하면 창 상태를 DynamoDB 테이블에 두고, 닫힌 창은 예약 호출({"flushLeadWindows": true})에서 내보냅니다.
+# 설정하지 않으면(로컬 실행) 컨테이너 메모리에서 집계하고 배치 처리 끝에 닫힌 창을 내보냅니다.
+SCOUTER_WINDOW_TABLE = os.environ.get('SCOUTER_WINDOW_TABLE')
+# 서로 다른 질문의 추출을 동시에 실행할 최대 개수
+SCOUTER_CONCURRENCY = int(os.environ.get('SCOUTER_CONCURRENCY', '8'))
+
+# 중복 제거 기록은 컨테이너 안에서 배치 사이에 유지됩니다. (재사용되는 Lambda 실행 환경 기준)
+question_deduplicator = QuestionDeduplicator(
+    SCOUTER_DEDUP_WINDOW_SECONDS, SCOUTER_DEDUP_MAX_ENTRIES
+)
+if SCOUTER_WINDOW_TABLE:
+    lead_windows = DynamoDBLeadWindowStore(
+        SCOUTER_WINDOW_TABLE,
+        SCOUTER_WINDOW_SECONDS,
+        SCOUTER_WINDOW_GRACE_SECONDS,
+    )
+else:
+    lead_windows = TumblingWindowAggregator(
+        SCOUTER_WINDOW_SECONDS, SCOUTER_WINDOW_GRACE_SECONDS
+    )
+
+# 호출 단위 지표 (단계별 시간/카운터를 EMF 한 줄로 출력, 레코드 단위 로그는 표본 추출)
+metrics = InvocationMetrics('scouter')
+
+
+@metrics.instrument
 def handler(event, context):
     """
     DynamoDB 스트림으로부터 받은 레코드를 처리하여 잠재 광고주를 식별하고
     영업 전략 생성을 시작합니다.
+    같은 질문은 배치 안팎에서 한 번만 추출하고, 결과는 (고객, 광고주, 창)별 집계 레코드로 내보냅니다.
+    추출에 실패했거나 창에 저장하지 못한 레코드는 batchItemFailures로 보고해 다시 전달받습니다.
+    """
+    if isinstance(event, dict) and event.get('flushLeadWindows') is True:
+        # 예약 호출: 트래픽이 끊겨도 닫힌 창을 내보냅니다.
+        with metrics.stage('emit'):
+            emitted = lead_windows.emit_closed(emit_scouting_results)
+        metrics.count('emitted', emitted)
+        return {
+            'statusCode': 200,
+            'body': json.dumps(f"Emitted {emitted} lead windows."),
+        }
+
+    if is_warmup_event(event):
+        return warmup_response(
+            warm_up(generative_models=['gemini-pro'] if GEMINI_API_KEY else ())
+        )
+
+    metrics.count('records', len(event['Records']))
+
+    with metrics.stage('decode'):
+        leads = collect_leads(event['Records'])
+    with metrics.stage('extract'):
+        advertisers = resolve_advertisers(leads)
+
+    failed_leads = []
+    identified_leads = []
+    for lead in leads:
+        potential_advertiser = advertisers.get(lead['question_hash'])
+        if potential_advertiser is EXTRACTION_FAILED:
+            failed_leads.append(lead)
+        elif potential_advertiser:
+            identified_leads.append(
+                dict(lead, advertiser=potential_advertiser)
+            )
+
+    with metrics.stage('aggregate'):
+        failed_leads.extend(lead_windows.add_leads(identified_leads))
+
+    if not SCOUTER_WINDOW_TABLE:
+        with metrics.stage('emit'):
+            emitted = lead_windows.emit_closed(emit_scouting_results)
+        metrics.count('emitted', emitted)
+        metrics.count('open_windows', lead_windows.pending())
+    metrics.count('leads', len(leads))
+    metrics.count('distinct_questions', len(advertisers))
+    metrics.count('identified', len(identified_leads))
+    metrics.set_property('dedup', question_deduplicator.stats())
+    metrics.set_property('gemini', get_gemini_client().stats())
+
+    batch_item_failures = report_batch_item_failures(failed_leads)
+    metrics.count('batch_item_failures', len(batch_item_failures))
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps(
+            f"Successfully processed {len(event['Records'])} records."
+        ),
+        'batchItemFailures': batch_item_failures,
+    }
+
+
+def report_batch_item_failures(leads):
+    """
+    실패한 잠재 고객의 스트림 시퀀스 번호를 ReportBatchItemFailures 응답 형식으로 반환합니다.
+    (DynamoDB 스트림은 가장 앞선 실패 레코드부터 다시 전달합니다.
+    창 테이블은 eventID별 항목이라 재전달돼도 두 번 세지 않습니다.)
     """
-    print(f"Processing {len(event['Records'])} records from DynamoDB Stream.")
+    sequence_numbers = dict.fromkeys(lead['sequence_number'] for lead in leads)
+    return [
+        {'itemIdentifier': sequence_number}
+        for sequence_number in sequence_numbers
+    ]
 
-    for record in event['Records']:
+
+def collect_leads(records):
+    """
+    스트림 레코드 중 잠재 광고주 발굴 조건을 만족하는 INSERT를 골라냅니다.
+    """
+    leads = []
+    for record in records:
         try:
             # 이벤트 타입이 INSERT(새로운 데이터 추가)일 때만 처리
-            if record.get('eventName') == 'INSERT':
-                # DynamoDB 스트림 레코드에서 새로운 데이터(NewImage)를 추출
-                new_image = record['dynamodb']['NewImage']
-                
-                # 데이터 타입에 맞게 파싱 (DynamoDB는 타입을 명시함)
-                intent = new_image.get('intent', {}).get('S')
-                question = new_image.get('originalQuestion', {}).get('S')
-                customer_id = new_image.get('customerId', {}).get('S')
-                event_name = new_image.get('eventName', {}).get('S')
-                
-                print(f"New record received: Customer='{customer_id}', Event='{event_name}', Intent='{intent}', Question='{question}'")
-
-                # 1. 잠재 광고주 발굴 조건 확인
-                # 예: 의도가 '구매 고려'이고, 질문에 특정 제품/서비스가 언급될 때
-                if intent == '구매 고려':
-                    print(f"Found potential lead with '구매 고려' intent. Starting scouting process...")
-                    
-                    # 2. 잠재 광고주 정보 추출 (Gemini API 활용)
-                    # TODO: Gemini를 호출하여 질문에서 회사/제품/서비스 이름 추출
-                    potential_advertiser = extract_advertiser_from_question(question)
-                    
-                    if potential_advertiser:
-                        print(f"Identified potential advertiser: {potential_advertiser}")
-                        # 3. 광고주 정보 검색 및 영업 전략 생성
-                        # TODO: Gemini (with Search)를 호출하여 회사 정보, 연락처 등 검색
-                        # TODO: 검색된 정보를 바탕으로 맞춤형 이메일, 랜딩페이지 컨셉 생성
-                        # TODO: 생성된 결과를 S3에 저장하고 영업팀에 SES로 알림 전송
-                        
-                        # 현재는 로그로만 출력 (실제 구현 시 S3, SES 연동)
-                        scouting_result = {
-                            'customer_id': customer_id,
-                            'potential_advertiser': potential_advertiser,
-                            'original_question': question,
-                            'scouting_timestamp': context.aws_request_id,
-                            'status': 'identified'
-                        }
-                        print(f"Scouting result: {json.dumps(scouting_result, ensure_ascii=False)}")
-                    else:
-                        print("Could not identify specific advertiser from question. Skipping.")
-                else:
-                    print("Record does not meet scouting criteria. Skipping.")
+            if record.get('eventName') != 'INSERT':
+                continue
+            # DynamoDB 스트림 레코드에서 새로운 데이터(NewImage)를 추출
+            new_image = record['dynamodb']['NewImage']
 
+            # 데이터 타입에 맞게 파싱 (DynamoDB는 타입을 명시함)
+            intent = new_image.get('intent', {}).get('S')
+            question = new_image.get('originalQuestion', {}).get('S')
+            customer_id = new_image.get('customerId', {}).get('S')
+
+            # 잠재 광고주 발굴 조건: 의도가 '구매 고려'인 질문
+            if intent != '구매 고려' or not question:
+                continue
+            leads.append({
+                'event_id': (
+                    record.get('eventID')
+                    or record['dynamodb']['SequenceNumber']
+                ),
+                'sequence_number': record['dynamodb'].get('SequenceNumber'),
+                'customer_id': customer_id,
+                'question': question,
+                'question_hash': question_key(question),
+                'event_time': record_event_time(record),
+            })
         except Exception as e:
             print(f"Error processing record: {e}")
             continue
-            
-    return {
-        'statusCode': 200,
-        'body': json.dumps(f"Successfully processed {len(event['Records'])} records.")
-    }
+    return leads
+
+
+def resolve_advertisers(leads):
+    """
+    질문 해시 → 광고주를 반환합니다. 추출 호출이 실패한 질문은 EXTRACTION_FAILED입니다.
+    이미 본 질문은 저장된 결과를 쓰고, 처음 보는 질문만 동시에 추출합니다.
+    """
+    advertisers = {}
+    pending = {}
+    for lead in leads:
+        key = lead['question_hash']
+        if key in advertisers or key in pending:
+            continue
+        seen, advertiser = question_deduplicator.lookup(key)
+        if seen:
+            advertisers[key] = advertiser
+        else:
+            pending[key] = lead['question']
+
+    if pending:
+        # concurrent.futures는 콜드 스타트 시간을 줄이기 위해 추출할 질문이 있을 때 불러옵니다.
+        from concurrent.futures import ThreadPoolExecutor
+
+        metrics.count('extractions', len(pending))
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(SCOUTER_CONCURRENCY, len(pending)))
+        ) as executor:
+            results = executor.map(extract_or_fail, pending.values())
+            for key, advertiser in zip(pending, results):
+                question_deduplicator.remember(key, advertiser)
+                advertisers[key] = advertiser
+    return advertisers
+
+
+def emit_scouting_results(results):
+    # 현재는 로그로만 출력 (실제 구현 시 S3, SES 연동)
+    # TODO: Gemini (with Search)를 호출하여 회사 정보, 연락처 등 검색
+    # TODO: 검색된 정보를 바탕으로 맞춤형 이메일, 랜딩페이지 컨셉 생성
+    # TODO: 생성된 결과를 S3에 저장하고 영업팀에 SES로 알림 전송
+    for scouting_result in results:
+        print(
+            "Scouting result:"
+            f" {json.dumps(scouting_result, ensure_ascii=False)}"
+        )
+    return len(results)
+
+
+def extract_or_fail(question):
+    """
+    extract_advertiser_from_question과 같지만 API 오류는 EXTRACTION_FAILED로 구분해 해당
+    레코드를 다시 전달받습니다.
+    """
+    try:
+        return _extract_advertiser(question)
+    except Exception as e:
+        print(f"Error calling Gemini API for extraction: {e}")
+        return EXTRACTION_FAILED
+
 
 def extract_advertiser_from_question(question):
     """
     Gemini API를 사용하여 질문에서 잠재 광고주 이름(회사/제품)을 추출합니다.
     """
-    if not GEMINI_API_KEY:
-        print("GEMINI_API_KEY is not configured. Skipping advertiser extraction.")
-        return None
-        
     try:
-        model = genai.GenerativeModel('gemini-pro')
-        prompt = f"""
-        다음 문장에서 언급된 가장 핵심적인 회사 또는 제품 이름을 하나만 정확히 추출해줘. 다른 설명 없이 이름만 말해줘. 만약 없다면 '없음'이라고 답해줘.
-        문장: "{question}"
-        회사/제품 이름:
-        """
-        response = model.generate_content(prompt)
-        result = response.text.strip()
-        return result if result != "없음" else None
+        return _extract_advertiser(question)
     except Exception as e:
         print(f"Error calling Gemini API for extraction: {e}")
         return None
+
+
+def _extract_advertiser(question):
+    if not GEMINI_API_KEY:
+        print(
+            "GEMINI_API_KEY is not configured. Skipping advertiser extraction."
+        )
+        return None
+
+    prompt = f"""
+    다음 문장에서 언급된 가장 핵심적인 회사 또는 제품 이름을 하나만 정확히 추출해줘. 다른 설명 없이 이름만 말해줘. 만약 없다면 '없음'이라고 답해줘.
+    문장: "{question}"
+    회사/제품 이름:
+    """
+    response = get_gemini_client().generate_content(prompt, 'gemini-pro')
+    result = response.text.strip()
+    return result if result != "없음" else None
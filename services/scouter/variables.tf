@@ -3,3 +3,57 @@ variable "gemini_api_key" {
   type        = string
   sensitive   = true
 }
+
+variable "scouter_window_seconds" {
+  description = "Tumbling window length in seconds for aggregating leads per (customer, advertiser)."
+  type        = string
+  default     = "300"
+}
+
+variable "lead_window_flush_schedule" {
+  description = "EventBridge schedule expression for emitting closed lead windows."
+  type        = string
+  default     = "rate(1 minute)"
+}
+
+variable "stream_max_retry_attempts" {
+  description = "Maximum retries for stream records whose extraction or window write failed (-1 retries until the record expires)."
+  type        = string
+  default     = "10"
+}
+
+variable "scouter_dedup_window_seconds" {
+  description = "Seconds a normalized question is remembered so it is extracted only once."
+  type        = string
+  default     = "3600"
+}
+
+variable "scouter_concurrency" {
+  description = "Maximum concurrent advertiser extractions per batch."
+  type        = string
+  default     = "8"
+}
+
+variable "gemini_rate_limit_per_second" {
+  description = "Gemini calls per second allowed per scouter container (token bucket)."
+  type        = string
+  default     = "5"
+}
+
+variable "gemini_max_concurrency" {
+  description = "Upper bound of the adaptive Gemini concurrency limit per scouter container."
+  type        = string
+  default     = "8"
+}
+
+variable "metrics_enabled" {
+  description = "Emit one CloudWatch Embedded Metric Format line per invocation (\"false\" makes instrumentation a no-op)."
+  type        = string
+  default     = "true"
+}
+
+variable "debug_log_sample_rate" {
+  description = "Fraction of per-record debug log lines to print (0 disables them, 1 logs every record)."
+  type        = string
+  default     = "0.01"
+}
@@ -0,0 +1,175 @@
+"""
+각 Lambda 핸들러의 콜드 스타트 시간(모듈 import 시간, 첫 응답까지의 시간)을 측정합니다.
+핸들러마다 새 Python 프로세스를 띄워 컨테이너 초기화를 흉내 내며, 네트워크/자격 증명 없이
+워밍업 이벤트({"warmup": true})와 네트워크를 쓰지 않는 요청으로 첫 응답 시간을 잽니다.
+
+--baseline에 다른 체크아웃(예: git worktree로 만든 이전 커밋)의 저장소 루트를 주면 같은 방식으로 측정해 비교합니다.
+
+사용법:
+    python services/shared/benchmarks/bench_cold_start.py [--runs 5]
+        [--baseline /tmp/ad-scouter-before]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..')
+)
+
+# (이름, 서비스 src 경로, 모듈, 첫 요청 이벤트)
+# 첫 요청은 외부 호출 없이 끝나는 경로(OPTIONS, 검증 실패, 스킵 대상 레코드)를 사용합니다.
+HANDLERS = [
+    (
+        'api-gateway/ingest',
+        'services/api-gateway/src',
+        'ingest',
+        {
+            'requestContext': {'http': {'method': 'POST'}},
+            'body': json.dumps({'eventName': 'question_asked'}),
+        },
+    ),
+    (
+        'data-processor/processor',
+        'services/data-processor/src',
+        'processor',
+        {'Records': []},
+    ),
+    (
+        'ad-engine/ad_generator',
+        'services/ad-engine/src',
+        'ad_generator',
+        {'requestContext': {'http': {'method': 'OPTIONS'}}},
+    ),
+    (
+        'ad-engine/vectorizer',
+        'services/ad-engine/src',
+        'vectorizer',
+        {'advertiser_info': {}},
+    ),
+    (
+        'scouter/scouter',
+        'services/scouter/src',
+        'scouter',
+        {'Records': [{'eventName': 'MODIFY', 'dynamodb': {}}]},
+    ),
+]
+
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+module = __import__(sys.argv[1])
+imported = time.perf_counter()
+module.handler(json.loads(sys.argv[2]), None)
+responded = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_response_ms': (responded - started) * 1000,
+    'modules': len(sys.modules),
+}))
+"""
+
+
+def measure(repo_root, src, module, event):
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': os.pathsep.join([
+            os.path.join(repo_root, 'services', 'shared', 'python'),
+            os.path.join(repo_root, src),
+        ]),
+        'PYTHONDONTWRITEBYTECODE': '1',
+        'AWS_DEFAULT_REGION': 'ap-northeast-2',
+        'GEMINI_API_KEY': 'local-benchmark',
+        'KINESIS_STREAM_NAME': 'ad-scouter-ingest-stream-local',
+        'STATS_TABLE_NAME': 'ad-scouter-stats-local',
+    })
+    completed = subprocess.run(
+        [
+            sys.executable,
+            '-W',
+            'ignore',
+            '-c',
+            CHILD_SCRIPT,
+            module,
+            json.dumps(event),
+        ],
+        env=env,
+        capture_output=True,
+        text=True,
+        cwd=repo_root,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(
+            completed.stderr.strip().splitlines()[-1]
+            if completed.stderr
+            else 'failed'
+        )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def summarize(repo_root, runs):
+    results = {}
+    for name, src, module, event in HANDLERS:
+        try:
+            samples = [
+                measure(repo_root, src, module, event) for _ in range(runs)
+            ]
+        except RuntimeError as e:
+            results[name] = {'error': str(e)}
+            continue
+        results[name] = {
+            'import_ms': statistics.median(s['import_ms'] for s in samples),
+            'first_response_ms': statistics.median(
+                s['first_response_ms'] for s in samples
+            ),
+            'modules': samples[0]['modules'],
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument(
+        '--baseline', help='비교할 다른 체크아웃의 저장소 루트'
+    )
+    args = parser.parse_args()
+
+    current = summarize(REPO_ROOT, args.runs)
+    baseline = summarize(args.baseline, args.runs) if args.baseline else None
+
+    print(f"median of {args.runs} fresh processes")
+    header = (
+        f"{'handler':<26} {'import ms':>10} {'first resp ms':>14}"
+        f" {'modules':>8}"
+    )
+    if baseline:
+        header += f" {'baseline import':>16} {'baseline resp':>14}"
+    print(header)
+    for name, *_ in HANDLERS:
+        row = current[name]
+        if 'error' in row:
+            line = f"{name:<26} error: {row['error']}"
+        else:
+            line = (
+                f"{name:<26} {row['import_ms']:>10.1f}"
+                f" {row['first_response_ms']:>14.1f} {row['modules']:>8}"
+            )
+        if baseline:
+            before = baseline[name]
+            if 'error' in before:
+                line += f"  baseline error: {before['error']}"
+            else:
+                line += (
+                    f" {before['import_ms']:>16.1f}"
+                    f" {before['first_response_ms']:>14.1f}"
+                )
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""
+공용 Gemini 클라이언트(gemini_client.GeminiClient)의 부하 상황 동작을 측정합니다.
+
+로컬 장애 주입 스텁이 Gemini를 흉내냅니다.
+- 초당 할당량(--quota-rps)과 동시 호출 한도(--provider-concurrency)를 넘으면
+  429(ResourceExhausted)를 돌려줍니다.
+- 동시 호출이 많을수록 응답이 느려집니다.
+- --outage 구간에는 --outage-latency 만큼 기다린 뒤 503(ServiceUnavailable)을 돌려줍니다.
+
+여러 작업 스레드가 계속 요청을 보내고, 실패한 요청은 각 모듈처럼 대체 결과(fallback)로 처리합니다.
+직접 호출(재시도/제한 없음)과 공용 클라이언트를 비교해 성공/대체 결과 수, 제공자가 받은 호출과 429 수,
+장애 구간에서 대체 결과를 받기까지 걸린 시간을 출력하고, 기대하는 성질을 assert로 확인합니다.
+
+사용법:
+    python benchmarks/bench_gemini_client.py [--workers 32] [--duration 10]
+        [--quota-rps 40] [--outage 4 7]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, '..', 'python'))
+
+from gemini_client import (  # noqa: E402
+    AdaptiveConcurrencyLimiter,
+    CircuitBreaker,
+    GeminiClient,
+    TokenBucket,
+)
+
+
+class ResourceExhausted(Exception):
+    code = 429
+
+
+class ServiceUnavailable(Exception):
+    code = 503
+
+
+class FaultInjectingGemini:
+    def __init__(
+        self, quota_rps, max_concurrent, base_latency, outage, outage_latency
+    ):
+        self.quota_rps = quota_rps
+        self.max_concurrent = max_concurrent
+        self.base_latency = base_latency
+        self.outage = outage
+        self.outage_latency = outage_latency
+        self.started = time.monotonic()
+        self.tokens = float(quota_rps)
+        self.updated = self.started
+        self.in_flight = 0
+        self.counters = {'calls': 0, 'ok': 0, 'throttled': 0, 'unavailable': 0}
+        self._lock = threading.Lock()
+
+    def generate(self):
+        with self._lock:
+            now = time.monotonic()
+            self.counters['calls'] += 1
+            self.tokens = min(
+                self.quota_rps,
+                self.tokens + (now - self.updated) * self.quota_rps,
+            )
+            self.updated = now
+            in_outage = self.outage[0] <= now - self.started < self.outage[1]
+            throttled = not in_outage and (
+                self.tokens < 1 or self.in_flight >= self.max_concurrent
+            )
+            if in_outage:
+                self.counters['unavailable'] += 1
+            elif throttled:
+                self.counters['throttled'] += 1
+            else:
+                self.tokens -= 1
+                self.in_flight += 1
+                latency = self.base_latency * (
+                    1 + self.in_flight / self.max_concurrent
+                )
+        if in_outage:
+            time.sleep(self.outage_latency)
+            raise ServiceUnavailable(
+                "503 The service is currently unavailable."
+            )
+        if throttled:
+            time.sleep(0.01)
+            raise ResourceExhausted(
+                "429 Resource has been exhausted (e.g. check quota)."
+            )
+        try:
+            time.sleep(latency)
+            with self._lock:
+                self.counters['ok'] += 1
+            return 'ok'
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def run(args, make_call):
+    provider = FaultInjectingGemini(
+        args.quota_rps,
+        args.provider_concurrency,
+        args.latency,
+        args.outage,
+        args.outage_latency,
+    )
+    call = make_call(provider)
+    results = []
+    results_lock = threading.Lock()
+    stop_at = provider.started + args.duration
+
+    def worker():
+        local = []
+        while time.monotonic() < stop_at:
+            start = time.monotonic()
+            try:
+                call()
+                ok = True
+            except Exception:
+                ok = False  # 모듈의 대체 경로 (기본 광고, '분석 실패' 등)
+            local.append(
+                (start - provider.started, time.monotonic() - start, ok)
+            )
+            time.sleep(args.think_time)
+        with results_lock:
+            results.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return provider, results
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return (
+        values[min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))]
+        if values
+        else 0.0
+    )
+
+
+def summarize(name, provider, results, outage):
+    ok = [latency for _, latency, success in results if success]
+    fallback = [latency for _, latency, success in results if not success]
+    outage_fallback = [
+        latency
+        for start, latency, success in results
+        if not success and outage[0] <= start < outage[1]
+    ]
+    print(
+        f"{name:<24} {len(ok):>6} {len(fallback):>8}"
+        f" {provider.counters['calls']:>10}"
+        f" {provider.counters['throttled']:>6}"
+        f" {percentile(ok, 50) * 1000:>8.0f} {percentile(ok, 99) * 1000:>8.0f}"
+        f" {percentile(outage_fallback, 50) * 1000:>12.0f}"
+        f" {sum(fallback):>11.1f}"
+    )
+    return {
+        'ok': len(ok),
+        'fallback': len(fallback),
+        'throttled': provider.counters['throttled'],
+        'calls': provider.counters['calls'],
+        'outage_fallback_p50': percentile(outage_fallback, 50),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--quota-rps', type=float, default=40.0)
+    parser.add_argument('--provider-concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument(
+        '--outage',
+        type=float,
+        nargs=2,
+        default=[4.0, 7.0],
+        help='503 구간 (시작, 끝 초)',
+    )
+    parser.add_argument(
+        '--outage-latency',
+        type=float,
+        default=1.0,
+        help='503을 돌려주기까지 걸리는 시간(초)',
+    )
+    parser.add_argument(
+        '--think-time',
+        type=float,
+        default=0.05,
+        help='요청 사이 작업 스레드 대기(초)',
+    )
+    parser.add_argument(
+        '--call-budget',
+        type=float,
+        default=2.0,
+        help='요청 하나가 대기/재시도에 쓸 수 있는 시간(초)',
+    )
+    args = parser.parse_args()
+
+    def direct(provider):
+        return provider.generate
+
+    def client(rate):
+        def make(provider):
+            gemini = GeminiClient(
+                rate_limiter=TokenBucket(rate, burst=int(rate) or None),
+                concurrency_limiter=AdaptiveConcurrencyLimiter(
+                    initial=8, min_limit=1, max_limit=32, latency_target=1.0
+                ),
+                breaker=CircuitBreaker(failure_threshold=5, reset_timeout=1.0),
+                max_retries=3,
+                base_delay=0.05,
+                max_delay=1.0,
+                max_wait=args.call_budget,
+            )
+            make.client = gemini
+            return lambda: gemini.call(provider.generate)
+
+        return make
+
+    print(
+        f"{args.workers} workers for {args.duration:.0f}s, provider quota"
+        f" {args.quota_rps:.0f} rps / {args.provider_concurrency} concurrent,"
+        f" 503 outage {args.outage[0]:.0f}-{args.outage[1]:.0f}s"
+        f" ({args.outage_latency:.1f}s each)"
+    )
+    print(
+        f"{'mode':<24} {'ok':>6} {'fallback':>8} {'provider':>10} {'429s':>6}"
+        f" {'p50 ms':>8} {'p99 ms':>8} {'outage fb ms':>12} {'fallback s':>11}"
+    )
+
+    results = {}
+    for name, make_call in (
+        ('direct (no client)', direct),
+        ('client, AIMD only', client(0)),
+        (f'client, bucket {args.quota_rps:.0f}/s', client(args.quota_rps)),
+    ):
+        provider, outcome = run(args, make_call)
+        results[name] = summarize(name, provider, outcome, args.outage)
+        if hasattr(make_call, 'client'):
+            stats = make_call.client.stats()
+            print(
+                f"    retries {stats['retries']}, fast failures"
+                f" {stats['fast_failures']}, breaker opened"
+                f" {stats['breaker']['opened']}x, final concurrency limit"
+                f" {stats['concurrency']['limit']}"
+            )
+
+    direct_result = results['direct (no client)']
+    for name, result in results.items():
+        if name == 'direct (no client)':
+            continue
+        # 공용 클라이언트는 429를 훨씬 덜 일으키면서 할당량만큼(직접 호출의 90% 이상) 성공시키고,
+        # 장애 중에는 대체 결과를 더 빨리 돌려줘야 합니다.
+        assert result['throttled'] * 10 <= direct_result['throttled'], name
+        assert result['ok'] >= direct_result['ok'] * 0.9, name
+        assert result['outage_fallback_p50'] < args.outage_latency / 2, name
+    print(
+        "\nassertions passed: >10x fewer 429s, successes within 10% of the"
+        " quota-bound direct mode, fast fallback during the outage"
+    )
+
+
+if __name__ == '__main__':
+    main()
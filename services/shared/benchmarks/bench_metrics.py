@@ -0,0 +1,209 @@
+"""
+호출 단위 지표(metrics.InvocationMetrics)의 비용과 로그 양을 측정합니다.
+
+1. 연산별 비용: stage/count/observe/debug를 켠 상태와 끈 상태(no-op)에서 호출 하나당 ns
+2. processor.handler: 100개 Kinesis 레코드(레코드당 이벤트 5개) 배치를 의도 캐시가 채워진 상태로 처리하며
+   설정별 배치 처리 시간(중앙값)과 출력 로그 줄/바이트를 비교합니다.
+   (디버그 표본 비율 1.0은 이전처럼 모든 이벤트를 로그로 남기는 경우에 해당)
+
+사용법:
+    python benchmarks/bench_metrics.py [--batches 50] [--records 100]
+        [--events-per-record 5]
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICES_DIR = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+sys.path.insert(0, os.path.join(SERVICES_DIR, 'shared', 'python'))
+sys.path.insert(0, os.path.join(SERVICES_DIR, 'data-processor', 'src'))
+sys.path.insert(0, BASE_DIR)
+os.environ['GEMINI_API_KEY'] = 'local-benchmark'
+os.environ['STATS_TABLE_NAME'] = 'ad-scouter-stats-local'
+for name in ('INTENT_CACHE_TABLE_NAME', 'INTENT_CACHE_SQLITE_PATH'):
+    os.environ.pop(name, None)
+
+from metrics import InvocationMetrics  # noqa: E402
+
+# (이름, 지표 사용, 디버그 로그 표본 비율)
+CONFIGS = [
+    ('per-event logs (sample 1.0)', True, 1.0),
+    ('metrics + sampled logs (0.01)', True, 0.01),
+    ('metrics only (sample 0)', True, 0.0),
+    ('no-op (disabled, sample 0)', False, 0.0),
+]
+
+
+def per_call_ns(function, iterations=200000):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - started) / iterations * 1e9
+
+
+def bench_operations():
+    print(f"{'operation':<22} {'enabled ns':>11} {'no-op ns':>9}")
+    for label, make_call in (
+        ('stage()', lambda m: lambda: m.stage('decode').__enter__()),
+        ('with stage()', lambda m: lambda: _with_stage(m)),
+        ('count()', lambda m: lambda: m.count('events')),
+        ('observe()', lambda m: lambda: m.observe('latency', 1.5)),
+        ('debug() sample 0', lambda m: lambda: m.debug("Decoded data: %s", m)),
+    ):
+        enabled = InvocationMetrics(
+            'bench', enabled=True, sample_rate=0.0, emit=lambda line: None
+        )
+        disabled = InvocationMetrics(
+            'bench', enabled=False, sample_rate=0.0, emit=lambda line: None
+        )
+        print(
+            f"{label:<22} {per_call_ns(make_call(enabled)):>11.0f}"
+            f" {per_call_ns(make_call(disabled)):>9.0f}"
+        )
+
+
+def _with_stage(metrics):
+    with metrics.stage('decode'):
+        pass
+
+
+def build_batch(args):
+    from event_codec import pack_events
+    from pipeline_stubs import InMemoryKinesis
+
+    kinesis = InMemoryKinesis(shards=1)
+    questions = [
+        f"클라우드 스토리지 사용법 알려주세요 ({i})" for i in range(50)
+    ]
+    records = []
+    for record in range(args.records):
+        events = [
+            {
+                'apiKey': f"customer-{record % 10}",
+                'eventName': 'question_asked',
+                'properties': {
+                    'question': questions[(record + i) % len(questions)],
+                    'page': '/pricing',
+                },
+                'timestamp': '2025-08-25T00:00:00Z',
+            }
+            for i in range(args.events_per_record)
+        ]
+        ((_, data, _),) = pack_events(events, lambda e: 'same-key')
+        records.append(
+            {'Data': data, 'PartitionKey': f"customer-{record % 10}"}
+        )
+    kinesis.put_records(StreamName='local', Records=records)
+    return kinesis.poll(batch_size=args.records)[0]
+
+
+def bench_processor(args):
+    import gemini_client
+    import processor
+    from gemini_client import (
+        AdaptiveConcurrencyLimiter,
+        CircuitBreaker,
+        TokenBucket,
+    )
+    from pipeline_stubs import (
+        GeminiStub,
+        InMemoryStreamingDynamoDB,
+        StubGeminiClient,
+    )
+
+    processor.dynamodb = InMemoryStreamingDynamoDB()
+    gemini_client._default_client = StubGeminiClient(
+        GeminiStub(latency_ms=0.0, embed_latency_ms=0.0),
+        rate_limiter=TokenBucket(0),
+        concurrency_limiter=AdaptiveConcurrencyLimiter(8, 1, 32),
+        breaker=CircuitBreaker(5, 5.0),
+    )
+    batch = build_batch(args)
+    # 한 번 처리해 의도 캐시를 채워 측정하는 배치는 LLM 호출 없이 처리합니다.
+    with redirect_stdout(io.StringIO()):
+        processor.handler(_fresh(batch, 'warm'), None)
+    events = args.records * args.events_per_record
+
+    print(
+        f"\nprocessor.handler, {args.records} records x"
+        f" {args.events_per_record} events per batch, {args.batches} batches"
+        " per configuration (intent cache warm)"
+    )
+    print(
+        f"{'configuration':<32} {'ms/batch':>9} {'us/event':>9}"
+        f" {'log lines':>10} {'log KB':>8}"
+    )
+    handlers = {}
+    for label, enabled, sample_rate in CONFIGS:
+        # 데코레이터는 import 시점의 인스턴스를 잡고 있으므로 설정별 인스턴스로 다시 감쌉니다.
+        metrics = InvocationMetrics(
+            'data-processor', enabled=enabled, sample_rate=sample_rate
+        )
+        handlers[label] = (
+            metrics,
+            metrics.instrument(processor.handler.__wrapped__),
+        )
+    results = {label: ([], [0, 0]) for label in handlers}
+    # 순서 효과를 줄이도록 설정을 번갈아 실행합니다.
+    for _ in range(args.batches):
+        for label, (metrics, handler) in handlers.items():
+            processor.metrics = metrics
+            processor.dynamodb = InMemoryStreamingDynamoDB()
+            # 시퀀스 번호를 바꿔 같은 배치를 여러 번 처리해도 이미 저장된 이벤트로 건너뛰지 않게 합니다.
+            event = _fresh(batch, label)
+            output = io.StringIO()
+            with redirect_stdout(output):
+                started = time.perf_counter()
+                handler(event, None)
+                results[label][0].append(
+                    (time.perf_counter() - started) * 1000
+                )
+            text = output.getvalue()
+            results[label][1][0] += text.count('\n')
+            results[label][1][1] += len(text.encode('utf-8'))
+
+    for label, (durations, (lines, size)) in results.items():
+        median = statistics.median(durations)
+        print(
+            f"{label:<32} {median:>9.2f} {median * 1000 / events:>9.1f}"
+            f" {lines / len(durations):>10.1f}"
+            f" {size / len(durations) / 1024:>8.1f}"
+        )
+
+
+def _fresh(batch, label):
+    return {
+        'Records': [
+            {
+                **record,
+                'kinesis': {
+                    **record['kinesis'],
+                    'sequenceNumber': (
+                        f"{label[:3]}{time.perf_counter_ns()}{index}"
+                    ),
+                },
+            }
+            for index, record in enumerate(batch['Records'])
+        ]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batches', type=int, default=50)
+    parser.add_argument('--records', type=int, default=100)
+    parser.add_argument('--events-per-record', type=int, default=5)
+    args = parser.parse_args()
+
+    bench_operations()
+    bench_processor(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,581 @@
+"""
+AWS/Gemini 없이 전체 파이프라인을 재생하며 처리량을 측정합니다.
+
+    ingest.handler → (메모리 Kinesis) → processor.handler → (메모리 DynamoDB + 스트림) →
+    scouter.handler
+    ad_generator.handler (같은 질문으로 광고 요청)
+
+합성 이벤트(Zipf 분포의 반복 질문) 또는 기록된 이벤트 파일(--corpus, SDK 이벤트 JSON 한 줄에 하나)을 재생합니다.
+Gemini 생성/임베딩은 지연 시간(로그 정규 분포)과 오류(503/429) 비율을 조절할 수 있는 결정적 스텁이며,
+공용 GeminiClient(속도 제한/재시도/회로 차단)를 그대로 거칩니다.
+
+처리량(events/s, 단계별 records/s), 단계별 지연 백분위수, 이벤트당 LLM 호출 수, 메모리 최고치를 출력하고
+JSON 파일로 저장합니다. --compare로 두 결과 파일(예: 두 커밋)의 차이를 비교합니다.
+
+사용법:
+    python services/shared/benchmarks/bench_pipeline.py [--events 2000]
+        [--distinct 300] [--llm-latency-ms 80]
+        [--error-rate 0.0] [--throttle-rate 0.0] [--corpus events.jsonl]
+            [--output pipeline.json]
+    python services/shared/benchmarks/bench_pipeline.py --compare before.json
+        after.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICES_DIR = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+REPO_ROOT = os.path.dirname(SERVICES_DIR)
+for path in (
+    os.path.join(SERVICES_DIR, 'shared', 'python'),
+    os.path.join(SERVICES_DIR, 'api-gateway', 'src'),
+    os.path.join(SERVICES_DIR, 'data-processor', 'src'),
+    os.path.join(SERVICES_DIR, 'scouter', 'src'),
+    os.path.join(SERVICES_DIR, 'ad-engine', 'src'),
+    BASE_DIR,
+):
+    sys.path.insert(0, path)
+
+# 비교할 때 보여 줄 지표 (경로, 클수록 좋은지)
+COMPARE_METRICS = [
+    (('throughput', 'events_per_second'), True),
+    (('stages', 'ingest', 'records_per_second'), True),
+    (('stages', 'processor', 'records_per_second'), True),
+    (('stages', 'scouter', 'records_per_second'), True),
+    (('stages', 'ad_generator', 'records_per_second'), True),
+    (('latency_ms', 'processor', 'p99'), False),
+    (('latency_ms', 'kinesis_to_stored', 'p99'), False),
+    (('latency_ms', 'ad_generator', 'p99'), False),
+    (('llm', 'calls_per_event'), False),
+    (('memory', 'max_rss_mb'), False),
+]
+
+PRODUCTS = [
+    'AI 서비스',
+    '클라우드 스토리지',
+    '노트북',
+    '스마트폰',
+    '번역 API',
+    '검색 광고',
+]
+PURCHASE_TEMPLATES = [
+    '{company} {product} 가격은 얼마인가요?',
+    '{company} {product} 구독 가격 비교해주세요',
+    '{company}의 {product} 가격 할인 있나요?',
+]
+OTHER_TEMPLATES = [
+    '{product} 사용법 알려주세요',
+    '{product} 기능 중에 번역도 되나요?',
+    '{product}는 무엇인가요?',
+    '오늘 {product} 관련 뉴스 요약해줘',
+    '{product} 설정이 안 돼요',
+]
+
+
+def synthetic_corpus(args):
+    from pipeline_stubs import COMPANIES
+
+    rng = random.Random(args.seed)
+    pool = []
+    for i in range(args.distinct):
+        product = PRODUCTS[i % len(PRODUCTS)]
+        if rng.random() < args.purchase_share:
+            template = rng.choice(PURCHASE_TEMPLATES)
+        else:
+            template = rng.choice(OTHER_TEMPLATES)
+        pool.append(
+            template.format(
+                company=COMPANIES[i % len(COMPANIES)], product=product
+            )
+            + f" ({i})"
+        )
+    weights = [1.0 / (rank + 1) ** args.skew for rank in range(len(pool))]
+    started = datetime(2025, 8, 25, tzinfo=timezone.utc).timestamp()
+    return [
+        {
+            'apiKey': f"customer-{rng.randrange(args.customers)}",
+            'eventName': 'question_asked',
+            'properties': {'question': question},
+            'timestamp': (
+                datetime.fromtimestamp(started + i, timezone.utc).strftime(
+                    '%Y-%m-%dT%H:%M:%SZ'
+                )
+            ),
+        }
+        for i, question in enumerate(rng.choices(pool, weights, k=args.events))
+    ]
+
+
+def load_corpus(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def max_rss_mb():
+    # Linux는 KiB, macOS는 바이트 단위입니다.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def configure_environment(args):
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-2')
+    os.environ['GEMINI_API_KEY'] = 'local-benchmark'
+    os.environ['KINESIS_STREAM_NAME'] = 'ad-scouter-ingest-stream-local'
+    os.environ['STATS_TABLE_NAME'] = 'ad-scouter-stats-local'
+    os.environ['AD_DEADLINE_MS'] = str(args.ad_deadline_ms)
+    for name in (
+        'INTENT_CACHE_TABLE_NAME',
+        'INTENT_CACHE_SQLITE_PATH',
+        'EMBEDDING_CACHE_PATH',
+        'AD_INDEX_PATH',
+    ):
+        os.environ.pop(name, None)
+
+
+class Pipeline:
+    """
+    핸들러들과 메모리 대체 구현을 연결하고, 단계별 시간/레코드 수를 기록합니다.
+    """
+
+    def __init__(self, args):
+        import ad_generator
+        import gemini_client
+        import ingest
+        import processor
+        import scouter
+        from gemini_client import (
+            AdaptiveConcurrencyLimiter,
+            CircuitBreaker,
+            TokenBucket,
+        )
+        from latency import LatencyTracker
+        from pipeline_stubs import (
+            GeminiStub,
+            InMemoryKinesis,
+            InMemoryStreamingDynamoDB,
+            StubGeminiClient,
+        )
+
+        self.args = args
+        self.ingest, self.processor, self.scouter, self.ad_generator = (
+            ingest,
+            processor,
+            scouter,
+            ad_generator,
+        )
+        self.kinesis = InMemoryKinesis(shards=args.shards)
+        self.dynamodb = InMemoryStreamingDynamoDB(
+            latency=args.dynamodb_latency_ms / 1000.0
+        )
+        self.gemini = GeminiStub(
+            args.llm_latency_ms,
+            args.llm_sigma,
+            args.embed_latency_ms,
+            args.error_rate,
+            args.throttle_rate,
+            seed=args.seed,
+        )
+        self.client = StubGeminiClient(
+            self.gemini,
+            rate_limiter=TokenBucket(args.gemini_rate),
+            concurrency_limiter=AdaptiveConcurrencyLimiter(8, 1, 32),
+            breaker=CircuitBreaker(5, 5.0),
+            max_retries=3,
+            base_delay=0.05,
+            max_delay=1.0,
+            max_wait=10.0,
+        )
+        ingest.kinesis_client = self.kinesis
+        processor.dynamodb = self.dynamodb
+        gemini_client._default_client = self.client
+
+        self.latency = LatencyTracker(window=10**7)
+        self.stage_seconds = {
+            'ingest': 0.0,
+            'processor': 0.0,
+            'scouter': 0.0,
+            'ad_generator': 0.0,
+        }
+        self.stage_records = dict.fromkeys(self.stage_seconds, 0)
+        self.failed_records = 0
+        self.scouting_results = 0
+        self.ad_sources = {}
+
+        real_emit = scouter.emit_scouting_results
+
+        def count_emitted(results):
+            self.scouting_results += len(results)
+            return real_emit(results)
+
+        scouter.emit_scouting_results = count_emitted
+
+    def _timed(self, stage, records, call):
+        started = time.perf_counter()
+        result = call()
+        elapsed = time.perf_counter() - started
+        self.stage_seconds[stage] += elapsed
+        self.stage_records[stage] += records
+        self.latency.record(stage, elapsed * 1000)
+        return result
+
+    def send(self, events):
+        body = json.dumps({'events': events}, ensure_ascii=False)
+        request = {
+            'requestContext': {'http': {'method': 'POST'}},
+            'body': body,
+        }
+        self._timed(
+            'ingest', len(events), lambda: self.ingest.handler(request, None)
+        )
+
+    def drain_kinesis(self):
+        for batch in self.kinesis.poll(self.args.batch_size):
+            response = self._timed(
+                'processor',
+                len(batch['Records']),
+                lambda: self.processor.handler(batch, None),
+            )
+            self.failed_records += len(response.get('batchItemFailures', []))
+            now = time.time()
+            for record in batch['Records']:
+                self.latency.record(
+                    'kinesis_to_stored',
+                    (now - record['kinesis']['approximateArrivalTimestamp'])
+                    * 1000,
+                )
+        self.drain_stream()
+
+    def drain_stream(self):
+        for batch in self.dynamodb.poll_stream(self.args.batch_size):
+            self._timed(
+                'scouter',
+                len(batch['Records']),
+                lambda: self.scouter.handler(batch, None),
+            )
+            now = time.time()
+            for record in batch['Records']:
+                self.latency.record(
+                    'stream_to_scouted',
+                    (now - record['dynamodb']['ApproximateCreationDateTime'])
+                    * 1000,
+                )
+
+    def request_ad(self, question):
+        request = {'body': json.dumps({'query': question}, ensure_ascii=False)}
+        response = self._timed(
+            'ad_generator', 1, lambda: self.ad_generator.handler(request, None)
+        )
+        source = json.loads(response['body']).get(
+            'ad_source', f"status {response['statusCode']}"
+        )
+        self.ad_sources[source] = self.ad_sources.get(source, 0) + 1
+
+    def finish(self):
+        self.drain_kinesis()
+        # 남은 집계 창과 백그라운드 광고 생성을 마무리합니다.
+        self.scouting_results += len(
+            self.scouter.lead_windows.flush(force=True)
+        )
+        self.ad_generator.get_generation_executor().shutdown(wait=True)
+
+
+def run(args, corpus):
+    configure_environment(args)
+    if args.tracemalloc:
+        tracemalloc.start()
+    rss_before = max_rss_mb()
+    rng = random.Random(args.seed + 1)
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        pipeline = Pipeline(args)
+        rss_after_import = max_rss_mb()
+        started = time.perf_counter()
+        for start in range(0, len(corpus), args.events_per_request):
+            events = corpus[start:start + args.events_per_request]
+            pipeline.send(events)
+            for event in events:
+                if rng.random() < args.ad_share:
+                    pipeline.request_ad(
+                        event.get('properties', {}).get('question', '')
+                    )
+            if pipeline.kinesis.pending() >= args.batch_size:
+                pipeline.drain_kinesis()
+        pipeline.finish()
+        wall = time.perf_counter() - started
+
+    events = len(corpus)
+    llm_calls = dict(sorted(pipeline.gemini.calls.items()))
+    total_llm = sum(llm_calls.values())
+    result = {
+        'meta': {
+            'commit': git_commit(),
+            'created_at': (
+                datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+            ),
+            'python': platform.python_version(),
+            'corpus': args.corpus or 'synthetic',
+            'args': vars(args),
+        },
+        'throughput': {
+            'events': events,
+            'wall_seconds': round(wall, 3),
+            'events_per_second': round(events / wall, 1) if wall else None,
+        },
+        'stages': {
+            stage: {
+                'records': pipeline.stage_records[stage],
+                'seconds': round(seconds, 3),
+                'records_per_second': (
+                    round(pipeline.stage_records[stage] / seconds, 1)
+                    if seconds
+                    else None
+                ),
+            }
+            for stage, seconds in pipeline.stage_seconds.items()
+        },
+        'latency_ms': {
+            stage: {
+                key: round(value, 2) if isinstance(value, float) else value
+                for key, value in values.items()
+            }
+            for stage, values in pipeline.latency.summary().items()
+        },
+        'llm': {
+            'calls': llm_calls,
+            'failures': dict(sorted(pipeline.gemini.failures.items())),
+            'calls_per_event': (
+                round(total_llm / events, 4) if events else None
+            ),
+            'client': pipeline.client.stats(),
+        },
+        'memory': {
+            'max_rss_mb': round(max_rss_mb(), 1),
+            'rss_growth_mb': round(max_rss_mb() - rss_after_import, 1),
+            'import_rss_mb': round(rss_after_import - rss_before, 1),
+        },
+        'outputs': {
+            'stored_items': len(
+                pipeline.dynamodb.items(os.environ['STATS_TABLE_NAME'])
+            ),
+            'failed_records_reported': pipeline.failed_records,
+            'scouting_results': pipeline.scouting_results,
+            'ad_sources': pipeline.ad_sources,
+        },
+    }
+    if args.tracemalloc:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['memory']['python_heap_peak_mb'] = round(
+            peak / (1024 * 1024), 1
+        )
+    return result
+
+
+def print_report(result):
+    throughput = result['throughput']
+    print(
+        f"commit {result['meta']['commit']}, {throughput['events']} events"
+        f" ({result['meta']['corpus']}) in {throughput['wall_seconds']:.2f}s"
+        f" -> {throughput['events_per_second']} events/s"
+    )
+    print(
+        f"\n{'stage':<18} {'records':>8} {'seconds':>8} {'records/s':>10}"
+        f" {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for stage, values in result['latency_ms'].items():
+        totals = result['stages'].get(stage)
+        if totals:
+            columns = (
+                f"{totals['records']:>8} {totals['seconds']:>8.2f}"
+                f" {totals['records_per_second'] or 0:>10.1f}"
+            )
+        else:
+            columns = f"{values['count']:>8} {'-':>8} {'-':>10}"
+        print(
+            f"{stage:<18} {columns} {values['p50']:>8.1f}"
+            f" {values['p95']:>8.1f} {values['p99']:>8.1f}"
+        )
+    print(
+        "(processor records are aggregated Kinesis records; scouter records"
+        " are DynamoDB stream records)"
+    )
+    llm = result['llm']
+    print(
+        f"\nLLM calls {llm['calls']} ({llm['calls_per_event']} per event),"
+        f" failures {llm['failures']}, retries {llm['client']['retries']},"
+        f" fast failures {llm['client']['fast_failures']}"
+    )
+    memory = result['memory']
+    print(
+        f"memory: max RSS {memory['max_rss_mb']} MB (imports"
+        f" +{memory['import_rss_mb']} MB, run +{memory['rss_growth_mb']} MB)"
+        + (
+            f", Python heap peak {memory['python_heap_peak_mb']} MB"
+            if 'python_heap_peak_mb' in memory
+            else ''
+        )
+    )
+    print(f"outputs: {result['outputs']}")
+
+
+def lookup(result, path):
+    for key in path:
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result
+
+
+def compare(before_path, after_path):
+    with open(before_path, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(after_path, encoding='utf-8') as f:
+        after = json.load(f)
+    print(
+        f"{'metric':<42} {before['meta']['commit'] or 'before':>10}"
+        f" {after['meta']['commit'] or 'after':>10} {'change':>8}"
+    )
+    for path, higher_is_better in COMPARE_METRICS:
+        old, new = lookup(before, path), lookup(after, path)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        better = (change > 0) == higher_is_better if change else None
+        marker = '' if better is None else (' +' if better else ' -')
+        print(
+            f"{'.'.join(path):<42} {old:>10} {new:>10}"
+            f" {change:>+7.1f}%{marker}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--compare',
+        nargs=2,
+        metavar=('BEFORE', 'AFTER'),
+        help='두 결과 파일 비교',
+    )
+    parser.add_argument('--corpus', help='기록된 SDK 이벤트 파일 (JSON Lines)')
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument(
+        '--distinct', type=int, default=300, help='합성 질문 종류 수'
+    )
+    parser.add_argument(
+        '--skew',
+        type=float,
+        default=1.1,
+        help='Zipf 지수 (클수록 반복이 많음)',
+    )
+    parser.add_argument('--customers', type=int, default=20)
+    parser.add_argument(
+        '--purchase-share',
+        type=float,
+        default=0.4,
+        help="'구매 고려' 질문 비율",
+    )
+    parser.add_argument('--events-per-request', type=int, default=20)
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=100,
+        help='Kinesis/DynamoDB 스트림 배치 크기',
+    )
+    parser.add_argument('--shards', type=int, default=2)
+    parser.add_argument(
+        '--ad-share',
+        type=float,
+        default=0.1,
+        help='광고 요청을 보내는 이벤트 비율',
+    )
+    parser.add_argument('--ad-deadline-ms', type=int, default=1500)
+    parser.add_argument(
+        '--llm-latency-ms',
+        type=float,
+        default=80.0,
+        help='생성 호출 지연 중앙값',
+    )
+    parser.add_argument(
+        '--llm-sigma',
+        type=float,
+        default=0.5,
+        help='지연 로그 정규 분포 sigma',
+    )
+    parser.add_argument('--embed-latency-ms', type=float, default=20.0)
+    parser.add_argument(
+        '--error-rate', type=float, default=0.0, help='503 비율'
+    )
+    parser.add_argument(
+        '--throttle-rate', type=float, default=0.0, help='429 비율'
+    )
+    parser.add_argument(
+        '--gemini-rate',
+        type=float,
+        default=0.0,
+        help='공용 클라이언트 초당 호출 수 (0이면 제한 없음)',
+    )
+    parser.add_argument('--dynamodb-latency-ms', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--tracemalloc',
+        action='store_true',
+        help='Python 힙 최고치도 측정 (느려짐)',
+    )
+    parser.add_argument(
+        '--output',
+        help=(
+            '결과 JSON 경로 (기본: benchmarks/results/pipeline-<commit>.json)'
+        ),
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    corpus = (
+        load_corpus(args.corpus) if args.corpus else synthetic_corpus(args)
+    )
+    result = run(args, corpus)
+    print_report(result)
+
+    output = args.output or os.path.join(
+        BASE_DIR,
+        'results',
+        f"pipeline-{result['meta']['commit'] or 'local'}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\nsaved {output}")
+
+
+if __name__ == '__main__':
+    main()
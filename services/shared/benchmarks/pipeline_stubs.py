@@ -0,0 +1,361 @@
+"""
+파이프라인 재생 하니스(bench_pipeline.py)용 로컬 대체 구현입니다.
+Kinesis, DynamoDB(+스트림), Gemini(생성/임베딩)를 메모리 안에서 흉내 내며 지연 시간과 오류를 주입합니다.
+"""
+
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+
+from gemini_client import GeminiClient
+
+INTENTS = ['정보 탐색', '구매 고려', '기능 문의', '단순 대화', '기타']
+COMPANIES = [
+    'Microsoft',
+    'Google',
+    'Apple',
+    'Amazon',
+    'Samsung',
+    'Naver',
+    'Kakao',
+]
+
+_BATCH_ITEM = re.compile(r'^\d+\. (".*")$', re.MULTILINE)
+_INTENT_ITEM = re.compile(r'텍스트: "(.*)"', re.DOTALL)
+_SENTENCE_ITEM = re.compile(r'문장: "(.*)"', re.DOTALL)
+_QUERY_ITEM = re.compile(r'사용자 질문: (.*)')
+
+
+class InMemoryKinesis:
+    """
+    put_records를 받아 파티션 키 해시로 샤드에 나눠 담고,
+    Lambda 이벤트 형식의 배치로 꺼내 주는 Kinesis 대체 구현입니다.
+    """
+
+    def __init__(self, shards=1):
+        self.shards = [[] for _ in range(max(1, shards))]
+        self.positions = [0] * len(self.shards)
+        self.calls = 0
+        self._sequence = 49650000000000000000
+        self._lock = threading.Lock()
+
+    def put_records(self, StreamName, Records):
+        with self._lock:
+            self.calls += 1
+            results = []
+            for record in Records:
+                shard = int(
+                    hashlib.md5(
+                        record['PartitionKey'].encode('utf-8')
+                    ).hexdigest(),
+                    16,
+                ) % len(self.shards)
+                self._sequence += 1
+                self.shards[shard].append({
+                    'kinesis': {
+                        'partitionKey': record['PartitionKey'],
+                        'sequenceNumber': str(self._sequence),
+                        'data': (
+                            base64.b64encode(record['Data']).decode('ascii')
+                        ),
+                        'approximateArrivalTimestamp': time.time(),
+                    },
+                    'eventSource': 'aws:kinesis',
+                })
+                results.append({
+                    'SequenceNumber': str(self._sequence),
+                    'ShardId': f'shardId-{shard:012d}',
+                })
+        return {'FailedRecordCount': 0, 'Records': results}
+
+    def poll(self, batch_size=100):
+        """
+        샤드마다 아직 전달하지 않은 레코드를 batch_size개씩 Lambda 이벤트로 반환합니다.
+        """
+        with self._lock:
+            batches = []
+            for shard, records in enumerate(self.shards):
+                start = self.positions[shard]
+                if start < len(records):
+                    batch = records[start:start + batch_size]
+                    self.positions[shard] += len(batch)
+                    batches.append({'Records': batch})
+            return batches
+
+    def pending(self):
+        with self._lock:
+            return sum(
+                len(records) - position
+                for records, position in zip(self.shards, self.positions)
+            )
+
+
+def _typed(value):
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, float)):
+        return {'N': str(value)}
+    return {'S': str(value)}
+
+
+class InMemoryStreamingDynamoDB:
+    """
+    batch_write_item/batch_get_item을 지원하는 DynamoDB 대체 구현입니다.
+    항목이 새로 생기면 INSERT, 덮어쓰면 MODIFY 스트림
+    레코드(NEW_IMAGE)를 쌓아 두고 poll_stream으로 꺼내 줍니다.
+    """
+
+    def __init__(self, key_names=('customerId', 'eventId'), latency=0.0):
+        self.key_names = key_names
+        self.latency = latency
+        self.tables = {}
+        self.stream = []
+        self.stream_position = 0
+        self.calls = 0
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def items(self, table_name):
+        with self._lock:
+            return list(self.tables.get(table_name, {}).values())
+
+    def _store(self, table_name, item):
+        key = tuple(item.get(name) for name in self.key_names)
+        if any(value in (None, '') for value in key):
+            raise ValidationException(f"Missing key attribute in item: {key}")
+        table = self.tables.setdefault(table_name, {})
+        event_name = 'MODIFY' if key in table else 'INSERT'
+        table[key] = dict(item)
+        self._sequence += 1
+        self.stream.append({
+            'eventID': str(self._sequence),
+            'eventName': event_name,
+            'eventSource': 'aws:dynamodb',
+            'dynamodb': {
+                'ApproximateCreationDateTime': time.time(),
+                'Keys': {
+                    name: _typed(item.get(name)) for name in self.key_names
+                },
+                'NewImage': {
+                    name: _typed(value) for name, value in item.items()
+                },
+                'SequenceNumber': str(self._sequence),
+                'StreamViewType': 'NEW_IMAGE',
+            },
+        })
+
+    def batch_write_item(self, RequestItems):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        with self._lock:
+            for table_name, requests in RequestItems.items():
+                if len(requests) > 25:
+                    raise ValidationException(
+                        "Too many items requested for the BatchWriteItem call"
+                    )
+                for request in requests:
+                    key = tuple(
+                        request['PutRequest']['Item'].get(name)
+                        for name in self.key_names
+                    )
+                    if any(value in (None, '') for value in key):
+                        raise ValidationException(
+                            f"Missing key attribute in item: {key}"
+                        )
+                for request in requests:
+                    self._store(table_name, request['PutRequest']['Item'])
+        return {'UnprocessedItems': {}}
+
+    def batch_get_item(self, RequestItems):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        responses = {}
+        with self._lock:
+            for table_name, request in RequestItems.items():
+                table = self.tables.get(table_name, {})
+                for key in request['Keys']:
+                    item = table.get(
+                        tuple(key.get(name) for name in self.key_names)
+                    )
+                    if item is not None:
+                        responses.setdefault(table_name, []).append(
+                            {name: item[name] for name in self.key_names}
+                        )
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def poll_stream(self, batch_size=100):
+        """
+        아직 전달하지 않은 스트림 레코드를 batch_size개씩 Lambda 이벤트로 반환합니다.
+        """
+        with self._lock:
+            batches = []
+            while self.stream_position < len(self.stream):
+                batch = self.stream[
+                    self.stream_position:self.stream_position + batch_size
+                ]
+                self.stream_position += len(batch)
+                batches.append({'Records': batch})
+            return batches
+
+
+class ValidationException(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.response = {
+            'Error': {'Code': 'ValidationException', 'Message': message}
+        }
+
+
+class ResourceExhausted(Exception):
+    code = 429
+
+
+class ServiceUnavailable(Exception):
+    code = 503
+
+
+class _Text:
+    def __init__(self, text):
+        self.text = text
+
+
+class GeminiStub:
+    """
+    결정적인 Gemini 생성/임베딩 스텁입니다. 프롬프트 종류(의도 단독/묶음, 광고주 추출, 광고 생성)를 알아보고
+    형식에 맞는 답을 돌려줍니다. 지연 시간은 로그 정규 분포(중앙값, sigma)이고,
+    error_rate 비율로 503, throttle_rate 비율로 429를 돌려줍니다.
+    """
+
+    def __init__(
+        self,
+        latency_ms=100.0,
+        sigma=0.5,
+        embed_latency_ms=30.0,
+        error_rate=0.0,
+        throttle_rate=0.0,
+        dim=768,
+        seed=0,
+    ):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.embed_latency_ms = embed_latency_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.dim = dim
+        self.calls = {}
+        self.failures = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def intent_for(text):
+        digest = hashlib.sha256(text.strip().encode('utf-8')).digest()
+        return (
+            INTENTS[digest[0] % len(INTENTS)]
+            if '가격' not in text
+            else '구매 고려'
+        )
+
+    @staticmethod
+    def company_in(text):
+        for company in COMPANIES:
+            if company.lower() in text.lower():
+                return company
+        return '없음'
+
+    def _call(self, kind, latency_ms):
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+            delay = (
+                latency_ms * math.exp(self._rng.gauss(0, self.sigma)) / 1000.0
+            )
+            roll = self._rng.random()
+        time.sleep(delay)
+        if roll < self.throttle_rate:
+            self._fail(kind)
+            raise ResourceExhausted(
+                "429 Resource has been exhausted (e.g. check quota)."
+            )
+        if roll < self.throttle_rate + self.error_rate:
+            self._fail(kind)
+            raise ServiceUnavailable(
+                "503 The service is currently unavailable."
+            )
+
+    def _fail(self, kind):
+        with self._lock:
+            self.failures[kind] = self.failures.get(kind, 0) + 1
+
+    def generate(self, prompt, generation_config=None):
+        if '회사/제품 이름' in prompt:
+            self._call('extract', self.latency_ms)
+            return _Text(
+                self.company_in(_SENTENCE_ITEM.search(prompt).group(1))
+            )
+        if '광고주:' in prompt:
+            self._call('ad', self.latency_ms)
+            query = _QUERY_ITEM.search(prompt).group(1).strip()
+            return _Text(f"{query[:20]} 고민이라면 지금 바로 확인하세요!")
+        if (
+            generation_config
+            and generation_config.get('response_mime_type')
+            == 'application/json'
+        ):
+            self._call('intent_batch', self.latency_ms)
+            questions = [
+                json.loads(item) for item in _BATCH_ITEM.findall(prompt)
+            ]
+            return _Text(
+                json.dumps(
+                    [
+                        {'id': number, 'intent': self.intent_for(q)}
+                        for number, q in enumerate(questions, 1)
+                    ],
+                    ensure_ascii=False,
+                )
+            )
+        self._call('intent', self.latency_ms)
+        return _Text(self.intent_for(_INTENT_ITEM.search(prompt).group(1)))
+
+    def vector(self, text):
+        rng = random.Random(hashlib.sha256(text.encode('utf-8')).digest())
+        return [0.2 + rng.gauss(0, 0.05) for _ in range(self.dim)]
+
+    def embed(self, content, **kwargs):
+        self._call('embed', self.embed_latency_ms)
+        if isinstance(content, list):
+            return {'embedding': [self.vector(text) for text in content]}
+        return {'embedding': self.vector(content)}
+
+    def total_calls(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+
+class StubGeminiClient(GeminiClient):
+    """
+    실제 모델 대신 GeminiStub을 호출하는 GeminiClient입니다. 속도 제한/재시도/회로 차단 경로는 그대로 거칩니다.
+    """
+
+    def __init__(self, stub, **kwargs):
+        super().__init__(**kwargs)
+        self.stub = stub
+
+    def generate_content(
+        self, prompt, model_name='gemini-pro', timeout=None, **kwargs
+    ):
+        return self.call(
+            lambda: self.stub.generate(prompt, **kwargs), timeout=timeout
+        )
+
+    def embed_content(self, timeout=None, **kwargs):
+        return self.call(lambda: self.stub.embed(**kwargs), timeout=timeout)
@@ -0,0 +1,135 @@
+import json
+import zlib
+
+# --- 집계 레코드 포맷 ---
+# MAGIC(2바이트) | 플래그(1바이트) | 본문
+# 본문(플래그에 따라 zlib 압축): varint 이벤트 수, 이벤트마다 varint 길이 + 압축 JSON(UTF-8)
+# 기존 레코드는 '{'로 시작하는 JSON 하나이므로 MAGIC으로 구분할 수 있습니다.
+MAGIC = b'\xa5\xd5'
+FLAG_ZLIB = 0x01
+
+# Kinesis 레코드 하나에 담을 이벤트 크기/개수 기본 상한 (Kinesis 레코드 최대 크기는 1MiB)
+DEFAULT_MAX_RECORD_BYTES = 64 * 1024
+DEFAULT_MAX_EVENTS_PER_RECORD = 100
+# 이 크기 미만이면 압축 이득보다 오버헤드가 커서 압축하지 않습니다.
+MIN_COMPRESS_BYTES = 256
+
+
+def _encode_varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _decode_varint(data, position):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, position
+        shift += 7
+
+
+def encode_event(event):
+    """
+    이벤트 하나를 공백 없는 UTF-8 JSON으로 직렬화합니다. (한글을 \\uXXXX로 이스케이프하지 않음)
+    """
+    return json.dumps(event, ensure_ascii=False, separators=(',', ':')).encode(
+        'utf-8'
+    )
+
+
+def encode_events(encoded_events, compress=True):
+    """
+    encode_event로 직렬화한 이벤트들을 집계 레코드 하나로 묶습니다.
+    압축 결과가 더 작을 때만 zlib 압축을 적용합니다.
+    """
+    body = bytearray(_encode_varint(len(encoded_events)))
+    for encoded in encoded_events:
+        body += _encode_varint(len(encoded))
+        body += encoded
+    body = bytes(body)
+
+    flags = 0
+    if compress and len(body) >= MIN_COMPRESS_BYTES:
+        compressed = zlib.compress(body, 6)
+        if len(compressed) < len(body):
+            body = compressed
+            flags |= FLAG_ZLIB
+    return MAGIC + bytes([flags]) + body
+
+
+def decode_events(data):
+    """
+    Kinesis 레코드 데이터를 이벤트 리스트로 복원합니다.
+    집계 레코드가 아니면 기존 형식(JSON 이벤트 하나)으로 읽습니다.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if not data.startswith(MAGIC):
+        return [json.loads(data.decode('utf-8'))]
+
+    flags = data[len(MAGIC)]
+    body = data[len(MAGIC) + 1:]
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+
+    count, position = _decode_varint(body, 0)
+    events = []
+    for _ in range(count):
+        length, position = _decode_varint(body, position)
+        events.append(
+            json.loads(body[position:position + length].decode('utf-8'))
+        )
+        position += length
+    return events
+
+
+def pack_events(
+    events,
+    partition_key_of,
+    compress=True,
+    max_record_bytes=DEFAULT_MAX_RECORD_BYTES,
+    max_events_per_record=DEFAULT_MAX_EVENTS_PER_RECORD,
+):
+    """
+    이벤트들을 파티션 키별로 모아 집계 레코드 [(파티션 키, 데이터, 이벤트 수)]로 만듭니다.
+    레코드 크기는 압축 전 기준으로 max_record_bytes를 넘지 않습니다.
+    """
+    groups = {}
+    for event in events:
+        groups.setdefault(partition_key_of(event), []).append(
+            encode_event(event)
+        )
+
+    records = []
+    for partition_key, encoded_events in groups.items():
+        current, current_bytes = [], 0
+        for encoded in encoded_events:
+            size = len(encoded) + 5  # 길이 varint 최대 크기 포함
+            if current and (
+                current_bytes + size > max_record_bytes
+                or len(current) >= max_events_per_record
+            ):
+                records.append((
+                    partition_key,
+                    encode_events(current, compress),
+                    len(current),
+                ))
+                current, current_bytes = [], 0
+            current.append(encoded)
+            current_bytes += size
+        if current:
+            records.append(
+                (partition_key, encode_events(current, compress), len(current))
+            )
+    return records
@@ -0,0 +1,423 @@
+import os
+import random
+import threading
+import time
+
+from lazy_clients import get_genai, get_generative_model
+
+# Gemini 호출 공용 계층 설정 (컨테이너 단위)
+# 여러 서비스가 같은 할당량을 나눠 쓰므로 함수별 환경 변수로 초당 호출 수와 동시 호출 수를 나눠 줍니다.
+GEMINI_RATE_LIMIT_PER_SECOND = float(
+    os.environ.get('GEMINI_RATE_LIMIT_PER_SECOND', '20')
+)
+GEMINI_RATE_LIMIT_BURST = int(os.environ.get('GEMINI_RATE_LIMIT_BURST', '20'))
+GEMINI_INITIAL_CONCURRENCY = int(
+    os.environ.get('GEMINI_INITIAL_CONCURRENCY', '8')
+)
+GEMINI_MIN_CONCURRENCY = int(os.environ.get('GEMINI_MIN_CONCURRENCY', '1'))
+GEMINI_MAX_CONCURRENCY = int(os.environ.get('GEMINI_MAX_CONCURRENCY', '32'))
+# 이보다 느린 응답은 과부하 신호로 보고 동시 호출 수를 줄입니다. (0이면 지연 시간은 보지 않음)
+GEMINI_LATENCY_TARGET_MS = float(
+    os.environ.get('GEMINI_LATENCY_TARGET_MS', '10000')
+)
+GEMINI_MAX_RETRIES = int(os.environ.get('GEMINI_MAX_RETRIES', '3'))
+GEMINI_RETRY_BASE_DELAY_MS = float(
+    os.environ.get('GEMINI_RETRY_BASE_DELAY_MS', '200')
+)
+GEMINI_RETRY_MAX_DELAY_MS = float(
+    os.environ.get('GEMINI_RETRY_MAX_DELAY_MS', '5000')
+)
+# 호출 하나가 속도 제한/동시 호출 대기와 재시도 대기에 쓸 수 있는 최대 시간
+GEMINI_MAX_WAIT_MS = float(os.environ.get('GEMINI_MAX_WAIT_MS', '20000'))
+GEMINI_BREAKER_FAILURES = int(os.environ.get('GEMINI_BREAKER_FAILURES', '5'))
+GEMINI_BREAKER_RESET_SECONDS = float(
+    os.environ.get('GEMINI_BREAKER_RESET_SECONDS', '30')
+)
+
+# 할당량 초과 / 재시도하면 성공할 수 있는 오류 (google.api_core 예외의 HTTP 코드와 클래스 이름)
+THROTTLE_STATUS_CODES = {429}
+RETRYABLE_STATUS_CODES = {408, 500, 502, 503, 504}
+THROTTLE_ERROR_NAMES = {'ResourceExhausted', 'TooManyRequests'}
+RETRYABLE_ERROR_NAMES = {
+    'ServiceUnavailable',
+    'InternalServerError',
+    'DeadlineExceeded',
+    'GatewayTimeout',
+    'BadGateway',
+    'TimeoutError',
+    'ConnectionError',
+    'RetryError',
+}
+
+
+class GeminiUnavailableError(Exception):
+    """
+    회로 차단기가 열려 있거나 대기 한도 안에 호출할 수 없어 바로 실패한 경우입니다.
+    호출하는 쪽은 다른 오류와 같이 기존 대체 경로(기본 광고, '분석 실패' 등)로 처리합니다.
+    """
+
+
+def classify_error(error):
+    """
+    오류를 'throttled'(할당량 초과), 'retryable'(일시적 오류), None(재시도해도 실패) 중 하나로 분류합니다.
+    """
+    code = getattr(error, 'code', None)
+    name = type(error).__name__
+    if code in THROTTLE_STATUS_CODES or name in THROTTLE_ERROR_NAMES:
+        return 'throttled'
+    if code in RETRYABLE_STATUS_CODES or name in RETRYABLE_ERROR_NAMES:
+        return 'retryable'
+    return None
+
+
+class TokenBucket:
+    """
+    초당 rate개, 최대 burst개까지 모아 둘 수 있는 토큰 버킷 속도 제한기입니다. rate가 0 이하면 제한하지 않습니다.
+    토큰을 미리 예약하는 방식이라 대기 중인 호출들은 도착 순서대로 rate 간격으로 나갑니다.
+    """
+
+    def __init__(
+        self, rate, burst=None, clock=time.monotonic, sleep=time.sleep
+    ):
+        self.rate = rate
+        self.burst = max(1, burst or int(rate) or 1)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        토큰 하나를 얻을 때까지 기다립니다. timeout(초) 안에 얻을 수 없으면 기다리지 않고 False를 반환합니다.
+        """
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            wait = max(0.0, (1.0 - self._tokens) / self.rate)
+            if timeout is not None and wait > timeout:
+                return False
+            self._tokens -= 1.0
+        if wait > 0:
+            self.sleep(wait)
+        return True
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD 방식의 동시 호출 수 제한기입니다.
+    한도를 채워 쓰는 동안 성공하면 한도를 조금씩(한도당 +1) 늘리고, 할당량 초과(429)나 목표보다 느린 응답을 받으면
+    한도를 decrease_factor배로 줄입니다.
+    한 번의 과부하에 여러 번 줄이지 않도록 마지막으로 줄인 뒤 시작한 호출만 반영합니다.
+    """
+
+    def __init__(
+        self,
+        initial=8,
+        min_limit=1,
+        max_limit=32,
+        latency_target=None,
+        decrease_factor=0.5,
+        clock=time.monotonic,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.clock = clock
+        self.in_flight = 0
+        self._last_decrease = float('-inf')
+        self._cond = threading.Condition()
+        self._counters = {'increases': 0, 'decreases': 0}
+
+    def acquire(self, timeout=None):
+        """
+        호출 자리가 날 때까지 기다립니다. timeout(초) 안에 자리가 나지 않으면 False를 반환합니다.
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                remaining = (
+                    None if deadline is None else deadline - self.clock()
+                )
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, started, latency, throttled=False):
+        with self._cond:
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            slow = bool(self.latency_target) and latency > self.latency_target
+            if throttled or slow:
+                if started >= self._last_decrease:
+                    self.limit = max(
+                        self.min_limit, self.limit * self.decrease_factor
+                    )
+                    self._last_decrease = self.clock()
+                    self._counters['decreases'] += 1
+            elif saturated and self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                self._counters['increases'] += 1
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return dict(
+                self._counters,
+                limit=round(self.limit, 2),
+                in_flight=self.in_flight,
+            )
+
+
+class CircuitBreaker:
+    """
+    연속 실패가 failure_threshold번이면 열려서 reset_timeout초 동안 호출을 바로 거부합니다.
+    그 뒤 시험 호출 하나만 보내(half-open) 성공하면 닫고, 실패하면 다시 엽니다.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._counters = {'opened': 0, 'rejected': 0}
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.clock() - self._opened_at < self.reset_timeout:
+                    self._counters['rejected'] += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self._counters['rejected'] += 1
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def cancel(self):
+        """
+        allow() 후 호출하지 못했을 때 시험 호출 자리를 돌려놓습니다.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED
+                and self._failures >= self.failure_threshold
+            ):
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+                self._counters['opened'] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, state=self.state)
+
+
+class GeminiClient:
+    """
+    Gemini 호출 공용 계층입니다. 호출마다 회로 차단기 → 토큰 버킷 → 적응형 동시 호출 제한을 거치고,
+    할당량 초과/일시적 오류는 지수 백오프 + full jitter로 재시도합니다.
+    재시도할 수 없는 오류는 그대로, 바로 실패해야 하는 경우는 GeminiUnavailableError로 올립니다.
+    """
+
+    def __init__(
+        self,
+        rate_limiter=None,
+        concurrency_limiter=None,
+        breaker=None,
+        max_retries=3,
+        base_delay=0.2,
+        max_delay=5.0,
+        max_wait=20.0,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.rate_limiter = rate_limiter or TokenBucket(0)
+        self.concurrency_limiter = (
+            concurrency_limiter or AdaptiveConcurrencyLimiter()
+        )
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._counters = {
+            'calls': 0,
+            'attempts': 0,
+            'successes': 0,
+            'retries': 0,
+            'throttled': 0,
+            'errors': 0,
+            'fast_failures': 0,
+        }
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            rate_limiter=TokenBucket(
+                GEMINI_RATE_LIMIT_PER_SECOND, GEMINI_RATE_LIMIT_BURST
+            ),
+            concurrency_limiter=AdaptiveConcurrencyLimiter(
+                GEMINI_INITIAL_CONCURRENCY,
+                GEMINI_MIN_CONCURRENCY,
+                GEMINI_MAX_CONCURRENCY,
+                latency_target=(
+                    GEMINI_LATENCY_TARGET_MS / 1000.0
+                    if GEMINI_LATENCY_TARGET_MS > 0
+                    else None
+                ),
+            ),
+            breaker=CircuitBreaker(
+                GEMINI_BREAKER_FAILURES, GEMINI_BREAKER_RESET_SECONDS
+            ),
+            max_retries=GEMINI_MAX_RETRIES,
+            base_delay=GEMINI_RETRY_BASE_DELAY_MS / 1000.0,
+            max_delay=GEMINI_RETRY_MAX_DELAY_MS / 1000.0,
+            max_wait=GEMINI_MAX_WAIT_MS / 1000.0,
+        )
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _fail_fast(self, reason):
+        self._count('fast_failures')
+        raise GeminiUnavailableError(reason)
+
+    def call(self, operation, timeout=None):
+        """
+        operation()을 호출해 결과를 반환합니다.
+        timeout(초)은 대기와 재시도에 쓸 수 있는 시간으로, 없으면 max_wait를 씁니다.
+        """
+        self._count('calls')
+        deadline = self.clock() + (
+            self.max_wait if timeout is None else timeout
+        )
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                self._fail_fast("Gemini circuit breaker is open.")
+            if not self.rate_limiter.acquire(
+                max(0.0, deadline - self.clock())
+            ):
+                self.breaker.cancel()
+                self._fail_fast(
+                    "Gemini rate limit wait exceeds the call budget."
+                )
+            if not self.concurrency_limiter.acquire(
+                max(0.0, deadline - self.clock())
+            ):
+                self.breaker.cancel()
+                self._fail_fast(
+                    "Gemini concurrency limit wait exceeds the call budget."
+                )
+
+            self._count('attempts')
+            started = self.clock()
+            try:
+                result = operation()
+            except Exception as e:
+                kind = classify_error(e)
+                self.concurrency_limiter.release(
+                    started,
+                    self.clock() - started,
+                    throttled=kind == 'throttled',
+                )
+                if kind is None:
+                    # 요청 자체의 문제이므로 제공자 상태(회로 차단기)에는 반영하지 않습니다.
+                    self.breaker.record_success()
+                    self._count('errors')
+                    raise
+                self.breaker.record_failure()
+                self._count('throttled' if kind == 'throttled' else 'errors')
+                delay = random.uniform(
+                    0, min(self.max_delay, self.base_delay * (2**attempt))
+                )
+                if (
+                    attempt >= self.max_retries
+                    or self.clock() + delay > deadline
+                ):
+                    raise
+                self._count('retries')
+                self.sleep(delay)
+                continue
+
+            self.concurrency_limiter.release(started, self.clock() - started)
+            self.breaker.record_success()
+            self._count('successes')
+            return result
+
+    def generate_content(
+        self, prompt, model_name='gemini-pro', timeout=None, **kwargs
+    ):
+        """
+        모델 이름별로 재사용하는 GenerativeModel로 generate_content를 호출합니다.
+        """
+        model = get_generative_model(model_name)
+        return self.call(
+            lambda: model.generate_content(prompt, **kwargs), timeout=timeout
+        )
+
+    def embed_content(self, timeout=None, **kwargs):
+        genai = get_genai()
+        return self.call(
+            lambda: genai.embed_content(**kwargs), timeout=timeout
+        )
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['concurrency'] = self.concurrency_limiter.stats()
+        stats['breaker'] = self.breaker.stats()
+        return stats
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_gemini_client():
+    """
+    환경 변수 설정으로 만든 공용 GeminiClient를 컨테이너 안에서 재사용합니다.
+    """
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = GeminiClient.from_env()
+    return _default_client
@@ -0,0 +1,126 @@
+import importlib
+import os
+import threading
+
+# 무거운 SDK(boto3, google.generativeai)는 실제로 필요할 때 처음 import하고,
+# 만든 클라이언트/모델은 컨테이너가 살아있는 동안 재사용합니다.
+_lock = threading.RLock()
+_instances = {}
+
+
+def _memoize(key, factory):
+    instance = _instances.get(key)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(key)
+            if instance is None:
+                instance = factory()
+                _instances[key] = instance
+    return instance
+
+
+def lazy_import(module_name):
+    """
+    모듈을 처음 필요할 때 import합니다.
+    """
+    return importlib.import_module(module_name)
+
+
+def get_boto3_client(service_name, **kwargs):
+    """
+    boto3 클라이언트를 서비스/옵션별로 한 번만 만들어 재사용합니다.
+    """
+    key = ('boto3.client', service_name, tuple(sorted(kwargs.items())))
+    return _memoize(
+        key, lambda: lazy_import('boto3').client(service_name, **kwargs)
+    )
+
+
+def get_boto3_resource(service_name, **kwargs):
+    """
+    boto3 리소스를 서비스/옵션별로 한 번만 만들어 재사용합니다.
+    """
+    key = ('boto3.resource', service_name, tuple(sorted(kwargs.items())))
+    return _memoize(
+        key, lambda: lazy_import('boto3').resource(service_name, **kwargs)
+    )
+
+
+def get_gemini_api_key():
+    return os.environ.get('GEMINI_API_KEY')
+
+
+def get_genai():
+    """
+    google.generativeai 모듈을 import하고 API 키를 한 번만 설정합니다.
+    API 키가 없으면 ValueError를 발생시킵니다.
+    """
+
+    def configure():
+        api_key = get_gemini_api_key()
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is not set.")
+        genai = lazy_import('google.generativeai')
+        genai.configure(api_key=api_key)
+        return genai
+
+    return _memoize(('genai',), configure)
+
+
+def get_generative_model(model_name='gemini-pro'):
+    """
+    GenerativeModel 인스턴스를 모델 이름별로 한 번만 만들어 재사용합니다.
+    """
+    return _memoize(
+        ('genai.model', model_name),
+        lambda: get_genai().GenerativeModel(model_name),
+    )
+
+
+def is_warmup_event(event):
+    """
+    예약 호출(EventBridge 등)로 보내는 워밍업 이벤트인지 확인합니다. 예: {"warmup": true}
+    """
+    return isinstance(event, dict) and event.get('warmup') is True
+
+
+def warm_up(
+    boto3_clients=(), boto3_resources=(), generative_models=(), modules=()
+):
+    """
+    지정한 모듈 import와 클라이언트/모델 생성을 미리 수행합니다. 네트워크 호출은 하지 않습니다.
+    초기화하지 못한 항목은 건너뛰고, 초기화한 항목 이름 리스트를 반환합니다.
+    """
+    warmed = []
+    steps = (
+        [
+            (f"module:{name}", lambda name=name: lazy_import(name))
+            for name in modules
+        ]
+        + [
+            (f"client:{name}", lambda name=name: get_boto3_client(name))
+            for name in boto3_clients
+        ]
+        + [
+            (f"resource:{name}", lambda name=name: get_boto3_resource(name))
+            for name in boto3_resources
+        ]
+        + [
+            (f"model:{name}", lambda name=name: get_generative_model(name))
+            for name in generative_models
+        ]
+    )
+    for label, step in steps:
+        try:
+            step()
+            warmed.append(label)
+        except Exception as e:
+            print(f"Warm-up skipped {label}: {e}")
+    return warmed
+
+
+def warmup_response(warmed):
+    return {
+        'statusCode': 200,
+        'body': f"Warmed up: {', '.join(warmed) or 'nothing'}",
+    }
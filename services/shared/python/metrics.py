@@ -0,0 +1,223 @@
+import functools
+import json
+import os
+import random
+import threading
+import time
+
+from lazy_clients import is_warmup_event
+
+# 호출(invocation) 단위 지표 설정
+# 꺼 두면(METRICS_ENABLED=false) 타이머/카운터는 아무 일도 하지 않고 지표 줄도 남기지 않습니다.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() not in (
+    '0',
+    'false',
+    'no',
+    'off',
+)
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'AdScouter')
+# 레코드 단위 디버그 로그를 남길 비율 (0이면 남기지 않음, 1이면 모두)
+DEBUG_LOG_SAMPLE_RATE = float(os.environ.get('DEBUG_LOG_SAMPLE_RATE', '0.01'))
+# 히스토그램 하나가 지표 줄에 싣는 최대 값 수 (EMF 배열 한도 100)
+METRICS_MAX_HISTOGRAM_VALUES = 100
+
+
+class _NoopStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+class _Stage:
+    __slots__ = ('metrics', 'name', 'started')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = self.metrics.clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.timing(
+            self.name, (self.metrics.clock() - self.started) * 1000.0
+        )
+        return False
+
+
+class InvocationMetrics:
+    """
+    핸들러 호출 하나 동안의 단계별 시간, 카운터, 히스토그램을 모았다가 flush에서
+    CloudWatch Embedded Metric Format(EMF) JSON 한 줄로 내보냅니다. (Lambda 로그로 출력하면
+    CloudWatch가 지표로 추출)
+
+    - stage(name): 단계 시간(ms)을 누적합니다. 같은 단계를 여러 번 지나면 합산합니다.
+    - count(name, value): 카운터를 더합니다.
+    - observe(name, value): 히스토그램 값을 기록합니다. 값이 많으면 저장소 표본 추출로 최대 100개만 싣습니다.
+    - set_property(name, value): 지표가 아닌 속성(캐시 통계 등)을 지표 줄에 함께 남깁니다.
+    - debug(message, *args): sample_rate 비율로만 출력하며, 표본에 뽑힌 경우에만 메시지를 포맷합니다.
+
+    enabled=False면 위 메서드가 바로 반환하므로 레코드 루프 안에서 호출해도 부담이 거의 없습니다.
+    백그라운드 스레드에서도 기록할 수 있도록 스레드 안전합니다.
+    """
+
+    def __init__(
+        self,
+        service,
+        namespace=METRICS_NAMESPACE,
+        enabled=METRICS_ENABLED,
+        sample_rate=DEBUG_LOG_SAMPLE_RATE,
+        clock=time.perf_counter,
+        rng=None,
+        emit=print,
+    ):
+        self.service = service
+        self.namespace = namespace
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.clock = clock
+        self.emit = emit
+        self._random = (rng or random.Random()).random
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._timers = {}
+        self._counters = {}
+        self._histograms = {}
+        self._properties = {}
+
+    def stage(self, name):
+        """
+        with metrics.stage('classify'): ... 형태로 단계 시간을 잽니다.
+        """
+        if not self.enabled:
+            return _NOOP_STAGE
+        return _Stage(self, name)
+
+    def timing(self, name, milliseconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._timers[name] = self._timers.get(name, 0.0) + milliseconds
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, value, unit='Milliseconds'):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = {
+                    'unit': unit,
+                    'count': 0,
+                    'values': [],
+                }
+            histogram['count'] += 1
+            if len(histogram['values']) < METRICS_MAX_HISTOGRAM_VALUES:
+                histogram['values'].append(value)
+            else:
+                slot = int(self._random() * histogram['count'])
+                if slot < METRICS_MAX_HISTOGRAM_VALUES:
+                    histogram['values'][slot] = value
+
+    def set_property(self, name, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._properties[name] = value
+
+    def debug_enabled(self):
+        """
+        이번 레코드의 디버그 로그를 남길지 표본 추출합니다. 로그를 만드는 비용이 클 때 먼저 확인합니다.
+        """
+        return self.sample_rate > 0 and (
+            self.sample_rate >= 1 or self._random() < self.sample_rate
+        )
+
+    def debug(self, message, *args):
+        if self.debug_enabled():
+            print(message % args if args else message)
+
+    def to_emf(self, timestamp=None, reset=False):
+        """
+        모은 값을 EMF 문서(dict)로 만듭니다. 기록된 값이 없으면 None입니다.
+        reset=True면 같은 잠금 안에서 값을 비웁니다.
+        """
+        with self._lock:
+            if not (self._timers or self._counters or self._histograms):
+                if reset:
+                    self._reset()
+                return None
+            definitions = []
+            document = {'Service': self.service}
+            for name, milliseconds in self._timers.items():
+                metric = f"{name}_ms"
+                definitions.append({'Name': metric, 'Unit': 'Milliseconds'})
+                document[metric] = round(milliseconds, 3)
+            for name, value in self._counters.items():
+                definitions.append({'Name': name, 'Unit': 'Count'})
+                document[name] = value
+            for name, histogram in self._histograms.items():
+                definitions.append({'Name': name, 'Unit': histogram['unit']})
+                document[name] = [
+                    round(value, 3) for value in histogram['values']
+                ]
+                document[f"{name}_samples"] = histogram['count']
+            for name, value in self._properties.items():
+                document.setdefault(name, value)
+            if reset:
+                self._reset()
+
+        document['_aws'] = {
+            'Timestamp': int(
+                (time.time() if timestamp is None else timestamp) * 1000
+            ),
+            'CloudWatchMetrics': [{
+                'Namespace': self.namespace,
+                'Dimensions': [['Service']],
+                # EMF 지시문 하나에는 지표를 100개까지 정의할 수 있습니다.
+                'Metrics': definitions[:100],
+            }],
+        }
+        return document
+
+    def flush(self):
+        """
+        지표 줄을 한 번 출력하고 다음 호출을 위해 값을 비웁니다.
+        """
+        if not self.enabled:
+            return None
+        document = self.to_emf(reset=True)
+        if document is not None:
+            self.emit(json.dumps(document, ensure_ascii=False, default=str))
+        return document
+
+    def instrument(self, handler):
+        """
+        핸들러 데코레이터입니다. 전체 시간을 'total' 단계로 기록하고, 반환하거나 예외가 나도 지표 줄을 flush합니다.
+        워밍업 호출은 지표에 넣지 않습니다.
+        """
+
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            if is_warmup_event(event):
+                return handler(event, context)
+            try:
+                with self.stage('total'):
+                    return handler(event, context)
+            finally:
+                self.flush()
+
+        return wrapper
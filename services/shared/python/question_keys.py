@@ -0,0 +1,23 @@
+import hashlib
+import re
+import unicodedata
+
+# 질문 중복 판단(캐시 키, 중복 제거)에 쓰는 정규화 규칙입니다. (data-processor ↔ scouter)
+_WHITESPACE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION = re.compile(r'[\s?!.~…,]+$')
+
+
+def normalize_question(text):
+    """
+    캐시 키 계산을 위해 질문을 정규화합니다. (유니코드 NFKC, 소문자, 공백 정리, 끝 문장부호 제거)
+    """
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    text = _WHITESPACE.sub(' ', text).strip()
+    return _TRAILING_PUNCTUATION.sub('', text)
+
+
+def question_key(text):
+    """
+    정규화된 질문의 SHA-256 해시를 캐시 키로 반환합니다.
+    """
+    return hashlib.sha256(normalize_question(text).encode('utf-8')).hexdigest()